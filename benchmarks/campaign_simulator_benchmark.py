@@ -0,0 +1,68 @@
+"""
+Time to dry-run a campaign over a corpus of carts with CampaignSimulator, against repricing every cart through
+DiscountService once per catalogue (measured on a sample of the corpus and scaled up).
+
+Usage: python -m benchmarks.campaign_simulator_benchmark --carts 200000 --discounts 1000
+"""
+import argparse
+import asyncio
+import time
+from decimal import Decimal
+
+import pendulum
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_discounts, generate_requests
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from models.pricing_request import PricingRequest
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.campaign_simulator import CampaignSimulator
+from services.discount_service import DiscountService
+
+
+async def reprice_every_cart(discounts, campaign, requests: list[PricingRequest]) -> float:
+    """
+    :return: Seconds spent pricing every request through DiscountService, once without and once with `campaign`.
+    """
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    started = time.perf_counter()
+    for catalogue in (discounts, discounts + [campaign]):
+        service = DiscountService(InMemoryDiscountRepository(catalogue),
+                                  DiscountProcessor(strategy, mutate_products=False))
+        for request in requests:
+            await service.calculate_cart_discounts(*request)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=1_000)
+    parser.add_argument("--carts", type=int, default=200_000)
+    parser.add_argument("--max-cart-size", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=2_000, help="Carts repriced one by one for the baseline")
+    args = parser.parse_args()
+
+    discounts = generate_discounts(args.discounts)
+    requests = generate_requests(args.carts, max_cart_size=args.max_cart_size)
+    campaign = PercentageDiscount(name="Campaign 20%", discount_percentage=Decimal(20),
+                                  discount_rules=[BrandDiscountRule(include_brands=["BRAND-1", "BRAND-2"])],
+                                  discount_type=DiscountType.BRAND_DISCOUNT,
+                                  expires_at=pendulum.now("UTC") + pendulum.duration(days=1))
+    simulator = CampaignSimulator(InMemoryDiscountRepository(discounts),
+                                  DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING))
+
+    started = time.perf_counter()
+    report = asyncio.run(simulator.simulate(campaign, requests))
+    simulated = time.perf_counter() - started
+    sample = requests[:args.sample]
+    repriced = asyncio.run(reprice_every_cart(discounts, campaign, sample)) * len(requests) / len(sample)
+    print(f"{report.carts} carts, {report.carts_affected} affected, revenue delta {report.revenue_delta}")
+    print(f"simulator          {simulated:8.1f} s  ({report.carts / simulated:10.0f} carts/s)")
+    print(f"reprice every cart {repriced:8.1f} s  (scaled from {len(sample)} carts)")
+
+
+if __name__ == "__main__":
+    main()
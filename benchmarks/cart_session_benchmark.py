@@ -0,0 +1,66 @@
+"""
+Cost of repricing a cart after changing one line: a full DiscountService.calculate_cart_discounts against
+a CartPricingSession, for growing cart sizes.
+
+Usage: python -m benchmarks.cart_session_benchmark --discounts 1000 --edits 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.rule_compiler import RuleCompiler
+from models.cart import CartItem
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_plan_cache import DiscountPlanCache
+from services.discount_service import DiscountService
+
+
+async def run_edits(service: DiscountService, cart_size: int, edits: int, incremental: bool, seed: int = 0) -> float:
+    """
+    Change the quantity of a random line and reprice, `edits` times.
+
+    :return: The mean time per edit, in seconds.
+    """
+    rng = random.Random(seed)
+    customer = generate_customer(rng)
+    cart_items = generate_cart(cart_size, rng=rng)
+    session = service.start_cart_session(customer)
+    handles = [session.add_item(item) for item in cart_items]
+    await session.price()
+    started = time.perf_counter()
+    for _ in range(edits):
+        position = rng.randrange(cart_size)
+        cart_items[position] = CartItem(product=cart_items[position].product, quantity=rng.randrange(1, 5),
+                                        size=cart_items[position].size)
+        if incremental:
+            session.update_item(handles[position], cart_items[position])
+            await session.price()
+        else:
+            await service.calculate_cart_discounts(cart_items, customer)
+    return (time.perf_counter() - started) / edits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=1_000)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--cart-sizes", type=int, nargs="+", default=[10, 100, 1_000, 5_000])
+    args = parser.parse_args()
+
+    repository = InMemoryDiscountRepository(generate_discounts(args.discounts))
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                                  repository.get_discount_index, mutate_products=False, rule_compiler=RuleCompiler())
+    service = DiscountService(repository, processor, plan_cache=DiscountPlanCache())
+    for cart_size in args.cart_sizes:
+        full = asyncio.run(run_edits(service, cart_size, args.edits, incremental=False))
+        incremental = asyncio.run(run_edits(service, cart_size, args.edits, incremental=True))
+        print(f"{cart_size:6d} lines  full {full * 1e6:10.1f} µs/edit  session {incremental * 1e6:8.1f} µs/edit  "
+              f"({full / incremental:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cold start of a worker serving a catalogue file through MappedDiscountRepository, against decoding the whole
+file into an InMemoryDiscountRepository.
+
+The catalogue holds `--discounts` generated discounts plus `--voucher-codes` generated codes redeeming one
+template. Start up is timed until the first voucher lookup and until the first active listing has been served.
+
+Usage: python -m benchmarks.catalogue_file_benchmark --discounts 100000 --voucher-codes 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.pricing_benchmark import percentile
+from benchmarks.synthetic_data import generate_discounts
+from discounts.constants import DiscountType
+from repositories.catalogue_file import load_catalogue_file, write_catalogue_file
+from repositories.discount_catalogue import DiscountCatalogue
+from repositories.discount_repository import IDiscountRepository, InMemoryDiscountRepository
+from repositories.mapped_discount_repository import MappedDiscountRepository
+
+
+async def time_first_requests(repository: IDiscountRepository, voucher_codes: list[str],
+                              lookups: int = 1000) -> tuple[float, float, list[float]]:
+    """
+    :return: Seconds until the first lookup and the first listing were served, and the sorted latencies
+        of `lookups` further random lookups.
+    """
+    started = time.perf_counter()
+    await repository.get_discount_by_code(voucher_codes[0])
+    first_lookup = time.perf_counter() - started
+    await repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT})
+    first_listing = time.perf_counter() - started
+    rng, latencies = random.Random(0), []
+    for _ in range(lookups):
+        code = rng.choice(voucher_codes)
+        lookup_started = time.perf_counter()
+        await repository.get_discount_by_code(code)
+        latencies.append(time.perf_counter() - lookup_started)
+    latencies.sort()
+    return first_lookup, first_listing, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=100_000)
+    parser.add_argument("--voucher-codes", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    discounts = generate_discounts(args.discounts, voucher_share=0.1)
+    template = next(discount for discount in discounts if discount.discount_type == DiscountType.VOUCHER_DISCOUNT)
+    voucher_codes = [f"FEST-{number:08d}" for number in range(args.voucher_codes)]
+    catalogue = DiscountCatalogue(discounts, dict.fromkeys(voucher_codes, template))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalogue.bin")
+        started = time.perf_counter()
+        write_catalogue_file(path, catalogue)
+        print(f"wrote {os.path.getsize(path) / 2 ** 20:.1f} MiB in {time.perf_counter() - started:.1f}s")
+
+        for name in ("mapped", "decoded"):
+            started = time.perf_counter()
+            if name == "mapped":
+                repository = MappedDiscountRepository(path)
+            else:
+                repository = InMemoryDiscountRepository()
+                repository.update(lambda _: load_catalogue_file(path))
+            opened = time.perf_counter() - started
+            first_lookup, first_listing, latencies = asyncio.run(time_first_requests(repository, voucher_codes))
+            print(f"{name:8s} open {opened * 1000:9.1f} ms  first lookup {(opened + first_lookup) * 1000:9.1f} ms  "
+                  f"first listing {(opened + first_listing) * 1000:9.1f} ms  "
+                  f"lookup p99 {percentile(latencies, 0.99) * 1e6:6.1f} us")
+            if isinstance(repository, MappedDiscountRepository):
+                repository.close()
+
+
+if __name__ == "__main__":
+    main()
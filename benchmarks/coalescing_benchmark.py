@@ -0,0 +1,106 @@
+"""
+Throughput of DiscountService under a burst of concurrent checkouts against a repository with latency,
+with and without CoalescingDiscountRepository.
+
+The simulated repository sleeps for `--latency-ms` per call and serves at most `--pool-size` calls at a
+time, like a database behind a connection pool.
+
+Usage: python -m benchmarks.coalescing_benchmark --coroutines 10000 --latency-ms 5 --pool-size 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Sequence
+
+from pendulum import DateTime
+
+from benchmarks.synthetic_data import (
+    DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts, generate_payment_info,
+)
+from benchmarks.pricing_benchmark import percentile
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from repositories.coalescing_discount_repository import CoalescingDiscountRepository
+from repositories.discount_repository import IDiscountRepository, InMemoryDiscountRepository
+from services.discount_service import DiscountService
+
+
+class LatencyDiscountRepository(InMemoryDiscountRepository):
+    """
+    InMemoryDiscountRepository that behaves like a remote store: each call waits `latency_seconds`, and at most
+    `pool_size` calls are served at a time.
+    """
+
+    def __init__(self, discounts: list[Discount], latency_seconds: float, pool_size: int) -> None:
+        super().__init__(discounts)
+        self._latency_seconds = latency_seconds
+        self._pool = asyncio.Semaphore(pool_size)
+        self.calls = 0
+
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: DateTime | None = None) -> Sequence[Discount]:
+        await self._round_trip()
+        return await super().list_all_active_discounts(exclude_discount_type, now=now)
+
+    async def get_discount_by_code(self, discount_code: str) -> Discount | None:
+        await self._round_trip()
+        return await super().get_discount_by_code(discount_code)
+
+    async def _round_trip(self) -> None:
+        self.calls += 1
+        async with self._pool:
+            await asyncio.sleep(self._latency_seconds)
+
+
+async def run_burst(repository: IDiscountRepository, coroutines: int, voucher_codes: list[str],
+                    seed: int = 0) -> tuple[float, list[float]]:
+    """
+    Start `coroutines` checkouts at once.
+
+    :return: The wall time of the burst and the latency of each checkout, in seconds.
+    """
+    rng = random.Random(seed)
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False)
+    service = DiscountService(repository, processor)
+    carts = [generate_cart(rng.randint(1, 10), rng=rng) for _ in range(min(coroutines, 500))]
+
+    async def checkout(index: int) -> float:
+        started = time.perf_counter()
+        await service.calculate_cart_discounts(cart_items=carts[index % len(carts)], customer=generate_customer(rng),
+                                               payment_info=generate_payment_info(rng),
+                                               voucher_code=rng.choice(voucher_codes) if voucher_codes else None)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(checkout(index) for index in range(coroutines)))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=1_000)
+    parser.add_argument("--coroutines", type=int, default=10_000)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--max-concurrent-calls", type=int, default=20)
+    parser.add_argument("--voucher-codes", type=int, default=10, help="Number of distinct codes redeemed")
+    args = parser.parse_args()
+
+    discounts = generate_discounts(args.discounts, voucher_share=0.1)
+    voucher_codes = [discount.discount_code for discount in discounts
+                     if discount.discount_type == DiscountType.VOUCHER_DISCOUNT][:args.voucher_codes]
+    for coalesce in (False, True):
+        backend = LatencyDiscountRepository(discounts, args.latency_ms / 1000, args.pool_size)
+        repository = (CoalescingDiscountRepository(backend, max_concurrent_calls=args.max_concurrent_calls)
+                      if coalesce else backend)
+        seconds, latencies = asyncio.run(run_burst(repository, args.coroutines, voucher_codes))
+        print(f"{'coalescing' if coalesce else 'direct':10s} {args.coroutines / seconds:10.1f} carts/s  "
+              f"p50 {percentile(latencies, 0.50) * 1000:9.1f} ms  p99 {percentile(latencies, 0.99) * 1000:9.1f} ms  "
+              f"{backend.calls:6d} repository calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cost of the pricing pipeline's instrumentation hooks: single-cart checkouts through DiscountService with the
+default no-op instrumentation and with InProcessInstrumentation, whose statistics are dumped at the end.
+
+Usage: python -m benchmarks.instrumentation_benchmark --carts 20000 --max-cart-size 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_discounts, generate_requests
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.rule_compiler import RuleCompiler
+from instrumentation.in_process_instrumentation import InProcessInstrumentation
+from instrumentation.instrumentation_interface import IInstrumentation
+from models.pricing_request import PricingRequest
+from repositories.discount_repository import InMemoryDiscountRepository
+from repositories.instrumented_discount_repository import InstrumentedDiscountRepository
+from services.discount_plan_cache import DiscountPlanCache
+from services.discount_service import DiscountService
+
+
+async def run_checkouts(repository: InMemoryDiscountRepository, requests: list[PricingRequest],
+                        instrumentation: IInstrumentation | None) -> float:
+    """
+    :return: The wall time of pricing every request one at a time, in seconds.
+    """
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                                  repository.get_discount_index, mutate_products=False, rule_compiler=RuleCompiler(),
+                                  instrumentation=instrumentation)
+    service = DiscountService(repository if instrumentation is None
+                              else InstrumentedDiscountRepository(repository, instrumentation),
+                              processor, plan_cache=DiscountPlanCache(), instrumentation=instrumentation)
+    started = time.perf_counter()
+    for request in requests:
+        await service.calculate_cart_discounts(request.cart_items, request.customer, request.payment_info,
+                                               request.voucher_code)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=1_000)
+    parser.add_argument("--carts", type=int, default=20_000)
+    parser.add_argument("--max-cart-size", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5, help="Best of this many runs is reported")
+    args = parser.parse_args()
+
+    repository = InMemoryDiscountRepository(generate_discounts(args.discounts))
+    requests = generate_requests(args.carts, max_cart_size=args.max_cart_size)
+    in_process = InProcessInstrumentation()
+    for name, instrumentation in (("no-op", None), ("in-process", in_process)):
+        seconds = float("inf")
+        for _ in range(args.rounds):
+            # Only the last round's statistics are dumped.
+            in_process.reset()
+            seconds = min(seconds, asyncio.run(run_checkouts(repository, requests, instrumentation)))
+        print(f"{name:10s} {args.carts / seconds:10.1f} carts/s  {seconds / args.carts * 1e6:8.2f} µs/cart")
+    in_process.dump()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Memory footprint and rule-check speed of the slotted models against plain (dict-backed) dataclasses
+with list-based rule filters, as the models were originally defined.
+
+Usage: python -m benchmarks.model_memory_benchmark --products 1000000
+"""
+import argparse
+import random
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable
+
+from benchmarks.synthetic_data import brand_names, category_names
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from models.cart import CartItem
+from models.customer import CustomerProfile, CustomerTier
+from models.product import Product, BrandTier
+
+
+@dataclass
+class DictProduct:
+    id: str
+    brand: str
+    brand_tier: BrandTier
+    category: str
+    base_price: Decimal
+    current_price: Decimal
+
+
+@dataclass
+class DictCartItem:
+    product: DictProduct
+    quantity: int
+    size: str
+
+
+class ListBrandDiscountRule:
+
+    def __init__(self, include_brands: list[str] | None = None, exclude_brands: list[str] | None = None) -> None:
+        self.include_brands = include_brands or []
+        self.exclude_brands = exclude_brands or []
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        brand_name = cart_item.product.brand
+        if self.include_brands and brand_name not in self.include_brands:
+            return False
+        if self.exclude_brands and brand_name in self.exclude_brands:
+            return False
+        return True
+
+
+class ListCategoryDiscountRule:
+
+    def __init__(self, include_categories: list[str] | None = None,
+                 exclude_categories: list[str] | None = None) -> None:
+        self.include_categories = include_categories or []
+        self.exclude_categories = exclude_categories or []
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        category_name = cart_item.product.category
+        if self.include_categories and category_name not in self.include_categories:
+            return False
+        if self.exclude_categories and category_name in self.exclude_categories:
+            return False
+        return True
+
+
+def _cart_items(count: int, product_type: type, cart_item_type: type) -> list:
+    rng = random.Random(0)
+    brands, categories = brand_names(500), category_names(50)
+    price = Decimal("999.00")
+    # Brand and category strings are built per row, as they would be when decoded from a database or JSON.
+    return [
+        cart_item_type(
+            product=product_type(id=f"P{number}", brand="".join(rng.choice(brands)),
+                                 brand_tier=BrandTier.REGULAR, category="".join(rng.choice(categories)),
+                                 base_price=price, current_price=price),
+            quantity=1,
+            size="M",
+        )
+        for number in range(count)
+    ]
+
+
+def _measure(build: Callable[[], list]) -> tuple[list, int]:
+    tracemalloc.start()
+    built = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, allocated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--filter-size", type=int, default=50, help="Brands/categories listed in each rule filter")
+    args = parser.parse_args()
+
+    customer = CustomerProfile(id="C1", name="Bench", tier=CustomerTier.GOLD, email="c@example.com", phone="0")
+    brands, categories = brand_names(500), category_names(50)
+    rule_filters = dict(brands=brands[-args.filter_size:], categories=categories[-args.filter_size // 5:])
+
+    variants = {
+        "dataclass + list filters": (DictProduct, DictCartItem, ListBrandDiscountRule, ListCategoryDiscountRule),
+        "slotted + frozenset filters": (Product, CartItem, BrandDiscountRule, CategoryDiscountRule),
+    }
+    for label, (product_type, cart_item_type, brand_rule_type, category_rule_type) in variants.items():
+        cart_items, allocated = _measure(lambda: _cart_items(args.products, product_type, cart_item_type))
+        rules = [brand_rule_type(include_brands=rule_filters["brands"]),
+                 category_rule_type(include_categories=rule_filters["categories"])]
+        sample = cart_items[:10_000]
+
+        def check() -> None:
+            for item in sample:
+                for rule in rules:
+                    if not rule.is_applicable(customer_profile=customer, cart_item=item):
+                        break
+
+        seconds = min(timeit.repeat(check, number=5, repeat=3)) / (5 * len(sample))
+        print(f"{label:30s} {allocated / args.products:8.1f} bytes/cart item  "
+              f"{seconds * 1e9:8.1f} ns/is_applicable check")
+        del cart_items
+
+
+if __name__ == "__main__":
+    main()
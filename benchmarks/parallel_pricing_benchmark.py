@@ -0,0 +1,65 @@
+"""
+Throughput of ParallelDiscountProcessor for an increasing number of worker processes.
+
+Usage: python -m benchmarks.parallel_pricing_benchmark --carts 20000 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks.synthetic_data import (
+    DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts, generate_payment_info,
+)
+from discounts.index.discount_index import DiscountIndex
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor, PricingJob
+from discounts.processor.parallel_discount_processor import ParallelDiscountProcessor
+
+
+def _jobs(processor: DiscountProcessor, discounts: list, carts: int, cart_size: int, seed: int) -> list[PricingJob]:
+    rng = random.Random(seed)
+    resolved_discounts = processor.resolve_discounts(list(discounts))
+    return [
+        PricingJob(resolved_discounts=resolved_discounts, customer_profile=generate_customer(rng),
+                   cart_items=generate_cart(cart_size, rng=rng), payment_info=generate_payment_info(rng))
+        for _ in range(carts)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=5_000)
+    parser.add_argument("--carts", type=int, default=5_000)
+    parser.add_argument("--cart-size", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    discounts = generate_discounts(args.discounts)
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    serial = DiscountProcessor(strategy, discount_index=DiscountIndex(discounts))
+
+    started = time.perf_counter()
+    expected = serial.apply_discounts_many(_jobs(serial, discounts, args.carts, args.cart_size, seed=1))
+    serial_seconds = time.perf_counter() - started
+    print(f"serial      {args.carts / serial_seconds:12.1f} carts/s")
+
+    for workers in sorted(set(args.workers)):
+        with ParallelDiscountProcessor(strategy, discount_index=DiscountIndex(discounts), max_workers=workers,
+                                       chunk_size=args.chunk_size) as parallel:
+            parallel.load_catalogue(discounts)
+            jobs = _jobs(parallel, discounts, args.carts, args.cart_size, seed=1)
+            # Warm the pool so process start-up and snapshot loading are not measured.
+            parallel.apply_discounts_many(jobs[:workers])
+            jobs = _jobs(parallel, discounts, args.carts, args.cart_size, seed=1)
+            started = time.perf_counter()
+            results = parallel.apply_discounts_many(jobs)
+            seconds = time.perf_counter() - started
+        assert results == expected, "parallel results differ from serial mode"
+        print(f"{workers:2d} workers  {args.carts / seconds:12.1f} carts/s  "
+              f"speedup x{serial_seconds / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Page views repricing the same carts: each of `--carts` carts is priced `--views` times (cart page, checkout,
+payment method switches), in shuffled order, through DiscountService with and without a DiscountedPriceCache.
+Every cached result is checked against the uncached one.
+
+Usage: python -m benchmarks.price_cache_benchmark --carts 5000 --views 3 --max-cart-size 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_discounts, generate_requests
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.rule_compiler import RuleCompiler
+from models.discount import DiscountedPrice
+from models.pricing_request import PricingRequest
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_plan_cache import DiscountPlanCache
+from services.discount_service import DiscountService
+from services.discounted_price_cache import DiscountedPriceCache
+
+
+async def run_page_views(repository: InMemoryDiscountRepository, page_views: list[PricingRequest],
+                         price_cache: DiscountedPriceCache | None) -> tuple[float, list[DiscountedPrice]]:
+    """
+    :return: The wall time of pricing every page view one at a time, in seconds, and the results.
+    """
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                                  repository.get_discount_index, mutate_products=False, rule_compiler=RuleCompiler())
+    service = DiscountService(repository, processor, plan_cache=DiscountPlanCache(), price_cache=price_cache)
+    results = []
+    started = time.perf_counter()
+    for request in page_views:
+        results.append(await service.calculate_cart_discounts(request.cart_items, request.customer,
+                                                              request.payment_info, request.voucher_code))
+    return time.perf_counter() - started, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=1_000)
+    parser.add_argument("--carts", type=int, default=5_000)
+    parser.add_argument("--views", type=int, default=3, help="Page views per cart")
+    parser.add_argument("--max-cart-size", type=int, default=20)
+    args = parser.parse_args()
+
+    repository = InMemoryDiscountRepository(generate_discounts(args.discounts))
+    page_views = generate_requests(args.carts, max_cart_size=args.max_cart_size) * args.views
+    random.Random(0).shuffle(page_views)
+
+    uncached_seconds, expected = asyncio.run(run_page_views(repository, page_views, None))
+    price_cache = DiscountedPriceCache()
+    cached_seconds, results = asyncio.run(run_page_views(repository, page_views, price_cache))
+    for result, expected_result in zip(results, expected):
+        assert (result.final_price, result.applied_discounts) == \
+               (expected_result.final_price, expected_result.applied_discounts), "cached result differs"
+    for name, seconds in (("uncached", uncached_seconds), ("cached", cached_seconds)):
+        print(f"{name:10s} {len(page_views) / seconds:10.1f} views/s  {seconds / len(page_views) * 1e6:8.2f} µs/view")
+    print(f"hit rate {price_cache.stats.hit_rate:.1%} ({price_cache.stats.hits} hits, "
+          f"{price_cache.stats.misses} misses, {price_cache.stats.evictions} evictions)")
+
+
+if __name__ == "__main__":
+    main()
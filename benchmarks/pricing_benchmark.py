@@ -0,0 +1,213 @@
+"""
+Throughput, latency and allocations of DiscountService.calculate_cart_discounts for each pricing engine.
+
+Requests are replayed from a JSON Lines log (see serializers.pricing_request_serializer) or generated
+against a synthetic catalogue. Results are written as JSON, and a previous results file can be passed
+as --baseline to compare two commits.
+
+Usage: python -m benchmarks.pricing_benchmark --discounts 5000 --carts 2000 --output results.json
+       python -m benchmarks.pricing_benchmark --requests carts.jsonl --baseline results.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+import pendulum
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_discounts, generate_requests
+from discounts.constants import DiscountType
+from discounts.index.discount_index import DiscountIndex
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processing_strategies.discount_processing_strategy_interface import IDiscountProcessingStrategy
+from discounts.processor.columnar_discount_processor import ColumnarDiscountProcessor
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from discounts.rules.rule_compiler import RuleCompiler
+from models.pricing_request import PricingRequest
+from repositories.discount_repository import InMemoryDiscountRepository
+from serializers.pricing_request_serializer import read_pricing_requests, write_pricing_requests
+from services.discount_plan_cache import DiscountPlanCache
+from services.discount_service import DiscountService
+
+# Products are never mutated, so every engine sees the same carts however often they are replayed.
+ENGINES: dict[str, Callable[[IDiscountProcessingStrategy, DiscountIndex], DiscountProcessor]] = {
+    "decimal": lambda strategy, discount_index: DiscountProcessor(
+        strategy, discount_index=discount_index, mutate_products=False),
+    "decimal_unindexed": lambda strategy, discount_index: DiscountProcessor(strategy, mutate_products=False),
+    "decimal_compiled": lambda strategy, discount_index: DiscountProcessor(
+        strategy, discount_index=discount_index, mutate_products=False, rule_compiler=RuleCompiler()),
+    "minor_units": lambda strategy, discount_index: MinorUnitDiscountProcessor(
+        strategy, discount_index=discount_index, mutate_products=False),
+    "minor_units_compiled": lambda strategy, discount_index: MinorUnitDiscountProcessor(
+        strategy, discount_index=discount_index, mutate_products=False, rule_compiler=RuleCompiler()),
+    "columnar": lambda strategy, discount_index: ColumnarDiscountProcessor(
+        strategy, discount_index=discount_index, mutate_products=False, rule_compiler=RuleCompiler()),
+}
+
+
+@dataclass
+class EngineResult:
+    engine: str
+    carts: int
+    seconds: float
+    carts_per_second: float
+    p50_ms: float
+    p99_ms: float
+    # Mean of the peak memory traced while pricing a single cart.
+    allocated_bytes_per_cart: float
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted, non-empty list.
+    """
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def benchmark_engine(engine: str, repository: InMemoryDiscountRepository, requests: list[PricingRequest],
+                           *, warmup: int = 50, allocation_sample: int = 200,
+                           plan_cache: bool = False) -> EngineResult:
+    """
+    Price every request once through a DiscountService backed by `engine`.
+
+    :param warmup: Number of requests priced before measuring.
+    :param plan_cache: Give the service a DiscountPlanCache.
+    :param allocation_sample: Number of requests priced again under tracemalloc, which is too slow
+        to leave on while timing.
+    """
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    service = DiscountService(repository, ENGINES[engine](strategy, repository.discount_index),
+                              plan_cache=DiscountPlanCache() if plan_cache else None)
+
+    async def price(request: PricingRequest) -> None:
+        await service.calculate_cart_discounts(cart_items=request.cart_items, customer=request.customer,
+                                               payment_info=request.payment_info, voucher_code=request.voucher_code)
+
+    for request in requests[:warmup]:
+        await price(request)
+
+    latencies = []
+    started = time.perf_counter()
+    for request in requests:
+        request_started = time.perf_counter()
+        await price(request)
+        latencies.append(time.perf_counter() - request_started)
+    seconds = time.perf_counter() - started
+
+    allocated = []
+    tracemalloc.start()
+    try:
+        for request in requests[:allocation_sample]:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await price(request)
+            allocated.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return EngineResult(
+        engine=engine,
+        carts=len(requests),
+        seconds=seconds,
+        carts_per_second=len(requests) / seconds,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        allocated_bytes_per_cart=sum(allocated) / len(allocated) if allocated else 0.0,
+    )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_comparison(results: list[EngineResult], baseline: dict) -> None:
+    previous = {result["engine"]: result for result in baseline["results"]}
+    print(f"compared with {baseline['metadata'].get('commit') or 'baseline'}:", file=sys.stderr)
+    for result in results:
+        before = previous.get(result.engine)
+        if before is None:
+            continue
+        print(f"{result.engine:20s} carts/s {result.carts_per_second / before['carts_per_second'] - 1:+8.1%}  "
+              f"p99 {result.p99_ms / before['p99_ms'] - 1:+8.1%}  "
+              f"alloc {result.allocated_bytes_per_cart / max(before['allocated_bytes_per_cart'], 1) - 1:+8.1%}",
+              file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", help="JSON Lines request log to replay instead of synthetic carts")
+    parser.add_argument("--write-requests", help="Write the synthetic requests to this JSON Lines file")
+    parser.add_argument("--discounts", type=int, default=1_000)
+    parser.add_argument("--brands", type=int, default=100)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--carts", type=int, default=1_000)
+    parser.add_argument("--min-cart-size", type=int, default=1)
+    parser.add_argument("--max-cart-size", type=int, default=200)
+    parser.add_argument("--voucher-share", type=float, default=0.1,
+                        help="Share of voucher discounts in the catalogue and of requests redeeming one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--plan-cache", action="store_true", help="Cache resolved discount plans per segment")
+    parser.add_argument("--output", help="Write results as JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="Results file of a previous run to compare against")
+    args = parser.parse_args()
+
+    discounts = generate_discounts(args.discounts, brands=args.brands, categories=args.categories,
+                                   voucher_share=args.voucher_share, seed=args.seed)
+    if args.requests:
+        with open(args.requests) as file:
+            requests = list(read_pricing_requests(file))
+    else:
+        voucher_codes = [discount.discount_code for discount in discounts
+                         if discount.discount_type == DiscountType.VOUCHER_DISCOUNT]
+        requests = generate_requests(args.carts, brands=args.brands, categories=args.categories,
+                                     min_cart_size=args.min_cart_size, max_cart_size=args.max_cart_size,
+                                     voucher_codes=voucher_codes, voucher_share=args.voucher_share, seed=args.seed)
+        if args.write_requests:
+            with open(args.write_requests, "w") as file:
+                write_pricing_requests(requests, file)
+
+    repository = InMemoryDiscountRepository(discounts)
+    results = []
+    for engine in args.engines:
+        result = asyncio.run(benchmark_engine(engine, repository, requests, plan_cache=args.plan_cache))
+        results.append(result)
+        print(f"{engine:20s} {result.carts_per_second:10.1f} carts/s  p50 {result.p50_ms:8.3f} ms  "
+              f"p99 {result.p99_ms:8.3f} ms  {result.allocated_bytes_per_cart / 1024:10.1f} KiB/cart",
+              file=sys.stderr)
+
+    report = {
+        "metadata": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "created_at": pendulum.now("UTC").to_iso8601_string(),
+            "workload": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        },
+        "results": [asdict(result) for result in results],
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            _print_comparison(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+A flash sale: thousands of simultaneous checkouts redeeming one capped voucher code, against a SQLite repository.
+
+Every checkout reserves a redemption, waits for its payment (`--payment-ms`, with `--failure-rate` of payments
+failing and releasing the reservation) and commits it. Compared:
+
+* locked: the naive approach, one lock per code held while the count is read from and written to the repository.
+* sharded: DiscountService with its RedemptionLimiter, claiming the limit from the repository in blocks and
+  flushing committed redemptions in batches.
+* sharded, threads: the same limiter shared by `--threads` threads, each serving checkouts on its own event loop.
+
+Each run checks that the redemptions recorded in the repository never exceed `--limit`. Checkouts turned away
+while the whole limit is reserved are not retried, so units released by failed payments may stay unredeemed.
+
+Usage: python -m benchmarks.redemption_benchmark --checkouts 20000 --limit 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from exceptions import RedemptionLimitExceededException
+from models.customer import CustomerProfile, CustomerTier
+from repositories.sqlite_discount_repository import SqliteDiscountRepository
+from services.discount_service import DiscountService
+from services.redemption_limiter import RedemptionLimiter
+
+CODE = "super_69"
+
+
+def make_customers(count: int) -> list[CustomerProfile]:
+    return [CustomerProfile(id=f"customer-{n}", name=f"Customer {n}", tier=CustomerTier.GOLD, email="", phone="")
+            for n in range(count)]
+
+
+async def pay(payment_seconds: float, failure_rate: float) -> bool:
+    await asyncio.sleep(random.uniform(0, 2 * payment_seconds))
+    return random.random() >= failure_rate
+
+
+async def locked_checkouts(repository: SqliteDiscountRepository, customers: list[CustomerProfile], limit: int,
+                           payment_seconds: float, failure_rate: float) -> int:
+    """
+    :return: The number of committed redemptions.
+    """
+    lock = asyncio.Lock()
+
+    async def checkout(customer: CustomerProfile) -> bool:
+        # The lock is held through the payment, or a failed payment could not give its redemption back.
+        async with lock:
+            if await repository.get_redemption_count(CODE) >= limit:
+                return False
+            if not await pay(payment_seconds, failure_rate):
+                return False
+            await repository.add_redemptions({(CODE, customer.id): 1})
+            return True
+
+    return sum(await asyncio.gather(*(checkout(customer) for customer in customers)))
+
+
+async def sharded_checkouts(service: DiscountService, customers: list[CustomerProfile], payment_seconds: float,
+                            failure_rate: float) -> int:
+    """
+    :return: The number of committed redemptions.
+    """
+    async def checkout(customer: CustomerProfile) -> bool:
+        try:
+            reservation = await service.reserve_redemption(CODE, customer)
+        except RedemptionLimitExceededException:
+            return False
+        if not await pay(payment_seconds, failure_rate):
+            service.release_redemption(reservation)
+            return False
+        await service.commit_redemption(reservation)
+        return True
+
+    committed = sum(await asyncio.gather(*(checkout(customer) for customer in customers)))
+    await service.flush_redemptions()
+    return committed
+
+
+def threaded_checkouts(service: DiscountService, customers: list[CustomerProfile], threads: int,
+                       payment_seconds: float, failure_rate: float) -> int:
+    committed = [0] * threads
+
+    def serve(position: int) -> None:
+        committed[position] = asyncio.run(sharded_checkouts(service, customers[position::threads],
+                                                            payment_seconds, failure_rate))
+
+    workers = [threading.Thread(target=serve, args=(position,)) for position in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(committed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkouts", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=5_000)
+    parser.add_argument("--payment-ms", type=float, default=1.0, help="Mean simulated payment latency")
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    voucher = PercentageDiscount(name=CODE, discount_percentage=Decimal(69), discount_rules=[],
+                                 discount_type=DiscountType.VOUCHER_DISCOUNT,
+                                 expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+                                 max_redemptions=args.limit)
+    customers = make_customers(args.checkouts)
+    payment_seconds = args.payment_ms / 1000
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("locked", "sharded", f"sharded, {args.threads} threads"):
+            repository = SqliteDiscountRepository(os.path.join(directory, f"{name}.db"))
+            asyncio.run(repository.add_discounts([voucher]))
+            service = DiscountService(repository, DiscountProcessor(DefaultDiscountProcessingStrategy(
+                list(DiscountType))), redemption_limiter=RedemptionLimiter(repository))
+            started = time.perf_counter()
+            if name == "locked":
+                committed = asyncio.run(locked_checkouts(repository, customers, args.limit, payment_seconds,
+                                                         args.failure_rate))
+            elif name == "sharded":
+                committed = asyncio.run(sharded_checkouts(service, customers, payment_seconds, args.failure_rate))
+            else:
+                committed = threaded_checkouts(service, customers, args.threads, payment_seconds, args.failure_rate)
+            seconds = time.perf_counter() - started
+            recorded = asyncio.run(repository.get_redemption_count(CODE))
+            repository.close()
+            assert recorded == committed <= args.limit, f"{name}: {recorded} recorded, {committed} committed"
+            print(f"{name:20s} {args.checkouts / seconds:10.1f} checkouts/s  {committed:6d} redeemed "
+                  f"of {args.limit} ({recorded} recorded)")
+
+
+if __name__ == "__main__":
+    main()
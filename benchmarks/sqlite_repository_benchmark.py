@@ -0,0 +1,77 @@
+"""
+Latency of SqliteDiscountRepository against InMemoryDiscountRepository on the same catalogue.
+
+Times code lookups one at a time and as a burst of concurrent lookups, catalogue version checks, and active
+listings, both the first one and repeats at an unchanged catalogue version.
+
+Usage: python -m benchmarks.sqlite_repository_benchmark --discounts 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+from benchmarks.pricing_benchmark import percentile
+from benchmarks.synthetic_data import generate_discounts
+from discounts.constants import DiscountType
+from repositories.discount_repository import IDiscountRepository, InMemoryDiscountRepository
+from repositories.sqlite_discount_repository import SqliteDiscountRepository
+
+
+async def latencies(call: Callable[[], Awaitable], count: int) -> list[float]:
+    measured = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await call()
+        measured.append(time.perf_counter() - started)
+    return sorted(measured)
+
+
+async def benchmark_repository(name: str, repository: IDiscountRepository, codes: list[str], *, lookups: int,
+                               burst: int) -> None:
+    rng = random.Random(0)
+    exclude = {DiscountType.VOUCHER_DISCOUNT}
+    started = time.perf_counter()
+    listed = await repository.list_all_active_discounts(exclude)
+    first_listing = time.perf_counter() - started
+    listing = await latencies(lambda: repository.list_all_active_discounts(exclude), 20)
+    lookup = await latencies(lambda: repository.get_discount_by_code(rng.choice(codes)), lookups)
+    version = await latencies(repository.get_catalogue_version, lookups)
+    started = time.perf_counter()
+    await asyncio.gather(*(repository.get_discount_by_code(rng.choice(codes)) for _ in range(burst)))
+    burst_seconds = time.perf_counter() - started
+    print(f"{name:9s} lookup p50 {percentile(lookup, 0.5) * 1e6:7.1f} us  p99 {percentile(lookup, 0.99) * 1e6:7.1f} us  "
+          f"version p50 {percentile(version, 0.5) * 1e6:6.1f} us  "
+          f"listing first {first_listing * 1000:8.1f} ms  repeat p50 {percentile(listing, 0.5) * 1000:6.1f} ms  "
+          f"({len(listed)} active)  burst {burst / burst_seconds:8.0f} lookups/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--discounts", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    parser.add_argument("--burst", type=int, default=10_000, help="Number of concurrent lookups")
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    discounts = generate_discounts(args.discounts, voucher_share=0.1)
+    codes = [discount.discount_code for discount in discounts]
+    memory = InMemoryDiscountRepository(discounts)
+    asyncio.run(benchmark_repository("in-memory", memory, codes, lookups=args.lookups, burst=args.burst))
+
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite = SqliteDiscountRepository(os.path.join(directory, "discounts.db"), pool_size=args.pool_size)
+        try:
+            started = time.perf_counter()
+            asyncio.run(sqlite.add_discounts(discounts))
+            print(f"inserted {len(discounts)} rows in {time.perf_counter() - started:.1f}s")
+            asyncio.run(benchmark_repository("sqlite", sqlite, codes, lookups=args.lookups, burst=args.burst))
+        finally:
+            sqlite.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Cold-start cost of a pricing worker: time-to-first-priced-cart of a fresh interpreter, with the default stdlib
+clock and with PendulumClock. Each run starts a new process, which imports DiscountService, builds a one-discount
+catalogue and prices one cart; the time from its first line to the priced cart is reported, as well as the wall
+time of the whole process, interpreter start-up included.
+
+Usage: python -m benchmarks.startup_benchmark --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_WORKER = """
+import time
+started = time.perf_counter()
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import clock
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from fake_data import CART_ITEMS, CUSTOMER, PAYMENT_INFO
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_service import DiscountService
+
+if {use_pendulum}:
+    clock.set_clock(clock.PendulumClock())
+discount = PercentageDiscount(name="PUMA 40%", discount_rules=[BrandDiscountRule(include_brands=["PUMA"])],
+                              discount_type=DiscountType.BRAND_DISCOUNT,
+                              expires_at=datetime(9999, 1, 1, tzinfo=timezone.utc), discount_percentage=Decimal(40))
+service = DiscountService(InMemoryDiscountRepository([discount]),
+                          DiscountProcessor(DefaultDiscountProcessingStrategy(list(DiscountType)),
+                                            mutate_products=False))
+result = asyncio.run(service.calculate_cart_discounts(CART_ITEMS, CUSTOMER, PAYMENT_INFO))
+assert result.applied_discounts, "the cart was not discounted"
+print(time.perf_counter() - started)
+"""
+
+
+def time_worker(use_pendulum: bool) -> tuple[float, float]:
+    """
+    :return: The worker's time-to-first-priced-cart and the wall time of its process, in seconds.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", _WORKER.format(use_pendulum=use_pendulum)], cwd=root,
+                            check=True, capture_output=True, text=True).stdout
+    return float(output), time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="The median of this many processes is reported")
+    args = parser.parse_args()
+
+    for name, use_pendulum in (("stdlib", False), ("pendulum", True)):
+        # Warms the OS page cache and the bytecode cache, so the first run is not an outlier.
+        time_worker(use_pendulum)
+        first_cart, process = zip(*(time_worker(use_pendulum) for _ in range(args.runs)))
+        print(f"{name:10s} first priced cart {statistics.median(first_cart) * 1e3:7.1f} ms"
+              f"  process {statistics.median(process) * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
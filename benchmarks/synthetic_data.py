@@ -0,0 +1,126 @@
+import random
+from decimal import Decimal
+
+import pendulum
+
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.percentage_discount import PercentageDiscount
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from models.cart import CartItem
+from models.customer import CustomerProfile, CustomerTier
+from models.payment import PaymentInfo, PaymentMethod, CardType
+from models.pricing_request import PricingRequest
+from models.product import Product, BrandTier
+
+DISCOUNT_TYPE_ORDERING = [
+    DiscountType.BRAND_DISCOUNT,
+    DiscountType.CATEGORY_DISCOUNT,
+    DiscountType.VOUCHER_DISCOUNT,
+    DiscountType.BANK_DISCOUNT,
+]
+
+BANKS = ["ICICI Bank", "HDFC Bank", "SBI", "Axis Bank"]
+
+
+def brand_names(count: int) -> list[str]:
+    return [f"BRAND-{number}" for number in range(count)]
+
+
+def category_names(count: int) -> list[str]:
+    return [f"CATEGORY-{number}" for number in range(count)]
+
+
+def generate_discounts(count: int, *, brands: int = 100, categories: int = 20, voucher_share: float = 0.0,
+                       seed: int = 0) -> list[Discount]:
+    """
+    Generate a catalogue of `count` discounts spread over all discount types.
+
+    :param voucher_share: Fraction of the catalogue generated as voucher discounts with codes `VOUCHER-<n>`.
+    """
+    rng = random.Random(seed)
+    brand_pool, category_pool = brand_names(brands), category_names(categories)
+    expires_at = pendulum.now("UTC") + pendulum.duration(days=365)
+    discounts: list[Discount] = []
+    for number in range(count):
+        if rng.random() < voucher_share:
+            discount_type, rules = DiscountType.VOUCHER_DISCOUNT, []
+        else:
+            discount_type = rng.choice([DiscountType.BRAND_DISCOUNT, DiscountType.CATEGORY_DISCOUNT,
+                                        DiscountType.BANK_DISCOUNT])
+            rules = {
+                DiscountType.BRAND_DISCOUNT: lambda: [BrandDiscountRule(include_brands=rng.sample(brand_pool, 3))],
+                DiscountType.CATEGORY_DISCOUNT: lambda: [
+                    CategoryDiscountRule(include_categories=rng.sample(category_pool, 2)),
+                    CustomerTierDiscountRule(exclude_tiers=[CustomerTier.BRONZE]),
+                ],
+                DiscountType.BANK_DISCOUNT: lambda: [PaymentDiscountRule(applicable_banks=[rng.choice(BANKS)])],
+            }[discount_type]()
+        common = dict(
+            name=f"{discount_type.value}-{number}",
+            discount_rules=rules,
+            discount_type=discount_type,
+            expires_at=expires_at.add(minutes=rng.randrange(60 * 24 * 30)),
+            discount_code=f"VOUCHER-{number}" if discount_type == DiscountType.VOUCHER_DISCOUNT else None,
+        )
+        if rng.random() < 0.8:
+            discounts.append(PercentageDiscount(discount_percentage=Decimal(rng.randrange(5, 50)), **common))
+        else:
+            discounts.append(FixedAmountDiscount(discount_amount=Decimal(rng.randrange(50, 500)), **common))
+    return discounts
+
+
+def generate_cart(size: int, *, brands: int = 100, categories: int = 20, rng: random.Random) -> list[CartItem]:
+    brand_pool, category_pool = brand_names(brands), category_names(categories)
+    cart_items = []
+    for line in range(size):
+        price = Decimal(rng.randrange(10_000, 1_000_000)).scaleb(-2)
+        cart_items.append(CartItem(
+            product=Product(
+                id=f"P{line}",
+                brand=rng.choice(brand_pool),
+                brand_tier=rng.choice(list(BrandTier)),
+                category=rng.choice(category_pool),
+                base_price=price,
+                current_price=price,
+            ),
+            quantity=rng.randrange(1, 4),
+            size=rng.choice(["S", "M", "L"]),
+        ))
+    return cart_items
+
+
+def generate_customer(rng: random.Random) -> CustomerProfile:
+    return CustomerProfile(id=f"C{rng.randrange(10**6)}", name="Synthetic Customer",
+                           tier=rng.choice(list(CustomerTier)), email="customer@example.com", phone="0000000000")
+
+
+def generate_payment_info(rng: random.Random) -> PaymentInfo | None:
+    if rng.random() < 0.1:
+        return None
+    return PaymentInfo(method=rng.choice(list(PaymentMethod)), bank_name=rng.choice(BANKS),
+                       card_type=rng.choice(list(CardType)))
+
+
+def generate_requests(count: int, *, brands: int = 100, categories: int = 20, min_cart_size: int = 1,
+                      max_cart_size: int = 200, voucher_codes: list[str] = (), voucher_share: float = 0.0,
+                      seed: int = 0) -> list[PricingRequest]:
+    """
+    Generate `count` pricing requests with cart sizes drawn uniformly from `min_cart_size` to `max_cart_size`.
+
+    :param voucher_codes: Codes to redeem, e.g. those of the catalogue's voucher discounts.
+    :param voucher_share: Fraction of requests that redeem one of `voucher_codes`.
+    """
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        cart_items = generate_cart(rng.randint(min_cart_size, max_cart_size), brands=brands, categories=categories,
+                                   rng=rng)
+        voucher_code = rng.choice(voucher_codes) if voucher_codes and rng.random() < voucher_share else None
+        requests.append(PricingRequest(cart_items=cart_items, customer=generate_customer(rng),
+                                       payment_info=generate_payment_info(rng), voucher_code=voucher_code))
+    return requests
@@ -0,0 +1,76 @@
+"""
+Source of the current time for the pricing pipeline.
+
+Timestamps are timezone-aware `datetime.datetime` objects in UTC. pendulum's DateTime is a subclass of it, so
+discounts can still be dated with pendulum; they store their timestamps converted by `as_utc`. The default clock
+only uses the standard library, so importing the pipeline does not import pendulum; install another one with
+`set_clock`, e.g. PendulumClock or a fixed clock in tests.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+
+class IClock(ABC):
+
+    @abstractmethod
+    def now(self) -> datetime:
+        """
+        The current time, timezone-aware in UTC.
+        """
+        ...
+
+
+class StdlibClock(IClock):
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+
+class PendulumClock(IClock):
+    """
+    Returns pendulum DateTime objects. pendulum is imported on first use.
+    They are in pendulum's own UTC timezone, so they compare with discount timestamps (see `as_utc`) more slowly
+    than those of StdlibClock.
+    """
+
+    def now(self) -> datetime:
+        import pendulum
+        return pendulum.now("UTC")
+
+
+_clock: IClock = StdlibClock()
+
+
+def now() -> datetime:
+    """
+    The current time according to the installed clock.
+    """
+    return _clock.now()
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """
+    The same instant as a standard library datetime in `timezone.utc`, the timezone every clock returns.
+    Datetimes with another tzinfo object, pendulum's UTC included, compare with those several times slower,
+    since every comparison has to ask both tzinfo objects for their offsets. Naive datetimes are returned unchanged.
+    """
+    if timestamp.tzinfo is None or (timestamp.tzinfo is timezone.utc and type(timestamp) is datetime):
+        return timestamp
+    utc = timestamp.astimezone(timezone.utc)
+    return datetime(utc.year, utc.month, utc.day, utc.hour, utc.minute, utc.second, utc.microsecond,
+                    tzinfo=timezone.utc)
+
+
+def get_clock() -> IClock:
+    return _clock
+
+
+def set_clock(clock: IClock) -> IClock:
+    """
+    Install the clock every component reads the current time from.
+
+    :return: The previously installed clock, to restore it.
+    """
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
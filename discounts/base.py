@@ -1,11 +1,11 @@
 
 from abc import ABC, abstractmethod
-from decimal import Decimal
-
-import pendulum
-from pendulum import datetime
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_EVEN
 
+import clock
 from discounts.constants import DiscountType
+from discounts.minor_units import from_scaled
 from discounts.rules.discount_rule_interface import IDiscountRule
 from models.cart import CartItem
 from models.customer import CustomerProfile
@@ -15,32 +15,93 @@ from models.payment import PaymentInfo
 class Discount(ABC):
 
     def __init__(self, name: str, discount_rules: list[IDiscountRule],
-                 discount_type: DiscountType, expires_at: datetime, * , discount_code: str | None = None) -> None:
+                 discount_type: DiscountType, expires_at: datetime, * , discount_code: str | None = None,
+                 starts_at: datetime | None = None, max_redemptions: int | None = None,
+                 max_redemptions_per_customer: int | None = None) -> None:
+        """
+        :param max_redemptions: How many times the discount's code can be redeemed in total, unlimited if None.
+        :param max_redemptions_per_customer: How many times each customer can redeem it, unlimited if None.
+            Redemptions go through `DiscountService.reserve_redemption`; pricing a cart does not count as one.
+        """
         self.name = name
         self.discount_rules = discount_rules
         self.discount_type = discount_type
-        self.expires_at = expires_at
+        # Normalized once here, so validity checks against `clock.now()` compare datetimes sharing one tzinfo.
+        self.expires_at = clock.as_utc(expires_at)
+        self.starts_at = None if starts_at is None else clock.as_utc(starts_at)
         self.discount_code = discount_code if discount_code is not None else name
+        self.max_redemptions = max_redemptions
+        self.max_redemptions_per_customer = max_redemptions_per_customer
 
     def is_applicable(self, customer_profile: CustomerProfile, cart_item: CartItem,
-                      payment_info: PaymentInfo | None = None) -> bool:
+                      payment_info: PaymentInfo | None = None, now: datetime | None = None) -> bool:
         """
         Check if the discount is applicable to the given product.
+
+        :param now: Evaluation timestamp, defaults to the current time.
         """
-        if self.is_expired():
+        if not self.is_active(now):
             return False
+        return self.matches_rules(customer_profile=customer_profile, cart_item=cart_item, payment_info=payment_info)
+
+    def matches_rules(self, customer_profile: CustomerProfile, cart_item: CartItem,
+                      payment_info: PaymentInfo | None = None) -> bool:
+        """
+        Check the discount rules against the given product, regardless of the validity period.
+        """
         for rule in self.discount_rules:
             if not rule.is_applicable(customer_profile=customer_profile, cart_item=cart_item, payment_info=payment_info):
                 return False
         return True
 
-    def is_expired(self) -> bool:
+    def is_expired(self, now: datetime | None = None) -> bool:
         """
         Check if the discount is still valid based on its expiration date.
+
+        :param now: Evaluation timestamp, defaults to the current time.
         """
-        return pendulum.now("UTC") >= self.expires_at
+        return (now or clock.now()) >= self.expires_at
+
+    def has_started(self, now: datetime | None = None) -> bool:
+        """
+        Check if the discount has reached its start date. Discounts without `starts_at` are always started.
+
+        :param now: Evaluation timestamp, defaults to the current time.
+        """
+        return self.starts_at is None or (now or clock.now()) >= self.starts_at
+
+    def is_active(self, now: datetime | None = None) -> bool:
+        """
+        Check if `now` falls within the discount's validity period.
+
+        :param now: Evaluation timestamp, defaults to the current time.
+        """
+        now = now or clock.now()
+        return self.has_started(now) and not self.is_expired(now)
 
     @abstractmethod
     def calculate_discount_amount(self, current_price: Decimal) -> Decimal:
         ...
 
+    def scaled_digits(self) -> tuple[int, int]:
+        """
+        Decimal digits needed to calculate this discount exactly with `calculate_discount_amount_scaled`.
+
+        :return: The decimal places of the discount's own amounts, and the extra digits one application
+            can add to a price.
+        """
+        return 0, 0
+
+    def calculate_discount_amount_scaled(self, current_price_scaled: int, scale: int) -> int:
+        """
+        Calculate the discount amount on integers counting 10**-scale units (e.g. scale 2 for paise/cents).
+        Subclasses should override this with pure integer arithmetic; by default the Decimal amount is converted,
+        rounding half-even if it does not fit in `scale` digits.
+
+        :param current_price_scaled: The current price of the product, in 10**-scale units.
+        :param scale: Number of decimal digits represented by the integers.
+        :return: The discount amount, in 10**-scale units.
+        """
+        current_price = from_scaled(current_price_scaled, scale)
+        amount = self.calculate_discount_amount(current_price).scaleb(scale)
+        return int(amount.to_integral_value(rounding=ROUND_HALF_EVEN))
@@ -6,3 +6,8 @@ class DiscountType(Enum):
     CATEGORY_DISCOUNT = "category_discount"
     BANK_DISCOUNT= "bank_discount"
     VOUCHER_DISCOUNT = "voucher_discount"
+
+
+class DiscountObjective(Enum):
+    BEST_FOR_CUSTOMER = "best_for_customer"
+    BEST_FOR_MARGIN = "best_for_margin"
@@ -1,17 +1,21 @@
+from datetime import datetime
 from decimal import Decimal
 
-from pendulum import datetime
-
 from discounts.base import Discount
 from discounts.constants import DiscountType
+from discounts.minor_units import decimal_places, to_scaled
 from discounts.rules.discount_rule_interface import IDiscountRule
 
 
 class FixedAmountDiscount(Discount):
 
     def __init__(self, name: str, discount_amount: Decimal, discount_rules: list[IDiscountRule],
-                 discount_type: DiscountType, expires_at: datetime, *, discount_code: str | None = None) -> None:
-        super().__init__(name, discount_rules, discount_type, expires_at, discount_code=discount_code)
+                 discount_type: DiscountType, expires_at: datetime, *, discount_code: str | None = None,
+                 starts_at: datetime | None = None, max_redemptions: int | None = None,
+                 max_redemptions_per_customer: int | None = None) -> None:
+        super().__init__(name, discount_rules, discount_type, expires_at, discount_code=discount_code,
+                         starts_at=starts_at, max_redemptions=max_redemptions,
+                         max_redemptions_per_customer=max_redemptions_per_customer)
         self.discount_amount = discount_amount
 
     def calculate_discount_amount(self, current_price: Decimal) -> Decimal:
@@ -21,3 +25,9 @@ class FixedAmountDiscount(Discount):
         :return: The discount amount, which is the minimum of the fixed discount amount and the current price.
         """
         return min(self.discount_amount, current_price)
+
+    def scaled_digits(self) -> tuple[int, int]:
+        return decimal_places(self.discount_amount), 0
+
+    def calculate_discount_amount_scaled(self, current_price_scaled: int, scale: int) -> int:
+        return min(to_scaled(self.discount_amount, scale), current_price_scaled)
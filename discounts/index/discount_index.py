@@ -0,0 +1,228 @@
+from typing import Hashable, Iterable
+
+from discounts.base import Discount
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.payment import PaymentInfo
+
+BRAND = "brand"
+CATEGORY = "category"
+CUSTOMER_TIER = "customer_tier"
+BANK = "bank"
+PAYMENT_METHOD = "payment_method"
+
+DIMENSIONS = (BRAND, CATEGORY, CUSTOMER_TIER, BANK, PAYMENT_METHOD)
+
+# Rules whose outcome depends only on the indexed attributes of the item, customer and payment.
+ATTRIBUTE_RULE_TYPES = frozenset({
+    BrandDiscountRule, CategoryDiscountRule, CustomerTierDiscountRule, PaymentDiscountRule,
+})
+
+
+def is_attribute_only(discount: Discount) -> bool:
+    """
+    Check whether a discount's applicability depends only on the indexed attributes, i.e. all of its rules
+    are exactly one of the attribute rule types.
+    """
+    return all(type(rule) in ATTRIBUTE_RULE_TYPES for rule in discount.discount_rules)
+
+
+class _IndexEntry:
+    """
+    Attribute constraints extracted from the include filters of a discount's rules.
+    A dimension mapped to None places no constraint on that attribute.
+    """
+    __slots__ = ("discount", "constraints", "requires_payment")
+
+    def __init__(self, discount: Discount) -> None:
+        self.discount = discount
+        self.constraints: dict[str, frozenset | None] = dict.fromkeys(DIMENSIONS)
+        self.requires_payment = False
+        for rule in discount.discount_rules:
+            # Subclasses may override `is_applicable`, so only the exact built-in rule types are indexed.
+            # Anything else is left to `Discount.is_applicable` when the candidate is verified.
+            rule_type = type(rule)
+            if rule_type is BrandDiscountRule:
+                self._narrow(BRAND, rule.include_brands)
+            elif rule_type is CategoryDiscountRule:
+                self._narrow(CATEGORY, rule.include_categories)
+            elif rule_type is CustomerTierDiscountRule:
+                self._narrow(CUSTOMER_TIER, rule.include_tiers)
+            elif rule_type is PaymentDiscountRule:
+                self.requires_payment = True
+                self._narrow(BANK, rule.applicable_banks)
+                self._narrow(PAYMENT_METHOD, rule.applicable_payment_methods)
+
+    def _narrow(self, dimension: str, values: Iterable[Hashable]) -> None:
+        if not values:
+            return
+        current = self.constraints[dimension]
+        values = frozenset(values)
+        self.constraints[dimension] = values if current is None else current & values
+
+
+class DiscountIndex:
+    """
+    Inverted index over discounts keyed by the attributes their rules filter on:
+    brand, category, customer tier, bank and payment method.
+
+    The index only narrows the set of discounts that *can* match a cart item; candidates still
+    have to pass `Discount.is_applicable`, so exclusion filters, expiry and custom rules behave
+    exactly as they do without the index.
+    Candidate sets are memoized per customer/payment and per brand/category combination
+    until the indexed discounts change.
+    """
+
+    def __init__(self, discounts: Iterable[Discount] | None = None, *, max_cached_lookups: int = 10_000) -> None:
+        """
+        :param discounts: Discounts to index.
+        :param max_cached_lookups: Maximum number of memoized attribute combinations.
+        """
+        self.version = 0
+        self._max_cached_lookups = max_cached_lookups
+        self._entries: dict[int, _IndexEntry] = {}
+        self._postings: dict[str, dict[Hashable, set[int]]] = {dimension: {} for dimension in DIMENSIONS}
+        self._unconstrained: dict[str, set[int]] = {dimension: set() for dimension in DIMENSIONS}
+        self._payment_optional: set[int] = set()
+        self._cart_lookup_cache: dict[tuple, frozenset[int]] = {}
+        self._item_lookup_cache: dict[tuple, frozenset[int]] = {}
+        for discount in discounts or []:
+            self._add_entry(discount)
+
+    def __contains__(self, discount: Discount) -> bool:
+        return id(discount) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, discount: Discount) -> None:
+        """
+        Index a discount, replacing any previous entry for the same object.
+        """
+        if discount in self:
+            self._remove_entry(discount)
+        self._add_entry(discount)
+        self._invalidate()
+
+    def remove(self, discount: Discount) -> None:
+        """
+        Drop a discount from the index. Unknown discounts are ignored.
+        """
+        if discount in self:
+            self._remove_entry(discount)
+            self._invalidate()
+
+    def rebuild(self, discounts: Iterable[Discount]) -> None:
+        """
+        Replace the indexed discounts with `discounts`.
+        """
+        self._entries.clear()
+        for dimension in DIMENSIONS:
+            self._postings[dimension].clear()
+            self._unconstrained[dimension].clear()
+        self._payment_optional.clear()
+        for discount in discounts:
+            self._add_entry(discount)
+        self._invalidate()
+
+    def candidate_ids(self, customer_profile: CustomerProfile, cart_item: CartItem,
+                      payment_info: PaymentInfo | None = None) -> frozenset[int]:
+        """
+        Return the ids of the indexed discounts whose include filters admit the given item.
+
+        :return: A set of `id(discount)` values.
+        """
+        return self.cart_candidate_ids(customer_profile, payment_info) & self.item_candidate_ids(cart_item)
+
+    def cart_candidate_ids(self, customer_profile: CustomerProfile,
+                           payment_info: PaymentInfo | None = None) -> frozenset[int]:
+        """
+        Return the ids of the indexed discounts whose customer tier and payment filters admit the cart.
+        """
+        if payment_info is None:
+            key = (customer_profile.tier, False, None, None)
+        else:
+            key = (customer_profile.tier, True, payment_info.bank_name, payment_info.method)
+        candidates = self._cart_lookup_cache.get(key)
+        if candidates is None:
+            tier, has_payment, bank_name, payment_method = key
+            matched = self._match(((CUSTOMER_TIER, tier), (BANK, bank_name), (PAYMENT_METHOD, payment_method)))
+            candidates = frozenset(matched if has_payment else matched & self._payment_optional)
+            self._remember(self._cart_lookup_cache, key, candidates)
+        return candidates
+
+    def item_candidate_ids(self, cart_item: CartItem) -> frozenset[int]:
+        """
+        Return the ids of the indexed discounts whose brand and category filters admit the item.
+        """
+        product = cart_item.product
+        key = (product.brand, product.category)
+        candidates = self._item_lookup_cache.get(key)
+        if candidates is None:
+            candidates = frozenset(self._match(((BRAND, product.brand), (CATEGORY, product.category))))
+            self._remember(self._item_lookup_cache, key, candidates)
+        return candidates
+
+    def admits_item(self, discount: Discount, cart_item: CartItem) -> bool:
+        """
+        Check the brand and category filters of an indexed discount against a single item,
+        without building candidate sets.
+        """
+        constraints = self._entries[id(discount)].constraints
+        brands, categories = constraints[BRAND], constraints[CATEGORY]
+        product = cart_item.product
+        return ((brands is None or product.brand in brands)
+                and (categories is None or product.category in categories))
+
+    def _match(self, attributes: tuple[tuple[str, Hashable], ...]) -> set[int]:
+        matched: set[int] | None = None
+        for dimension, value in attributes:
+            dimension_matches = self._unconstrained[dimension] | self._postings[dimension].get(value, set())
+            matched = dimension_matches if matched is None else matched & dimension_matches
+            if not matched:
+                break
+        return matched
+
+    def _remember(self, cache: dict[tuple, frozenset[int]], key: tuple, candidates: frozenset[int]) -> None:
+        if len(cache) >= self._max_cached_lookups:
+            cache.clear()
+        cache[key] = candidates
+
+    def _add_entry(self, discount: Discount) -> None:
+        entry = _IndexEntry(discount)
+        discount_id = id(discount)
+        self._entries[discount_id] = entry
+        if not entry.requires_payment:
+            self._payment_optional.add(discount_id)
+        for dimension, values in entry.constraints.items():
+            if values is None:
+                self._unconstrained[dimension].add(discount_id)
+                continue
+            postings = self._postings[dimension]
+            for value in values:
+                postings.setdefault(value, set()).add(discount_id)
+
+    def _remove_entry(self, discount: Discount) -> None:
+        discount_id = id(discount)
+        entry = self._entries.pop(discount_id)
+        self._payment_optional.discard(discount_id)
+        for dimension, values in entry.constraints.items():
+            if values is None:
+                self._unconstrained[dimension].discard(discount_id)
+                continue
+            postings = self._postings[dimension]
+            for value in values:
+                ids = postings.get(value)
+                if ids is not None:
+                    ids.discard(discount_id)
+                    if not ids:
+                        del postings[value]
+
+    def _invalidate(self) -> None:
+        self.version += 1
+        self._cart_lookup_cache.clear()
+        self._item_lookup_cache.clear()
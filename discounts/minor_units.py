@@ -0,0 +1,89 @@
+from decimal import Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, \
+    ROUND_UP
+from typing import Callable
+
+
+_ONE = Decimal(1)
+_CENT = Decimal("0.01")
+
+
+def decimal_places(amount: Decimal) -> int:
+    """
+    Number of digits after the decimal point in the representation of `amount`, trailing zeros included.
+    """
+    # Whole and two-digit amounts cover nearly every price, and comparing quanta is far cheaper than `as_tuple`.
+    if amount.same_quantum(_CENT):
+        return 2
+    if amount.same_quantum(_ONE):
+        return 0
+    return max(0, -amount.as_tuple().exponent)
+
+
+def ratio_decimal_places(denominator: int) -> int:
+    """
+    Number of decimal digits needed for division by `denominator` to be exact, i.e. the smallest `n`
+    such that `denominator` divides 10**n.
+    """
+    twos = fives = 0
+    while denominator % 2 == 0:
+        denominator //= 2
+        twos += 1
+    while denominator % 5 == 0:
+        denominator //= 5
+        fives += 1
+    if denominator != 1:
+        raise ValueError("Denominator has prime factors other than 2 and 5")
+    return max(twos, fives)
+
+
+def to_scaled(amount: Decimal, scale: int) -> int:
+    """
+    Convert an amount to an integer count of 10**-scale units. `scale` must cover the amount's decimal places.
+    """
+    return int(amount.scaleb(scale))
+
+
+def from_scaled(amount_scaled: int, scale: int) -> Decimal:
+    return Decimal(amount_scaled).scaleb(-scale)
+
+
+def divide_rounded(numerator: int, denominator: int, rounding: str) -> int:
+    """
+    Integer division of a non-negative numerator by a positive denominator using a `decimal` rounding mode.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    if not remainder:
+        return quotient
+    if rounding in (ROUND_DOWN, ROUND_FLOOR):
+        return quotient
+    if rounding in (ROUND_UP, ROUND_CEILING):
+        return quotient + 1
+    doubled_remainder = 2 * remainder
+    if doubled_remainder != denominator:
+        return quotient + (doubled_remainder > denominator)
+    if rounding == ROUND_HALF_UP:
+        return quotient + 1
+    if rounding == ROUND_HALF_DOWN:
+        return quotient
+    if rounding == ROUND_HALF_EVEN:
+        return quotient + (quotient & 1)
+    raise ValueError(f"Unsupported rounding mode: {rounding}")
+
+
+def rounded_divider(denominator: int, rounding: str) -> Callable[[int], int]:
+    """
+    Build a function equivalent to `divide_rounded(numerator, denominator, rounding)` for non-negative numerators,
+    reduced to a single integer expression for the common rounding modes.
+    """
+    half = denominator // 2
+    if denominator == 1:
+        return lambda numerator: numerator
+    if rounding in (ROUND_DOWN, ROUND_FLOOR):
+        return lambda numerator: numerator // denominator
+    if rounding in (ROUND_UP, ROUND_CEILING):
+        return lambda numerator: -(-numerator // denominator)
+    if denominator % 2 == 0 and rounding == ROUND_HALF_UP:
+        return lambda numerator: (numerator + half) // denominator
+    if denominator % 2 == 0 and rounding == ROUND_HALF_DOWN:
+        return lambda numerator: (numerator + half - 1) // denominator
+    return lambda numerator: divide_rounded(numerator, denominator, rounding)
@@ -1,19 +1,42 @@
+from datetime import datetime
 from decimal import Decimal
 
-from pendulum import datetime
-
 from discounts.base import Discount
 from discounts.constants import DiscountType
+from discounts.minor_units import ratio_decimal_places
 from discounts.rules.discount_rule_interface import IDiscountRule
 
 
 class PercentageDiscount(Discount):
 
     def __init__(self, name: str, discount_percentage: Decimal, discount_rules: list[IDiscountRule],
-                 discount_type: DiscountType, expires_at: datetime, * , discount_code: str | None = None) -> None:
-        super().__init__(name, discount_rules, discount_type, expires_at, discount_code=discount_code)
+                 discount_type: DiscountType, expires_at: datetime, * , discount_code: str | None = None,
+                 starts_at: datetime | None = None, max_redemptions: int | None = None,
+                 max_redemptions_per_customer: int | None = None) -> None:
+        super().__init__(name, discount_rules, discount_type, expires_at, discount_code=discount_code,
+                         starts_at=starts_at, max_redemptions=max_redemptions,
+                         max_redemptions_per_customer=max_redemptions_per_customer)
         self.discount_percentage = discount_percentage
 
+    @property
+    def discount_percentage(self) -> Decimal:
+        return self._discount_percentage
+
+    @discount_percentage.setter
+    def discount_percentage(self, discount_percentage: Decimal) -> None:
+        self._discount_percentage = discount_percentage
+        # Kept as an exact integer ratio so scaled amounts never go through Decimal.
+        numerator, denominator = Decimal(discount_percentage).as_integer_ratio()
+        self._percentage_ratio = (numerator, denominator * 100)
+        self._percentage_digits = ratio_decimal_places(denominator * 100)
+
+    @property
+    def percentage_ratio(self) -> tuple[int, int]:
+        """
+        The discount as an exact fraction of the price, (numerator, denominator).
+        """
+        return self._percentage_ratio
+
     def calculate_discount_amount(self, current_price: Decimal) -> Decimal:
         """
         Calculate the discount amount based on the current price and the discount percentage.
@@ -21,3 +44,10 @@ class PercentageDiscount(Discount):
         :return: The discount amount
         """
         return current_price * (self.discount_percentage / Decimal(100))
+
+    def scaled_digits(self) -> tuple[int, int]:
+        return 0, self._percentage_digits
+
+    def calculate_discount_amount_scaled(self, current_price_scaled: int, scale: int) -> int:
+        numerator, denominator = self._percentage_ratio
+        return current_price_scaled * numerator // denominator
@@ -1,6 +1,8 @@
 from discounts.base import Discount
 from discounts.constants import DiscountType
-from discounts.processing_strategies.discount_processing_strategy_interface import IDiscountProcessingStrategy
+from discounts.processing_strategies.discount_processing_strategy_interface import (
+    CartContext, IDiscountProcessingStrategy,
+)
 
 
 class DefaultDiscountProcessingStrategy(IDiscountProcessingStrategy):
@@ -12,10 +14,15 @@ class DefaultDiscountProcessingStrategy(IDiscountProcessingStrategy):
     """
     def __init__(self, discount_type_ordering: list[DiscountType]) -> None:
         self.discount_type_ordering = discount_type_ordering
+        # First position wins for repeated types, as with `list.index`.
+        self._type_rank = {
+            discount_type: rank for rank, discount_type in reversed(list(enumerate(discount_type_ordering)))
+        }
 
     def resolve_discounts(
             self,
             applicable_discounts: list[Discount],
+            cart_context: CartContext | None = None,
     ) -> list[Discount]:
         """
         Default strategy that returns all applicable discounts as is.
@@ -33,6 +40,6 @@ class DefaultDiscountProcessingStrategy(IDiscountProcessingStrategy):
                 discount_type_applied.add(discount.discount_type)
 
         resolved_discounts_list.sort(
-            key=lambda d: self.discount_type_ordering.index(d.discount_type)
+            key=lambda d: self._type_rank[d.discount_type]
         )
         return resolved_discounts_list
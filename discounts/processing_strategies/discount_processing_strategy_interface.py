@@ -1,19 +1,37 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import NamedTuple
 
 from discounts.base import Discount
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.payment import PaymentInfo
+
+
+class CartContext(NamedTuple):
+    """The cart discounts are being resolved for."""
+    customer_profile: CustomerProfile
+    cart_items: list[CartItem]
+    payment_info: PaymentInfo | None = None
+    now: datetime | None = None
 
 
 class IDiscountProcessingStrategy(ABC):
+    # Strategies whose result depends on the cart set this, so a resolution is never shared between carts.
+    uses_cart_context: bool = False
 
     @abstractmethod
     def resolve_discounts(
             self,
             applicable_discounts: list[Discount],
+            cart_context: CartContext | None = None,
     ) -> list[Discount]:
         """
         Resolve and return a list of applicable discounts.
         All discounts returned will be applied in the order they are returned.
 
+        :param cart_context: The cart being priced, when known. Strategies must still return a valid
+            resolution without it.
         :return: List of applicable discounts.
         """
         ...
@@ -0,0 +1,260 @@
+import time
+from decimal import Decimal
+from typing import Callable
+
+import clock
+from discounts.base import Discount
+from discounts.constants import DiscountObjective, DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processing_strategies.discount_processing_strategy_interface import (
+    CartContext, IDiscountProcessingStrategy,
+)
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class _Candidate:
+    """
+    A discount together with the cart lines its rules match.
+    """
+    __slots__ = ("discount", "positions")
+
+    def __init__(self, discount: Discount, positions: tuple[int, ...]) -> None:
+        self.discount = discount
+        self.positions = positions
+
+    def kind(self) -> tuple[str, Decimal] | None:
+        """
+        How the discount reduces a price, for the built-in discounts, or None if unknown.
+        """
+        discount_type = type(self.discount)
+        if discount_type is PercentageDiscount:
+            return "percentage", self.discount.discount_percentage
+        if discount_type is FixedAmountDiscount:
+            return "fixed", self.discount.discount_amount
+        return None
+
+    def dominates(self, other: "_Candidate", objective: DiscountObjective) -> bool:
+        """
+        Check whether this candidate leaves every line at a price at least as good for `objective` as `other`
+        does, whatever the running prices. Both must be of a known kind.
+        """
+        if not other.positions:
+            # Applying nothing leaves every price as is.
+            return objective == DiscountObjective.BEST_FOR_CUSTOMER or not self.positions
+        if not self.positions:
+            return objective == DiscountObjective.BEST_FOR_MARGIN
+        (kind, value), (other_kind, other_value) = self.kind(), other.kind()
+        if kind != other_kind:
+            return False
+        if objective == DiscountObjective.BEST_FOR_CUSTOMER:
+            return value >= other_value and set(self.positions) >= set(other.positions)
+        return value <= other_value and set(self.positions) <= set(other.positions)
+
+
+class OptimalDiscountProcessingStrategy(IDiscountProcessingStrategy):
+    """
+    Resolves the combination of discounts that is best for the customer (lowest final price) or for the
+    margin (highest final price) of a specific cart, under the same stacking constraints as
+    DefaultDiscountProcessingStrategy: exactly one discount per DiscountType, applied in `discount_type_ordering`.
+
+    Candidates dominated by another discount of the same type (e.g. a smaller percentage on fewer lines) are
+    dropped first. The search then walks the discount types in application order with memoized partial cart
+    prices: the best completion of a (type, running prices) state is computed once, and a choice is pruned when
+    even the best remaining savings at the starting prices could not beat the best choice found so far.
+    Line prices only ever go down and every discount saves at most as much on a lower price, which is what
+    makes both valid. Discounts are simulated per cart line, as in `mutate_products=False` mode.
+
+    Without a cart context, or when the search exceeds its time budget, the greedy resolution of
+    DefaultDiscountProcessingStrategy is returned. It is also kept whenever the search cannot strictly improve on it.
+    """
+    uses_cart_context = True
+
+    def __init__(
+            self,
+            discount_type_ordering: list[DiscountType],
+            objective: DiscountObjective = DiscountObjective.BEST_FOR_CUSTOMER,
+            *,
+            time_budget_seconds: float = 0.05,
+            monotonic_clock: Callable[[], float] = time.perf_counter
+    ) -> None:
+        """
+        :param objective: Whose interest the combination maximizes.
+        :param time_budget_seconds: Maximum search time per call before falling back to the greedy resolution.
+        :param monotonic_clock: Clock used for the time budget, in seconds.
+        """
+        self.discount_type_ordering = discount_type_ordering
+        self.objective = objective
+        self._greedy_strategy = DefaultDiscountProcessingStrategy(discount_type_ordering)
+        self._time_budget_seconds = time_budget_seconds
+        self._monotonic_clock = monotonic_clock
+        self.timeouts = 0
+
+    def resolve_discounts(
+            self,
+            applicable_discounts: list[Discount],
+            cart_context: CartContext | None = None,
+    ) -> list[Discount]:
+        greedy = self._greedy_strategy.resolve_discounts(applicable_discounts)
+        if cart_context is None or not cart_context.cart_items or len(applicable_discounts) == len(greedy):
+            # Nothing to choose from when every type has a single candidate.
+            return greedy
+
+        # `applicable_discounts` was sorted by expiry above, so candidates keep the greedy preference on ties.
+        levels = self._candidate_levels(applicable_discounts, greedy, cart_context)
+        prices = tuple(item.product.current_price for item in cart_context.cart_items)
+        quantities = tuple(item.quantity for item in cart_context.cart_items)
+        greedy_savings = self._savings_of(greedy, levels, prices, quantities)
+        levels = [self._drop_dominated(candidates) for candidates in levels]
+        try:
+            best_savings, choices = _Search(levels, quantities, self.objective,
+                                            self._monotonic_clock() + self._time_budget_seconds,
+                                            self._monotonic_clock).solve(0, prices)
+        except _SearchTimeout:
+            self.timeouts += 1
+            return greedy
+        if not self._is_better(best_savings, greedy_savings):
+            return greedy
+        return [candidate.discount for candidate in choices]
+
+    def _candidate_levels(self, discounts: list[Discount], greedy: list[Discount],
+                          cart_context: CartContext) -> list[list[_Candidate]]:
+        """
+        Group the candidates by discount type, in application order.
+        """
+        now = cart_context.now or clock.now()
+        levels = []
+        for chosen in greedy:
+            candidates = []
+            for discount in discounts:
+                if discount.discount_type != chosen.discount_type:
+                    continue
+                if discount.is_active(now):
+                    positions = tuple(
+                        position for position, item in enumerate(cart_context.cart_items)
+                        if discount.matches_rules(customer_profile=cart_context.customer_profile, cart_item=item,
+                                                  payment_info=cart_context.payment_info)
+                    )
+                else:
+                    positions = ()
+                candidates.append(_Candidate(discount, positions))
+            levels.append(candidates)
+        return levels
+
+    def _drop_dominated(self, candidates: list[_Candidate]) -> list[_Candidate]:
+        """
+        Drop candidates dominated by another one of the same level. A dominated candidate can never lead to a
+        better result, because each later discount maps a better running price to a better (or equal) final one.
+        Of equivalent candidates, the first (soonest-expiring) one is kept.
+        """
+        comparable = [
+            (position, candidate) for position, candidate in enumerate(candidates)
+            if candidate.kind() is not None or not candidate.positions
+        ]
+        dominated = {
+            position for position, candidate in comparable
+            if any(
+                other.dominates(candidate, self.objective)
+                and (other_position < position or not candidate.dominates(other, self.objective))
+                for other_position, other in comparable if other_position != position
+            )
+        }
+        return [candidate for position, candidate in enumerate(candidates) if position not in dominated]
+
+    @staticmethod
+    def _savings_of(resolved_discounts: list[Discount], levels: list[list[_Candidate]],
+                    prices: tuple[Decimal, ...], quantities: tuple[int, ...]) -> Decimal:
+        positions_by_discount = {
+            id(candidate.discount): candidate.positions for candidates in levels for candidate in candidates
+        }
+        running_prices, savings = list(prices), Decimal(0)
+        for discount in resolved_discounts:
+            for position in positions_by_discount.get(id(discount), ()):
+                amount = discount.calculate_discount_amount(running_prices[position])
+                running_prices[position] -= amount
+                savings += amount * quantities[position]
+        return savings
+
+    def _is_better(self, savings: Decimal, other_savings: Decimal) -> bool:
+        if self.objective == DiscountObjective.BEST_FOR_CUSTOMER:
+            return savings > other_savings
+        return savings < other_savings
+
+
+class _Search:
+    """
+    Depth-first search over one candidate per level, memoized on (level, running prices).
+    """
+
+    def __init__(self, levels: list[list[_Candidate]], quantities: tuple[int, ...], objective: DiscountObjective,
+                 deadline: float, monotonic_clock: Callable[[], float]) -> None:
+        self._levels = levels
+        self._quantities = quantities
+        self._maximize = objective == DiscountObjective.BEST_FOR_CUSTOMER
+        self._deadline = deadline
+        self._monotonic_clock = monotonic_clock
+        self._memo: dict[tuple[int, tuple[Decimal, ...]], tuple[Decimal, list[_Candidate]]] = {}
+        self._remaining_bound: list[Decimal] = []
+
+    def solve(self, level: int, prices: tuple[Decimal, ...]) -> tuple[Decimal, list[_Candidate]]:
+        """
+        :return: The best total savings reachable from `level` at `prices`, and the candidates achieving it.
+        """
+        if level == 0:
+            self._remaining_bound = self._remaining_savings_bound(prices)
+        if level == len(self._levels):
+            return Decimal(0), []
+        key = (level, prices)
+        solved = self._memo.get(key)
+        if solved is not None:
+            return solved
+        if self._monotonic_clock() > self._deadline:
+            raise _SearchTimeout
+
+        # Trying the most promising candidate first tightens the bound early. The sort is stable, so ties keep
+        # the expiry order of the candidates.
+        options = sorted(((candidate, *self._apply(candidate, prices)) for candidate in self._levels[level]),
+                         key=lambda option: option[1], reverse=self._maximize)
+        best: tuple[Decimal, list[_Candidate]] | None = None
+        for candidate, savings, next_prices in options:
+            if best is not None and not self._may_improve(savings, level, best[0]):
+                continue
+            remaining_savings, remaining_choices = self.solve(level + 1, next_prices)
+            total = savings + remaining_savings
+            if best is None or (total > best[0] if self._maximize else total < best[0]):
+                best = (total, [candidate] + remaining_choices)
+        self._memo[key] = best
+        return best
+
+    def _may_improve(self, savings: Decimal, level: int, best_total: Decimal) -> bool:
+        if self._maximize:
+            return savings + self._remaining_bound[level + 1] > best_total
+        # Later discounts never add negative savings.
+        return savings < best_total
+
+    def _apply(self, candidate: _Candidate, prices: tuple[Decimal, ...]) -> tuple[Decimal, tuple[Decimal, ...]]:
+        if not candidate.positions:
+            return Decimal(0), prices
+        calculate_discount_amount = candidate.discount.calculate_discount_amount
+        next_prices, savings = list(prices), Decimal(0)
+        for position in candidate.positions:
+            amount = calculate_discount_amount(next_prices[position])
+            next_prices[position] -= amount
+            savings += amount * self._quantities[position]
+        return savings, tuple(next_prices)
+
+    def _remaining_savings_bound(self, prices: tuple[Decimal, ...]) -> list[Decimal]:
+        """
+        Upper bound of the savings of levels `i` and later, for every level `i`, from the best candidate of
+        each level at the starting prices.
+        """
+        bound = [Decimal(0)] * (len(self._levels) + 1)
+        for level in range(len(self._levels) - 1, -1, -1):
+            best_savings = max((self._apply(candidate, prices)[0] for candidate in self._levels[level]),
+                               default=Decimal(0))
+            bound[level] = bound[level + 1] + best_savings
+        return bound
@@ -0,0 +1,50 @@
+from discounts.base import Discount
+from discounts.index.discount_index import is_attribute_only
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.payment import PaymentInfo
+
+
+class ApplicabilityCache:
+    """
+    Memoizes `Discount.matches_rules` across carts priced together.
+
+    Discounts built only from the attribute rules (brand, category, customer tier and payment) give the same
+    answer for every cart item sharing those attributes, so their result is computed once per attribute
+    combination. Discounts with any other rule are always evaluated directly.
+    The validity period is not part of the cached result; callers check `Discount.is_active` themselves.
+    """
+
+    def __init__(self) -> None:
+        self._results: dict[tuple, bool] = {}
+        self._attribute_only: dict[int, bool] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def matches_rules(self, discount: Discount, customer_profile: CustomerProfile, cart_item: CartItem,
+                      payment_info: PaymentInfo | None = None) -> bool:
+        discount_id = id(discount)
+        attribute_only = self._attribute_only.get(discount_id)
+        if attribute_only is None:
+            attribute_only = is_attribute_only(discount)
+            self._attribute_only[discount_id] = attribute_only
+        if not attribute_only:
+            return discount.matches_rules(customer_profile=customer_profile, cart_item=cart_item,
+                                          payment_info=payment_info)
+
+        product = cart_item.product
+        # Enum members are singletons, so their ids stand in for them and avoid Enum's Python-level __hash__.
+        if payment_info is None:
+            key = (discount_id, product.brand, product.category, id(customer_profile.tier), False, None, None)
+        else:
+            key = (discount_id, product.brand, product.category, id(customer_profile.tier), True,
+                   payment_info.bank_name, id(payment_info.method))
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            result = discount.matches_rules(customer_profile=customer_profile, cart_item=cart_item,
+                                            payment_info=payment_info)
+            self._results[key] = result
+        else:
+            self.hits += 1
+        return result
@@ -0,0 +1,238 @@
+import time
+from collections import Counter
+from datetime import datetime
+from decimal import ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, \
+    ROUND_UP
+from typing import Callable
+
+import clock
+from discounts.base import Discount
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.index.discount_index import DiscountIndex, is_attribute_only
+from discounts.minor_units import from_scaled, rounded_divider, to_scaled
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.discount_processing_strategy_interface import IDiscountProcessingStrategy
+from discounts.processor.applicability_cache import ApplicabilityCache
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from discounts.rules.rule_compiler import RuleCompiler
+from instrumentation.instrumentation_interface import IInstrumentation
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.discount import DiscountedPrice, MinorUnitLineItem
+from models.payment import PaymentInfo
+
+# NumPy is optional; without it every cart is priced by the scalar path. It is imported by the first cart large
+# enough for the columns, so workers that only price small carts never pay for the import.
+_NOT_LOADED = object()
+np = _NOT_LOADED
+
+# Scaled amounts live in int64 columns, products included.
+_INT64_LIMIT = 2 ** 63
+_VECTORIZED_ROUNDINGS = frozenset({
+    ROUND_DOWN, ROUND_FLOOR, ROUND_UP, ROUND_CEILING, ROUND_HALF_UP, ROUND_HALF_DOWN, ROUND_HALF_EVEN,
+})
+
+
+class ColumnarDiscountProcessor(MinorUnitDiscountProcessor):
+    """
+    MinorUnitDiscountProcessor that prices very large carts column-wise with NumPy.
+
+    A cart with at least `columnar_threshold` lines is loaded into int64 arrays of scaled prices and quantities,
+    the lines each discount matches become a boolean mask (one rule check per brand/category group for
+    attribute-only discounts), and PercentageDiscount and FixedAmountDiscount are applied to all matching lines
+    at once. Results are identical to MinorUnitDiscountProcessor.
+
+    Smaller carts, and carts the columns cannot represent exactly, are priced by the scalar path: other discount
+    classes, a discount name resolved twice, Product objects shared between lines while products are mutated,
+    scaled amounts that could overflow int64, or a rounding mode without a vectorized form. So is every cart
+    when NumPy is not installed.
+    """
+
+    def __init__(
+            self,
+            discount_application_strategy: IDiscountProcessingStrategy,
+            discount_index: DiscountIndex | Callable[[], DiscountIndex] | None = None,
+            *,
+            mutate_products: bool = True,
+            rule_compiler: RuleCompiler | None = None,
+            instrumentation: IInstrumentation | None = None,
+            minor_unit_exponent: int = 2,
+            rounding: str = ROUND_HALF_UP,
+            columnar_threshold: int = 1_000
+    ) -> None:
+        """
+        :param columnar_threshold: Minimum number of cart lines priced column-wise.
+        """
+        super().__init__(discount_application_strategy, discount_index=discount_index,
+                         mutate_products=mutate_products, rule_compiler=rule_compiler,
+                         instrumentation=instrumentation, minor_unit_exponent=minor_unit_exponent, rounding=rounding)
+        self._columnar_threshold = columnar_threshold
+
+    def apply_resolved_discounts(
+            self,
+            resolved_discounts: list[Discount],
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None = None,
+            applicability_cache: ApplicabilityCache | None = None,
+            now: datetime | None = None
+    ) -> DiscountedPrice:
+        started = time.perf_counter() if self._instrumentation.enabled else None
+        now = now or clock.now()
+        if not self._is_columnar(resolved_discounts, cart_items):
+            return super().apply_resolved_discounts(resolved_discounts, customer_profile, cart_items, payment_info,
+                                                    applicability_cache, now)
+
+        _, decimal_prices = self._running_prices(cart_items)
+        scale = self._scale(resolved_discounts, cart_items, list(range(len(cart_items))), decimal_prices)
+        unit_prices = [to_scaled(price, scale) for price in decimal_prices]
+        quantities = [item.quantity for item in cart_items]
+        if not self._fits_int64(resolved_discounts, unit_prices, quantities, scale - self._minor_unit_exponent):
+            return super().apply_resolved_discounts(resolved_discounts, customer_profile, cart_items, payment_info,
+                                                    applicability_cache, now)
+
+        original_price = sum(
+            (unit_price if item.product.base_price is item.product.current_price
+             else to_scaled(item.product.base_price, scale)) * item.quantity
+            for item, unit_price in zip(cart_items, unit_prices)
+        )
+        running_prices = np.array(unit_prices, dtype=np.int64)
+        quantity_column = np.array(quantities, dtype=np.int64)
+        discounted = np.zeros(len(cart_items), dtype=bool)
+        cart_candidate_ids = self._cart_candidate_ids(customer_profile, payment_info)
+        attribute_groups = self._attribute_groups(cart_items)
+        line_groups = np.empty(len(cart_items), dtype=np.intp)
+        for group, positions in enumerate(attribute_groups):
+            line_groups[positions] = group
+        # Lines of a group share their attribute bits, so only one line per group is encoded.
+        encoded_cart = self._encode_cart(resolved_discounts, customer_profile,
+                                         [cart_items[positions[0]] for positions in attribute_groups], payment_info)
+        if encoded_cart is not None:
+            group_bits = encoded_cart.item_bits
+            encoded_cart = encoded_cart._replace(item_bits=[group_bits[group] for group in line_groups.tolist()])
+        exponent = self._minor_unit_exponent
+        divisor = 10 ** (scale - exponent)
+        to_minor_units = rounded_divider(divisor, self._rounding)
+        line_discounts: list[dict[str, int]] = [{} for _ in cart_items]
+        applied_discounts: dict[str, int] = {}
+        message = ""
+        for discount in resolved_discounts:
+            if not discount.is_active(now):
+                continue
+            if is_attribute_only(discount):
+                matched_groups = np.zeros(len(attribute_groups), dtype=bool)
+                matched_groups[list(self._matching_groups(discount, customer_profile, cart_items, payment_info,
+                                                          attribute_groups, cart_candidate_ids, applicability_cache,
+                                                          encoded_cart))] = True
+                positions = np.flatnonzero(matched_groups[line_groups])
+            else:
+                positions = np.fromiter(
+                    self._applicable_positions(discount, customer_profile, cart_items, payment_info,
+                                               cart_candidate_ids, applicability_cache, encoded_cart),
+                    dtype=np.intp,
+                )
+            if not len(positions):
+                continue
+            amounts = self._discount_amounts(discount, running_prices[positions], scale)
+            running_prices[positions] -= amounts
+            discounted[positions] = True
+            name = discount.name
+            for position, amount_minor in zip(positions.tolist(), self._to_minor_units(amounts, divisor).tolist()):
+                line_discounts[position][name] = amount_minor
+            applied_discounts[name] = int(amounts.sum())
+            message += f"| Applied {discount.name} | "
+        if started is not None:
+            self._record_pricing(resolved_discounts, line_discounts, now, started)
+
+        final_unit_prices = running_prices.tolist()
+        if self._mutate_products:
+            for position in np.flatnonzero(discounted).tolist():
+                cart_items[position].product.current_price = from_scaled(final_unit_prices[position], scale)
+        unit_prices_minor = self._to_minor_units(np.array(unit_prices, dtype=np.int64), divisor).tolist()
+        final_unit_prices_minor = self._to_minor_units(running_prices, divisor).tolist()
+        return DiscountedPrice(
+            original_price=from_scaled(to_minor_units(original_price), exponent),
+            final_price=from_scaled(to_minor_units(int(running_prices @ quantity_column)), exponent),
+            applied_discounts={
+                name: from_scaled(to_minor_units(amount), exponent) for name, amount in applied_discounts.items()
+            },
+            message=message,
+            line_items=[
+                MinorUnitLineItem(item.product.id, quantity, unit_price_minor, final_unit_price_minor,
+                                  discounts_applied_to_line, exponent)
+                for item, quantity, unit_price_minor, final_unit_price_minor, discounts_applied_to_line
+                in zip(cart_items, quantities, unit_prices_minor, final_unit_prices_minor, line_discounts)
+            ]
+        )
+
+    def _is_columnar(self, resolved_discounts: list[Discount], cart_items: list[CartItem]) -> bool:
+        if len(cart_items) < self._columnar_threshold or self._rounding not in _VECTORIZED_ROUNDINGS:
+            return False
+        if _load_numpy() is None:
+            return False
+        # Subclasses may override the amount calculation, so only the exact built-in classes are vectorized.
+        if any(type(discount) not in (PercentageDiscount, FixedAmountDiscount) for discount in resolved_discounts):
+            return False
+        # Repeated names accumulate into one amount before rounding, which the columns do not track.
+        if max(Counter(discount.name for discount in resolved_discounts).values(), default=1) > 1:
+            return False
+        # Lines sharing a Product take each discount one after the other on the shared price.
+        return not self._mutate_products or len({id(item.product) for item in cart_items}) == len(cart_items)
+
+    @staticmethod
+    def _fits_int64(resolved_discounts: list[Discount], unit_prices: list[int], quantities: list[int],
+                    guard_digits: int) -> bool:
+        """
+        Check that no intermediate value of the columnar arithmetic can overflow int64. Prices only decrease,
+        so the starting prices bound every later one.
+        """
+        max_price = max(unit_prices, default=0)
+        max_multiplier = max((max(discount.percentage_ratio) for discount in resolved_discounts
+                              if type(discount) is PercentageDiscount), default=1)
+        return (min(unit_prices, default=0) >= 0 and min(quantities, default=0) >= 0
+                and max_price * max(max_multiplier, sum(quantities), len(unit_prices), 1) < _INT64_LIMIT
+                and 2 * 10 ** guard_digits < _INT64_LIMIT)
+
+    @staticmethod
+    def _discount_amounts(discount: Discount, prices: "np.ndarray", scale: int) -> "np.ndarray":
+        """
+        Column-wise `calculate_discount_amount_scaled` of the built-in discounts.
+        """
+        if type(discount) is PercentageDiscount:
+            numerator, denominator = discount.percentage_ratio
+            return prices * numerator // denominator
+        # Prices fit in int64, so a larger fixed amount takes the whole price either way.
+        return np.minimum(prices, min(to_scaled(discount.discount_amount, scale), _INT64_LIMIT - 1))
+
+    def _to_minor_units(self, amounts: "np.ndarray", divisor: int) -> "np.ndarray":
+        """
+        Column-wise `divide_rounded` of non-negative amounts.
+        """
+        if divisor == 1:
+            return amounts
+        quotient, remainder = np.divmod(amounts, divisor)
+        rounding = self._rounding
+        if rounding in (ROUND_DOWN, ROUND_FLOOR):
+            return quotient
+        if rounding in (ROUND_UP, ROUND_CEILING):
+            return quotient + (remainder > 0)
+        doubled_remainder = 2 * remainder
+        if rounding == ROUND_HALF_UP:
+            return quotient + (doubled_remainder >= divisor)
+        if rounding == ROUND_HALF_DOWN:
+            return quotient + (doubled_remainder > divisor)
+        return quotient + ((doubled_remainder > divisor) | ((doubled_remainder == divisor) & ((quotient & 1) == 1)))
+
+
+def _load_numpy():
+    """
+    :return: The numpy module, or None if it is not installed.
+    """
+    global np
+    if np is _NOT_LOADED:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
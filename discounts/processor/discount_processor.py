@@ -1,52 +1,339 @@
+import time
+from datetime import datetime
 from decimal import Decimal
+from typing import Callable, Iterable, Iterator, NamedTuple
 
+import clock
 from discounts.base import Discount
-from discounts.processing_strategies.discount_processing_strategy_interface import IDiscountProcessingStrategy
+from discounts.index.discount_index import DiscountIndex
+from discounts.processing_strategies.discount_processing_strategy_interface import (
+    CartContext, IDiscountProcessingStrategy,
+)
+from discounts.processor.applicability_cache import ApplicabilityCache
+from discounts.rules.rule_compiler import EncodedCart, RuleCompiler
+from instrumentation.instrumentation_interface import IInstrumentation, NO_OP_INSTRUMENTATION
 from models.cart import CartItem
 from models.customer import CustomerProfile
-from models.discount import DiscountedPrice
+from models.discount import DiscountedLineItem, DiscountedPrice
 from models.payment import PaymentInfo
 
 
+class PricingJob(NamedTuple):
+    """A cart to price against an already resolved list of discounts."""
+    resolved_discounts: list[Discount]
+    customer_profile: CustomerProfile
+    cart_items: list[CartItem]
+    payment_info: PaymentInfo | None = None
+
+
 class DiscountProcessor:
 
     def __init__(
             self,
-            discount_application_strategy: IDiscountProcessingStrategy
+            discount_application_strategy: IDiscountProcessingStrategy,
+            discount_index: DiscountIndex | Callable[[], DiscountIndex] | None = None,
+            *,
+            mutate_products: bool = True,
+            rule_compiler: RuleCompiler | None = None,
+            instrumentation: IInstrumentation | None = None
     ) -> None:
         """
         Initialize the DiscountProcessor with a list of discounts.
+
+        :param discount_application_strategy: Strategy used to resolve which discounts are applied.
+        :param discount_index: Optional index used to skip cart items a discount can never match.
+            Discounts missing from the index are always checked against every item. A callable, such as
+            `InMemoryDiscountRepository.get_discount_index`, is asked for the current index on every use.
+        :param mutate_products: Write discounted prices back into `Product.current_price`.
+            When False, running prices are kept per cart line for the duration of the call and products
+            are left untouched, so they can be shared between concurrent requests.
+        :param rule_compiler: Optional compiler used to check discount rules as bitmasks. Rules it cannot
+            compile are still checked through `is_applicable`.
+        :param instrumentation: Optional receiver of the processor's stage latencies ("processor.resolve_discounts",
+            "processor.apply_resolved_discounts") and counters: "carts.priced", "discounts.considered" (active
+            resolved discounts), "rules.evaluated" (cart lines, or brand/category groups, checked against a
+            discount's rules after the cart-wide checks), "items.matched" (discounts applied to cart lines) and the
+            "applicability_cache.hits"/"misses" of batches.
         """
         self._application_strategy = discount_application_strategy
+        self._discount_index_provider = discount_index if callable(discount_index) else None
+        self._fixed_discount_index = None if callable(discount_index) else discount_index
+        self._mutate_products = mutate_products
+        self._rule_compiler = rule_compiler
+        self._instrumentation = instrumentation or NO_OP_INSTRUMENTATION
+
+    @property
+    def _discount_index(self) -> DiscountIndex | None:
+        if self._discount_index_provider is None:
+            return self._fixed_discount_index
+        return self._discount_index_provider()
 
     def apply_discounts(
             self,
             discounts: list[Discount],
             customer_profile: CustomerProfile,
             cart_items: list[CartItem],
-            payment_info: PaymentInfo | None = None
+            payment_info: PaymentInfo | None = None,
+            now: datetime | None = None
+    ) -> DiscountedPrice:
+        now = now or clock.now()
+        cart_context = CartContext(customer_profile=customer_profile, cart_items=cart_items,
+                                   payment_info=payment_info, now=now)
+        return self.apply_resolved_discounts(
+            resolved_discounts=self.resolve_discounts(discounts, cart_context),
+            customer_profile=customer_profile,
+            cart_items=cart_items,
+            payment_info=payment_info,
+            now=now,
+        )
+
+    @property
+    def resolves_per_cart(self) -> bool:
+        """
+        Whether the strategy needs the cart to resolve discounts, so a resolution cannot be shared between carts.
+        """
+        return self._application_strategy.uses_cart_context
+
+    @property
+    def mutates_products(self) -> bool:
+        """
+        Whether pricing writes discounted prices back into `Product.current_price`, see `mutate_products`.
+        """
+        return self._mutate_products
+
+    @property
+    def prices_lines_independently(self) -> bool:
+        """
+        Whether a cart's result is the sum of its lines priced one at a time, so a changed line can be repriced
+        alone. Lines sharing a Product object see each other's discounts when products are mutated.
+        """
+        return not self._mutate_products
+
+    def resolve_discounts(self, discounts: list[Discount], cart_context: CartContext | None = None) -> list[Discount]:
+        """
+        Resolve the discounts to apply, in order, using the configured strategy.
+
+        :param cart_context: The cart being priced, for strategies that take it into account.
+        """
+        if not self._instrumentation.enabled:
+            return self._application_strategy.resolve_discounts(discounts, cart_context)
+        started = time.perf_counter()
+        resolved_discounts = self._application_strategy.resolve_discounts(discounts, cart_context)
+        self._instrumentation.record_latency("processor.resolve_discounts", time.perf_counter() - started)
+        return resolved_discounts
+
+    def apply_discounts_many(self, jobs: Iterable[PricingJob], now: datetime | None = None) -> list[DiscountedPrice]:
+        """
+        Price several carts, sharing rule evaluation between them.
+
+        :param jobs: Carts together with their resolved discounts.
+        :param now: Evaluation timestamp shared by all jobs, defaults to the time of the call.
+        :return: One DiscountedPrice per job, in the same order.
+        """
+        now = now or clock.now()
+        applicability_cache = ApplicabilityCache()
+        discounted_prices = [
+            self.apply_resolved_discounts(
+                resolved_discounts=job.resolved_discounts,
+                customer_profile=job.customer_profile,
+                cart_items=job.cart_items,
+                payment_info=job.payment_info,
+                applicability_cache=applicability_cache,
+                now=now,
+            )
+            for job in jobs
+        ]
+        if self._instrumentation.enabled:
+            self._instrumentation.increment("applicability_cache.hits", applicability_cache.hits)
+            self._instrumentation.increment("applicability_cache.misses", applicability_cache.misses)
+        return discounted_prices
+
+    async def apply_discounts_many_async(self, jobs: Iterable[PricingJob],
+                                         now: datetime | None = None) -> list[DiscountedPrice]:
+        """
+        `apply_discounts_many` for callers on an event loop. The carts are priced in the calling thread here;
+        processors that price elsewhere, like ParallelDiscountProcessor, let the loop run other tasks meanwhile.
+        """
+        return self.apply_discounts_many(jobs, now=now)
+
+    def apply_resolved_discounts(
+            self,
+            resolved_discounts: list[Discount],
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None = None,
+            applicability_cache: ApplicabilityCache | None = None,
+            now: datetime | None = None
     ) -> DiscountedPrice:
+        """
+        Apply discounts that were already resolved by `resolve_discounts`, in the given order.
+
+        :param applicability_cache: Optional cache shared between carts priced in the same batch.
+        :param now: Evaluation timestamp for the validity periods, defaults to the time of the call.
+            It is read once per request and each discount's validity is checked once, not per cart item.
+        """
+        started = time.perf_counter() if self._instrumentation.enabled else None
+        now = now or clock.now()
         original_price = Decimal(sum(item.product.base_price * item.quantity for item in cart_items))
         applied_discounts: dict[str, Decimal] = {}
-        resolved_discounts: list[Discount] = self._application_strategy.resolve_discounts(discounts)
+        line_discounts: list[dict[str, Decimal]] = [{} for _ in cart_items]
+        price_slots, running_prices = self._running_prices(cart_items)
+        unit_prices = [running_prices[slot] for slot in price_slots]
+        mutate_products = self._mutate_products
+        cart_candidate_ids = self._cart_candidate_ids(customer_profile, payment_info)
+        encoded_cart = self._encode_cart(resolved_discounts, customer_profile, cart_items, payment_info)
         message = ""
         for discount in resolved_discounts:
-            total_discount_amount = Decimal(0)
             discount_applied = False
-            for item in cart_items:
-                if discount.is_applicable(customer_profile=customer_profile, cart_item=item, payment_info=payment_info):
-                    discount_applied = True
-                    item_discount_amount = discount.calculate_discount_amount(item.product.current_price)
-                    total_discount_amount += item_discount_amount
-                    item.product.current_price -= item_discount_amount
-                    applied_discounts[discount.name] = applied_discounts.get(discount.name, Decimal(0)) + item_discount_amount
-
+            if not discount.is_active(now):
+                continue
+            for position in self._applicable_positions(discount, customer_profile, cart_items, payment_info,
+                                                       cart_candidate_ids, applicability_cache, encoded_cart):
+                discount_applied = True
+                slot = price_slots[position]
+                item_discount_amount = discount.calculate_discount_amount(running_prices[slot])
+                running_prices[slot] -= item_discount_amount
+                if mutate_products:
+                    cart_items[position].product.current_price = running_prices[slot]
+                line_discounts[position][discount.name] = (
+                    line_discounts[position].get(discount.name, Decimal(0)) + item_discount_amount
+                )
+                applied_discounts[discount.name] = applied_discounts.get(discount.name, Decimal(0)) + item_discount_amount
 
             if discount_applied:
                 message += f"| Applied {discount.name} | "
+        if started is not None:
+            self._record_pricing(resolved_discounts, line_discounts, now, started)
         return DiscountedPrice(
             original_price=original_price,
-            final_price=Decimal(sum(item.product.current_price * item.quantity for item in cart_items)),
+            final_price=Decimal(sum(running_prices[slot] * item.quantity for slot, item in zip(price_slots, cart_items))),
             applied_discounts=applied_discounts,
-            message=message
+            message=message,
+            line_items=[
+                DiscountedLineItem(
+                    product_id=item.product.id,
+                    quantity=item.quantity,
+                    unit_price=unit_price,
+                    final_unit_price=running_prices[slot],
+                    applied_discounts=discounts_applied_to_line,
+                )
+                for item, slot, unit_price, discounts_applied_to_line
+                in zip(cart_items, price_slots, unit_prices, line_discounts)
+            ]
         )
+
+    def _record_pricing(self, resolved_discounts: list[Discount], line_discounts: list[dict], now: datetime,
+                        started: float) -> None:
+        """
+        Report one priced cart to the instrumentation.
+
+        :param line_discounts: The discounts applied to each cart line, by name.
+        :param started: `time.perf_counter()` when pricing started.
+        """
+        instrumentation = self._instrumentation
+        instrumentation.record_latency("processor.apply_resolved_discounts", time.perf_counter() - started)
+        instrumentation.increment("carts.priced")
+        instrumentation.increment("discounts.considered",
+                                  sum(discount.is_active(now) for discount in resolved_discounts))
+        instrumentation.increment("items.matched", sum(map(len, line_discounts)))
+
+    def _cart_candidate_ids(
+            self,
+            customer_profile: CustomerProfile,
+            payment_info: PaymentInfo | None
+    ) -> frozenset[int] | None:
+        if self._discount_index is None:
+            return None
+        return self._discount_index.cart_candidate_ids(customer_profile, payment_info)
+
+    def _encode_cart(
+            self,
+            resolved_discounts: list[Discount],
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None
+    ) -> EncodedCart | None:
+        if self._rule_compiler is None:
+            return None
+        # Compiled first, so that the cart is encoded with the ids of every value the discounts mention.
+        for discount in resolved_discounts:
+            self._rule_compiler.compile(discount)
+        return self._rule_compiler.encode_cart(customer_profile, cart_items, payment_info)
+
+    def _applicable_positions(
+            self,
+            discount: Discount,
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None,
+            cart_candidate_ids: frozenset[int] | None,
+            applicability_cache: ApplicabilityCache | None,
+            encoded_cart: EncodedCart | None = None
+    ) -> Iterator[int]:
+        """
+        Yield the positions of the cart items whose rules `discount` matches. The caller checks the validity period.
+        Items are checked lazily, so each one sees the prices left by the items before it.
+        """
+        discount_index = self._discount_index
+        indexed = discount_index is not None and discount in discount_index
+        if indexed and id(discount) not in cart_candidate_ids:
+            return
+        if encoded_cart is not None:
+            yield from self._compiled_applicable_positions(discount, customer_profile, cart_items, payment_info,
+                                                           encoded_cart)
+            return
+        if self._instrumentation.enabled:
+            self._instrumentation.increment("rules.evaluated", len(cart_items))
+        for position, item in enumerate(cart_items):
+            if indexed and not discount_index.admits_item(discount, item):
+                continue
+            if applicability_cache is not None:
+                applicable = applicability_cache.matches_rules(discount, customer_profile, item, payment_info)
+            else:
+                applicable = discount.matches_rules(customer_profile=customer_profile, cart_item=item,
+                                                    payment_info=payment_info)
+            if applicable:
+                yield position
+
+    def _compiled_applicable_positions(
+            self,
+            discount: Discount,
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None,
+            encoded_cart: EncodedCart
+    ) -> Iterator[int]:
+        compiled = self._rule_compiler.compile(discount)
+        if not compiled.matches_cart(encoded_cart.cart_bits):
+            return
+        if self._instrumentation.enabled:
+            self._instrumentation.increment("rules.evaluated", len(encoded_cart.item_bits))
+        brand_mask, category_mask = compiled.brand_mask, compiled.category_mask
+        residual_rules = compiled.residual_rules
+        for position, (brand_bit, category_bit) in enumerate(encoded_cart.item_bits):
+            if not (brand_bit & brand_mask and category_bit & category_mask):
+                continue
+            if residual_rules and not compiled.matches_residual(customer_profile, cart_items[position], payment_info):
+                continue
+            yield position
+
+    def _running_prices(self, cart_items: list[CartItem]) -> tuple[list[int], list[Decimal]]:
+        """
+        Build the buffer of running unit prices for a request.
+
+        :return: The buffer slot of each cart line and the buffer itself, seeded with `current_price`.
+            When products are mutated, lines sharing a Product object share a slot, so they see each other's
+            discounts exactly as they do through `Product.current_price`. Otherwise every line has its own slot.
+        """
+        if not self._mutate_products:
+            return list(range(len(cart_items))), [item.product.current_price for item in cart_items]
+        slot_by_product: dict[int, int] = {}
+        running_prices: list[Decimal] = []
+        price_slots: list[int] = []
+        for item in cart_items:
+            slot = slot_by_product.get(id(item.product))
+            if slot is None:
+                slot = slot_by_product[id(item.product)] = len(running_prices)
+                running_prices.append(item.product.current_price)
+            price_slots.append(slot)
+        return price_slots, running_prices
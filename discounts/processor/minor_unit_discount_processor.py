@@ -0,0 +1,239 @@
+from collections import Counter
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Iterator
+
+import clock
+from discounts.base import Discount
+from discounts.index.discount_index import DiscountIndex, is_attribute_only
+from discounts.minor_units import decimal_places, from_scaled, rounded_divider, to_scaled
+from discounts.processing_strategies.discount_processing_strategy_interface import IDiscountProcessingStrategy
+from discounts.processor.applicability_cache import ApplicabilityCache
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.rule_compiler import EncodedCart, RuleCompiler
+from instrumentation.instrumentation_interface import IInstrumentation
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.discount import DiscountedPrice, MinorUnitLineItem
+from models.payment import PaymentInfo
+
+
+class MinorUnitDiscountProcessor(DiscountProcessor):
+    """
+    DiscountProcessor that does its arithmetic on integers instead of Decimal.
+
+    Prices are converted once per request to integers at minor-unit resolution (paise, cents) plus the guard
+    digits the resolved discounts need to stay exact, see `Discount.scaled_digits`. Every reported amount is
+    then rounded to whole minor units with the configured `rounding`, so results equal the Decimal path rounded
+    the same way. Each cart line reports its own breakdown in `DiscountedPrice.line_items` as a MinorUnitLineItem.
+
+    Lines are grouped by brand and category, so discounts built only from the attribute rules are checked once
+    per group rather than once per line; other discounts are checked line by line as in DiscountProcessor.
+    """
+
+    def __init__(
+            self,
+            discount_application_strategy: IDiscountProcessingStrategy,
+            discount_index: DiscountIndex | Callable[[], DiscountIndex] | None = None,
+            *,
+            mutate_products: bool = True,
+            rule_compiler: RuleCompiler | None = None,
+            instrumentation: IInstrumentation | None = None,
+            minor_unit_exponent: int = 2,
+            rounding: str = ROUND_HALF_UP
+    ) -> None:
+        """
+        :param minor_unit_exponent: Number of minor-unit digits, 2 for paise/cents.
+        :param rounding: A `decimal` rounding mode used to round amounts to minor units.
+        """
+        super().__init__(discount_application_strategy, discount_index=discount_index,
+                         mutate_products=mutate_products, rule_compiler=rule_compiler,
+                         instrumentation=instrumentation)
+        self._minor_unit_exponent = minor_unit_exponent
+        self._rounding = rounding
+
+    @property
+    def prices_lines_independently(self) -> bool:
+        # Cart totals are rounded to minor units once, after the lines are summed.
+        return False
+
+    def apply_resolved_discounts(
+            self,
+            resolved_discounts: list[Discount],
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None = None,
+            applicability_cache: ApplicabilityCache | None = None,
+            now: datetime | None = None
+    ) -> DiscountedPrice:
+        started = time.perf_counter() if self._instrumentation.enabled else None
+        now = now or clock.now()
+        price_slots, decimal_prices = self._running_prices(cart_items)
+        scale = self._scale(resolved_discounts, cart_items, price_slots, decimal_prices)
+        running_prices = [to_scaled(price, scale) for price in decimal_prices]
+        unit_prices = [running_prices[slot] for slot in price_slots]
+        # Read before discounts are written back to `current_price`. Base prices are usually the very same
+        # Decimal object as the current price, so its conversion is reused.
+        original_price = sum(
+            (unit_price if item.product.base_price is item.product.current_price
+             else to_scaled(item.product.base_price, scale)) * item.quantity
+            for item, unit_price in zip(cart_items, unit_prices)
+        )
+        applied_discounts: dict[str, int] = {}
+        line_discounts: list[dict[str, int]] = [{} for _ in cart_items]
+        mutate_products = self._mutate_products
+        cart_candidate_ids = self._cart_candidate_ids(customer_profile, payment_info)
+        attribute_groups = self._attribute_groups(cart_items)
+        encoded_cart = self._encode_cart(resolved_discounts, customer_profile, cart_items, payment_info)
+        message = ""
+        for discount in resolved_discounts:
+            if not discount.is_active(now):
+                continue
+            name = discount.name
+            calculate_discount_amount = discount.calculate_discount_amount_scaled
+            total_discount_amount = 0
+            discount_applied = False
+            for position in self._grouped_applicable_positions(discount, customer_profile, cart_items, payment_info,
+                                                               attribute_groups, cart_candidate_ids,
+                                                               applicability_cache, encoded_cart):
+                discount_applied = True
+                slot = price_slots[position]
+                item_discount_amount = calculate_discount_amount(running_prices[slot], scale)
+                running_prices[slot] -= item_discount_amount
+                if mutate_products:
+                    cart_items[position].product.current_price = from_scaled(running_prices[slot], scale)
+                discounts_applied_to_line = line_discounts[position]
+                discounts_applied_to_line[name] = discounts_applied_to_line.get(name, 0) + item_discount_amount
+                total_discount_amount += item_discount_amount
+
+            if discount_applied:
+                applied_discounts[name] = applied_discounts.get(name, 0) + total_discount_amount
+                message += f"| Applied {discount.name} | "
+        if started is not None:
+            self._record_pricing(resolved_discounts, line_discounts, now, started)
+
+        exponent = self._minor_unit_exponent
+        to_minor_units = rounded_divider(10 ** (scale - exponent), self._rounding)
+        final_price = sum(running_prices[slot] * item.quantity for slot, item in zip(price_slots, cart_items))
+        line_items = []
+        for item, slot, unit_price, discounts_applied_to_line in zip(cart_items, price_slots, unit_prices,
+                                                                     line_discounts):
+            unit_price_minor = to_minor_units(unit_price)
+            if discounts_applied_to_line:
+                final_unit_price_minor = to_minor_units(running_prices[slot])
+                applied_discounts_minor = {
+                    name: to_minor_units(amount) for name, amount in discounts_applied_to_line.items()
+                }
+            else:
+                # Many lines of a large cart are not discounted at all, so skip the rounding for them.
+                final_unit_price_minor, applied_discounts_minor = unit_price_minor, discounts_applied_to_line
+            # Positional arguments: this runs once per cart line and keywords double the construction cost.
+            line_items.append(MinorUnitLineItem(item.product.id, item.quantity, unit_price_minor,
+                                                final_unit_price_minor, applied_discounts_minor, exponent))
+        return DiscountedPrice(
+            original_price=from_scaled(to_minor_units(original_price), exponent),
+            final_price=from_scaled(to_minor_units(final_price), exponent),
+            applied_discounts={
+                name: from_scaled(to_minor_units(amount), exponent) for name, amount in applied_discounts.items()
+            },
+            message=message,
+            line_items=line_items
+        )
+
+    @staticmethod
+    def _attribute_groups(cart_items: list[CartItem]) -> list[list[int]]:
+        """
+        Group cart line positions by product brand and category.
+        """
+        attribute_groups: dict[tuple[str, str], list[int]] = {}
+        for position, item in enumerate(cart_items):
+            attribute_groups.setdefault((item.product.brand, item.product.category), []).append(position)
+        return list(attribute_groups.values())
+
+    def _grouped_applicable_positions(
+            self,
+            discount: Discount,
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None,
+            attribute_groups: list[list[int]],
+            cart_candidate_ids: frozenset[int] | None,
+            applicability_cache: ApplicabilityCache | None,
+            encoded_cart: EncodedCart | None = None
+    ) -> Iterator[int]:
+        """
+        Yield the positions of the cart items whose rules `discount` matches, checking attribute-only discounts once
+        per brand/category group. Lines sharing a Product always share a group, so they are still visited
+        in cart order.
+        """
+        if not is_attribute_only(discount):
+            yield from self._applicable_positions(discount, customer_profile, cart_items, payment_info,
+                                                  cart_candidate_ids, applicability_cache, encoded_cart)
+            return
+        for group in self._matching_groups(discount, customer_profile, cart_items, payment_info, attribute_groups,
+                                           cart_candidate_ids, applicability_cache, encoded_cart):
+            yield from attribute_groups[group]
+
+    def _matching_groups(
+            self,
+            discount: Discount,
+            customer_profile: CustomerProfile,
+            cart_items: list[CartItem],
+            payment_info: PaymentInfo | None,
+            attribute_groups: list[list[int]],
+            cart_candidate_ids: frozenset[int] | None,
+            applicability_cache: ApplicabilityCache | None,
+            encoded_cart: EncodedCart | None
+    ) -> Iterator[int]:
+        """
+        Yield the indexes of the brand/category groups whose lines an attribute-only discount matches.
+        """
+        discount_index = self._discount_index
+        indexed = discount_index is not None and discount in discount_index
+        if indexed and id(discount) not in cart_candidate_ids:
+            return
+        if encoded_cart is not None:
+            # Attribute-only discounts compile without residual rules.
+            compiled = self._rule_compiler.compile(discount)
+            if not compiled.matches_cart(encoded_cart.cart_bits):
+                return
+            if self._instrumentation.enabled:
+                self._instrumentation.increment("rules.evaluated", len(attribute_groups))
+            for group, positions in enumerate(attribute_groups):
+                if compiled.matches_item(encoded_cart.item_bits[positions[0]]):
+                    yield group
+            return
+        if self._instrumentation.enabled:
+            self._instrumentation.increment("rules.evaluated", len(attribute_groups))
+        for group, positions in enumerate(attribute_groups):
+            item = cart_items[positions[0]]
+            if indexed and not discount_index.admits_item(discount, item):
+                continue
+            if applicability_cache is not None:
+                applicable = applicability_cache.matches_rules(discount, customer_profile, item, payment_info)
+            else:
+                applicable = discount.matches_rules(customer_profile=customer_profile, cart_item=item,
+                                                    payment_info=payment_info)
+            if applicable:
+                yield group
+
+    def _scale(self, resolved_discounts: list[Discount], cart_items: list[CartItem], price_slots: list[int],
+               decimal_prices: list[Decimal]) -> int:
+        """
+        Number of decimal digits the integers of one request must carry for every step to be exact.
+        """
+        scale = self._minor_unit_exponent
+        for price in decimal_prices:
+            scale = max(scale, decimal_places(price))
+        for item in cart_items:
+            if item.product.base_price is not item.product.current_price:
+                scale = max(scale, decimal_places(item.product.base_price))
+        # A discount applies once per line, so a price shared by several lines can take it several times.
+        applications = max(Counter(price_slots).values(), default=1)
+        guard_digits = 0
+        for discount in resolved_discounts:
+            amount_digits, step_digits = discount.scaled_digits()
+            scale = max(scale, amount_digits)
+            guard_digits += step_digits * applications
+        return scale + guard_digits
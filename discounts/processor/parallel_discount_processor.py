@@ -0,0 +1,170 @@
+import pickle
+from datetime import datetime
+from itertools import islice, repeat
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+import clock
+from discounts.base import Discount
+from discounts.index.discount_index import DiscountIndex
+from discounts.processing_strategies.discount_processing_strategy_interface import IDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor, PricingJob
+from discounts.rules.rule_compiler import RuleCompiler
+from instrumentation.instrumentation_interface import IInstrumentation
+from models.discount import DiscountedPrice
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing.context import BaseContext
+
+# Per-worker state, populated once by `_initialize_worker`.
+_worker_catalogue: list[Discount] = []
+_worker_processor: DiscountProcessor | None = None
+
+
+def _initialize_worker(snapshot: bytes) -> None:
+    global _worker_catalogue, _worker_processor
+    strategy, catalogue, use_index, mutate_products, compile_rules = pickle.loads(snapshot)
+    _worker_catalogue = catalogue
+    _worker_processor = DiscountProcessor(
+        discount_application_strategy=strategy,
+        discount_index=DiscountIndex(catalogue) if use_index else None,
+        mutate_products=mutate_products,
+        rule_compiler=RuleCompiler() if compile_rules else None,
+    )
+
+
+def _price_chunk(chunk: list[PricingJob], now: datetime) -> list[DiscountedPrice]:
+    """
+    Price a chunk of jobs inside a worker. Discounts are sent either inline or as
+    positions into the catalogue snapshot the worker was initialized with.
+    """
+    jobs = [
+        job._replace(resolved_discounts=[
+            _worker_catalogue[discount] if isinstance(discount, int) else discount
+            for discount in job.resolved_discounts
+        ])
+        for job in chunk
+    ]
+    return _worker_processor.apply_discounts_many(jobs, now=now)
+
+
+class ParallelDiscountProcessor(DiscountProcessor):
+    """
+    DiscountProcessor that prices batches of carts on a pool of worker processes.
+
+    A pickled snapshot of the discount catalogue is shipped to each worker once, when the pool starts,
+    after which jobs only carry positions into that snapshot. Discounts outside the snapshot
+    (e.g. vouchers fetched per request) are sent along with the job.
+    Single-cart calls and batches priced before `load_catalogue` run serially in the calling process.
+
+    Products are priced on copies inside the workers, so unlike serial mode their `current_price`
+    is not written back. Results match serial mode as long as carts in a batch do not share Product objects.
+    Carts priced by the workers are not reported to the instrumentation.
+    """
+
+    def __init__(
+            self,
+            discount_application_strategy: IDiscountProcessingStrategy,
+            discount_index: DiscountIndex | Callable[[], DiscountIndex] | None = None,
+            *,
+            mutate_products: bool = True,
+            rule_compiler: RuleCompiler | None = None,
+            instrumentation: IInstrumentation | None = None,
+            max_workers: int | None = None,
+            chunk_size: int = 64,
+            mp_context: "BaseContext | None" = None
+    ) -> None:
+        """
+        :param max_workers: Number of worker processes, defaults to the number of CPUs.
+        :param chunk_size: Number of carts sent to a worker per task.
+        :param mp_context: Multiprocessing context used to start workers.
+        """
+        super().__init__(discount_application_strategy, discount_index=discount_index,
+                         mutate_products=mutate_products, rule_compiler=rule_compiler,
+                         instrumentation=instrumentation)
+        self._max_workers = max_workers
+        self._chunk_size = chunk_size
+        self._mp_context = mp_context
+        self._executor: "ProcessPoolExecutor | None" = None
+        self._catalogue: list[Discount] = []
+        self._catalogue_positions: dict[int, int] = {}
+
+    def load_catalogue(self, discounts: list[Discount]) -> None:
+        """
+        Snapshot `discounts` and (re)start the worker pool with it.
+        Call again whenever the discount catalogue changes.
+        """
+        catalogue = list(discounts)
+        snapshot = pickle.dumps(
+            (self._application_strategy, catalogue, self._discount_index is not None, self._mutate_products,
+             self._rule_compiler is not None),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        self.close()
+        # Keep the snapshot objects alive so their ids cannot be reused while the pool is running.
+        self._catalogue = catalogue
+        self._catalogue_positions = {id(discount): position for position, discount in enumerate(catalogue)}
+        # Deferred until a pool is started; concurrent.futures and multiprocessing are slow to import.
+        from concurrent.futures import ProcessPoolExecutor
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=self._mp_context,
+            initializer=_initialize_worker,
+            initargs=(snapshot,),
+        )
+
+    def apply_discounts_many(self, jobs: Iterable[PricingJob], now: datetime | None = None) -> list[DiscountedPrice]:
+        # Captured here so every worker evaluates validity periods at the same instant.
+        now = now or clock.now()
+        if self._executor is None:
+            return super().apply_discounts_many(jobs, now=now)
+        return [
+            discounted_price
+            for chunk_result in self._executor.map(_price_chunk, self._encoded_chunks(jobs), repeat(now))
+            for discounted_price in chunk_result
+        ]
+
+    async def apply_discounts_many_async(self, jobs: Iterable[PricingJob],
+                                         now: datetime | None = None) -> list[DiscountedPrice]:
+        """
+        Like `apply_discounts_many`, but the event loop keeps running while the workers price the carts, so
+        several batches can be priced at once.
+        """
+        now = now or clock.now()
+        if self._executor is None:
+            return super().apply_discounts_many(jobs, now=now)
+        # Deferred like concurrent.futures: only this method needs asyncio.
+        import asyncio
+
+        chunk_results = await asyncio.gather(*(
+            asyncio.wrap_future(self._executor.submit(_price_chunk, chunk, now))
+            for chunk in self._encoded_chunks(jobs)
+        ))
+        return [discounted_price for chunk_result in chunk_results for discounted_price in chunk_result]
+
+    def _encoded_chunks(self, jobs: Iterable[PricingJob]) -> Iterator[list[PricingJob]]:
+        """
+        Split jobs into the chunks sent to the workers, with snapshot discounts replaced by their positions.
+        """
+        positions = self._catalogue_positions
+        encoded_jobs = (
+            job._replace(resolved_discounts=[
+                positions.get(id(discount), discount) for discount in job.resolved_discounts
+            ])
+            for job in jobs
+        )
+        return iter(lambda: list(islice(encoded_jobs, self._chunk_size)), [])
+
+    def close(self) -> None:
+        """
+        Shut down the worker pool, if one is running.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ParallelDiscountProcessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,3 +1,5 @@
+import sys
+
 from discounts.rules.discount_rule_interface import IDiscountRule
 from models.cart import CartItem
 from models.customer import CustomerProfile
@@ -5,15 +7,15 @@ from models.payment import PaymentInfo
 
 
 class BrandDiscountRule(IDiscountRule):
+    __slots__ = ("include_brands", "exclude_brands")
 
     def __init__(self, include_brands: list[str] | None = None, exclude_brands: list[str] | None = None) -> None:
         """
         :param include_brands: List of brands to include in the discount rule.
         :param exclude_brands: List of brands to exclude from the discount rule.
         """
-        self.include_brands = include_brands or []
-        self.exclude_brands = exclude_brands or []
-
+        self.include_brands: frozenset[str] = frozenset(map(sys.intern, include_brands or ()))
+        self.exclude_brands: frozenset[str] = frozenset(map(sys.intern, exclude_brands or ()))
 
     def is_applicable(self, *, customer_profile: CustomerProfile, cart_item: CartItem,
                       payment_info: PaymentInfo | None = None) -> bool:
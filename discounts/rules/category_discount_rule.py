@@ -1,3 +1,5 @@
+import sys
+
 from discounts.rules.discount_rule_interface import IDiscountRule
 from models.cart import CartItem
 from models.customer import CustomerProfile
@@ -5,13 +7,15 @@ from models.payment import PaymentInfo
 
 
 class CategoryDiscountRule(IDiscountRule):
+    __slots__ = ("include_categories", "exclude_categories")
+
     def __init__(self, include_categories: list[str] | None = None, exclude_categories: list[str] | None = None) -> None:
         """
         :param include_categories: List of categories to include in the discount rule.
         :param exclude_categories: List of categories to exclude from the discount rule, if any.
         """
-        self.include_categories = include_categories or []
-        self.exclude_categories = exclude_categories or []
+        self.include_categories: frozenset[str] = frozenset(map(sys.intern, include_categories or ()))
+        self.exclude_categories: frozenset[str] = frozenset(map(sys.intern, exclude_categories or ()))
 
     def is_applicable(self, *, customer_profile: CustomerProfile, cart_item: CartItem, payment_info: PaymentInfo=None) -> bool:
         category_name = cart_item.product.category
@@ -5,6 +5,7 @@ from models.payment import PaymentInfo
 
 
 class CustomerTierDiscountRule(IDiscountRule):
+    __slots__ = ("include_tiers", "exclude_tiers")
 
     def __init__(self, include_tiers: list[CustomerTier] | None = None,
                  exclude_tiers: list[CustomerTier] | None = None) -> None:
@@ -12,8 +13,8 @@ class CustomerTierDiscountRule(IDiscountRule):
         :param include_tiers: List of customer tiers to include in the discount rule.
         :param exclude_tiers: List of customer tiers to exclude from the discount rule, if any.
         """
-        self.include_tiers = include_tiers or []
-        self.exclude_tiers = exclude_tiers or []
+        self.include_tiers: frozenset[CustomerTier] = frozenset(include_tiers or ())
+        self.exclude_tiers: frozenset[CustomerTier] = frozenset(exclude_tiers or ())
 
     def is_applicable(self, *, customer_profile: CustomerProfile, cart_item: CartItem,
                       payment_info: PaymentInfo = None) -> bool:
@@ -6,6 +6,7 @@ from models.payment import PaymentInfo
 
 
 class IDiscountRule(ABC):
+    __slots__ = ()
 
     @abstractmethod
     def is_applicable(self, *, customer_profile: CustomerProfile, cart_item: CartItem,
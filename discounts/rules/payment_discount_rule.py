@@ -1,3 +1,5 @@
+import sys
+
 from discounts.rules.discount_rule_interface import IDiscountRule
 from models.cart import CartItem
 from models.customer import CustomerProfile
@@ -5,6 +7,7 @@ from models.payment import PaymentInfo, PaymentMethod
 
 
 class PaymentDiscountRule(IDiscountRule):
+    __slots__ = ("applicable_banks", "applicable_payment_methods")
 
     def __init__(self, applicable_banks: list[str] | None = None,
                  applicable_payment_methods: list[PaymentMethod] | None = None) -> None:
@@ -12,8 +15,8 @@ class PaymentDiscountRule(IDiscountRule):
         :param applicable_banks: List of bank names to which this discount rule applies.
         :param applicable_payment_methods: List of payment methods to which this discount rule applies.
         """
-        self.applicable_banks = applicable_banks or []
-        self.applicable_payment_methods = applicable_payment_methods or []
+        self.applicable_banks: frozenset[str] = frozenset(map(sys.intern, applicable_banks or ()))
+        self.applicable_payment_methods: frozenset[PaymentMethod] = frozenset(applicable_payment_methods or ())
 
     def is_applicable(self, *, customer_profile: CustomerProfile, cart_item: CartItem,
                       payment_info: PaymentInfo = None) -> bool:
@@ -0,0 +1,171 @@
+from typing import Hashable, NamedTuple
+from weakref import WeakKeyDictionary
+
+from discounts.base import Discount
+from discounts.index.discount_index import BANK, BRAND, CATEGORY, CUSTOMER_TIER, DIMENSIONS, PAYMENT_METHOD
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.discount_rule_interface import IDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.payment import PaymentInfo
+
+# Bit shared by every value no compiled rule mentions; mentioned values get bits 1, 2, ...
+_UNMENTIONED_VALUE_BIT = 1
+# Mask admitting every value, mentioned or not. Python ints behave as infinite two's complement, so
+# `~excluded_bits` also admits every value outside `excluded_bits`.
+_ANY_VALUE = -1
+
+
+class CartBits(NamedTuple):
+    """Attribute bits of the customer and payment of a cart."""
+    tier_bit: int
+    bank_bit: int
+    payment_method_bit: int
+    has_payment: bool
+
+
+class EncodedCart(NamedTuple):
+    """A cart encoded once per request: its cart-level bits and the (brand, category) bits of each line."""
+    cart_bits: CartBits
+    item_bits: list[tuple[int, int]]
+
+
+class CompiledRules:
+    """
+    The rules of one discount fused into one bitmask per attribute: a value is admitted when its bit is set.
+    Several rules on the same attribute are intersected. Rules that are not exactly one of the built-in
+    attribute rules are kept in `residual_rules` and evaluated as usual.
+    """
+    __slots__ = ("source_rules", "brand_mask", "category_mask", "tier_mask", "bank_mask", "payment_method_mask",
+                 "requires_payment", "residual_rules")
+
+    def __init__(self, source_rules: list[IDiscountRule]) -> None:
+        self.source_rules = source_rules
+        self.brand_mask = self.category_mask = self.tier_mask = _ANY_VALUE
+        self.bank_mask = self.payment_method_mask = _ANY_VALUE
+        self.requires_payment = False
+        self.residual_rules: tuple[IDiscountRule, ...] = ()
+
+    def matches_cart(self, cart_bits: CartBits) -> bool:
+        """
+        Check the customer tier and payment filters, which are the same for every line of a cart.
+        """
+        if self.requires_payment and not cart_bits.has_payment:
+            return False
+        return bool(cart_bits.tier_bit & self.tier_mask and cart_bits.bank_bit & self.bank_mask
+                    and cart_bits.payment_method_bit & self.payment_method_mask)
+
+    def matches_item(self, item_bits: tuple[int, int]) -> bool:
+        """
+        Check the brand and category filters against the bits of one cart line.
+        """
+        brand_bit, category_bit = item_bits
+        return bool(brand_bit & self.brand_mask and category_bit & self.category_mask)
+
+    def matches_residual(self, customer_profile: CustomerProfile, cart_item: CartItem,
+                         payment_info: PaymentInfo | None = None) -> bool:
+        for rule in self.residual_rules:
+            if not rule.is_applicable(customer_profile=customer_profile, cart_item=cart_item, payment_info=payment_info):
+                return False
+        return True
+
+
+class RuleCompiler:
+    """
+    Compiles discount rules into bitmask predicates over small integer attribute ids.
+
+    Attribute values mentioned by any compiled rule are numbered per attribute on first sight. A cart is encoded
+    once per request with `encode_cart`, after which checking a discount against a line is a couple of ANDs
+    instead of one `is_applicable` call per rule.
+    Compiled rules are memoized per discount until its `discount_rules` list is replaced.
+    Compile every discount of a request before encoding the cart, so the cart sees all ids.
+    """
+
+    def __init__(self) -> None:
+        self._codes: dict[str, dict[Hashable, int]] = {dimension: {} for dimension in DIMENSIONS}
+        self._compiled: WeakKeyDictionary[Discount, CompiledRules] = WeakKeyDictionary()
+
+    def compile(self, discount: Discount) -> CompiledRules:
+        compiled = self._compiled.get(discount)
+        if compiled is None or compiled.source_rules is not discount.discount_rules:
+            compiled = self._compile_rules(discount.discount_rules)
+            self._compiled[discount] = compiled
+        return compiled
+
+    def cart_bits(self, customer_profile: CustomerProfile, payment_info: PaymentInfo | None = None) -> CartBits:
+        tier_bit = self._bit(CUSTOMER_TIER, customer_profile.tier)
+        if payment_info is None:
+            # Discounts with a payment rule are rejected through `has_payment`; nothing else reads these bits.
+            return CartBits(tier_bit, _UNMENTIONED_VALUE_BIT, _UNMENTIONED_VALUE_BIT, False)
+        return CartBits(tier_bit, self._bit(BANK, payment_info.bank_name),
+                        self._bit(PAYMENT_METHOD, payment_info.method), True)
+
+    def item_bits(self, cart_item: CartItem) -> tuple[int, int]:
+        product = cart_item.product
+        return self._bit(BRAND, product.brand), self._bit(CATEGORY, product.category)
+
+    def encode_cart(self, customer_profile: CustomerProfile, cart_items: list[CartItem],
+                    payment_info: PaymentInfo | None = None) -> EncodedCart:
+        brand_codes, category_codes = self._codes[BRAND], self._codes[CATEGORY]
+        item_bits = []
+        for item in cart_items:
+            brand_code = brand_codes.get(item.product.brand)
+            category_code = category_codes.get(item.product.category)
+            item_bits.append((_UNMENTIONED_VALUE_BIT if brand_code is None else 1 << brand_code,
+                              _UNMENTIONED_VALUE_BIT if category_code is None else 1 << category_code))
+        return EncodedCart(self.cart_bits(customer_profile, payment_info), item_bits)
+
+    def matches_rules(self, discount: Discount, customer_profile: CustomerProfile, cart_item: CartItem,
+                      payment_info: PaymentInfo | None = None) -> bool:
+        """
+        Compiled equivalent of `Discount.matches_rules` for a single check.
+        """
+        compiled = self.compile(discount)
+        return (compiled.matches_cart(self.cart_bits(customer_profile, payment_info))
+                and compiled.matches_item(self.item_bits(cart_item))
+                and compiled.matches_residual(customer_profile, cart_item, payment_info))
+
+    def _compile_rules(self, rules: list[IDiscountRule]) -> CompiledRules:
+        compiled = CompiledRules(rules)
+        residual_rules = []
+        for rule in rules:
+            # Subclasses may override `is_applicable`, so only the exact built-in rule types are compiled.
+            rule_type = type(rule)
+            if rule_type is BrandDiscountRule:
+                compiled.brand_mask &= self._mask(BRAND, rule.include_brands, rule.exclude_brands)
+            elif rule_type is CategoryDiscountRule:
+                compiled.category_mask &= self._mask(CATEGORY, rule.include_categories, rule.exclude_categories)
+            elif rule_type is CustomerTierDiscountRule:
+                compiled.tier_mask &= self._mask(CUSTOMER_TIER, rule.include_tiers, rule.exclude_tiers)
+            elif rule_type is PaymentDiscountRule:
+                compiled.requires_payment = True
+                compiled.bank_mask &= self._mask(BANK, rule.applicable_banks, ())
+                compiled.payment_method_mask &= self._mask(PAYMENT_METHOD, rule.applicable_payment_methods, ())
+            else:
+                residual_rules.append(rule)
+        compiled.residual_rules = tuple(residual_rules)
+        return compiled
+
+    def _mask(self, dimension: str, include: frozenset, exclude: frozenset) -> int:
+        mask = _ANY_VALUE
+        if include:
+            mask = 0
+            for value in include:
+                mask |= 1 << self._code(dimension, value)
+        for value in exclude:
+            mask &= ~(1 << self._code(dimension, value))
+        return mask
+
+    def _code(self, dimension: str, value: Hashable) -> int:
+        codes = self._codes[dimension]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes) + 1
+        return code
+
+    def _bit(self, dimension: str, value: Hashable) -> int:
+        code = self._codes[dimension].get(value)
+        return _UNMENTIONED_VALUE_BIT if code is None else 1 << code
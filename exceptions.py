@@ -9,4 +9,12 @@ class DiscountNotFoundException(DiscountSystemBaseException):
 
 class DiscountExpiredException(DiscountSystemBaseException):
     """Exception raised when a discount has expired."""
-    pass
\ No newline at end of file
+    pass
+
+class DiscountNotStartedException(DiscountSystemBaseException):
+    """Exception raised when a discount has not started yet."""
+    pass
+
+class RedemptionLimitExceededException(DiscountSystemBaseException):
+    """Exception raised when a discount code has no redemptions left, in total or for the customer."""
+    pass
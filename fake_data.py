@@ -1,7 +1,6 @@
+from datetime import datetime, timezone
 from decimal import Decimal
 
-import pendulum
-
 from discounts.constants import DiscountType
 from discounts.percentage_discount import PercentageDiscount
 from discounts.rules.brand_discount_rule import BrandDiscountRule
@@ -73,7 +72,7 @@ puma_t_shirt_40_percent_discount = PercentageDiscount(
         BrandDiscountRule(include_brands=["PUMA"]),
         CategoryDiscountRule(include_categories=["T-Shirt"]),
     ],
-    expires_at= pendulum.DateTime(2025, 12, 31, 23, 59, 59, tzinfo=pendulum.tz.UTC),
+    expires_at= datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
     discount_type=DiscountType.BRAND_DISCOUNT
 )
 
@@ -84,7 +83,7 @@ additional_10_percent_tshirt_discount = PercentageDiscount(
     discount_rules=[
         CategoryDiscountRule(include_categories=["T-Shirt"]),
     ],
-    expires_at=pendulum.DateTime(2025, 12, 31, 23, 59, 59, tzinfo=pendulum.tz.UTC),
+    expires_at=datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
     discount_type=DiscountType.CATEGORY_DISCOUNT
 )
 
@@ -95,7 +94,7 @@ icici_bank_10_percent_bank_discount = PercentageDiscount(
     discount_rules=[
         PaymentDiscountRule(applicable_banks=["ICICI Bank"]),
     ],
-    expires_at=pendulum.DateTime(2025, 12, 31, 23, 59, 59, tzinfo=pendulum.tz.UTC),
+    expires_at=datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
     discount_type=DiscountType.BANK_DISCOUNT
 )
 
@@ -104,7 +103,7 @@ voucher_discount = PercentageDiscount(
     discount_code="super_69",
     discount_percentage=Decimal(69),
     discount_rules=[],
-    expires_at=pendulum.DateTime(2025, 12, 31, 23, 59, 59, tzinfo=pendulum.tz.UTC),
+    expires_at=datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
     discount_type=DiscountType.VOUCHER_DISCOUNT
 )
 
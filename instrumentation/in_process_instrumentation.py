@@ -0,0 +1,111 @@
+import math
+import sys
+import threading
+from typing import Any, TextIO
+
+from instrumentation.instrumentation_interface import IInstrumentation
+
+_PERCENTILES = (50, 90, 99)
+
+
+class LatencyHistogram:
+    """
+    Latencies bucketed by powers of two of microseconds: bucket 0 holds everything under 1 µs and bucket `i`
+    the range [2 ** (i - 1), 2 ** i) µs. Percentiles are reported as the upper bound of their bucket, capped at
+    the largest recorded value, so they are never under-estimated by more than a factor of two.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: list[int] = []
+        self.count = 0
+        self.total_seconds = 0.0
+        self.min_seconds = float("inf")
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        bucket = int(seconds * 1_000_000).bit_length()
+        if bucket >= len(self.buckets):
+            self.buckets.extend([0] * (bucket + 1 - len(self.buckets)))
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.min_seconds = min(self.min_seconds, seconds)
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """
+        :return: An upper bound of the `percent` percentile, in seconds, or 0.0 without recordings.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min((1 << bucket) / 1_000_000, self.max_seconds)
+        return self.max_seconds
+
+    def summary(self) -> dict[str, float]:
+        summary = {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "min_seconds": self.min_seconds if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+        }
+        for percent in _PERCENTILES:
+            summary[f"p{percent}_seconds"] = self.percentile(percent)
+        return summary
+
+
+class InProcessInstrumentation(IInstrumentation):
+    """
+    Aggregates counters and per-stage latency histograms in memory, to be read with `snapshot` or `dump`.
+    Safe to share between threads. Worker processes (ParallelDiscountProcessor) do not report back to it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        self._latencies: dict[str, LatencyHistogram] = {}
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def record_latency(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._latencies.get(stage)
+            if histogram is None:
+                histogram = self._latencies[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        :return: {"counters": {name: value}, "latencies": {stage: LatencyHistogram.summary()}}, JSON serializable.
+        """
+        with self._lock:
+            return {
+                "counters": dict(sorted(self._counters.items())),
+                "latencies": {stage: histogram.summary() for stage, histogram in sorted(self._latencies.items())},
+            }
+
+    def dump(self, file: TextIO | None = None) -> None:
+        """
+        Write the current statistics as a human-readable table, to stderr by default.
+        """
+        file = file or sys.stderr
+        snapshot = self.snapshot()
+        for counter, value in snapshot["counters"].items():
+            print(f"{counter:<40} {value:>12}", file=file)
+        for stage, summary in snapshot["latencies"].items():
+            print(f"{stage:<40} {summary['count']:>12} calls  mean {summary['mean_seconds'] * 1e6:10.1f} µs  "
+                  + "  ".join(f"p{percent} {summary[f'p{percent}_seconds'] * 1e6:10.1f} µs"
+                              for percent in _PERCENTILES)
+                  + f"  max {summary['max_seconds'] * 1e6:10.1f} µs", file=file)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._latencies.clear()
@@ -0,0 +1,69 @@
+import time
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import ContextManager
+
+
+class IInstrumentation(ABC):
+    """
+    Receives counters and stage latencies from the pricing pipeline.
+
+    Hooks sit on hot paths, so callers check `enabled` before gathering anything and a disabled implementation
+    costs one attribute read per hook.
+    """
+    enabled: bool = True
+
+    @abstractmethod
+    def increment(self, counter: str, value: int = 1) -> None:
+        """
+        Add `value` to a named counter.
+        """
+        ...
+
+    @abstractmethod
+    def record_latency(self, stage: str, seconds: float) -> None:
+        """
+        Record one execution of a pipeline stage.
+        """
+        ...
+
+    def time(self, stage: str) -> ContextManager[None]:
+        """
+        Context manager recording the wall-clock time of its block as one execution of `stage`.
+        """
+        return _StageTimer(self, stage)
+
+
+class _StageTimer:
+    # A plain class rather than @contextmanager, which costs a generator per timed block.
+    __slots__ = ("_instrumentation", "_stage", "_started")
+
+    def __init__(self, instrumentation: IInstrumentation, stage: str) -> None:
+        self._instrumentation = instrumentation
+        self._stage = stage
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._instrumentation.record_latency(self._stage, time.perf_counter() - self._started)
+
+
+class NoOpInstrumentation(IInstrumentation):
+    """
+    The default instrumentation: records nothing.
+    """
+    enabled = False
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        pass
+
+    def record_latency(self, stage: str, seconds: float) -> None:
+        pass
+
+    def time(self, stage: str) -> ContextManager[None]:
+        return _NULL_CONTEXT
+
+
+_NULL_CONTEXT = nullcontext()
+NO_OP_INSTRUMENTATION = NoOpInstrumentation()
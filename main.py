@@ -4,29 +4,38 @@ from decimal import Decimal
 from discounts.constants import DiscountType
 from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
 from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.rule_compiler import RuleCompiler
 from fake_data import DUMMY_DISCOUNTS, CUSTOMER, PAYMENT_INFO, CART_ITEMS
 from models.discount import DiscountedPrice
+from repositories.coalescing_discount_repository import CoalescingDiscountRepository
 from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_plan_cache import DiscountPlanCache
 from services.discount_service import DiscountService
 
 
+DISCOUNT_TYPE_ORDERING = [
+    DiscountType.BRAND_DISCOUNT,
+    DiscountType.CATEGORY_DISCOUNT,
+    DiscountType.VOUCHER_DISCOUNT,
+    DiscountType.BANK_DISCOUNT,
+]
+
+
 def get_discount_service() -> DiscountService:
-    discount_repo = InMemoryDiscountRepository()
-    discount_repo.all_discounts = DUMMY_DISCOUNTS
+    discount_repo = InMemoryDiscountRepository(DUMMY_DISCOUNTS)
 
     discount_processor = DiscountProcessor(
         discount_application_strategy=DefaultDiscountProcessingStrategy(
-            discount_type_ordering=[
-                DiscountType.BRAND_DISCOUNT,
-                DiscountType.CATEGORY_DISCOUNT,
-                DiscountType.VOUCHER_DISCOUNT,
-                DiscountType.BANK_DISCOUNT,
-            ]
-        ))
+            discount_type_ordering=DISCOUNT_TYPE_ORDERING
+        ),
+        discount_index=discount_repo.get_discount_index,
+        rule_compiler=RuleCompiler()
+    )
 
     discount_service = DiscountService(
-        discount_repository=discount_repo,
-        discount_processor=discount_processor
+        discount_repository=CoalescingDiscountRepository(discount_repo),
+        discount_processor=discount_processor,
+        plan_cache=DiscountPlanCache()
     )
     return discount_service
 
@@ -40,4 +49,5 @@ async def main():
     print(f"Discounts Applied: {discounted_price.applied_discounts}")
 
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
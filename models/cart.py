@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from models.product import Product
 
 
-@dataclass
+@dataclass(slots=True)
 class CartItem:
     product: Product
     quantity: int
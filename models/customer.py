@@ -8,7 +8,7 @@ class CustomerTier(Enum):
     BRONZE = "bronze"
 
 
-@dataclass
+@dataclass(slots=True)
 class CustomerProfile:
     id: str
     name: str
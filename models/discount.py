@@ -1,13 +1,62 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
 
 
+@dataclass
+class DiscountedLineItem:
+    """Price of a single cart line after discounts. Prices are per unit."""
+    product_id: str
+    quantity: int
+    unit_price: Decimal
+    final_unit_price: Decimal
+    applied_discounts: dict[str, Decimal]
+
+
+@dataclass
+class MinorUnitLineItem:
+    """
+    Price of a single cart line after discounts, in integer minor units (e.g. paise or cents).
+    Prices are per unit. Decimal values are available through the same attributes as DiscountedLineItem.
+    """
+    product_id: str
+    quantity: int
+    unit_price_minor: int
+    final_unit_price_minor: int
+    applied_discounts_minor: dict[str, int]
+    minor_unit_exponent: int = 2
+
+    @property
+    def unit_price(self) -> Decimal:
+        return Decimal(self.unit_price_minor).scaleb(-self.minor_unit_exponent)
+
+    @property
+    def final_unit_price(self) -> Decimal:
+        return Decimal(self.final_unit_price_minor).scaleb(-self.minor_unit_exponent)
+
+    @property
+    def applied_discounts(self) -> dict[str, Decimal]:
+        return {
+            name: Decimal(amount).scaleb(-self.minor_unit_exponent)
+            for name, amount in self.applied_discounts_minor.items()
+        }
+
+    def to_discounted_line_item(self) -> DiscountedLineItem:
+        return DiscountedLineItem(
+            product_id=self.product_id,
+            quantity=self.quantity,
+            unit_price=self.unit_price,
+            final_unit_price=self.final_unit_price,
+            applied_discounts=self.applied_discounts,
+        )
+
+
 @dataclass
 class DiscountedPrice:
     original_price: Decimal
     final_price: Decimal
     applied_discounts: dict[str, Decimal]
     message: str
+    line_items: list[DiscountedLineItem | MinorUnitLineItem] = field(default_factory=list)
 
 
 @dataclass
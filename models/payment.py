@@ -16,7 +16,7 @@ class CardType(Enum):
     CREDIT_CARD = "credit_card"
 
 
-@dataclass
+@dataclass(slots=True)
 class PaymentInfo:
     method: PaymentMethod
     bank_name: Optional[str]
@@ -0,0 +1,13 @@
+from typing import NamedTuple, Optional
+
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.payment import PaymentInfo
+
+
+class PricingRequest(NamedTuple):
+    """A single cart to price, as accepted by `DiscountService.calculate_many`."""
+    cart_items: list[CartItem]
+    customer: CustomerProfile
+    payment_info: Optional[PaymentInfo] = None
+    voucher_code: Optional[str] = None
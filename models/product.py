@@ -1,3 +1,4 @@
+import sys
 from dataclasses import dataclass
 from decimal import Decimal
 from enum import Enum
@@ -9,7 +10,7 @@ class BrandTier(Enum):
     BUDGET = "budget"
 
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     id: str
     brand: str
@@ -17,3 +18,8 @@ class Product:
     category: str
     base_price: Decimal
     current_price: Decimal
+
+    def __post_init__(self) -> None:
+        # Brands and categories repeat across the catalogue and are compared by rules on every price check.
+        self.brand = sys.intern(self.brand)
+        self.category = sys.intern(self.category)
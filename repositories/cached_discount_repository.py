@@ -0,0 +1,109 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Mapping, Sequence
+
+import clock
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from models.cache_stats import CacheStats
+from repositories.discount_repository import IDiscountRepository
+
+
+@dataclass
+class _CachedListing:
+    discounts: Sequence[Discount]
+    fresh_until: float
+    expires_at: datetime | None
+
+
+class CachedDiscountRepository(IDiscountRepository):
+    """
+    Caching decorator for any IDiscountRepository.
+
+    Active discount listings are cached per catalogue version at the requested `now` and `exclude_discount_type`
+    set, so a listing is only served for instants with the same version. Repositories that do not track versions
+    get listings for an explicit `now` cached for that very instant. An entry is dropped when its TTL runs out,
+    when the soonest `expires_at` among the cached discounts passes at the requested `now`, or when more than
+    `max_cached_listings` are cached, oldest first. Discounts that have not started yet are not listed, so without
+    catalogue versions their activation is only picked up through the TTL.
+    Lookups by code and redemptions are passed through unchanged.
+    """
+
+    def __init__(
+            self,
+            discount_repository: IDiscountRepository,
+            ttl_seconds: float = 60.0,
+            monotonic_clock: Callable[[], float] = time.monotonic,
+            max_cached_listings: int = 64
+    ) -> None:
+        """
+        :param discount_repository: The repository to cache.
+        :param ttl_seconds: Maximum age of a cached listing.
+        :param monotonic_clock: Clock used for the TTL, in seconds.
+        :param max_cached_listings: Maximum number of cached listings, across catalogue versions.
+        """
+        self._discount_repository = discount_repository
+        self._ttl_seconds = ttl_seconds
+        self._monotonic_clock = monotonic_clock
+        self._max_cached_listings = max_cached_listings
+        self._listings: dict[tuple, _CachedListing] = {}
+        self.stats = CacheStats()
+
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: datetime | None = None) -> Sequence[Discount]:
+        catalogue_version = await self._discount_repository.get_catalogue_version(now)
+        key: tuple = (catalogue_version, frozenset(exclude_discount_type))
+        if catalogue_version is None and now is not None:
+            # Without versions, only calls for the very same instant are known to get the same listing.
+            key += (now,)
+        now = now or clock.now()
+        listing = self._listings.get(key)
+        if listing is not None and self._is_fresh(listing, now):
+            self.stats.hits += 1
+            return listing.discounts
+        if listing is not None:
+            self.stats.evictions += 1
+            del self._listings[key]
+
+        self.stats.misses += 1
+        discounts = await self._discount_repository.list_all_active_discounts(exclude_discount_type, now=now)
+        if len(self._listings) >= self._max_cached_listings:
+            self.stats.evictions += 1
+            del self._listings[next(iter(self._listings))]
+        self._listings[key] = _CachedListing(
+            discounts=discounts,
+            fresh_until=self._monotonic_clock() + self._ttl_seconds,
+            expires_at=min((discount.expires_at for discount in discounts), default=None),
+        )
+        return discounts
+
+    async def get_discount_by_code(self, discount_code: str) -> Discount | None:
+        return await self._discount_repository.get_discount_by_code(discount_code)
+
+    async def get_catalogue_version(self, now: datetime | None = None) -> int | None:
+        return await self._discount_repository.get_catalogue_version(now)
+
+    async def get_redemption_count(self, discount_code: str, customer_id: str | None = None) -> int:
+        return await self._discount_repository.get_redemption_count(discount_code, customer_id)
+
+    async def add_redemptions(self, redemptions: Mapping[tuple[str, str], int]) -> None:
+        await self._discount_repository.add_redemptions(redemptions)
+
+    async def claim_redemptions(self, discount_code: str, max_redemptions: int, count: int) -> int:
+        return await self._discount_repository.claim_redemptions(discount_code, max_redemptions, count)
+
+    async def return_redemptions(self, discount_code: str, count: int) -> None:
+        await self._discount_repository.return_redemptions(discount_code, count)
+
+    def invalidate(self) -> None:
+        """
+        Drop all cached listings.
+        """
+        self.stats.evictions += len(self._listings)
+        self._listings.clear()
+
+    def _is_fresh(self, listing: _CachedListing, now: datetime) -> bool:
+        if self._monotonic_clock() >= listing.fresh_until:
+            return False
+        return listing.expires_at is None or now < listing.expires_at
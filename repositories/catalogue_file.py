@@ -0,0 +1,266 @@
+"""
+Memory-mapped file format for discount catalogues.
+
+A catalogue file holds the discounts and generated voucher codes of a DiscountCatalogue. It is laid out so a
+reader can serve listings and code lookups straight from the mapped pages: opening a file only reads its header,
+and only the pages a lookup touches are ever read from disk.
+
+Layout: an 8-byte magic, the offset and length of a JSON header (at the end of the file), then 8-byte aligned
+sections in native byte order, described by the header:
+
+* records, record_offsets: every discount, then every voucher template, as JSON (serializers.discount_serializer),
+  and the start offset of each record plus the end of the last one.
+* starts, expires, types: the validity period of each discount, in microseconds since the epoch, and the position
+  of its type in the header's `discount_types`. Discounts without `starts_at` start at the smallest int64.
+* transitions: every `starts_at` and `expires_at` of the discounts and voucher templates, in microseconds, sorted.
+* code_hashes, code_targets, code_offsets, codes: a table of every code sorted by its 64-bit hash, the record each
+  code resolves to, and the codes themselves. Codes resolving to a template record are generated voucher codes.
+"""
+import calendar
+import hashlib
+import json
+import mmap
+import os
+import stat
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import BinaryIO, Iterable
+
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from repositories.discount_catalogue import DiscountCatalogue
+from repositories.voucher_codes import VoucherCodes
+from serializers.discount_serializer import discount_from_dict, discount_to_dict
+
+MAGIC = b"DISCCAT1"
+FORMAT_VERSION = 1
+
+_PREAMBLE = struct.Struct("<8sQQ")
+_NO_START = -2 ** 63
+_DISCOUNT_TYPES = list(DiscountType)
+_TYPE_POSITIONS = {discount_type: position for position, discount_type in enumerate(_DISCOUNT_TYPES)}
+
+
+def epoch_microseconds(timestamp: datetime) -> int:
+    """
+    Exact number of microseconds between the epoch and a timezone-aware timestamp.
+    """
+    return calendar.timegm(timestamp.utctimetuple()) * 1_000_000 + timestamp.microsecond
+
+
+def code_hash(code: str) -> int:
+    """
+    Stable 64-bit hash of a code; `hash()` is salted per process, so it cannot be stored.
+    """
+    return int.from_bytes(hashlib.blake2b(code.encode(), digest_size=8).digest(), "little")
+
+
+def write_catalogue_file(path: str, catalogue: DiscountCatalogue) -> None:
+    """
+    Write a catalogue snapshot, replacing the file if it exists.
+
+    The file is written under a temporary name next to `path` and then renamed over it, so processes that still
+    have the previous file mapped keep reading it unchanged, and readers never see a partly written file.
+
+    :raises TypeError: If a discount or voucher template cannot be serialized, see serializers.discount_serializer.
+    """
+    discounts = catalogue.discounts
+    templates: list[Discount] = []
+    template_records: dict[int, int] = {}
+    targets_by_code: dict[str, int] = {}
+    for record, discount in enumerate(discounts):
+        # Earlier discounts win when codes collide.
+        targets_by_code.setdefault(discount.discount_code, record)
+    for code, template in catalogue.voucher_templates_by_code.items():
+        if code in targets_by_code:
+            # Codes of discounts take precedence over generated voucher codes.
+            continue
+        record = template_records.get(id(template))
+        if record is None:
+            record = template_records[id(template)] = len(discounts) + len(templates)
+            templates.append(template)
+        targets_by_code[code] = record
+    codes = sorted((code_hash(code), code.encode(), target) for code, target in targets_by_code.items())
+    del targets_by_code
+
+    record_offsets, records = array("Q", [0]), bytearray()
+    for discount in (*discounts, *templates):
+        records += json.dumps(discount_to_dict(discount), separators=(",", ":")).encode()
+        record_offsets.append(len(records))
+    code_offsets, code_bytes = array("Q", [0]), bytearray()
+    for _, code, _ in codes:
+        code_bytes += code
+        code_offsets.append(len(code_bytes))
+    starts = array("q", (_NO_START if discount.starts_at is None else epoch_microseconds(discount.starts_at)
+                         for discount in discounts))
+    expires = array("q", (epoch_microseconds(discount.expires_at) for discount in discounts))
+    sections: dict[str, bytes | bytearray | array] = {
+        "records": records,
+        "record_offsets": record_offsets,
+        "starts": starts,
+        "expires": expires,
+        "types": array("B", (_TYPE_POSITIONS[discount.discount_type] for discount in discounts)),
+        # Voucher templates are scheduled too, so that the version changes when a voucher starts or expires.
+        "transitions": array("q", sorted(
+            [epoch_microseconds(discount.expires_at) for discount in (*discounts, *templates)]
+            + [epoch_microseconds(discount.starts_at) for discount in (*discounts, *templates)
+               if discount.starts_at is not None]
+        )),
+        "code_hashes": array("Q", (code_hash_value for code_hash_value, _, _ in codes)),
+        "code_targets": array("I", (target for _, _, target in codes)),
+        "code_offsets": code_offsets,
+        "codes": code_bytes,
+    }
+
+    directory, name = os.path.split(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates the file readable by its owner only; keep the permissions of the file it replaces.
+        os.chmod(temporary_path, stat.S_IMODE(os.stat(path).st_mode) if os.path.exists(path) else 0o644)
+        with os.fdopen(descriptor, "wb") as file:
+            _write_sections(file, sections, catalogue.version, len(discounts), len(discounts) + len(templates))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _write_sections(file: BinaryIO, sections: dict[str, bytes | bytearray | array], version: int,
+                    discount_count: int, record_count: int) -> None:
+    file.write(bytes(_PREAMBLE.size))
+    layout = {}
+    for name, section in sections.items():
+        offset = file.tell()
+        data = section.tobytes() if isinstance(section, array) else section
+        file.write(data)
+        file.write(bytes(-len(data) % 8))
+        layout[name] = [offset, len(data)]
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "version": version,
+        "discount_count": discount_count,
+        "record_count": record_count,
+        "discount_types": [discount_type.value for discount_type in _DISCOUNT_TYPES],
+        "sections": layout,
+    }).encode()
+    header_offset = file.tell()
+    file.write(header)
+    file.seek(0)
+    file.write(_PREAMBLE.pack(MAGIC, header_offset, len(header)))
+
+
+class CatalogueFile:
+    """
+    Read-only view of a catalogue file. Nothing is decoded until it is asked for.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :raises ValueError: If the file is not a catalogue file this version can read.
+        """
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, header_offset, header_length = _PREAMBLE.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a catalogue file")
+            header = json.loads(self._mmap[header_offset:header_offset + header_length])
+            if header["format"] != FORMAT_VERSION or header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} has format {header['format']} ({header['byteorder']} endian), "
+                                 f"expected {FORMAT_VERSION} ({sys.byteorder} endian)")
+        except (struct.error, KeyError, json.JSONDecodeError) as error:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a valid catalogue file") from error
+        except ValueError:
+            self._mmap.close()
+            raise
+        self.version: int = header["version"]
+        self.discount_count: int = header["discount_count"]
+        self.record_count: int = header["record_count"]
+        self.discount_types = [DiscountType(value) for value in header["discount_types"]]
+        self._layout: dict[str, list[int]] = header["sections"]
+        self._buffer = memoryview(self._mmap)
+        self._views: list[memoryview] = []
+        self._records = self._section("records")
+        self._record_offsets = self._section("record_offsets", "Q")
+        self.starts = self._section("starts", "q")
+        self.expires = self._section("expires", "q")
+        self.types = self._section("types", "B")
+        self.transitions = self._section("transitions", "q")
+        self._code_hashes = self._section("code_hashes", "Q")
+        self._code_targets = self._section("code_targets", "I")
+        self._code_offsets = self._section("code_offsets", "Q")
+        self._codes = self._section("codes")
+
+    def __enter__(self) -> "CatalogueFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # The mapping can only be closed once no view of it is left.
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._buffer.release()
+        self._mmap.close()
+
+    def decode_record(self, record: int) -> Discount:
+        """
+        Decode a discount (records below `discount_count`) or a voucher template.
+        """
+        start, end = self._record_offsets[record], self._record_offsets[record + 1]
+        return discount_from_dict(json.loads(bytes(self._records[start:end])))
+
+    def find_code(self, code: str) -> int | None:
+        """
+        :return: The record the code resolves to, or None for unknown codes.
+        """
+        hashes, wanted = self._code_hashes, code_hash(code)
+        encoded = code.encode()
+        position = bisect_left(hashes, wanted)
+        while position < len(hashes) and hashes[position] == wanted:
+            if self._codes[self._code_offsets[position]:self._code_offsets[position + 1]] == encoded:
+                return self._code_targets[position]
+            position += 1
+        return None
+
+    def voucher_codes(self) -> Iterable[tuple[str, int]]:
+        """
+        Iterate the generated voucher codes and the template record each one redeems.
+        """
+        discount_count, codes, offsets = self.discount_count, self._codes, self._code_offsets
+        for position, target in enumerate(self._code_targets):
+            if target >= discount_count:
+                yield bytes(codes[offsets[position]:offsets[position + 1]]).decode(), target
+
+    def _section(self, name: str, format_character: str | None = None) -> memoryview:
+        offset, length = self._layout[name]
+        view = self._buffer[offset:offset + length]
+        if format_character is not None:
+            view = view.cast(format_character)
+        self._views.append(view)
+        return view
+
+
+def load_catalogue_file(path: str) -> DiscountCatalogue:
+    """
+    Decode a whole catalogue file into a snapshot for InMemoryDiscountRepository, e.g.
+    `repository.update(lambda _: load_catalogue_file(path))`.
+    Use MappedDiscountRepository instead to serve a large file without decoding it.
+    """
+    with CatalogueFile(path) as catalogue_file:
+        records = [catalogue_file.decode_record(record) for record in range(catalogue_file.record_count)]
+        voucher_templates_by_code = VoucherCodes({
+            code: records[record] for code, record in catalogue_file.voucher_codes()
+        })
+        return DiscountCatalogue(records[:catalogue_file.discount_count], voucher_templates_by_code,
+                                 version=catalogue_file.version)
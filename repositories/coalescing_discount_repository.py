@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Hashable, Mapping, Sequence, TypeVar
+
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from models.cache_stats import CacheStats
+from repositories.discount_repository import IDiscountRepository
+
+_Result = TypeVar("_Result")
+
+
+class CoalescingDiscountRepository(IDiscountRepository):
+    """
+    Single-flight decorator for any IDiscountRepository.
+
+    Concurrent identical calls share one call to the wrapped repository: the first caller starts it and
+    later callers await the same result until it completes. Calls that reach the wrapped repository are
+    limited to `max_concurrent_calls` at a time. In `stats`, hits count the calls that joined a call in flight.
+    Redemption calls are passed through unchanged.
+
+    A listing requested without `now` is evaluated at the time of the call that started it, so a joined listing
+    can be up to one repository round trip old. Discounts that expired meanwhile are still skipped by the
+    processor, which checks every discount's validity at the request's own timestamp. A listing requested for an
+    explicit `now` is only joined by calls whose `now` has the same catalogue version, so that no discount started
+    or expired in between; this costs a catalogue version lookup per call.
+    """
+
+    def __init__(self, discount_repository: IDiscountRepository, max_concurrent_calls: int = 32) -> None:
+        """
+        :param discount_repository: The repository to coalesce calls to.
+        :param max_concurrent_calls: Maximum number of calls running against the wrapped repository.
+        """
+        self._discount_repository = discount_repository
+        self._semaphore = asyncio.BoundedSemaphore(max_concurrent_calls)
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.stats = CacheStats()
+
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: datetime | None = None) -> Sequence[Discount]:
+        key: tuple = ("list_all_active_discounts", frozenset(exclude_discount_type))
+        if now is not None:
+            # Not coalesced: concurrent calls rarely share an instant, and a task per lookup costs more than it saves.
+            catalogue_version = await self._limited(lambda: self._discount_repository.get_catalogue_version(now))
+            # Without versions, only calls for the very same instant are known to get the same listing.
+            key += (now,) if catalogue_version is None else (catalogue_version,)
+        return await self._single_flight(
+            key, lambda: self._discount_repository.list_all_active_discounts(exclude_discount_type, now=now))
+
+    async def get_discount_by_code(self, discount_code: str) -> Discount | None:
+        return await self._single_flight(
+            ("get_discount_by_code", discount_code),
+            lambda: self._discount_repository.get_discount_by_code(discount_code),
+        )
+
+    async def get_catalogue_version(self, now: datetime | None = None) -> int | None:
+        return await self._single_flight(("get_catalogue_version", now),
+                                         lambda: self._discount_repository.get_catalogue_version(now))
+
+    async def get_redemption_count(self, discount_code: str, customer_id: str | None = None) -> int:
+        return await self._discount_repository.get_redemption_count(discount_code, customer_id)
+
+    async def add_redemptions(self, redemptions: Mapping[tuple[str, str], int]) -> None:
+        await self._discount_repository.add_redemptions(redemptions)
+
+    async def claim_redemptions(self, discount_code: str, max_redemptions: int, count: int) -> int:
+        return await self._discount_repository.claim_redemptions(discount_code, max_redemptions, count)
+
+    async def return_redemptions(self, discount_code: str, count: int) -> None:
+        await self._discount_repository.return_redemptions(discount_code, count)
+
+    async def _single_flight(self, key: Hashable, call: Callable[[], Awaitable[_Result]]) -> _Result:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+            task = asyncio.create_task(self._limited(call))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shielded, so a caller that is cancelled does not cancel the call for everyone else.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Every waiter may have been cancelled; the error is still reported to any that were not.
+            task.exception()
+
+    async def _limited(self, call: Callable[[], Awaitable[_Result]]) -> _Result:
+        async with self._semaphore:
+            return await call()
@@ -0,0 +1,146 @@
+import copy
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterable, Mapping, Sequence
+
+import clock
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from discounts.index.discount_index import DiscountIndex
+from repositories.voucher_codes import VoucherCodes
+
+
+class DiscountCatalogue:
+    """
+    Immutable, versioned snapshot of a discount catalogue with every lookup structure prebuilt:
+    the discount index, the code lookup and the start/expiry schedule.
+
+    Changes never modify a snapshot; `with_changes` builds the next one, which can be done off the request path
+    and published with a single assignment. Neither the snapshot nor its `discount_index` may be modified.
+
+    The discounts active at an instant only change at a `starts_at` or `expires_at`, so the schedule is the sorted
+    list of those instants and the active listing between two of them is computed once and memoized. Voucher
+    templates are never listed, but their instants are scheduled too, so that the version changes when a voucher
+    starts or expires and nothing cached per version keeps pricing it.
+    Validity dates are read when the snapshot is built. Discounts that have expired, by default at the current time,
+    are dropped whenever the next snapshot's discounts are given, see `with_changes`.
+    """
+    __slots__ = ("discounts", "version", "discount_index", "_discounts_by_code", "_voucher_templates_by_code",
+                 "_transitions", "_listings", "_max_cached_listings")
+
+    def __init__(self, discounts: Iterable[Discount] = (),
+                 voucher_templates_by_code: Mapping[str, Discount] | None = None, *, version: int = 0,
+                 max_cached_listings: int = 64) -> None:
+        """
+        :param discounts: The catalogue's discounts. Earlier discounts win when codes collide.
+        :param voucher_templates_by_code: Generated voucher codes and the template discount each one redeems.
+            These are looked up by code but never listed as active discounts. VoucherCodes are shared, any other
+            mapping is copied.
+        :param version: Catalogue version at the first instant of the schedule.
+        :param max_cached_listings: Maximum number of memoized active listings.
+        """
+        self.discounts: tuple[Discount, ...] = tuple(discounts)
+        self.version = version
+        self.discount_index = DiscountIndex(self.discounts)
+        self._discounts_by_code: dict[str, Discount] = {}
+        for discount in reversed(self.discounts):
+            self._discounts_by_code[discount.discount_code] = discount
+        self._voucher_templates_by_code = _voucher_codes(voucher_templates_by_code)
+        self._transitions = _schedule(self.discounts, self._voucher_templates_by_code)
+        self._listings: dict[tuple[int, frozenset[DiscountType]], tuple[Discount, ...]] = {}
+        self._max_cached_listings = max_cached_listings
+
+    def __len__(self) -> int:
+        return len(self.discounts)
+
+    @property
+    def voucher_templates_by_code(self) -> VoucherCodes:
+        """
+        The generated voucher codes; derive the next snapshot's with `VoucherCodes.with_codes`/`without_codes`.
+        """
+        return self._voucher_templates_by_code
+
+    @property
+    def next_version(self) -> int:
+        """
+        First version of a snapshot derived from this one, above every version this one reports.
+        """
+        return self.version + len(self._transitions) + 1
+
+    def with_changes(self, *, discounts: Iterable[Discount] | None = None,
+                     voucher_templates_by_code: Mapping[str, Discount] | None = None,
+                     now: datetime | None = None) -> "DiscountCatalogue":
+        """
+        Build the next snapshot. Structures of the parts that did not change are shared with this one.
+
+        :param discounts: The new discounts, or None to keep this snapshot's. Those that have expired are left out:
+            they would never be listed again, but would stay in the index and schedule of every later snapshot.
+            Their codes are no longer found either.
+        :param voucher_templates_by_code: The new voucher codes, or None to keep this snapshot's.
+            VoucherCodes are shared, any other mapping is copied.
+        :param now: Instant at which discounts count as expired, defaults to the current time. Pass the instant
+            the snapshot is evaluated at when that is not the present, e.g. to price carts as of a past date.
+        """
+        if discounts is not None:
+            now = now or clock.now()
+            return DiscountCatalogue(
+                (discount for discount in discounts if not discount.is_expired(now)),
+                self._voucher_templates_by_code if voucher_templates_by_code is None else voucher_templates_by_code,
+                version=self.next_version, max_cached_listings=self._max_cached_listings,
+            )
+        catalogue = copy.copy(self)
+        catalogue.version = self.next_version
+        if voucher_templates_by_code is not None:
+            catalogue._voucher_templates_by_code = voucher_codes = _voucher_codes(voucher_templates_by_code)
+            # Loading more codes of a known template keeps the schedule.
+            if voucher_codes.templates is not self._voucher_templates_by_code.templates:
+                catalogue._transitions = _schedule(self.discounts, voucher_codes)
+        catalogue._listings = {}
+        return catalogue
+
+    def version_at(self, now: datetime) -> int:
+        """
+        Catalogue version at `now`; it goes up by one at every scheduled start and expiry.
+        """
+        return self.version + bisect_right(self._transitions, now)
+
+    def active_discounts(self, exclude_discount_type: set[DiscountType], now: datetime) -> Sequence[Discount]:
+        """
+        List the discounts active at `now`, in catalogue order.
+        """
+        key = (bisect_right(self._transitions, now), frozenset(exclude_discount_type))
+        listing = self._listings.get(key)
+        if listing is None:
+            listing = tuple(discount for discount in self.discounts
+                            if discount.is_active(now) and discount.discount_type not in exclude_discount_type)
+            if len(self._listings) >= self._max_cached_listings:
+                self._listings.clear()
+            self._listings[key] = listing
+        return listing
+
+    def get_discount_by_code(self, discount_code: str) -> Discount | None:
+        """
+        Look up a discount by code. Codes of `discounts` take precedence over generated voucher codes,
+        whose discount is a copy of the template carrying the code.
+        """
+        discount = self._discounts_by_code.get(discount_code)
+        if discount is not None:
+            return discount
+        template = self._voucher_templates_by_code.get(discount_code)
+        if template is None:
+            return None
+        voucher = copy.copy(template)
+        voucher.discount_code = discount_code
+        return voucher
+
+
+def _schedule(discounts: tuple[Discount, ...], voucher_codes: VoucherCodes) -> list[datetime]:
+    scheduled = (*discounts, *voucher_codes.templates)
+    return sorted([discount.expires_at for discount in scheduled]
+                  + [discount.starts_at for discount in scheduled if discount.starts_at is not None])
+
+
+def _voucher_codes(voucher_templates_by_code: Mapping[str, Discount] | None) -> VoucherCodes:
+    if isinstance(voucher_templates_by_code, VoucherCodes):
+        return voucher_templates_by_code
+    return VoucherCodes(dict(voucher_templates_by_code or {}))
@@ -1,17 +1,24 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Iterable, Mapping, Sequence
 
+import clock
 from discounts.base import Discount
 from discounts.constants import DiscountType
+from discounts.index.discount_index import DiscountIndex
+from repositories.discount_catalogue import DiscountCatalogue
 
 
 class IDiscountRepository(ABC):
 
     @abstractmethod
-    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType]) -> list[Discount]:
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: datetime | None = None) -> Sequence[Discount]:
         """
         List all available discounts.
 
-        :return: A list of all discounts.
+        :param now: Evaluation timestamp for the validity periods, defaults to the current time.
+        :return: A list of all discounts. It may be shared with other callers, so it must not be modified.
         """
         ...
 
@@ -25,22 +32,198 @@ class IDiscountRepository(ABC):
         """
         ...
 
+    async def get_catalogue_version(self, now: datetime | None = None) -> int | None:
+        """
+        Get a version number that changes whenever the set of discounts changes,
+        including when a scheduled discount starts or expires.
+
+        :param now: Instant to get the version at, defaults to the current time.
+        :return: The catalogue version, or None if the repository does not track versions.
+        """
+        return None
+
+    async def get_redemption_count(self, discount_code: str, customer_id: str | None = None) -> int:
+        """
+        Get how many times a code has been redeemed, as recorded by `add_redemptions`.
+
+        :param customer_id: Count only this customer's redemptions, instead of everyone's.
+        :return: The number of redemptions, 0 if the repository does not store them.
+        """
+        return 0
+
+    async def add_redemptions(self, redemptions: Mapping[tuple[str, str], int]) -> None:
+        """
+        Record committed redemptions. Repositories that do not store them ignore them, so their limits are only
+        enforced within a process.
+
+        :param redemptions: Number of new redemptions per (discount code, customer id).
+        """
+        return None
+
+    async def claim_redemptions(self, discount_code: str, max_redemptions: int, count: int) -> int:
+        """
+        Claim up to `count` redemptions of a code's total limit, for a RedemptionLimiter to hand out. Claims are
+        counted against `max_redemptions` together with the redemptions recorded before the code's first claim, and
+        atomically across every process sharing the repository, so together they never exceed the limit.
+        Repositories that do not store redemptions grant every claim, so their limits are only enforced within a
+        process.
+
+        :return: The number of redemptions claimed, fewer than `count` once the limit is nearly reached.
+        """
+        return count
+
+    async def return_redemptions(self, discount_code: str, count: int) -> None:
+        """
+        Give back claimed redemptions that were never committed, so other processes can claim them.
+        """
+        return None
+
 
 class InMemoryDiscountRepository(IDiscountRepository):
     """
     In-memory implementation of the discount repository.
     This is a placeholder for actual database or external service integration.
+
+    Discounts are held in an immutable DiscountCatalogue snapshot. Every change builds the next snapshot and
+    publishes it with a single assignment, so readers never take a lock, never see a half-applied change and
+    never wait for an index rebuild. Each change rebuilds the snapshot, so apply many at once with `update`.
     """
 
-    def __init__(self, discounts: list[Discount] = None):
-        self.all_discounts = discounts or []
+    def __init__(self, discounts: Iterable[Discount] = None):
+        self._catalogue = DiscountCatalogue(discounts or ())
+        self._redemptions: dict[tuple[str, str], int] = {}
+        self._redemptions_by_code: dict[str, int] = {}
+        self._claimed_redemptions: dict[str, int] = {}
+
+    @property
+    def catalogue(self) -> DiscountCatalogue:
+        """
+        The current catalogue snapshot. Read it once per operation so the operation sees a single version.
+        """
+        return self._catalogue
+
+    @property
+    def all_discounts(self) -> tuple[Discount, ...]:
+        """
+        Discounts of the current snapshot. Use `replace_discounts`, `add_discount`, `remove_discount`
+        or `update` to change them.
+        """
+        return self._catalogue.discounts
+
+    @property
+    def discount_index(self) -> DiscountIndex:
+        """
+        Index of the current snapshot. Give processors `get_discount_index` instead, so they follow updates.
+        """
+        return self._catalogue.discount_index
 
-    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType]) -> list[Discount]:
-        return [discount for discount in self.all_discounts if
-                not discount.is_expired() and discount.discount_type not in exclude_discount_type]
+    def get_discount_index(self) -> DiscountIndex:
+        return self._catalogue.discount_index
+
+    @property
+    def catalogue_version(self) -> int:
+        return self._catalogue.version_at(clock.now())
+
+    def update(self, change: Callable[[DiscountCatalogue], DiscountCatalogue]) -> DiscountCatalogue:
+        """
+        Publish the snapshot `change` derives from the current one, e.g. with `DiscountCatalogue.with_changes`.
+        Call from the thread that serves requests; use `update_in_background` to build the snapshot elsewhere.
+
+        :return: The published snapshot.
+        """
+        self._catalogue = catalogue = change(self._catalogue)
+        return catalogue
+
+    async def update_in_background(self, change: Callable[[DiscountCatalogue], DiscountCatalogue]) -> DiscountCatalogue:
+        """
+        Like `update`, but build the next snapshot in a worker thread while requests keep being served from the
+        current one. If another update was published meanwhile, `change` is applied again to the newer snapshot,
+        so it must not have side effects.
+
+        :return: The published snapshot.
+        """
+        # Deferred: asyncio is the most expensive import on a worker's cold start and only this method needs it.
+        import asyncio
+
+        while True:
+            base = self._catalogue
+            catalogue = await asyncio.to_thread(change, base)
+            if self._catalogue is base:
+                self._catalogue = catalogue
+                return catalogue
+
+    def replace_discounts(self, discounts: Iterable[Discount]) -> None:
+        self.update(lambda catalogue: catalogue.with_changes(discounts=discounts))
+
+    def add_discount(self, discount: Discount) -> None:
+        self.update(lambda catalogue: catalogue.with_changes(discounts=catalogue.discounts + (discount,)))
+
+    def remove_discount(self, discount: Discount) -> None:
+        """
+        Remove the first occurrence of `discount`.
+
+        :raises ValueError: If the discount is not in the catalogue.
+        """
+        discounts = list(self._catalogue.discounts)
+        discounts.remove(discount)
+        self.replace_discounts(discounts)
+
+    def bulk_load_voucher_codes(self, template: Discount, codes: Iterable[str]) -> int:
+        """
+        Register generated voucher codes that all redeem the same template discount.
+
+        Only the code itself is stored per voucher; a copy of the template carrying the code is built
+        when the code is looked up. Codes of discounts in `all_discounts` take precedence. Each call only stores
+        the codes it is given, see VoucherCodes, so large sets of codes can be loaded in chunks.
+
+        :param template: The discount every code redeems. It is not listed as an active discount.
+        :param codes: The voucher codes, e.g. streamed from a file.
+        :return: The number of codes that were not registered before.
+        """
+        catalogue = self._catalogue
+        voucher_codes = catalogue.voucher_templates_by_code.with_codes(codes, template)
+        self._catalogue = catalogue.with_changes(voucher_templates_by_code=voucher_codes)
+        return len(voucher_codes) - len(catalogue.voucher_templates_by_code)
+
+    def remove_voucher_codes(self, codes: Iterable[str]) -> None:
+        """
+        Unregister voucher codes loaded with `bulk_load_voucher_codes`. Unknown codes are ignored.
+        """
+        catalogue = self._catalogue
+        self._catalogue = catalogue.with_changes(
+            voucher_templates_by_code=catalogue.voucher_templates_by_code.without_codes(codes))
+
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: datetime | None = None) -> Sequence[Discount]:
+        return self._catalogue.active_discounts(exclude_discount_type, now or clock.now())
 
     async def get_discount_by_code(self, discount_code: str) -> Discount | None:
-        for discount in self.all_discounts:
-            if discount.discount_code == discount_code:
-                return discount
-        return None
+        return self._catalogue.get_discount_by_code(discount_code)
+
+    async def get_catalogue_version(self, now: datetime | None = None) -> int | None:
+        if now is None:
+            return self.catalogue_version
+        return self._catalogue.version_at(now)
+
+    async def get_redemption_count(self, discount_code: str, customer_id: str | None = None) -> int:
+        if customer_id is None:
+            return self._redemptions_by_code.get(discount_code, 0)
+        return self._redemptions.get((discount_code, customer_id), 0)
+
+    async def add_redemptions(self, redemptions: Mapping[tuple[str, str], int]) -> None:
+        for key, count in redemptions.items():
+            discount_code = key[0]
+            self._redemptions[key] = self._redemptions.get(key, 0) + count
+            self._redemptions_by_code[discount_code] = self._redemptions_by_code.get(discount_code, 0) + count
+
+    async def claim_redemptions(self, discount_code: str, max_redemptions: int, count: int) -> int:
+        claimed = self._claimed_redemptions.get(discount_code)
+        if claimed is None:
+            claimed = self._redemptions_by_code.get(discount_code, 0)
+        granted = max(min(count, max_redemptions - claimed), 0)
+        self._claimed_redemptions[discount_code] = claimed + granted
+        return granted
+
+    async def return_redemptions(self, discount_code: str, count: int) -> None:
+        if discount_code in self._claimed_redemptions:
+            self._claimed_redemptions[discount_code] -= count
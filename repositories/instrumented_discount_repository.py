@@ -0,0 +1,55 @@
+
+from datetime import datetime
+from typing import Mapping, Sequence
+
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from instrumentation.instrumentation_interface import IInstrumentation
+from repositories.discount_repository import IDiscountRepository
+
+
+class InstrumentedDiscountRepository(IDiscountRepository):
+    """
+    Decorator for any IDiscountRepository reporting the latency of each call as the stage
+    "repository.<method name>", e.g. "repository.list_all_active_discounts".
+
+    Wrap the outermost repository to measure what the service waits for, or a cached or coalescing decorator's
+    inner repository to measure only the calls that reach the backend.
+    """
+
+    def __init__(self, discount_repository: IDiscountRepository, instrumentation: IInstrumentation) -> None:
+        """
+        :param discount_repository: The repository to measure.
+        :param instrumentation: Receiver of the latencies.
+        """
+        self._discount_repository = discount_repository
+        self._instrumentation = instrumentation
+
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: datetime | None = None) -> Sequence[Discount]:
+        with self._instrumentation.time("repository.list_all_active_discounts"):
+            return await self._discount_repository.list_all_active_discounts(exclude_discount_type, now=now)
+
+    async def get_discount_by_code(self, discount_code: str) -> Discount | None:
+        with self._instrumentation.time("repository.get_discount_by_code"):
+            return await self._discount_repository.get_discount_by_code(discount_code)
+
+    async def get_catalogue_version(self, now: datetime | None = None) -> int | None:
+        with self._instrumentation.time("repository.get_catalogue_version"):
+            return await self._discount_repository.get_catalogue_version(now)
+
+    async def get_redemption_count(self, discount_code: str, customer_id: str | None = None) -> int:
+        with self._instrumentation.time("repository.get_redemption_count"):
+            return await self._discount_repository.get_redemption_count(discount_code, customer_id)
+
+    async def add_redemptions(self, redemptions: Mapping[tuple[str, str], int]) -> None:
+        with self._instrumentation.time("repository.add_redemptions"):
+            await self._discount_repository.add_redemptions(redemptions)
+
+    async def claim_redemptions(self, discount_code: str, max_redemptions: int, count: int) -> int:
+        with self._instrumentation.time("repository.claim_redemptions"):
+            return await self._discount_repository.claim_redemptions(discount_code, max_redemptions, count)
+
+    async def return_redemptions(self, discount_code: str, count: int) -> None:
+        with self._instrumentation.time("repository.return_redemptions"):
+            await self._discount_repository.return_redemptions(discount_code, count)
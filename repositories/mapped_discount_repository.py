@@ -0,0 +1,86 @@
+import copy
+from bisect import bisect_right
+from datetime import datetime
+from typing import Sequence
+
+import clock
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from repositories.catalogue_file import CatalogueFile, epoch_microseconds
+from repositories.discount_repository import IDiscountRepository
+
+
+class MappedDiscountRepository(IDiscountRepository):
+    """
+    Read-only repository serving a catalogue file (see repositories.catalogue_file) straight from a memory mapping.
+
+    Opening a repository only reads the file header, so a worker starts in milliseconds however large the catalogue
+    is. A code lookup reads a few pages of the code table and decodes one record. A listing scans the validity
+    columns once per interval between two scheduled starts or expiries and decodes only the active discounts.
+    Decoded discounts are kept, so every lookup of a record returns the same object.
+
+    The repository has no DiscountIndex, which would need every discount decoded; give the processor a RuleCompiler
+    to skip non-matching items instead. To publish a new catalogue, write a new file and open a new repository.
+    """
+
+    def __init__(self, path: str, *, max_cached_listings: int = 64) -> None:
+        """
+        :param path: A file written by `write_catalogue_file`.
+        :param max_cached_listings: Maximum number of memoized active listings.
+        :raises ValueError: If the file is not a catalogue file.
+        """
+        self._file = CatalogueFile(path)
+        self._decoded: dict[int, Discount] = {}
+        self._listings: dict[tuple[int, frozenset[DiscountType]], tuple[Discount, ...]] = {}
+        self._max_cached_listings = max_cached_listings
+
+    def __enter__(self) -> "MappedDiscountRepository":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmap the file. Discounts already returned stay usable.
+        """
+        self._file.close()
+
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: datetime | None = None) -> Sequence[Discount]:
+        now_microseconds = epoch_microseconds(now or clock.now())
+        catalogue_file = self._file
+        key = (bisect_right(catalogue_file.transitions, now_microseconds), frozenset(exclude_discount_type))
+        listing = self._listings.get(key)
+        if listing is None:
+            excluded = {position for position, discount_type in enumerate(catalogue_file.discount_types)
+                        if discount_type in exclude_discount_type}
+            starts, expires, types = catalogue_file.starts, catalogue_file.expires, catalogue_file.types
+            listing = tuple(
+                self._decode(record) for record in range(catalogue_file.discount_count)
+                if starts[record] <= now_microseconds < expires[record] and types[record] not in excluded
+            )
+            if len(self._listings) >= self._max_cached_listings:
+                self._listings.clear()
+            self._listings[key] = listing
+        return listing
+
+    async def get_discount_by_code(self, discount_code: str) -> Discount | None:
+        record = self._file.find_code(discount_code)
+        if record is None:
+            return None
+        discount = self._decode(record)
+        if record < self._file.discount_count:
+            return discount
+        voucher = copy.copy(discount)
+        voucher.discount_code = discount_code
+        return voucher
+
+    async def get_catalogue_version(self, now: datetime | None = None) -> int | None:
+        return self._file.version + bisect_right(self._file.transitions, epoch_microseconds(now or clock.now()))
+
+    def _decode(self, record: int) -> Discount:
+        discount = self._decoded.get(record)
+        if discount is None:
+            discount = self._decoded[record] = self._file.decode_record(record)
+        return discount
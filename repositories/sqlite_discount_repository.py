@@ -0,0 +1,377 @@
+import asyncio
+import copy
+import itertools
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Mapping, Sequence, TypeVar
+
+import clock
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from repositories.catalogue_file import epoch_microseconds
+from repositories.discount_repository import IDiscountRepository
+from serializers.discount_serializer import discount_from_dict, discount_to_dict
+
+_Result = TypeVar("_Result")
+
+_NO_START = -2 ** 63
+# Rows per `IN (...)` query, below SQLite's default limit of host parameters.
+_BULK_QUERY_ROWS = 500
+_INSERT_BATCH_ROWS = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS discounts (
+    id INTEGER PRIMARY KEY,
+    discount_code TEXT NOT NULL,
+    discount_type TEXT NOT NULL,
+    starts_at INTEGER,
+    expires_at INTEGER NOT NULL,
+    definition TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS discounts_by_type_and_expiry ON discounts (discount_type, expires_at);
+CREATE INDEX IF NOT EXISTS discounts_by_expiry ON discounts (expires_at);
+CREATE INDEX IF NOT EXISTS discounts_by_start ON discounts (starts_at);
+CREATE INDEX IF NOT EXISTS discounts_by_code ON discounts (discount_code, id);
+CREATE TABLE IF NOT EXISTS voucher_templates (
+    id INTEGER PRIMARY KEY,
+    starts_at INTEGER,
+    expires_at INTEGER NOT NULL,
+    definition TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS voucher_templates_by_definition ON voucher_templates (definition);
+CREATE INDEX IF NOT EXISTS voucher_templates_by_expiry ON voucher_templates (expires_at);
+CREATE INDEX IF NOT EXISTS voucher_templates_by_start ON voucher_templates (starts_at);
+CREATE TABLE IF NOT EXISTS voucher_codes (
+    code TEXT PRIMARY KEY,
+    template_id INTEGER NOT NULL REFERENCES voucher_templates (id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS voucher_codes_by_template ON voucher_codes (template_id);
+CREATE TABLE IF NOT EXISTS catalogue (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalogue (id, version) VALUES (0, 0);
+CREATE TABLE IF NOT EXISTS redemptions (
+    discount_code TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (discount_code, customer_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS redemption_claims (
+    discount_code TEXT PRIMARY KEY,
+    claimed INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_VERSION_QUERY = """
+SELECT (SELECT version FROM catalogue),
+       (SELECT expires_at FROM discounts WHERE expires_at <= :now ORDER BY expires_at DESC LIMIT 1),
+       (SELECT starts_at FROM discounts WHERE starts_at <= :now ORDER BY starts_at DESC LIMIT 1),
+       (SELECT expires_at FROM voucher_templates WHERE expires_at <= :now ORDER BY expires_at DESC LIMIT 1),
+       (SELECT starts_at FROM voucher_templates WHERE starts_at <= :now ORDER BY starts_at DESC LIMIT 1)
+"""
+
+
+class SqliteDiscountRepository(IDiscountRepository):
+    """
+    IDiscountRepository stored in a SQLite database file, with no outside service to run.
+
+    Queries run on a thread pool, each thread with its own connection, so they never block the event loop.
+    The database is in WAL mode, so reads are not blocked by a writer. Discounts are stored as their
+    serializers.discount_serializer definition, with their code, type and validity period in indexed columns.
+    Only the built-in discount and rule classes can be stored.
+
+    The catalogue version combines a write counter with the last start or expiry of a discount or voucher template
+    that has passed, all read with index seeks. Active listings and decoded discounts are kept per version, so a
+    listing at an unchanged version does not touch the discount rows. Writes through this class bump the counter;
+    other writers must bump `catalogue.version` in the same transaction. Redemption counts are kept per code and customer, and claimed
+    redemptions per code; neither is part of the catalogue, so recording them does not change its version.
+    """
+
+    def __init__(self, path: str, *, pool_size: int = 4, max_cached_listings: int = 64) -> None:
+        """
+        :param path: Database file, created if missing. Every connection opens it, so it cannot be ":memory:".
+        :param pool_size: Number of threads, and connections, running queries.
+        :param max_cached_listings: Maximum number of memoized active listings.
+        """
+        self._path = path
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="sqlite-discounts")
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._max_cached_listings = max_cached_listings
+        self._listings: dict[tuple[int, frozenset[DiscountType]], tuple[Discount, ...]] = {}
+        self._decoded: dict[int, Discount] = {}
+        self._decoded_templates: dict[int, Discount] = {}
+        self._decoded_base_version: int | None = None
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    async def list_all_active_discounts(self, exclude_discount_type: set[DiscountType],
+                                        now: datetime | None = None) -> Sequence[Discount]:
+        now = now or clock.now()
+        return await self._run(lambda connection: self._list_active(connection, exclude_discount_type, now))
+
+    async def get_discount_by_code(self, discount_code: str) -> Discount | None:
+        return await self._run(lambda connection: self._find_code(connection, discount_code))
+
+    async def get_catalogue_version(self, now: datetime | None = None) -> int | None:
+        now = now or clock.now()
+        return await self._run(lambda connection: self._version(connection, now))
+
+    async def add_discounts(self, discounts: Iterable[Discount]) -> None:
+        """
+        Append discounts to the catalogue, in order.
+        """
+        await self._run(lambda connection: self._write(connection, lambda: self._insert(connection, discounts)))
+
+    async def replace_discounts(self, discounts: Iterable[Discount]) -> None:
+        """
+        Replace every discount in one transaction. Generated voucher codes are kept.
+        """
+        def replace(connection: sqlite3.Connection) -> None:
+            connection.execute("DELETE FROM discounts")
+            self._insert(connection, discounts)
+
+        await self._run(lambda connection: self._write(connection, lambda: replace(connection)))
+
+    async def remove_discount_codes(self, discount_codes: Iterable[str]) -> int:
+        """
+        Remove every discount with one of the given codes. Generated voucher codes are not affected.
+
+        :return: The number of discounts removed.
+        """
+        def remove(connection: sqlite3.Connection) -> int:
+            removed = 0
+            for batch in _batched(discount_codes, _BULK_QUERY_ROWS):
+                removed += connection.execute(
+                    f"DELETE FROM discounts WHERE discount_code IN ({_placeholders(batch)})", batch).rowcount
+            return removed
+
+        return await self._run(lambda connection: self._write(connection, lambda: remove(connection)))
+
+    async def bulk_load_voucher_codes(self, template: Discount, codes: Iterable[str]) -> int:
+        """
+        Register generated voucher codes that all redeem the same template discount, as
+        `InMemoryDiscountRepository.bulk_load_voucher_codes` does. Codes are inserted in batches as they are read.
+        Loads of the same template, e.g. one per chunk of a large batch, share one stored template.
+
+        :return: The number of codes that were not registered before.
+        """
+        definition = json.dumps(discount_to_dict(template), separators=(",", ":"))
+
+        def load(connection: sqlite3.Connection) -> int:
+            row = connection.execute("SELECT id FROM voucher_templates WHERE definition = ? ORDER BY id LIMIT 1",
+                                     (definition,)).fetchone()
+            template_id = row[0] if row is not None else connection.execute(
+                "INSERT INTO voucher_templates (starts_at, expires_at, definition) VALUES (?, ?, ?)",
+                (None if template.starts_at is None else epoch_microseconds(template.starts_at),
+                 epoch_microseconds(template.expires_at), definition)).lastrowid
+            loaded = 0
+            for batch in _batched(codes, _INSERT_BATCH_ROWS):
+                existing = sum(
+                    connection.execute(f"SELECT COUNT(*) FROM voucher_codes WHERE code IN ({_placeholders(chunk)})",
+                                       chunk).fetchone()[0]
+                    for chunk in _batched(batch, _BULK_QUERY_ROWS)
+                )
+                connection.executemany(
+                    "INSERT INTO voucher_codes (code, template_id) VALUES (?, ?) "
+                    "ON CONFLICT (code) DO UPDATE SET template_id = excluded.template_id",
+                    zip(batch, itertools.repeat(template_id)),
+                )
+                loaded += len(set(batch)) - existing
+            # Codes loaded again may have moved off their previous template.
+            _remove_unused_templates(connection)
+            return loaded
+
+        return await self._run(lambda connection: self._write(connection, lambda: load(connection)))
+
+    async def remove_voucher_codes(self, codes: Iterable[str]) -> None:
+        """
+        Unregister voucher codes loaded with `bulk_load_voucher_codes`. Unknown codes are ignored.
+        """
+        def remove(connection: sqlite3.Connection) -> None:
+            for batch in _batched(codes, _BULK_QUERY_ROWS):
+                connection.execute(f"DELETE FROM voucher_codes WHERE code IN ({_placeholders(batch)})", batch)
+            _remove_unused_templates(connection)
+
+        await self._run(lambda connection: self._write(connection, lambda: remove(connection)))
+
+    async def get_redemption_count(self, discount_code: str, customer_id: str | None = None) -> int:
+        def count(connection: sqlite3.Connection) -> int:
+            if customer_id is None:
+                row = connection.execute("SELECT SUM(count) FROM redemptions WHERE discount_code = ?",
+                                         (discount_code,)).fetchone()
+            else:
+                row = connection.execute("SELECT count FROM redemptions WHERE discount_code = ? AND customer_id = ?",
+                                         (discount_code, customer_id)).fetchone()
+            # SUM is NULL, and the customer's row missing, until a first redemption is recorded.
+            return 0 if row is None or row[0] is None else row[0]
+
+        return await self._run(count)
+
+    async def add_redemptions(self, redemptions: Mapping[tuple[str, str], int]) -> None:
+        rows = [(discount_code, customer_id, count) for (discount_code, customer_id), count in redemptions.items()]
+
+        def add(connection: sqlite3.Connection) -> None:
+            with _transaction(connection, "BEGIN IMMEDIATE"):
+                connection.executemany(
+                    "INSERT INTO redemptions (discount_code, customer_id, count) VALUES (?, ?, ?) "
+                    "ON CONFLICT (discount_code, customer_id) DO UPDATE SET count = count + excluded.count",
+                    rows,
+                )
+
+        await self._run(add)
+
+    async def claim_redemptions(self, discount_code: str, max_redemptions: int, count: int) -> int:
+        def claim(connection: sqlite3.Connection) -> int:
+            # The write lock is taken first, so no other process claims between the read and the update.
+            with _transaction(connection, "BEGIN IMMEDIATE"):
+                connection.execute(
+                    "INSERT OR IGNORE INTO redemption_claims (discount_code, claimed) "
+                    "SELECT ?, COALESCE(SUM(count), 0) FROM redemptions WHERE discount_code = ?",
+                    (discount_code, discount_code))
+                claimed = connection.execute("SELECT claimed FROM redemption_claims WHERE discount_code = ?",
+                                             (discount_code,)).fetchone()[0]
+                granted = max(min(count, max_redemptions - claimed), 0)
+                connection.execute("UPDATE redemption_claims SET claimed = claimed + ? WHERE discount_code = ?",
+                                   (granted, discount_code))
+            return granted
+
+        return await self._run(claim)
+
+    async def return_redemptions(self, discount_code: str, count: int) -> None:
+        await self._run(lambda connection: connection.execute(
+            "UPDATE redemption_claims SET claimed = claimed - ? WHERE discount_code = ?", (count, discount_code)))
+
+    async def _run(self, query: Callable[[sqlite3.Connection], _Result]) -> _Result:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: query(self._connection()))
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Transactions are managed explicitly; the connection is only shared with `close`.
+            connection = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _write(self, connection: sqlite3.Connection, write: Callable[[], _Result]) -> _Result:
+        with _transaction(connection, "BEGIN IMMEDIATE"):
+            result = write()
+            connection.execute("UPDATE catalogue SET version = version + 1")
+        # Refreshes the statistics the planner uses to choose between the expiry index and a scan.
+        connection.execute("PRAGMA optimize")
+        return result
+
+    def _insert(self, connection: sqlite3.Connection, discounts: Iterable[Discount]) -> None:
+        rows = (
+            (discount.discount_code, discount.discount_type.value,
+             None if discount.starts_at is None else epoch_microseconds(discount.starts_at),
+             epoch_microseconds(discount.expires_at), json.dumps(discount_to_dict(discount), separators=(",", ":")))
+            for discount in discounts
+        )
+        for batch in _batched(rows, _INSERT_BATCH_ROWS):
+            connection.executemany(
+                "INSERT INTO discounts (discount_code, discount_type, starts_at, expires_at, definition) "
+                "VALUES (?, ?, ?, ?, ?)", batch)
+
+    def _version(self, connection: sqlite3.Connection, now: datetime) -> int:
+        """
+        Catalogue version at `now`: the write counter and the last start or expiry passed, in one integer.
+        """
+        base_version, *last_transitions = connection.execute(
+            _VERSION_QUERY, {"now": epoch_microseconds(now)}).fetchone()
+        if base_version != self._decoded_base_version:
+            # Rows may have been rewritten, and row ids reused.
+            self._decoded, self._decoded_templates = {}, {}
+            self._decoded_base_version = base_version
+        last_transition = max(_NO_START if transition is None else transition for transition in last_transitions)
+        return (base_version << 64) | (last_transition - _NO_START)
+
+    def _list_active(self, connection: sqlite3.Connection, exclude_discount_type: set[DiscountType],
+                     now: datetime) -> tuple[Discount, ...]:
+        with _transaction(connection, "BEGIN"):
+            key = (self._version(connection, now), frozenset(exclude_discount_type))
+            listing = self._listings.get(key)
+            if listing is not None:
+                return listing
+            excluded = [discount_type.value for discount_type in exclude_discount_type]
+            now_microseconds = epoch_microseconds(now)
+            ids = [row_id for row_id, in connection.execute(
+                "SELECT id FROM discounts WHERE expires_at > ? AND (starts_at IS NULL OR starts_at <= ?) "
+                f"AND discount_type NOT IN ({_placeholders(excluded)}) ORDER BY id",
+                (now_microseconds, now_microseconds, *excluded),
+            )]
+            decoded = self._decoded
+            for batch in _batched([row_id for row_id in ids if row_id not in decoded], _BULK_QUERY_ROWS):
+                for row_id, definition in connection.execute(
+                        f"SELECT id, definition FROM discounts WHERE id IN ({_placeholders(batch)})", batch):
+                    decoded.setdefault(row_id, discount_from_dict(json.loads(definition)))
+            listing = tuple(decoded[row_id] for row_id in ids)
+        if len(self._listings) >= self._max_cached_listings:
+            self._listings.clear()
+        self._listings[key] = listing
+        return listing
+
+    def _find_code(self, connection: sqlite3.Connection, discount_code: str) -> Discount | None:
+        with _transaction(connection, "BEGIN"):
+            self._version(connection, clock.now())
+            row = connection.execute("SELECT id, definition FROM discounts WHERE discount_code = ? ORDER BY id LIMIT 1",
+                                     (discount_code,)).fetchone()
+            if row is not None:
+                # Earlier discounts win when codes collide.
+                return self._decoded.setdefault(row[0], discount_from_dict(json.loads(row[1])))
+            row = connection.execute(
+                "SELECT voucher_templates.id, voucher_templates.definition FROM voucher_codes "
+                "JOIN voucher_templates ON voucher_templates.id = voucher_codes.template_id "
+                "WHERE voucher_codes.code = ?", (discount_code,)).fetchone()
+        if row is None:
+            return None
+        template = self._decoded_templates.get(row[0])
+        if template is None:
+            template = self._decoded_templates.setdefault(row[0], discount_from_dict(json.loads(row[1])))
+        voucher = copy.copy(template)
+        voucher.discount_code = discount_code
+        return voucher
+
+
+@contextmanager
+def _transaction(connection: sqlite3.Connection, begin: str) -> Iterator[None]:
+    connection.execute(begin)
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def _remove_unused_templates(connection: sqlite3.Connection) -> None:
+    connection.execute("DELETE FROM voucher_templates WHERE NOT EXISTS "
+                       "(SELECT 1 FROM voucher_codes WHERE voucher_codes.template_id = voucher_templates.id)")
+
+
+def _batched(values: Iterable, size: int) -> Iterator[list]:
+    values = iter(values)
+    while batch := list(itertools.islice(values, size)):
+        yield batch
+
+
+def _placeholders(values: list) -> str:
+    return ", ".join("?" * len(values))
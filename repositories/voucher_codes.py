@@ -0,0 +1,108 @@
+from itertools import repeat
+from typing import Iterable, Iterator, Mapping
+
+from discounts.base import Discount
+
+# Marks a code removed in a newer segment.
+_REMOVED = None
+
+
+class VoucherCodes(Mapping[str, Discount]):
+    """
+    Immutable mapping of generated voucher codes to the template discount each one redeems.
+
+    Codes are kept in segments that are never modified once built, newest first, and a code is looked up in them
+    in that order. `with_codes` and `without_codes` return a new mapping that shares every segment with this one
+    plus a segment holding only the given codes, so loading codes in chunks costs time and memory per chunk rather
+    than per code loaded so far, and snapshots built from each other share their codes.
+
+    A new segment is merged into the next older one while it is at least half as large, so every segment is less
+    than half the size of the next older one: there are O(log n) segments, and every code is copied O(log n) times
+    over all loads.
+
+    `templates` holds every template loaded, without having to visit the codes. A template whose codes were all
+    removed stays in it until the segments are next merged into one.
+    """
+    __slots__ = ("_segments", "_length", "_templates")
+
+    def __init__(self, codes: dict[str, Discount] | None = None) -> None:
+        """
+        :param codes: The initial codes. The dict is taken over, not copied, so it must not be modified afterwards.
+        """
+        self._segments: tuple[dict[str, Discount | None], ...] = (codes,) if codes else ()
+        self._length = len(codes) if codes else 0
+        self._templates = _distinct(codes.values()) if codes else ()
+
+    def __getitem__(self, code: str) -> Discount:
+        template = self.get(code)
+        if template is None:
+            raise KeyError(code)
+        return template
+
+    def get(self, code: str, default: Discount | None = None) -> Discount | None:
+        for segment in self._segments:
+            if code in segment:
+                template = segment[code]
+                return default if template is _REMOVED else template
+        return default
+
+    def __contains__(self, code: object) -> bool:
+        return self.get(code) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        segments = self._segments
+        for position, segment in enumerate(segments):
+            for code, template in segment.items():
+                # Skip codes removed or loaded again in a newer segment.
+                if template is not _REMOVED and not any(code in newer for newer in segments[:position]):
+                    yield code
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def templates(self) -> tuple[Discount, ...]:
+        """
+        The distinct templates codes were loaded with, oldest first. May include templates no code redeems anymore.
+        """
+        return self._templates
+
+    def with_codes(self, codes: Iterable[str], template: Discount) -> "VoucherCodes":
+        """
+        :return: A mapping with `codes` added, or redeeming `template` if they were already present.
+        """
+        segment: dict[str, Discount | None] = dict(zip(codes, repeat(template)))
+        added = sum(1 for code in segment if code not in self)
+        templates = self._templates if any(known is template for known in self._templates) \
+            else (*self._templates, template)
+        return self._with_segment(segment, self._length + added, templates)
+
+    def without_codes(self, codes: Iterable[str]) -> "VoucherCodes":
+        """
+        :return: A mapping without `codes`. Unknown codes are ignored.
+        """
+        segment: dict[str, Discount | None] = {code: _REMOVED for code in codes if code in self}
+        return self._with_segment(segment, self._length - len(segment), self._templates)
+
+    def _with_segment(self, segment: dict[str, Discount | None], length: int,
+                      templates: tuple[Discount, ...]) -> "VoucherCodes":
+        if not segment:
+            return self
+        older = list(self._segments)
+        while older and 2 * len(segment) >= len(older[0]):
+            segment = {**older.pop(0), **segment}
+        if not older:
+            if any(template is _REMOVED for template in segment.values()):
+                # The oldest segment has nothing left to hide.
+                segment = {code: template for code, template in segment.items() if template is not _REMOVED}
+            # The segment holds every code and was just built, so finding the templates still in use costs no more.
+            templates = _distinct(segment.values())
+        voucher_codes = VoucherCodes.__new__(VoucherCodes)
+        voucher_codes._segments = (segment, *older)
+        voucher_codes._length = length
+        voucher_codes._templates = templates
+        return voucher_codes
+
+
+def _distinct(templates: Iterable[Discount]) -> tuple[Discount, ...]:
+    return tuple({id(template): template for template in templates}.values())
@@ -0,0 +1,209 @@
+"""
+Reprice carts read as JSON Lines through DiscountService.
+
+Each input line is a pricing request in the format of serializers.pricing_request_serializer. Each output line
+is the DiscountedPrice of the request on the same input line, or {"error": "..."} when that line is not a
+valid request or could not be priced, so input and output stay aligned. Blank input lines are skipped.
+
+At most `--concurrency` batches of `--batch-size` carts are held at a time: the next batch is only read once
+the oldest one has been priced and written, so memory stays bounded however long the input is.
+
+Usage: python reprice.py carts.jsonl --catalogue catalogue.bin > priced.jsonl
+       cat carts.jsonl | python reprice.py --catalogue catalogue.bin --workers 8 --batch-size 5000 > priced.jsonl
+       python reprice.py carts.jsonl --sample-catalogue
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from decimal import InvalidOperation
+from typing import Iterable, Iterator, TextIO
+
+from discounts.index.discount_index import DiscountIndex
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.columnar_discount_processor import ColumnarDiscountProcessor
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from discounts.processor.parallel_discount_processor import ParallelDiscountProcessor
+from discounts.rules.rule_compiler import RuleCompiler
+from fake_data import DUMMY_DISCOUNTS
+from main import DISCOUNT_TYPE_ORDERING
+from models.discount import DiscountedPrice
+from models.pricing_request import PricingRequest
+from repositories.catalogue_file import load_catalogue_file
+from repositories.discount_repository import InMemoryDiscountRepository
+from serializers.pricing_request_serializer import discounted_price_to_dict, pricing_request_from_dict
+from services.discount_plan_cache import DiscountPlanCache
+from services.discount_service import DiscountService
+
+ENGINES: dict[str, type[DiscountProcessor]] = {
+    "decimal": DiscountProcessor,
+    "minor_units": MinorUnitDiscountProcessor,
+    "columnar": ColumnarDiscountProcessor,
+}
+
+
+@dataclass
+class RepricingSummary:
+    carts: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+
+async def reprice(service: DiscountService, lines: Iterable[str], output: TextIO, *, batch_size: int = 1000,
+                  concurrency: int = 1) -> RepricingSummary:
+    """
+    Price every request of a JSON Lines stream and write the results in input order.
+
+    :param lines: E.g. an open file or `sys.stdin`. Lines are read in a thread, so a slow producer does not
+        block the pricing of batches already read.
+    :param batch_size: Number of carts priced together by `DiscountService.calculate_many`.
+    :param concurrency: Maximum number of batches being priced at once. Batches only overlap while the processor
+        prices off the event loop, as ParallelDiscountProcessor does; otherwise only reading overlaps with pricing.
+    """
+    started = time.perf_counter()
+    summary = RepricingSummary()
+    lines = iter(lines)
+    in_flight: deque[asyncio.Task[tuple[list[str], int]]] = deque()
+
+    async def write_oldest() -> None:
+        lines_out, errors = await in_flight.popleft()
+        summary.errors += errors
+        output.writelines(lines_out)
+
+    try:
+        while batch := await asyncio.to_thread(_read_batch, lines, batch_size):
+            summary.carts += len(batch)
+            in_flight.append(asyncio.create_task(_price_batch(service, batch)))
+            if len(in_flight) >= concurrency:
+                await write_oldest()
+        while in_flight:
+            await write_oldest()
+    finally:
+        for task in in_flight:
+            task.cancel()
+    output.flush()
+    summary.seconds = time.perf_counter() - started
+    return summary
+
+
+def _read_batch(lines: Iterator[str], batch_size: int) -> list[PricingRequest | str]:
+    """
+    Read up to `batch_size` requests. Lines that are not valid requests are returned as their error message.
+    """
+    batch: list[PricingRequest | str] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            batch.append(pricing_request_from_dict(json.loads(line)))
+        except (KeyError, TypeError, ValueError, InvalidOperation) as error:
+            batch.append(f"{type(error).__name__}: {error}")
+        if len(batch) == batch_size:
+            break
+    return batch
+
+
+async def _price_batch(service: DiscountService, batch: list[PricingRequest | str]) -> tuple[list[str], int]:
+    """
+    :return: The output lines of the batch, serialized here so priced carts can be released early, and the number
+        of them that are errors.
+    """
+    requests = [request for request in batch if not isinstance(request, str)]
+    try:
+        results: list[DiscountedPrice | str] = [
+            discounted_price async for discounted_price in service.calculate_many(requests, batch_size=len(requests))
+        ]
+    except Exception:
+        # A cart that cannot be priced fails its whole batch, so price them one at a time to find it.
+        results = [await _price_request(service, request) for request in requests]
+    results_in_order = iter(results)
+    lines: list[str] = []
+    errors = 0
+    for request in batch:
+        result = request if isinstance(request, str) else next(results_in_order)
+        if isinstance(result, str):
+            errors += 1
+            lines.append(json.dumps({"error": result}) + "\n")
+        else:
+            lines.append(json.dumps(discounted_price_to_dict(result)) + "\n")
+    return lines, errors
+
+
+async def _price_request(service: DiscountService, request: PricingRequest) -> DiscountedPrice | str:
+    """
+    :return: The request's DiscountedPrice, or the error message if it could not be priced.
+    """
+    try:
+        [discounted_price] = [discounted_price async for discounted_price in service.calculate_many([request])]
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+    return discounted_price
+
+
+def build_processor(repository: InMemoryDiscountRepository, engine: str = "decimal",
+                    workers: int = 0) -> DiscountProcessor:
+    """
+    :param workers: Number of worker processes; 0 prices in the calling process. Requires the decimal engine.
+    """
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    # Products are parsed per request and never shared, so nothing is gained by mutating them.
+    if not workers:
+        return ENGINES[engine](strategy, repository.get_discount_index, mutate_products=False,
+                               rule_compiler=RuleCompiler())
+    processor = ParallelDiscountProcessor(strategy, DiscountIndex(repository.all_discounts), mutate_products=False,
+                                          rule_compiler=RuleCompiler(), max_workers=workers)
+    processor.load_catalogue(repository.all_discounts)
+    return processor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="JSON Lines file of pricing requests, - for stdin")
+    parser.add_argument("--output", help="Write results to this file instead of stdout")
+    catalogue = parser.add_mutually_exclusive_group(required=True)
+    catalogue.add_argument("--catalogue", help="Catalogue file (repositories.catalogue_file) to price against")
+    catalogue.add_argument("--sample-catalogue", action="store_true",
+                           help="Price against the sample catalogue of fake_data instead, as main.py does")
+    parser.add_argument("--engine", choices=list(ENGINES), default="decimal")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Maximum number of batches priced at once (with --workers; otherwise batches are "
+                             "priced one at a time while the next ones are read)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Price batches on this many worker processes (decimal engine only)")
+    args = parser.parse_args()
+    if args.batch_size < 1 or args.concurrency < 1 or args.workers < 0:
+        parser.error("--batch-size and --concurrency must be positive and --workers non-negative")
+    if args.workers and args.engine != "decimal":
+        parser.error("--workers requires --engine decimal")
+
+    if args.catalogue is not None:
+        repository = InMemoryDiscountRepository()
+        repository.update(lambda _: load_catalogue_file(args.catalogue))
+    else:
+        repository = InMemoryDiscountRepository(DUMMY_DISCOUNTS)
+    processor = build_processor(repository, args.engine, args.workers)
+    service = DiscountService(repository, processor, plan_cache=DiscountPlanCache())
+    input_file = sys.stdin if args.input == "-" else open(args.input)
+    output_file = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        summary = asyncio.run(reprice(service, input_file, output_file, batch_size=args.batch_size,
+                                      concurrency=args.concurrency))
+    finally:
+        for file in (input_file, output_file):
+            if file not in (sys.stdin, sys.stdout):
+                file.close()
+        if isinstance(processor, ParallelDiscountProcessor):
+            processor.close()
+    print(f"priced {summary.carts - summary.errors} carts, {summary.errors} invalid, in {summary.seconds:.1f}s "
+          f"({summary.carts / max(summary.seconds, 1e-9):.0f} carts/s)", file=sys.stderr)
+    if summary.errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
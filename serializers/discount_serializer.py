@@ -0,0 +1,127 @@
+"""
+JSON-compatible format for discounts and their rules, used to store catalogues outside the process.
+
+Each discount is one object::
+
+    {"kind": "percentage", "name": "PUMA 40%", "discount_code": "PUMA 40%", "discount_type": "brand_discount",
+     "starts_at": null, "expires_at": "2026-01-01T00:00:00+00:00", "discount_percentage": "40",
+     "rules": [{"kind": "brand", "include": ["PUMA"], "exclude": []}]}
+
+Fixed amount discounts have "kind": "fixed_amount" and a "discount_amount" instead of "discount_percentage".
+Redemption limits, "max_redemptions" and "max_redemptions_per_customer", are null or missing when unlimited.
+Rule kinds are "brand", "category", "customer_tier" (include/exclude) and "payment" (banks/payment_methods).
+Enums are written as their values, money as decimal strings and timestamps in ISO 8601, so discounts round-trip
+exactly. Only the built-in discount and rule classes can be serialized; subclasses may carry behaviour the format
+cannot describe.
+"""
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+from discounts.base import Discount
+from discounts.constants import DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.percentage_discount import PercentageDiscount
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.discount_rule_interface import IDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from models.customer import CustomerTier
+from models.payment import PaymentMethod
+
+
+def discount_to_dict(discount: Discount) -> dict[str, Any]:
+    """
+    :raises TypeError: If the discount or one of its rules is not of a built-in class.
+    """
+    data: dict[str, Any] = {
+        "kind": None,
+        "name": discount.name,
+        "discount_code": discount.discount_code,
+        "discount_type": discount.discount_type.value,
+        "starts_at": None if discount.starts_at is None else discount.starts_at.isoformat(),
+        "expires_at": discount.expires_at.isoformat(),
+        "max_redemptions": discount.max_redemptions,
+        "max_redemptions_per_customer": discount.max_redemptions_per_customer,
+    }
+    if type(discount) is PercentageDiscount:
+        data["kind"] = "percentage"
+        data["discount_percentage"] = str(discount.discount_percentage)
+    elif type(discount) is FixedAmountDiscount:
+        data["kind"] = "fixed_amount"
+        data["discount_amount"] = str(discount.discount_amount)
+    else:
+        raise TypeError(f"Cannot serialize discount of type {type(discount).__name__}")
+    data["rules"] = [rule_to_dict(rule) for rule in discount.discount_rules]
+    return data
+
+
+def discount_from_dict(data: dict[str, Any]) -> Discount:
+    """
+    :raises KeyError, ValueError: If a required field is missing or holds an unknown kind or enum value.
+    """
+    common = dict(
+        name=data["name"],
+        discount_rules=[rule_from_dict(rule) for rule in data["rules"]],
+        discount_type=DiscountType(data["discount_type"]),
+        expires_at=_parse_datetime(data["expires_at"]),
+        discount_code=data.get("discount_code"),
+        starts_at=None if data.get("starts_at") is None else _parse_datetime(data["starts_at"]),
+        max_redemptions=data.get("max_redemptions"),
+        max_redemptions_per_customer=data.get("max_redemptions_per_customer"),
+    )
+    kind = data["kind"]
+    if kind == "percentage":
+        return PercentageDiscount(discount_percentage=Decimal(data["discount_percentage"]), **common)
+    if kind == "fixed_amount":
+        return FixedAmountDiscount(discount_amount=Decimal(data["discount_amount"]), **common)
+    raise ValueError(f"Unknown discount kind: {kind!r}")
+
+
+def rule_to_dict(rule: IDiscountRule) -> dict[str, Any]:
+    """
+    :raises TypeError: If the rule is not of a built-in class.
+    """
+    rule_type = type(rule)
+    if rule_type is BrandDiscountRule:
+        return {"kind": "brand", "include": sorted(rule.include_brands), "exclude": sorted(rule.exclude_brands)}
+    if rule_type is CategoryDiscountRule:
+        return {"kind": "category", "include": sorted(rule.include_categories),
+                "exclude": sorted(rule.exclude_categories)}
+    if rule_type is CustomerTierDiscountRule:
+        return {"kind": "customer_tier", "include": sorted(tier.value for tier in rule.include_tiers),
+                "exclude": sorted(tier.value for tier in rule.exclude_tiers)}
+    if rule_type is PaymentDiscountRule:
+        return {"kind": "payment", "banks": sorted(rule.applicable_banks),
+                "payment_methods": sorted(method.value for method in rule.applicable_payment_methods)}
+    raise TypeError(f"Cannot serialize discount rule of type {rule_type.__name__}")
+
+
+def rule_from_dict(data: dict[str, Any]) -> IDiscountRule:
+    """
+    :raises KeyError, ValueError: If a required field is missing or holds an unknown kind or enum value.
+    """
+    kind = data["kind"]
+    if kind == "brand":
+        return BrandDiscountRule(include_brands=data["include"], exclude_brands=data["exclude"])
+    if kind == "category":
+        return CategoryDiscountRule(include_categories=data["include"], exclude_categories=data["exclude"])
+    if kind == "customer_tier":
+        return CustomerTierDiscountRule(include_tiers=[CustomerTier(tier) for tier in data["include"]],
+                                        exclude_tiers=[CustomerTier(tier) for tier in data["exclude"]])
+    if kind == "payment":
+        return PaymentDiscountRule(applicable_banks=data["banks"],
+                                   applicable_payment_methods=[PaymentMethod(method)
+                                                               for method in data["payment_methods"]])
+    raise ValueError(f"Unknown discount rule kind: {kind!r}")
+
+
+@lru_cache(maxsize=4096)
+def _parse_datetime(value: str) -> datetime:
+    # Catalogues share a handful of campaign dates, and datetime objects are immutable, so parses are reused.
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        raise ValueError(f"Timestamp without a timezone: {value!r}")
+    return parsed
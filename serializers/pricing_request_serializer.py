@@ -0,0 +1,145 @@
+"""
+JSON Lines format for pricing requests and their results.
+
+Each request is one JSON object per line::
+
+    {"customer": {"id": "C1", "name": "Jane", "tier": "gold", "email": "...", "phone": "..."},
+     "cart_items": [{"product": {"id": "P1", "brand": "PUMA", "brand_tier": "premium", "category": "T-Shirt",
+                                 "base_price": "1000.00", "current_price": "1000.00"},
+                     "quantity": 1, "size": "M"}],
+     "payment_info": {"method": "card_payment", "bank_name": "ICICI Bank", "card_type": "credit_card"},
+     "voucher_code": "SUPER69"}
+
+Enums are written as their values and money as decimal strings, so amounts round-trip exactly.
+`payment_info`, `voucher_code` and `current_price` (defaults to `base_price`) are optional.
+"""
+import json
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, TextIO
+
+from models.cart import CartItem
+from models.customer import CustomerProfile, CustomerTier
+from models.discount import DiscountedPrice
+from models.payment import CardType, PaymentInfo, PaymentMethod
+from models.pricing_request import PricingRequest
+from models.product import BrandTier, Product
+
+
+def pricing_request_to_dict(request: PricingRequest) -> dict[str, Any]:
+    customer, payment_info = request.customer, request.payment_info
+    return {
+        "customer": {
+            "id": customer.id,
+            "name": customer.name,
+            "tier": customer.tier.value,
+            "email": customer.email,
+            "phone": customer.phone,
+        },
+        "cart_items": [
+            {
+                "product": {
+                    "id": item.product.id,
+                    "brand": item.product.brand,
+                    "brand_tier": item.product.brand_tier.value,
+                    "category": item.product.category,
+                    "base_price": str(item.product.base_price),
+                    "current_price": str(item.product.current_price),
+                },
+                "quantity": item.quantity,
+                "size": item.size,
+            }
+            for item in request.cart_items
+        ],
+        "payment_info": None if payment_info is None else {
+            "method": payment_info.method.value,
+            "bank_name": payment_info.bank_name,
+            "card_type": None if payment_info.card_type is None else payment_info.card_type.value,
+        },
+        "voucher_code": request.voucher_code,
+    }
+
+
+def pricing_request_from_dict(data: dict[str, Any]) -> PricingRequest:
+    """
+    :raises KeyError, ValueError: If a required field is missing, holds an unknown enum value or a quantity that
+        is not a positive integer.
+    :raises decimal.InvalidOperation: If a price is not a decimal number.
+    """
+    customer = data["customer"]
+    payment_info = data.get("payment_info")
+    return PricingRequest(
+        cart_items=[_cart_item_from_dict(item) for item in data["cart_items"]],
+        customer=CustomerProfile(id=customer["id"], name=customer["name"], tier=CustomerTier(customer["tier"]),
+                                 email=customer["email"], phone=customer["phone"]),
+        payment_info=None if payment_info is None else PaymentInfo(
+            method=PaymentMethod(payment_info["method"]),
+            bank_name=payment_info.get("bank_name"),
+            card_type=None if payment_info.get("card_type") is None else CardType(payment_info["card_type"]),
+        ),
+        voucher_code=data.get("voucher_code"),
+    )
+
+
+def discounted_price_to_dict(discounted_price: DiscountedPrice) -> dict[str, Any]:
+    return {
+        "original_price": str(discounted_price.original_price),
+        "final_price": str(discounted_price.final_price),
+        "applied_discounts": {name: str(amount) for name, amount in discounted_price.applied_discounts.items()},
+        "message": discounted_price.message,
+        "line_items": [
+            {
+                "product_id": line_item.product_id,
+                "quantity": line_item.quantity,
+                "unit_price": str(line_item.unit_price),
+                "final_unit_price": str(line_item.final_unit_price),
+                "applied_discounts": {name: str(amount) for name, amount in line_item.applied_discounts.items()},
+            }
+            for line_item in discounted_price.line_items
+        ],
+    }
+
+
+def read_pricing_requests(lines: Iterable[str]) -> Iterator[PricingRequest]:
+    """
+    Lazily decode a JSON Lines stream of pricing requests. Blank lines are skipped.
+
+    :param lines: E.g. an open file or `sys.stdin`.
+    """
+    for line in lines:
+        if line.strip():
+            yield pricing_request_from_dict(json.loads(line))
+
+
+def write_pricing_requests(requests: Iterable[PricingRequest], file: TextIO) -> int:
+    """
+    Write pricing requests as JSON Lines.
+
+    :return: The number of requests written.
+    """
+    written = 0
+    for request in requests:
+        file.write(json.dumps(pricing_request_to_dict(request)) + "\n")
+        written += 1
+    return written
+
+
+def _cart_item_from_dict(data: dict[str, Any]) -> CartItem:
+    product = data["product"]
+    quantity = data["quantity"]
+    # bool is an int subclass, but `true` is no quantity.
+    if type(quantity) is not int or quantity < 1:
+        raise ValueError(f"Quantity must be a positive integer, got {quantity!r}")
+    base_price = Decimal(product["base_price"])
+    current_price = product.get("current_price")
+    return CartItem(
+        product=Product(
+            id=product["id"],
+            brand=product["brand"],
+            brand_tier=BrandTier(product["brand_tier"]),
+            category=product["category"],
+            base_price=base_price,
+            current_price=base_price if current_price is None else Decimal(current_price),
+        ),
+        quantity=quantity,
+        size=data["size"],
+    )
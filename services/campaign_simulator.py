@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Callable, Iterable
+
+import clock
+from discounts.base import Discount
+from discounts.processing_strategies.discount_processing_strategy_interface import IDiscountProcessingStrategy
+from discounts.processor.applicability_cache import ApplicabilityCache
+from discounts.processor.columnar_discount_processor import ColumnarDiscountProcessor
+from discounts.processor.discount_processor import DiscountProcessor, PricingJob
+from discounts.rules.rule_compiler import RuleCompiler
+from models.discount import DiscountedPrice
+from models.pricing_request import PricingRequest
+from models.product import Product
+from repositories.discount_catalogue import DiscountCatalogue
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_plan_cache import DiscountPlan, DiscountPlanCache
+from services.discount_service import DiscountService
+
+
+@dataclass
+class CampaignReport:
+    """
+    Aggregate effect of a campaign on a corpus of carts. Amounts are totals over every cart, quantities included.
+    """
+    carts: int = 0
+    # Carts the campaign's discounts apply to, and carts whose final price changes. These differ when the
+    # campaign displaces a discount the strategy would otherwise have applied.
+    carts_applied: int = 0
+    carts_affected: int = 0
+    baseline_revenue: Decimal = Decimal(0)
+    campaign_revenue: Decimal = Decimal(0)
+    # What the campaign's own discounts take off, before the effect of displaced discounts.
+    campaign_discount: Decimal = Decimal(0)
+    # Cost of the goods sold, when unit costs are known. Not changed by the campaign.
+    cost: Decimal | None = None
+
+    @property
+    def revenue_delta(self) -> Decimal:
+        return self.campaign_revenue - self.baseline_revenue
+
+    @property
+    def baseline_margin_rate(self) -> float | None:
+        return _margin_rate(self.baseline_revenue, self.cost)
+
+    @property
+    def campaign_margin_rate(self) -> float | None:
+        return _margin_rate(self.campaign_revenue, self.cost)
+
+
+def _margin_rate(revenue: Decimal, cost: Decimal | None) -> float | None:
+    if cost is None or not revenue:
+        return None
+    return float((revenue - cost) / revenue)
+
+
+class CampaignSimulator:
+    """
+    Dry-runs a proposed campaign over historical carts, pricing each one against the current catalogue and
+    against the catalogue with the campaign added, without changing the repository.
+
+    Carts are priced in batches through `DiscountProcessor.apply_discounts_many`, so rule evaluation is shared
+    within a batch, and with ColumnarDiscountProcessor by default. A cart is only priced against the campaign
+    catalogue when the campaign can change its price: when the campaign changes its segment's resolved discounts
+    other than by being added to them, or when one of the campaign's discounts matches one of its lines.
+    """
+
+    def __init__(
+            self,
+            repository: InMemoryDiscountRepository,
+            strategy: IDiscountProcessingStrategy,
+            *,
+            engine: type[DiscountProcessor] = ColumnarDiscountProcessor,
+            batch_size: int = 10_000
+    ) -> None:
+        """
+        :param repository: The current catalogue, read once per simulation.
+        :param strategy: The strategy used in production.
+        :param engine: Processor class carts are priced with. Products are never mutated.
+        :param batch_size: Number of carts priced together.
+        """
+        self._repository = repository
+        self._strategy = strategy
+        self._engine = engine
+        self._batch_size = batch_size
+
+    async def simulate(
+            self,
+            campaign: Discount | Iterable[Discount],
+            carts: Iterable[PricingRequest | tuple],
+            *,
+            unit_cost: Callable[[Product], Decimal] | None = None,
+            now: datetime | None = None
+    ) -> CampaignReport:
+        """
+        :param campaign: The proposed discount or discounts. Their names must not be used by the catalogue.
+        :param carts: (cart_items, customer, payment_info, voucher_code) tuples or PricingRequest objects.
+        :param unit_cost: Optional cost of a unit of a product, to report margins.
+        :param now: Instant the campaign is evaluated at, defaults to the time of the call.
+        """
+        now = now or clock.now()
+        campaign = [campaign] if isinstance(campaign, Discount) else list(campaign)
+        campaign_names = {discount.name for discount in campaign}
+        catalogue = self._repository.catalogue
+        baseline = self._pricer(catalogue)
+        with_campaign = self._pricer(catalogue.with_changes(discounts=catalogue.discounts + tuple(campaign), now=now))
+        report = CampaignReport(cost=None if unit_cost is None else Decimal(0))
+        carts = iter(carts)
+        while batch := [PricingRequest(*cart) for cart in islice(carts, self._batch_size)]:
+            baseline_prices, campaign_prices = await self._price_batch(batch, baseline, with_campaign, campaign,
+                                                                       now)
+            for request, baseline_price, campaign_price in zip(batch, baseline_prices, campaign_prices):
+                report.carts += 1
+                report.baseline_revenue += baseline_price.final_price
+                if unit_cost is not None:
+                    report.cost += sum(unit_cost(item.product) * item.quantity for item in request.cart_items)
+                if campaign_price is None:
+                    report.campaign_revenue += baseline_price.final_price
+                    continue
+                report.campaign_revenue += campaign_price.final_price
+                report.carts_affected += campaign_price.final_price != baseline_price.final_price
+                if campaign_names.intersection(campaign_price.applied_discounts):
+                    report.carts_applied += 1
+                    report.campaign_discount += sum(
+                        amount * line.quantity for line in campaign_price.line_items
+                        for name, amount in line.applied_discounts.items() if name in campaign_names
+                    )
+        return report
+
+    def _pricer(self, catalogue: DiscountCatalogue) -> tuple[DiscountService, DiscountProcessor]:
+        """
+        :return: A service over `catalogue` and its processor.
+        """
+        repository = InMemoryDiscountRepository()
+        repository.update(lambda _: catalogue)
+        processor = self._engine(self._strategy, repository.get_discount_index, mutate_products=False,
+                                 rule_compiler=RuleCompiler())
+        return DiscountService(repository, processor, plan_cache=DiscountPlanCache()), processor
+
+    async def _price_batch(
+            self,
+            batch: list[PricingRequest],
+            baseline: tuple[DiscountService, DiscountProcessor],
+            with_campaign: tuple[DiscountService, DiscountProcessor],
+            campaign: list[Discount],
+            now: datetime
+    ) -> tuple[list[DiscountedPrice], list[DiscountedPrice | None]]:
+        """
+        :return: The baseline price of every cart, and its price with the campaign or None when it is unchanged.
+        """
+        (baseline_service, baseline_processor), (campaign_service, campaign_processor) = baseline, with_campaign
+        if baseline_processor.resolves_per_cart:
+            # Resolutions depend on the cart, so every cart is priced both ways.
+            return ([price async for price in baseline_service.calculate_many(batch, batch_size=len(batch))],
+                    [price async for price in campaign_service.calculate_many(batch, batch_size=len(batch))])
+
+        baseline_jobs: list[PricingJob] = []
+        campaign_jobs: list[PricingJob] = []
+        campaign_positions: list[int] = []
+        applicability_cache = ApplicabilityCache()
+        for position, request in enumerate(batch):
+            baseline_plan, campaign_plan = [
+                await service.get_discount_plan(request.customer, request.payment_info, request.voucher_code, now)
+                for service in (baseline_service, campaign_service)
+            ]
+            job = PricingJob(resolved_discounts=baseline_plan.resolved_discounts, customer_profile=request.customer,
+                             cart_items=request.cart_items, payment_info=request.payment_info)
+            baseline_jobs.append(job)
+            if self._changes_price(job, baseline_plan, campaign_plan, campaign, applicability_cache, now):
+                campaign_jobs.append(job._replace(resolved_discounts=campaign_plan.resolved_discounts))
+                campaign_positions.append(position)
+
+        baseline_prices = baseline_processor.apply_discounts_many(baseline_jobs, now=now)
+        campaign_prices: list[DiscountedPrice | None] = [None] * len(batch)
+        for position, campaign_price in zip(campaign_positions,
+                                            campaign_processor.apply_discounts_many(campaign_jobs, now=now)):
+            campaign_prices[position] = campaign_price
+        return baseline_prices, campaign_prices
+
+    @staticmethod
+    def _changes_price(job: PricingJob, baseline_plan: DiscountPlan, campaign_plan: DiscountPlan,
+                       campaign: list[Discount], applicability_cache: ApplicabilityCache, now: datetime) -> bool:
+        """
+        Whether the campaign can change the price of a cart. It cannot when the campaign plan is the baseline
+        plan with campaign discounts added that match none of the cart's lines.
+        """
+        campaign_ids = {id(discount) for discount in campaign}
+        resolved_campaign = [discount for discount in campaign_plan.resolved_discounts if id(discount) in campaign_ids]
+        if [discount for discount in campaign_plan.resolved_discounts
+                if id(discount) not in campaign_ids] != baseline_plan.resolved_discounts:
+            return True
+        return any(
+            discount.is_active(now) and any(
+                applicability_cache.matches_rules(discount, job.customer_profile, item, job.payment_info)
+                for item in job.cart_items
+            )
+            for discount in resolved_campaign
+        )
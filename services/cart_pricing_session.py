@@ -0,0 +1,171 @@
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+import clock
+from discounts.base import Discount
+from discounts.processor.discount_processor import DiscountProcessor
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.discount import DiscountedLineItem, DiscountedPrice
+from models.payment import PaymentInfo
+from services.discount_plan_cache import DiscountPlan
+
+if TYPE_CHECKING:
+    from services.discount_service import DiscountService
+
+
+class CartPricingSession:
+    """
+    Prices a cart that changes one line at a time, e.g. a shopping cart between add-to-cart clicks.
+    Start one with `DiscountService.start_cart_session`.
+
+    A line is priced alone, against the segment's discount plan, when it is added or changed, and the cart
+    totals are kept as running sums, so an edit costs the same however large the cart is. `price` returns what
+    `DiscountService.calculate_cart_discounts` would for the same lines. Every line is repriced when the plan
+    changes (a new catalogue version, or a different listing without a plan cache) or one of its discounts
+    starts or expires.
+
+    Carts are priced in full by `price` instead when the processor's line results do not add up to its cart
+    results (see `DiscountProcessor.prices_lines_independently`) or the strategy depends on the cart.
+    Line items are shared between the results of successive `price` calls.
+    """
+
+    def __init__(self, discount_service: "DiscountService", discount_processor: DiscountProcessor,
+                 customer: CustomerProfile, payment_info: PaymentInfo | None = None,
+                 voucher_code: str | None = None) -> None:
+        """
+        :param discount_processor: The processor of `discount_service`, used to price single lines.
+        """
+        self._discount_service = discount_service
+        self._discount_processor = discount_processor
+        self._customer = customer
+        self._payment_info = payment_info
+        self._voucher_code = voucher_code
+        self._cart_items: dict[int, CartItem] = {}
+        self._next_handle = 0
+        self._plan: DiscountPlan | None = None
+        self._plan_valid_until: datetime | None = None
+        # Both in cart order, like `_cart_items`, once the cart is priced.
+        self._line_results: dict[int, DiscountedPrice] = {}
+        self._line_items: dict[int, DiscountedLineItem] = {}
+        self._reset_totals()
+
+    @property
+    def cart_items(self) -> list[CartItem]:
+        return list(self._cart_items.values())
+
+    def add_item(self, cart_item: CartItem) -> int:
+        """
+        Append a line to the cart.
+
+        :return: The handle identifying the line in `update_item` and `remove_item`.
+        """
+        handle = self._next_handle
+        self._next_handle += 1
+        self._cart_items[handle] = cart_item
+        if self._plan is not None:
+            self._price_line(handle, clock.now())
+        return handle
+
+    def update_item(self, handle: int, cart_item: CartItem) -> None:
+        """
+        Replace a line, e.g. with a new quantity, keeping its position in the cart.
+
+        :raises KeyError: If no line has this handle.
+        """
+        if handle not in self._cart_items:
+            raise KeyError(handle)
+        self._cart_items[handle] = cart_item
+        if self._plan is not None:
+            # Overwritten in place, so the line keeps its position.
+            self._forget_line(handle)
+            self._price_line(handle, clock.now())
+
+    def remove_item(self, handle: int) -> None:
+        """
+        :raises KeyError: If no line has this handle.
+        """
+        del self._cart_items[handle]
+        if handle in self._line_results:
+            self._forget_line(handle)
+            del self._line_results[handle], self._line_items[handle]
+
+    async def price(self) -> DiscountedPrice:
+        """
+        Price the cart as it is now.
+        """
+        now = clock.now()
+        plan = None
+        if self._discount_processor.prices_lines_independently:
+            plan = await self._discount_service.get_discount_plan(self._customer, self._payment_info,
+                                                                  self._voucher_code, now)
+        if plan is None:
+            return await self._discount_service.calculate_cart_discounts(self.cart_items, self._customer,
+                                                                         self._payment_info, self._voucher_code)
+        if plan != self._plan or (self._plan_valid_until is not None and now >= self._plan_valid_until):
+            self._plan = plan
+            self._plan_valid_until = _next_transition(plan.resolved_discounts, now)
+            self._reset_totals()
+            for handle in self._cart_items:
+                self._price_line(handle, now)
+
+        # Rebuilt in resolution order, the order a full reprice applies the discounts in.
+        applied_discounts: dict[str, Decimal] = {}
+        message = ""
+        for discount in plan.resolved_discounts:
+            name = discount.name
+            if name in self._applied_discounts:
+                applied_discounts[name] = self._applied_discounts[name]
+                message += f"| Applied {name} | "
+        return DiscountedPrice(
+            original_price=self._original_price,
+            final_price=self._final_price,
+            applied_discounts=applied_discounts,
+            message=message + plan.message,
+            line_items=list(self._line_items.values()),
+        )
+
+    def _reset_totals(self) -> None:
+        self._line_results.clear()
+        self._line_items.clear()
+        self._original_price = Decimal(0)
+        self._final_price = Decimal(0)
+        self._applied_discounts: dict[str, Decimal] = {}
+        # Number of lines each discount applies to, so a discount is dropped once it applies to none.
+        self._discounted_lines: Counter[str] = Counter()
+
+    def _price_line(self, handle: int, now: datetime) -> None:
+        result = self._discount_processor.apply_resolved_discounts(
+            resolved_discounts=self._plan.resolved_discounts, customer_profile=self._customer,
+            cart_items=[self._cart_items[handle]], payment_info=self._payment_info, now=now)
+        self._line_results[handle] = result
+        self._line_items[handle] = result.line_items[0]
+        self._original_price += result.original_price
+        self._final_price += result.final_price
+        for name, amount in result.applied_discounts.items():
+            self._applied_discounts[name] = self._applied_discounts.get(name, Decimal(0)) + amount
+            self._discounted_lines[name] += 1
+
+    def _forget_line(self, handle: int) -> None:
+        """
+        Take a priced line's contribution out of the cart totals.
+        """
+        result = self._line_results[handle]
+        self._original_price -= result.original_price
+        self._final_price -= result.final_price
+        for name, amount in result.applied_discounts.items():
+            self._discounted_lines[name] -= 1
+            if self._discounted_lines[name]:
+                self._applied_discounts[name] -= amount
+            else:
+                del self._discounted_lines[name], self._applied_discounts[name]
+
+
+def _next_transition(discounts: list[Discount], now: datetime) -> datetime | None:
+    """
+    :return: The first start or expiry among `discounts` after `now`, when the plan's results may change.
+    """
+    return min((moment for discount in discounts for moment in (discount.starts_at, discount.expires_at)
+                if moment is not None and moment > now), default=None)
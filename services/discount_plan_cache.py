@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import Hashable, NamedTuple
+
+from discounts.base import Discount
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from models.cache_stats import CacheStats
+from models.customer import CustomerProfile
+from models.payment import PaymentInfo
+
+# Rules that read nothing but the customer tier and the payment method and bank.
+SEGMENT_RULE_TYPES = frozenset({CustomerTierDiscountRule, PaymentDiscountRule})
+
+
+class DiscountPlan(NamedTuple):
+    """The resolved discounts of a segment and the message added to every result priced with them."""
+    resolved_discounts: list[Discount]
+    message: str = ""
+
+
+def segment_key(customer: CustomerProfile, payment_info: PaymentInfo | None,
+                voucher_code: str | None) -> tuple[Hashable, ...]:
+    """
+    The attributes a discount plan depends on, besides the catalogue.
+    """
+    if payment_info is None:
+        return customer.tier, None, None, voucher_code or None
+    return customer.tier, payment_info.method, payment_info.bank_name, voucher_code or None
+
+
+def admits_segment(discount: Discount, customer: CustomerProfile, payment_info: PaymentInfo | None) -> bool:
+    """
+    Check the discount's customer tier and payment rules, which give the same answer for every cart of a segment.
+    A discount rejected here cannot apply to any line of the segment's carts.
+    """
+    for rule in discount.discount_rules:
+        if type(rule) in SEGMENT_RULE_TYPES and not rule.is_applicable(customer_profile=customer, cart_item=None,
+                                                                        payment_info=payment_info):
+            return False
+    return True
+
+
+class DiscountPlanCache:
+    """
+    LRU cache of discount plans per segment key, see `segment_key`.
+
+    Every plan belongs to the catalogue version it was built from. A lookup with another version drops every
+    cached plan, since a new version means discounts were added, removed, started or expired.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        """
+        :param max_entries: Maximum number of cached plans, the least recently used one is evicted first.
+        """
+        self._max_entries = max_entries
+        self._plans: OrderedDict[tuple[Hashable, ...], DiscountPlan] = OrderedDict()
+        self._catalogue_version: int | None = None
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def get(self, catalogue_version: int, key: tuple[Hashable, ...]) -> DiscountPlan | None:
+        if catalogue_version != self._catalogue_version:
+            self.invalidate()
+            self._catalogue_version = catalogue_version
+        plan = self._plans.get(key)
+        if plan is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._plans.move_to_end(key)
+        return plan
+
+    def put(self, catalogue_version: int, key: tuple[Hashable, ...], plan: DiscountPlan) -> None:
+        if catalogue_version != self._catalogue_version:
+            # Built against a catalogue that has changed since.
+            return
+        self._plans[key] = plan
+        self._plans.move_to_end(key)
+        while len(self._plans) > self._max_entries:
+            self._plans.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self) -> None:
+        """
+        Drop all cached plans.
+        """
+        self.stats.evictions += len(self._plans)
+        self._plans.clear()
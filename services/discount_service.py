@@ -1,20 +1,48 @@
-from typing import List, Optional
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
 
+import clock
 from discounts.base import Discount
 from discounts.constants import DiscountType
-from discounts.processor.discount_processor import DiscountProcessor
-from exceptions import DiscountNotFoundException, DiscountExpiredException
+from discounts.processing_strategies.discount_processing_strategy_interface import CartContext
+from discounts.processor.discount_processor import DiscountProcessor, PricingJob
+from exceptions import DiscountNotFoundException, DiscountExpiredException, DiscountNotStartedException
+from instrumentation.instrumentation_interface import IInstrumentation, NO_OP_INSTRUMENTATION
 from models.cart import CartItem
 from models.customer import CustomerProfile
 from models.discount import DiscountedPrice
 from models.payment import PaymentInfo
+from models.pricing_request import PricingRequest
 from repositories.discount_repository import IDiscountRepository
+from services.cart_pricing_session import CartPricingSession
+from services.discount_plan_cache import DiscountPlan, DiscountPlanCache, admits_segment, segment_key
+from services.discounted_price_cache import DiscountedPriceCache, cart_fingerprint
+from services.redemption_limiter import RedemptionLimiter, RedemptionReservation
 
 
 class DiscountService:
-    def __init__(self, discount_repository: IDiscountRepository, discount_processor: DiscountProcessor):
+    def __init__(self, discount_repository: IDiscountRepository, discount_processor: DiscountProcessor,
+                 plan_cache: DiscountPlanCache | None = None, instrumentation: IInstrumentation | None = None,
+                 redemption_limiter: RedemptionLimiter | None = None,
+                 price_cache: DiscountedPriceCache | None = None):
+        """
+        :param plan_cache: Optional cache of resolved discounts per customer segment and voucher code. It is only
+            used with repositories that report a catalogue version and strategies that do not depend on the cart.
+        :param instrumentation: Optional receiver of the request latencies ("service.calculate_cart_discounts",
+            "service.calculate_batch") and the "plan_cache.hits"/"misses" and "price_cache.hits"/"misses" counters.
+            Pass the same instance to the processor and an InstrumentedDiscountRepository for the stages below.
+        :param redemption_limiter: Enforces the redemption limits of discount codes, defaults to a limiter of its
+            own over `discount_repository`. Services of one process should share one.
+        :param price_cache: Optional cache of `calculate_cart_discounts` results per cart fingerprint. It is only used
+            with repositories that report a catalogue version and processors that do not mutate products.
+        """
         self._discount_repository = discount_repository
         self._discount_processor = discount_processor
+        self._plan_cache = plan_cache
+        self._instrumentation = instrumentation or NO_OP_INSTRUMENTATION
+        self._redemption_limiter = redemption_limiter or RedemptionLimiter(discount_repository)
+        self._price_cache = price_cache
 
     async def calculate_cart_discounts(
             self,
@@ -23,20 +51,218 @@ class DiscountService:
             payment_info: Optional[PaymentInfo] = None,
             voucher_code: Optional[str] = None
     ) -> DiscountedPrice:
+        # A voucher this process has found fully redeemed is priced as no voucher, with a message saying so.
+        if voucher_code and self._redemption_limiter.is_exhausted(voucher_code):
+            discount_price = await self.calculate_cart_discounts(cart_items, customer, payment_info)
+            discount_price.message += _exhausted_voucher_message(voucher_code)
+            return discount_price
+        with self._instrumentation.time("service.calculate_cart_discounts"):
+            price_cache = self._price_cache
+            if price_cache is None or self._discount_processor.mutates_products:
+                return await self._price_cart(cart_items, customer, payment_info, voucher_code)
+            catalogue_version = await self._discount_repository.get_catalogue_version()
+            if catalogue_version is None:
+                return await self._price_cart(cart_items, customer, payment_info, voucher_code)
+            fingerprint = cart_fingerprint(cart_items, customer, payment_info, voucher_code, catalogue_version)
+            discount_price = price_cache.get(catalogue_version, fingerprint)
+            if self._instrumentation.enabled:
+                self._instrumentation.increment(
+                    "price_cache.misses" if discount_price is None else "price_cache.hits")
+            if discount_price is None:
+                discount_price = await self._price_cart(cart_items, customer, payment_info, voucher_code)
+                price_cache.put(catalogue_version, fingerprint, discount_price)
+            return discount_price
+
+    async def _price_cart(
+            self,
+            cart_items: List[CartItem],
+            customer: CustomerProfile,
+            payment_info: Optional[PaymentInfo],
+            voucher_code: Optional[str]
+    ) -> DiscountedPrice:
+        # One evaluation timestamp per request, so listing and pricing agree on which discounts are active.
+        now = clock.now()
+        plan = await self._cached_plan(customer, payment_info, voucher_code, now)
+        if plan is not None:
+            discount_price = self._discount_processor.apply_resolved_discounts(
+                resolved_discounts=plan.resolved_discounts, customer_profile=customer, cart_items=cart_items,
+                payment_info=payment_info, now=now)
+            discount_price.message += plan.message
+            return discount_price
+
+        active_discounts, message = await self._discounts_with_voucher(voucher_code, now)
+        discount_price = self._discount_processor.apply_discounts(customer_profile=customer,
+                                                                  cart_items=cart_items,
+                                                                  payment_info=payment_info,
+                                                                  discounts=active_discounts, now=now)
+        discount_price.message += message
+        return discount_price
+
+    async def calculate_many(
+            self,
+            requests: Iterable[PricingRequest | tuple],
+            batch_size: int = 1000
+    ) -> AsyncIterator[DiscountedPrice]:
+        """
+        Price a stream of carts, yielding results in request order.
+
+        Active discounts are fetched once per batch, each voucher code is looked up and resolved once per batch
+        (per cart for strategies that depend on the cart), and rule evaluation is shared between the carts of a batch.
+
+        :param requests: (cart_items, customer, payment_info, voucher_code) tuples or PricingRequest objects.
+        :param batch_size: Number of carts priced against the same snapshot of active discounts.
+        :return: An async iterator of DiscountedPrice, one per request.
+        """
+        requests = iter(requests)
+        while batch := [PricingRequest(*request) for request in islice(requests, batch_size)]:
+            with self._instrumentation.time("service.calculate_batch"):
+                discounted_prices = await self._calculate_batch(batch)
+            for discounted_price in discounted_prices:
+                yield discounted_price
+
+    async def _calculate_batch(self, batch: list[PricingRequest]) -> list[DiscountedPrice]:
+        now = clock.now()
+        # Only listed once a cart misses the plan cache.
+        active_discounts: Sequence[Discount] | None = None
+        processor = self._discount_processor
+        plans: dict[str | None, tuple[list[Discount], list[Discount] | None, str]] = {}
+        jobs: list[PricingJob] = []
+        messages: list[str] = []
+        for request in batch:
+            voucher_code = request.voucher_code or None
+            voucher_message = ""
+            if voucher_code and self._redemption_limiter.is_exhausted(voucher_code):
+                voucher_code, voucher_message = None, _exhausted_voucher_message(voucher_code)
+            plan = await self._cached_plan(request.customer, request.payment_info, voucher_code, now)
+            if plan is not None:
+                jobs.append(PricingJob(resolved_discounts=plan.resolved_discounts, customer_profile=request.customer,
+                                       cart_items=request.cart_items, payment_info=request.payment_info))
+                messages.append(plan.message + voucher_message)
+                continue
+            if voucher_code not in plans:
+                if active_discounts is None:
+                    active_discounts = await self._discount_repository.list_all_active_discounts(
+                        exclude_discount_type={DiscountType.VOUCHER_DISCOUNT}, now=now)
+                discounts, message = list(active_discounts), ""
+                if voucher_code:
+                    voucher_discount: Discount = await self._discount_repository.get_discount_by_code(voucher_code)
+                    if voucher_discount:
+                        discounts.append(voucher_discount)
+                    else:
+                        message = f" Invalid voucher code : {voucher_code} "
+                shared_resolution = None if processor.resolves_per_cart else processor.resolve_discounts(discounts)
+                plans[voucher_code] = (discounts, shared_resolution, message)
+            discounts, resolved_discounts, message = plans[voucher_code]
+            if resolved_discounts is None:
+                resolved_discounts = processor.resolve_discounts(list(discounts), CartContext(
+                    customer_profile=request.customer, cart_items=request.cart_items,
+                    payment_info=request.payment_info, now=now))
+            jobs.append(PricingJob(resolved_discounts=resolved_discounts, customer_profile=request.customer,
+                                   cart_items=request.cart_items, payment_info=request.payment_info))
+            messages.append(message + voucher_message)
+
+        discounted_prices = await processor.apply_discounts_many_async(jobs, now=now)
+        for discounted_price, message in zip(discounted_prices, messages):
+            discounted_price.message += message
+        return discounted_prices
+
+    async def _discounts_with_voucher(self, voucher_code: str | None,
+                                      now: datetime) -> tuple[list[Discount], str]:
+        """
+        :return: The active discounts, plus the voucher's discount if the code is valid, and the message to report.
+        """
         message: str = ""
-        active_discounts: list[Discount] = await self._discount_repository.list_all_active_discounts(
-            exclude_discount_type={DiscountType.VOUCHER_DISCOUNT})
+        # Copied, since the voucher is appended and the listing may be shared.
+        active_discounts: list[Discount] = list(await self._discount_repository.list_all_active_discounts(
+            exclude_discount_type={DiscountType.VOUCHER_DISCOUNT}, now=now))
         if voucher_code:
             voucher_discount: Discount = await self._discount_repository.get_discount_by_code(voucher_code)
             if voucher_discount:
                 active_discounts.append(voucher_discount)
             else:
                 message = f" Invalid voucher code : {voucher_code} "
+        return active_discounts, message
 
-        discount_price = self._discount_processor.apply_discounts(customer_profile=customer, cart_items=cart_items,
-                                                                  payment_info=payment_info, discounts=active_discounts)
-        discount_price.message += message
-        return discount_price
+    async def get_discount_plan(
+            self,
+            customer: CustomerProfile,
+            payment_info: PaymentInfo | None = None,
+            voucher_code: str | None = None,
+            now: datetime | None = None
+    ) -> DiscountPlan | None:
+        """
+        The resolved discounts every cart of a customer segment is priced with.
+
+        With a plan cache, the same plan object is returned until the catalogue version changes. A voucher this
+        process has found fully redeemed is left out, as in `calculate_cart_discounts`.
+
+        :return: The plan, or None if the strategy depends on the cart.
+        """
+        if self._discount_processor.resolves_per_cart:
+            return None
+        now = now or clock.now()
+        if voucher_code and self._redemption_limiter.is_exhausted(voucher_code):
+            plan = await self.get_discount_plan(customer, payment_info, None, now)
+            return plan._replace(message=plan.message + _exhausted_voucher_message(voucher_code))
+        plan = await self._cached_plan(customer, payment_info, voucher_code, now)
+        if plan is None:
+            plan = await self._build_plan(customer, payment_info, voucher_code, now)
+        return plan
+
+    def start_cart_session(
+            self,
+            customer: CustomerProfile,
+            payment_info: PaymentInfo | None = None,
+            voucher_code: str | None = None
+    ) -> CartPricingSession:
+        """
+        Start pricing a cart that is edited line by line, see CartPricingSession.
+        """
+        return CartPricingSession(self, self._discount_processor, customer, payment_info, voucher_code)
+
+    async def _cached_plan(
+            self,
+            customer: CustomerProfile,
+            payment_info: PaymentInfo | None,
+            voucher_code: str | None,
+            now: datetime
+    ) -> DiscountPlan | None:
+        """
+        Get the segment's discount plan from the plan cache, building it on a miss.
+
+        :return: The plan, or None if plans cannot be cached.
+        """
+        plan_cache = self._plan_cache
+        if plan_cache is None or self._discount_processor.resolves_per_cart:
+            return None
+        catalogue_version = await self._discount_repository.get_catalogue_version()
+        if catalogue_version is None:
+            return None
+        key = segment_key(customer, payment_info, voucher_code)
+        plan = plan_cache.get(catalogue_version, key)
+        if self._instrumentation.enabled:
+            self._instrumentation.increment("plan_cache.misses" if plan is None else "plan_cache.hits")
+        if plan is None:
+            plan = await self._build_plan(customer, payment_info, voucher_code, now)
+            plan_cache.put(catalogue_version, key, plan)
+        return plan
+
+    async def _build_plan(
+            self,
+            customer: CustomerProfile,
+            payment_info: PaymentInfo | None,
+            voucher_code: str | None,
+            now: datetime
+    ) -> DiscountPlan:
+        discounts, message = await self._discounts_with_voucher(voucher_code, now)
+        # Discounts whose tier or payment rules reject the segment would never apply, so they are left out.
+        return DiscountPlan(
+            resolved_discounts=[
+                discount for discount in self._discount_processor.resolve_discounts(discounts)
+                if admits_segment(discount, customer, payment_info)
+            ],
+            message=message,
+        )
 
     async def validate_discount_code(
             self,
@@ -44,12 +270,57 @@ class DiscountService:
             cart_items: List[CartItem],
             customer: CustomerProfile
     ) -> bool:
+        """
+        Check that the code can be used now and that one of the cart's items matches its rules.
+
+        :raises DiscountNotFoundException, DiscountExpiredException, DiscountNotStartedException: If the code is
+            unknown, expired or not active yet.
+        :raises RedemptionLimitExceededException: If the code has no redemptions left, in total or for the customer.
+        """
+        discount = await self._active_discount_by_code(code)
+        await self._redemption_limiter.check(discount, customer.id)
+        return any(
+            discount.matches_rules(customer_profile=customer, cart_item=cart_item) for cart_item in cart_items
+        )
+
+    async def reserve_redemption(self, code: str, customer: CustomerProfile) -> RedemptionReservation:
+        """
+        Hold one redemption of a discount code for the customer's checkout. Commit it with `commit_redemption`
+        once the order is placed, or give it back with `release_redemption`.
+
+        :raises DiscountNotFoundException, DiscountExpiredException, DiscountNotStartedException: As
+            `validate_discount_code`.
+        :raises RedemptionLimitExceededException: If the code has no redemptions left, in total or for the customer.
+        """
+        discount = await self._active_discount_by_code(code)
+        return await self._redemption_limiter.reserve(discount, customer.id)
+
+    async def commit_redemption(self, reservation: RedemptionReservation) -> None:
+        """
+        Count a reserved redemption. It is recorded in the repository with the next batch of redemptions.
+        """
+        await self._redemption_limiter.commit(reservation)
+
+    def release_redemption(self, reservation: RedemptionReservation) -> None:
+        self._redemption_limiter.release(reservation)
+
+    async def flush_redemptions(self) -> None:
+        """
+        Record every committed redemption in the repository now, e.g. before the worker shuts down.
+        """
+        await self._redemption_limiter.flush()
+
+    async def _active_discount_by_code(self, code: str) -> Discount:
         discount: Discount = await self._discount_repository.get_discount_by_code(code)
         if not discount:
             raise DiscountNotFoundException(f"Discount code '{code}' not found.")
-        if discount.is_expired():
+        now = clock.now()
+        if discount.is_expired(now):
             raise DiscountExpiredException(f"Discount code '{code}' has expired.")
+        if not discount.has_started(now):
+            raise DiscountNotStartedException(f"Discount code '{code}' is not active yet.")
+        return discount
 
-        return any(
-            discount.is_applicable(customer_profile=customer, cart_item=cart_item) for cart_item in cart_items
-        )
+
+def _exhausted_voucher_message(voucher_code: str) -> str:
+    return f" Voucher code : {voucher_code} has no redemptions left "
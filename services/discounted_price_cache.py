@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple
+
+from models.cache_stats import CacheStats
+from models.cart import CartItem
+from models.customer import CustomerProfile
+from models.discount import DiscountedPrice
+from models.payment import PaymentInfo
+
+
+def cart_fingerprint(cart_items: list[CartItem], customer: CustomerProfile, payment_info: PaymentInfo | None,
+                     voucher_code: str | None, catalogue_version: int) -> tuple[Hashable, ...]:
+    """
+    Everything a cart's price depends on besides the discounts, as a hashable value: its lines, in order, the
+    customer tier, the payment info, the voucher code and the catalogue version. Carts with equal fingerprints get
+    the same DiscountedPrice, as long as no discount rule reads other customer attributes.
+    """
+    # A tuple of the values themselves; hashing it is several times cheaper than serializing it for a digest.
+    # Enums are keyed by value, since their hash is computed in Python and a string caches its own.
+    return (
+        catalogue_version,
+        customer.tier.value,
+        None if payment_info is None else (payment_info.method.value, payment_info.bank_name,
+                                           None if payment_info.card_type is None else payment_info.card_type.value),
+        voucher_code or None,
+        tuple((item.product.id, item.product.brand, item.product.brand_tier.value, item.product.category,
+               item.product.base_price, item.product.current_price, item.quantity, item.size) for item in cart_items),
+    )
+
+
+class _CachedPrice(NamedTuple):
+    discounted_price: DiscountedPrice
+    fresh_until: float
+
+
+class DiscountedPriceCache:
+    """
+    LRU cache of cart results per `cart_fingerprint`, for carts that are priced again unchanged, e.g. on the cart
+    page, at checkout and when the payment method is switched back.
+
+    Like DiscountPlanCache, every result belongs to the catalogue version it was computed against, and a lookup with
+    another version drops every cached result, so a result is never served once a discount was added, removed,
+    started or expired. Entries are also dropped after `ttl_seconds`. Memory is bounded by the number of results and
+    by the number of line items they hold in total.
+
+    Each hit returns a new DiscountedPrice; its line items are shared with the cached result and must not be changed.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 10_000,
+            max_line_items: int = 200_000,
+            ttl_seconds: float = 300.0,
+            monotonic_clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        :param max_entries: Maximum number of cached results, the least recently used one is evicted first.
+        :param max_line_items: Maximum number of line items across the cached results.
+        :param ttl_seconds: Maximum age of a cached result.
+        :param monotonic_clock: Clock used for the TTL, in seconds.
+        """
+        self._max_entries = max_entries
+        self._max_line_items = max_line_items
+        self._ttl_seconds = ttl_seconds
+        self._monotonic_clock = monotonic_clock
+        self._prices: OrderedDict[tuple[Hashable, ...], _CachedPrice] = OrderedDict()
+        self._line_items = 0
+        self._catalogue_version: int | None = None
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def get(self, catalogue_version: int, fingerprint: tuple[Hashable, ...]) -> DiscountedPrice | None:
+        if catalogue_version != self._catalogue_version:
+            self.invalidate()
+            self._catalogue_version = catalogue_version
+        cached = self._prices.get(fingerprint)
+        if cached is not None and self._monotonic_clock() >= cached.fresh_until:
+            self._evict(fingerprint)
+            cached = None
+        if cached is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._prices.move_to_end(fingerprint)
+        return _copy(cached.discounted_price)
+
+    def put(self, catalogue_version: int, fingerprint: tuple[Hashable, ...], discounted_price: DiscountedPrice) -> None:
+        if catalogue_version != self._catalogue_version:
+            # Computed against a catalogue that has changed since.
+            return
+        if len(discounted_price.line_items) > self._max_line_items:
+            return
+        if fingerprint in self._prices:
+            self._line_items -= len(self._prices.pop(fingerprint).discounted_price.line_items)
+        # Copied, so the caller may change the result it was given.
+        self._prices[fingerprint] = _CachedPrice(_copy(discounted_price),
+                                                 self._monotonic_clock() + self._ttl_seconds)
+        self._line_items += len(discounted_price.line_items)
+        while len(self._prices) > self._max_entries or self._line_items > self._max_line_items:
+            self._evict(next(iter(self._prices)))
+
+    def invalidate(self) -> None:
+        """
+        Drop all cached results.
+        """
+        self.stats.evictions += len(self._prices)
+        self._prices.clear()
+        self._line_items = 0
+
+    def _evict(self, fingerprint: tuple[Hashable, ...]) -> None:
+        self._line_items -= len(self._prices.pop(fingerprint).discounted_price.line_items)
+        self.stats.evictions += 1
+
+
+def _copy(discounted_price: DiscountedPrice) -> DiscountedPrice:
+    return DiscountedPrice(
+        original_price=discounted_price.original_price,
+        final_price=discounted_price.final_price,
+        applied_discounts=dict(discounted_price.applied_discounts),
+        message=discounted_price.message,
+        line_items=list(discounted_price.line_items),
+    )
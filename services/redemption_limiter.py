@@ -0,0 +1,330 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from discounts.base import Discount
+from exceptions import RedemptionLimitExceededException
+from repositories.discount_repository import IDiscountRepository
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RedemptionReservation:
+    """
+    One redemption of a code held for a customer until it is committed or released.
+    """
+    discount_code: str
+    customer_id: str
+    # Shard holding the customer's counts, and the one the unit of the code's total limit was taken from.
+    _shard: int
+    _capacity_shard: int | None
+    _settled: bool = False
+
+
+class _Shard:
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # Unreserved part of each code's claimed redemptions held by this shard.
+        self.available: dict[str, int] = {}
+        # Redemptions per (code, customer) with a per-customer limit: recorded, committed and reserved.
+        self.customer_counts: dict[tuple[str, str], int] = {}
+        # Committed redemptions not yet recorded in the repository.
+        self.pending: dict[tuple[str, str], int] = {}
+        self.pending_count = 0
+
+
+class RedemptionLimiter:
+    """
+    Enforces the `max_redemptions` and `max_redemptions_per_customer` limits of discounts.
+
+    A code's total limit is claimed from the repository `claim_size` redemptions at a time, atomically across every
+    process sharing it, so all processes together never exceed the limit. The claimed redemptions are split between
+    shards, each with its own lock, and a reservation takes one unit from the shard of the (code, customer) pair, or
+    from the next shard with some left. A customer's counts live in that same shard. Every check and update happens
+    under a single shard's lock and without awaiting, so reservations never overshoot a limit and only wait for
+    repository I/O when this process has used up its claim, or on the first reservation of a customer, which reads
+    the recorded count. Once a claim comes back short, the code is not claimed again until the next flush.
+
+    Committed redemptions are recorded in the repository in batches, by `flush` or once `flush_threshold` of them
+    are pending. Released ones give their unit back, and each flush returns unreserved claimed units to the
+    repository so that other processes can claim them. Give every DiscountService of a process the same limiter.
+    Per-customer limits are only shared within a limiter: separate processes each enforce them against the counts
+    recorded when they first saw the customer.
+    """
+
+    def __init__(self, discount_repository: IDiscountRepository, *, shards: int = 16,
+                 flush_threshold: int = 1000, claim_size: int = 100) -> None:
+        """
+        :param discount_repository: Where redemptions are claimed, counts read and committed redemptions recorded.
+        :param shards: Number of independently locked counters each limit is split into.
+        :param flush_threshold: Number of pending committed redemptions that triggers a flush on commit.
+        :param claim_size: Number of redemptions of a code claimed from the repository at a time. Larger claims
+            mean fewer repository calls, but more redemptions one process may hold while another runs out.
+        """
+        self._discount_repository = discount_repository
+        self._shards = [_Shard() for _ in range(shards)]
+        self._flush_threshold = flush_threshold
+        self._claim_size = claim_size
+        # Claim of each code in progress, awaited by reservations that also found no unit left.
+        self._claims_lock = threading.Lock()
+        self._claims_in_flight: dict[str, "Future[None]"] = {}
+        # Reservations per code that waited for a claim, which the next claim takes enough units for.
+        self._claim_demand: dict[str, int] = {}
+        # Redemptions claimed per code and not returned, committed ones included.
+        self._claimed: dict[str, int] = {}
+        # Codes whose last claim came back short, with the number of flushes at the time.
+        self._exhausted_codes: dict[str, int] = {}
+        self._flushes = 0
+
+    @property
+    def pending_count(self) -> int:
+        """
+        Number of committed redemptions not yet recorded in the repository.
+        """
+        return sum(shard.pending_count for shard in self._shards)
+
+    async def reserve(self, discount: Discount, customer_id: str) -> RedemptionReservation:
+        """
+        Reserve one redemption of the discount's code. Discounts without limits always succeed.
+
+        :raises RedemptionLimitExceededException: If the code has no redemptions left, in total or for the customer.
+        """
+        code = discount.discount_code
+        key = (code, customer_id)
+        shard_index = hash(key) % len(self._shards)
+        shard = self._shards[shard_index]
+        per_customer_limit = discount.max_redemptions_per_customer
+        if per_customer_limit is not None:
+            await self._load_customer_count(shard, key)
+            with shard.lock:
+                if shard.customer_counts[key] >= per_customer_limit:
+                    raise _customer_limit_exceeded(code, customer_id)
+                shard.customer_counts[key] += 1
+        capacity_shard = None
+        try:
+            if discount.max_redemptions is not None:
+                capacity_shard = self._take_capacity(code, shard_index)
+                if capacity_shard is None and await self._claim(code, discount.max_redemptions):
+                    capacity_shard = self._take_capacity(code, shard_index)
+                if capacity_shard is None:
+                    raise _limit_exceeded(code)
+        except BaseException:
+            # Also when the claim fails or is cancelled, so the customer is not left with a phantom reservation.
+            if per_customer_limit is not None:
+                with shard.lock:
+                    shard.customer_counts[key] -= 1
+            raise
+        return RedemptionReservation(code, customer_id, shard_index, capacity_shard)
+
+    async def check(self, discount: Discount, customer_id: str) -> None:
+        """
+        Check that the customer could reserve a redemption of the discount's code now, without reserving it.
+
+        :raises RedemptionLimitExceededException: If the code has no redemptions left, in total or for the customer.
+        """
+        code = discount.discount_code
+        key = (code, customer_id)
+        shard = self._shards[hash(key) % len(self._shards)]
+        per_customer_limit = discount.max_redemptions_per_customer
+        if per_customer_limit is not None:
+            await self._load_customer_count(shard, key)
+            if shard.customer_counts[key] >= per_customer_limit:
+                raise _customer_limit_exceeded(code, customer_id)
+        if (discount.max_redemptions is not None and not self._has_capacity(code)
+                and not await self._claim(code, discount.max_redemptions)):
+            raise _limit_exceeded(code)
+
+    def is_exhausted(self, discount_code: str) -> bool:
+        """
+        Whether this limiter has found the code's total limit reached: its last claim came back short and every
+        redemption it holds is reserved or committed. Answers without repository I/O, so it only knows about codes
+        reserved or checked in this process.
+        """
+        return discount_code in self._exhausted_codes and not self._has_capacity(discount_code)
+
+    async def commit(self, reservation: RedemptionReservation) -> None:
+        """
+        Count a reserved redemption for good, e.g. once the order is placed. If this triggers a flush and the
+        repository fails, the failure is logged and the redemptions stay pending for the next flush: the commit
+        itself has succeeded.
+
+        :raises ValueError: If the reservation was already committed or released.
+        """
+        shard = self._shards[reservation._shard]
+        key = (reservation.discount_code, reservation.customer_id)
+        with shard.lock:
+            self._settle(reservation)
+            shard.pending[key] = shard.pending.get(key, 0) + 1
+            shard.pending_count += 1
+        if self.pending_count >= self._flush_threshold:
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing redemptions failed, %d committed ones stay pending for the next flush",
+                                 self.pending_count)
+
+    def release(self, reservation: RedemptionReservation) -> None:
+        """
+        Give a reserved redemption back, e.g. when the checkout is abandoned or the payment fails.
+
+        :raises ValueError: If the reservation was already committed or released.
+        """
+        shard = self._shards[reservation._shard]
+        key = (reservation.discount_code, reservation.customer_id)
+        with shard.lock:
+            self._settle(reservation)
+            if key in shard.customer_counts:
+                shard.customer_counts[key] -= 1
+        if reservation._capacity_shard is not None:
+            capacity_shard = self._shards[reservation._capacity_shard]
+            with capacity_shard.lock:
+                capacity_shard.available[reservation.discount_code] += 1
+
+    async def flush(self) -> None:
+        """
+        Record every pending committed redemption in the repository, in one call, then return the unreserved
+        claimed redemptions. If the repository fails, the redemptions stay pending for the next flush.
+        """
+        await self._record_pending()
+        with self._claims_lock:
+            self._flushes += 1
+        unused = list(self._drain_capacity().items())
+        for position, (code, count) in enumerate(unused):
+            try:
+                await self._discount_repository.return_redemptions(code, count)
+            except BaseException:
+                for code, count in unused[position:]:
+                    self._add_capacity(code, count)
+                raise
+            with self._claims_lock:
+                self._claimed[code] -= count
+
+    async def _record_pending(self) -> None:
+        redemptions: dict[tuple[str, str], int] = {}
+        for shard in self._shards:
+            with shard.lock:
+                pending, shard.pending, shard.pending_count = shard.pending, {}, 0
+            for key, count in pending.items():
+                redemptions[key] = redemptions.get(key, 0) + count
+        if not redemptions:
+            return
+        try:
+            await self._discount_repository.add_redemptions(redemptions)
+        except BaseException:
+            for key, count in redemptions.items():
+                shard = self._shards[hash(key) % len(self._shards)]
+                with shard.lock:
+                    shard.pending[key] = shard.pending.get(key, 0) + count
+                    shard.pending_count += count
+            raise
+
+    async def _load_customer_count(self, shard: _Shard, key: tuple[str, str]) -> None:
+        if key not in shard.customer_counts:
+            recorded = await self._discount_repository.get_redemption_count(*key)
+            with shard.lock:
+                # Another reservation may have loaded it while this one waited.
+                shard.customer_counts.setdefault(key, recorded)
+
+    async def _claim(self, code: str, max_redemptions: int) -> bool:
+        """
+        Claim more redemptions of the code from the repository, unless another reservation just did.
+
+        :return: Whether this limiter now holds unreserved redemptions of the code.
+        """
+        # Deferred like in ParallelDiscountProcessor, so importing the service does not import them.
+        import asyncio
+        from concurrent.futures import Future
+
+        with self._claims_lock:
+            in_flight = self._claims_in_flight.get(code)
+            if in_flight is None:
+                if self._has_capacity(code):
+                    return True
+                if self._exhausted_codes.get(code) == self._flushes:
+                    return False
+                claim_done = self._claims_in_flight[code] = Future()
+                demand = self._claim_demand.pop(code, 0) + 1
+            else:
+                self._claim_demand[code] = self._claim_demand.get(code, 0) + 1
+        if in_flight is not None:
+            # A concurrent future, since reservations of other threads may be waiting on their own event loops.
+            await asyncio.wrap_future(in_flight)
+            return await self._claim(code, max_redemptions)
+
+        try:
+            # Never claims more than the limit itself, which also bounds repositories that grant every claim.
+            count = min(max(self._claim_size, demand), max_redemptions - self._claimed.get(code, 0))
+            claimed = await self._discount_repository.claim_redemptions(code, max_redemptions, count) \
+                if count > 0 else 0
+            with self._claims_lock:
+                if claimed < count or count < self._claim_size:
+                    self._exhausted_codes[code] = self._flushes
+                else:
+                    self._exhausted_codes.pop(code, None)
+                self._claimed[code] = self._claimed.get(code, 0) + claimed
+                self._add_capacity(code, claimed)
+            return claimed > 0
+        finally:
+            with self._claims_lock:
+                del self._claims_in_flight[code]
+            claim_done.set_result(None)
+
+    def _add_capacity(self, code: str, count: int) -> None:
+        shard_count = len(self._shards)
+        for position, shard in enumerate(self._shards):
+            with shard.lock:
+                shard.available[code] = (shard.available.get(code, 0) + count // shard_count
+                                         + (position < count % shard_count))
+
+    def _drain_capacity(self) -> dict[str, int]:
+        """
+        Take every unreserved claimed redemption out of the shards.
+
+        :return: The number taken per code.
+        """
+        drained: dict[str, int] = {}
+        for shard in self._shards:
+            with shard.lock:
+                for code, count in shard.available.items():
+                    if count:
+                        drained[code] = drained.get(code, 0) + count
+                shard.available = dict.fromkeys(shard.available, 0)
+        return drained
+
+    def _has_capacity(self, code: str) -> bool:
+        return any(shard.available.get(code, 0) > 0 for shard in self._shards)
+
+    def _take_capacity(self, code: str, home: int) -> int | None:
+        """
+        :return: The shard a unit of the code's total limit was taken from, or None if none has any left.
+        """
+        shard_count = len(self._shards)
+        for offset in range(shard_count):
+            position = (home + offset) % shard_count
+            shard = self._shards[position]
+            with shard.lock:
+                if shard.available.get(code, 0) > 0:
+                    shard.available[code] -= 1
+                    return position
+        return None
+
+    @staticmethod
+    def _settle(reservation: RedemptionReservation) -> None:
+        if reservation._settled:
+            raise ValueError(f"Reservation of '{reservation.discount_code}' was already committed or released")
+        reservation._settled = True
+
+
+def _limit_exceeded(code: str) -> RedemptionLimitExceededException:
+    return RedemptionLimitExceededException(f"Discount code '{code}' has no redemptions left.")
+
+
+def _customer_limit_exceeded(code: str, customer_id: str) -> RedemptionLimitExceededException:
+    return RedemptionLimitExceededException(
+        f"Discount code '{code}' has no redemptions left for customer '{customer_id}'.")
@@ -0,0 +1,80 @@
+"""
+Dry-run a proposed campaign over historical carts and report its cost against the current catalogue.
+
+The campaign file holds one discount, or a list of discounts, in the format of serializers.discount_serializer.
+Carts are read as JSON Lines pricing requests (serializers.pricing_request_serializer). The report is written
+to stdout as one JSON object; amounts are totals over every cart, quantities included.
+
+Usage: python simulate_campaign.py campaign.json carts.jsonl
+       python simulate_campaign.py campaign.json carts.jsonl --catalogue catalogue.bin --batch-size 20000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any
+
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from fake_data import DUMMY_DISCOUNTS
+from main import DISCOUNT_TYPE_ORDERING
+from reprice import ENGINES
+from repositories.catalogue_file import load_catalogue_file
+from repositories.discount_repository import InMemoryDiscountRepository
+from serializers.discount_serializer import discount_from_dict
+from serializers.pricing_request_serializer import read_pricing_requests
+from services.campaign_simulator import CampaignReport, CampaignSimulator
+
+
+def campaign_report_to_dict(report: CampaignReport) -> dict[str, Any]:
+    return {
+        "carts": report.carts,
+        "carts_applied": report.carts_applied,
+        "carts_affected": report.carts_affected,
+        "baseline_revenue": str(report.baseline_revenue),
+        "campaign_revenue": str(report.campaign_revenue),
+        "revenue_delta": str(report.revenue_delta),
+        "campaign_discount": str(report.campaign_discount),
+        "cost": None if report.cost is None else str(report.cost),
+        "baseline_margin_rate": report.baseline_margin_rate,
+        "campaign_margin_rate": report.campaign_margin_rate,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("campaign", help="JSON file with the proposed discount or list of discounts")
+    parser.add_argument("carts", nargs="?", default="-", help="JSON Lines file of pricing requests, - for stdin")
+    parser.add_argument("--catalogue", help="Catalogue file (repositories.catalogue_file) to simulate against, "
+                                            "instead of the sample catalogue")
+    parser.add_argument("--engine", choices=list(ENGINES), default="columnar")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+
+    with open(args.campaign) as campaign_file:
+        campaign_data = json.load(campaign_file)
+    campaign = [discount_from_dict(data) for data in
+                (campaign_data if isinstance(campaign_data, list) else [campaign_data])]
+    repository = InMemoryDiscountRepository(DUMMY_DISCOUNTS)
+    if args.catalogue is not None:
+        repository.update(lambda _: load_catalogue_file(args.catalogue))
+    simulator = CampaignSimulator(repository, DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                                  engine=ENGINES[args.engine], batch_size=args.batch_size)
+    carts_file = sys.stdin if args.carts == "-" else open(args.carts)
+    started = time.perf_counter()
+    try:
+        report = asyncio.run(simulator.simulate(campaign, read_pricing_requests(carts_file)))
+    finally:
+        if carts_file is not sys.stdin:
+            carts_file.close()
+    seconds = time.perf_counter() - started
+    json.dump(campaign_report_to_dict(report), sys.stdout, indent=2)
+    print()
+    print(f"simulated {report.carts} carts in {seconds:.1f}s ({report.carts / max(seconds, 1e-9):.0f} carts/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from models.cart import CartItem
+from models.customer import CustomerTier, CustomerProfile
+from models.payment import PaymentMethod, CardType, PaymentInfo
+from models.product import BrandTier, Product
+from services.discount_service import DiscountService
+
+DISCOUNT_TYPE_ORDERING = [
+    DiscountType.BRAND_DISCOUNT,
+    DiscountType.CATEGORY_DISCOUNT,
+    DiscountType.VOUCHER_DISCOUNT,
+    DiscountType.BANK_DISCOUNT,
+]
+
+
+class FakeMonotonicClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def product_factory():
+    """Factory for creating product variants."""
+
+    def _create_product(
+            brand="Puma",
+            brand_tier=BrandTier.PREMIUM,
+            category="T-Shirt",
+            base_price=1000.0,
+            **kwargs
+    ):
+        return Product(
+            id=kwargs.get("id", "prod_123"),
+            brand=brand,
+            brand_tier=brand_tier,
+            category=category,
+            base_price=Decimal(base_price),
+            current_price=Decimal(kwargs.get("current_price", base_price)),
+        )
+
+    return _create_product
+
+
+@pytest.fixture
+def cart_item_factory(product_factory):
+    """Factory for creating cart lines, the product built from the remaining arguments."""
+
+    def _create_cart_item(
+            quantity=1,
+            size="M",
+            **product_kwargs
+    ):
+        return CartItem(product=product_factory(**product_kwargs), quantity=quantity, size=size)
+
+    return _create_cart_item
+
+
+@pytest.fixture
+def cart_factory(cart_item_factory):
+    """Factory for creating one-line carts, the line built from the arguments as by `cart_item_factory`."""
+
+    def _create_cart(**kwargs):
+        return [cart_item_factory(**kwargs)]
+
+    return _create_cart
+
+
+@pytest.fixture
+def customer_factory():
+    """Factory for creating customer variants."""
+
+    def _create_customer(
+            tier=CustomerTier.GOLD,
+            name="John Doe",
+            **kwargs
+    ):
+        return CustomerProfile(
+            id=kwargs.get("id", "cust_123"),
+            name=name,
+            tier=tier,
+            email=kwargs.get("email", "jd@gmail.com"),
+            phone=kwargs.get("phone", "1234567890"),
+        )
+
+    return _create_customer
+
+
+@pytest.fixture
+def payment_info_factory():
+    """Factory for creating payment info variants."""
+
+    def _create_payment_info(
+            method=PaymentMethod.CARD_PAYMENT,
+            bank_name: str = "ICICI Bank",
+            card_type: CardType = CardType.CREDIT_CARD,
+            **kwargs
+    ):
+        return PaymentInfo(
+            method=method,
+            bank_name=bank_name,
+            card_type=kwargs.get("card_type", card_type),
+        )
+
+    return _create_payment_info
+
+
+@pytest.fixture
+def discount_factory():
+    """Factory for creating percentage discounts, by default 10% and active from now for 30 days."""
+
+    def _create_discount(
+            name="discount",
+            discount_type=DiscountType.BRAND_DISCOUNT,
+            rules=(),
+            expires_in_days=30,
+            starts_in_days=None,
+            discount_percentage=10,
+            **kwargs
+    ):
+        now = pendulum.now("UTC")
+        return PercentageDiscount(
+            name=name,
+            discount_percentage=Decimal(discount_percentage),
+            discount_rules=list(rules),
+            discount_type=discount_type,
+            starts_at=None if starts_in_days is None else now.add(days=starts_in_days),
+            expires_at=now.add(days=expires_in_days),
+            **kwargs
+        )
+
+    return _create_discount
+
+
+@pytest.fixture
+def service_factory():
+    """Factory for creating discount services, by default with a processor that leaves products unchanged."""
+
+    def _create_service(
+            repository,
+            strategy=None,
+            mutate_products=False,
+            processor_type=DiscountProcessor,
+            discount_index=None,
+            **kwargs
+    ):
+        processor = processor_type(strategy or DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                                   discount_index, mutate_products=mutate_products)
+        return DiscountService(repository, processor, **kwargs)
+
+    return _create_service
+
+
+@pytest.fixture
+def monotonic_clock():
+    """A monotonic clock for caches with a TTL, which only moves when a test sets `now`."""
+    return FakeMonotonicClock()
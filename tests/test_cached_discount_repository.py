@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from repositories.cached_discount_repository import CachedDiscountRepository
+from repositories.discount_repository import InMemoryDiscountRepository
+
+
+@pytest.mark.asyncio
+async def test_listings_are_cached_per_excluded_types(discount_factory):
+    repository = CachedDiscountRepository(InMemoryDiscountRepository([
+        discount_factory("Brand"), discount_factory("Voucher", DiscountType.VOUCHER_DISCOUNT),
+    ]))
+
+    without_vouchers = await repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT})
+    assert [d.name for d in without_vouchers] == ["Brand"]
+    assert await repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT}) is without_vouchers
+    assert len(await repository.list_all_active_discounts(set())) == 2
+
+    assert (repository.stats.hits, repository.stats.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_catalogue_change_invalidates_listing(discount_factory):
+    inner = InMemoryDiscountRepository([discount_factory("Brand")])
+    repository = CachedDiscountRepository(inner)
+    await repository.list_all_active_discounts(set())
+
+    inner.add_discount(discount_factory("Category", DiscountType.CATEGORY_DISCOUNT))
+
+    assert len(await repository.list_all_active_discounts(set())) == 2
+    assert (repository.stats.hits, repository.stats.misses) == (0, 2)
+
+
+@pytest.mark.asyncio
+async def test_listings_are_cached_per_catalogue_version_at_now(discount_factory):
+    repository = CachedDiscountRepository(InMemoryDiscountRepository([
+        discount_factory("Later", starts_in_days=1), discount_factory("Brand"),
+    ]))
+    in_two_days = pendulum.now("UTC") + pendulum.duration(days=2)
+
+    assert [d.name for d in await repository.list_all_active_discounts(set())] == ["Brand"]
+    assert [d.name for d in await repository.list_all_active_discounts(set(), now=in_two_days)] == ["Later", "Brand"]
+    assert [d.name for d in await repository.list_all_active_discounts(set())] == ["Brand"]
+    assert (repository.stats.hits, repository.stats.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_oldest_listing_is_dropped_beyond_max_cached_listings(discount_factory):
+    repository = CachedDiscountRepository(InMemoryDiscountRepository([discount_factory("Brand")]),
+                                          max_cached_listings=2)
+    for excluded in ({DiscountType.VOUCHER_DISCOUNT}, {DiscountType.BRAND_DISCOUNT}, set()):
+        await repository.list_all_active_discounts(excluded)
+
+    await repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT})
+
+    assert (repository.stats.hits, repository.stats.misses, repository.stats.evictions) == (0, 4, 2)
+
+
+@pytest.mark.asyncio
+async def test_listing_is_dropped_when_nearest_discount_expires(discount_factory):
+    repository = CachedDiscountRepository(InMemoryDiscountRepository([
+        discount_factory("Soon", expires_in_days=1), discount_factory("Later"),
+    ]))
+    assert len(await repository.list_all_active_discounts(set())) == 2
+
+    in_two_days = pendulum.now("UTC") + pendulum.duration(days=2)
+    with patch("clock.now", return_value=in_two_days):
+        assert [d.name for d in await repository.list_all_active_discounts(set())] == ["Later"]
+    assert repository.stats.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_listing_is_dropped_after_ttl(discount_factory, monotonic_clock):
+    repository = CachedDiscountRepository(InMemoryDiscountRepository([discount_factory("Brand")]),
+                                          ttl_seconds=5, monotonic_clock=monotonic_clock)
+    await repository.list_all_active_discounts(set())
+    monotonic_clock.now = 4
+    await repository.list_all_active_discounts(set())
+    monotonic_clock.now = 5
+    await repository.list_all_active_discounts(set())
+
+    assert (repository.stats.hits, repository.stats.misses) == (1, 2)
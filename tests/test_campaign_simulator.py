@@ -0,0 +1,132 @@
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_discounts, generate_requests
+from discounts.constants import DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processing_strategies.optimal_discount_processing_strategy import OptimalDiscountProcessingStrategy
+from discounts.processor.columnar_discount_processor import ColumnarDiscountProcessor
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from fake_data import DUMMY_DISCOUNTS
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.campaign_simulator import CampaignSimulator
+from services.discount_service import DiscountService
+
+EXPIRES_AT = pendulum.now("UTC") + pendulum.duration(days=30)
+
+
+async def _naive_report(discounts, campaign, requests, strategy, engine):
+    """Reprice every cart through DiscountService, once per catalogue."""
+    totals = []
+    for catalogue in (discounts, discounts + campaign):
+        service = DiscountService(InMemoryDiscountRepository(catalogue), engine(strategy, mutate_products=False))
+        totals.append([(await service.calculate_cart_discounts(*request)).final_price for request in requests])
+    return totals
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", [DiscountProcessor, ColumnarDiscountProcessor])
+@pytest.mark.parametrize("campaign", [
+    # The catalogue has no bank discounts, so it displaces nothing.
+    [PercentageDiscount(name="Campaign 15%", discount_percentage=Decimal(15),
+                        discount_rules=[BrandDiscountRule(include_brands=["BRAND-1", "BRAND-2"])],
+                        discount_type=DiscountType.BANK_DISCOUNT, expires_at=EXPIRES_AT)],
+    # Expires first, so it displaces the catalogue's category discount for every segment.
+    [FixedAmountDiscount(name="Campaign 50 off", discount_amount=Decimal(50),
+                         discount_rules=[CategoryDiscountRule(include_categories=["CATEGORY-0"])],
+                         discount_type=DiscountType.CATEGORY_DISCOUNT, expires_at=EXPIRES_AT.subtract(days=29))],
+])
+async def test_report_matches_repricing_every_cart(engine, campaign):
+    discounts = [discount for discount in generate_discounts(200, brands=10, categories=5)
+                 if discount.discount_type != DiscountType.BANK_DISCOUNT]
+    requests = generate_requests(300, brands=10, categories=5, max_cart_size=8, seed=4)
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    simulator = CampaignSimulator(InMemoryDiscountRepository(discounts), strategy, engine=engine, batch_size=64)
+
+    report = await simulator.simulate(campaign, requests)
+
+    baseline, with_campaign = await _naive_report(discounts, campaign, requests, strategy, engine)
+    assert report.carts == len(requests)
+    assert report.baseline_revenue == sum(baseline)
+    assert report.campaign_revenue == sum(with_campaign)
+    assert report.carts_affected == sum(before != after for before, after in zip(baseline, with_campaign))
+    assert report.carts_applied > 0
+    assert report.campaign_discount > 0
+
+
+@pytest.mark.asyncio
+async def test_campaign_matching_nothing_changes_nothing():
+    discounts = generate_discounts(100, brands=10, categories=5)
+    requests = generate_requests(100, brands=10, categories=5, max_cart_size=5)
+    campaign = PercentageDiscount(name="Unknown brand", discount_percentage=Decimal(50),
+                                  discount_rules=[BrandDiscountRule(include_brands=["NO-SUCH-BRAND"])],
+                                  discount_type=DiscountType.BRAND_DISCOUNT, expires_at=EXPIRES_AT.add(years=5))
+    simulator = CampaignSimulator(InMemoryDiscountRepository(discounts),
+                                  DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING))
+
+    report = await simulator.simulate(campaign, requests)
+
+    assert report.carts == 100
+    assert report.revenue_delta == 0
+    assert report.carts_applied == report.carts_affected == 0
+
+
+@pytest.mark.asyncio
+async def test_campaign_matching_nothing_changes_nothing_at_a_past_now(
+        cart_factory, customer_factory, payment_info_factory
+):
+    # DUMMY_DISCOUNTS have expired by now, but were active at the simulated instant. The campaign expires after
+    # them, so it displaces none of them either.
+    now = pendulum.datetime(2025, 6, 1, tz="UTC")
+    campaign = PercentageDiscount(name="Nike 5%", discount_percentage=Decimal(5),
+                                  discount_rules=[BrandDiscountRule(include_brands=["NIKE"])],
+                                  discount_type=DiscountType.BRAND_DISCOUNT, expires_at=now.add(years=1))
+    simulator = CampaignSimulator(InMemoryDiscountRepository(DUMMY_DISCOUNTS),
+                                  DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING))
+    requests = [(cart_factory(brand="PUMA", base_price=2000.0), customer_factory(), payment_info_factory(), None)]
+
+    report = await simulator.simulate(campaign, requests, now=now)
+
+    assert report.baseline_revenue < Decimal(2000)
+    assert report.revenue_delta == 0
+    assert report.carts_applied == report.carts_affected == 0
+
+
+@pytest.mark.asyncio
+async def test_cart_dependent_strategy_prices_every_cart_both_ways():
+    discounts = generate_discounts(50, brands=5, categories=3)
+    requests = generate_requests(40, brands=5, categories=3, max_cart_size=4)
+    campaign = [PercentageDiscount(name="Campaign 10%", discount_percentage=Decimal(10), discount_rules=[],
+                                   discount_type=DiscountType.BANK_DISCOUNT, expires_at=EXPIRES_AT)]
+    strategy = OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    simulator = CampaignSimulator(InMemoryDiscountRepository(discounts), strategy, engine=DiscountProcessor)
+
+    report = await simulator.simulate(campaign, requests)
+
+    baseline, with_campaign = await _naive_report(discounts, campaign, requests, strategy, DiscountProcessor)
+    assert report.baseline_revenue == sum(baseline)
+    assert report.campaign_revenue == sum(with_campaign)
+
+
+@pytest.mark.asyncio
+async def test_margins_use_unit_costs():
+    requests = generate_requests(20, max_cart_size=3)
+    campaign = PercentageDiscount(name="Everything 10%", discount_percentage=Decimal(10), discount_rules=[],
+                                  discount_type=DiscountType.BRAND_DISCOUNT, expires_at=EXPIRES_AT)
+    simulator = CampaignSimulator(InMemoryDiscountRepository([]),
+                                  DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING))
+
+    report = await simulator.simulate(campaign, requests, unit_cost=lambda product: product.base_price / 2)
+
+    assert report.carts_applied == report.carts_affected == 20
+    # Up to a cent per cart apart: line amounts are rounded separately from cart totals.
+    assert abs(report.campaign_discount + report.revenue_delta) <= Decimal("0.01") * report.carts
+    assert report.cost == report.baseline_revenue / 2
+    assert report.baseline_margin_rate == pytest.approx(0.5)
+    assert report.campaign_margin_rate == pytest.approx(1 - 0.5 / 0.9)
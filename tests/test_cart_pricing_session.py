@@ -0,0 +1,132 @@
+import random
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from benchmarks.synthetic_data import (
+    DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts, generate_payment_info,
+)
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processing_strategies.optimal_discount_processing_strategy import OptimalDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from models.cart import CartItem
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_plan_cache import DiscountPlanCache
+from services.discount_service import DiscountService
+
+
+class CountingProcessor(DiscountProcessor):
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.lines_priced = 0
+
+    def apply_resolved_discounts(self, resolved_discounts, customer_profile, cart_items, *args, **kwargs):
+        self.lines_priced += len(cart_items)
+        return super().apply_resolved_discounts(resolved_discounts, customer_profile, cart_items, *args, **kwargs)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("plan_cache", [True, False])
+async def test_random_edits_match_full_repricing(plan_cache, service_factory):
+    rng = random.Random(7)
+    repository = InMemoryDiscountRepository(generate_discounts(300, brands=20, categories=5))
+    service = service_factory(repository, discount_index=repository.get_discount_index,
+                              plan_cache=DiscountPlanCache() if plan_cache else None)
+    customer, payment_info = generate_customer(rng), generate_payment_info(rng)
+    session = service.start_cart_session(customer, payment_info)
+    products_by_handle = {}
+    discounted_carts = 0
+    for step in range(60):
+        action = rng.random()
+        if action < 0.5 or not products_by_handle:
+            item = generate_cart(1, brands=20, categories=5, rng=rng)[0]
+            products_by_handle[session.add_item(item)] = item.product
+        elif action < 0.8:
+            handle = rng.choice(list(products_by_handle))
+            session.update_item(handle, CartItem(product=products_by_handle[handle], quantity=rng.randrange(1, 5),
+                                                 size="M"))
+        else:
+            handle = rng.choice(list(products_by_handle))
+            del products_by_handle[handle]
+            session.remove_item(handle)
+        if step % 5 == 0:
+            incremental = await session.price()
+            full = await service.calculate_cart_discounts(session.cart_items, customer, payment_info)
+            assert incremental == full
+            discounted_carts += bool(full.applied_discounts)
+    assert discounted_carts
+
+
+@pytest.mark.asyncio
+async def test_edits_reprice_only_the_changed_line():
+    rng = random.Random(1)
+    repository = InMemoryDiscountRepository(generate_discounts(200, brands=10, categories=5))
+    processor = CountingProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                                  repository.get_discount_index, mutate_products=False)
+    service = DiscountService(repository, processor, plan_cache=DiscountPlanCache())
+    session = service.start_cart_session(generate_customer(rng))
+    handles = [session.add_item(item) for item in generate_cart(100, brands=10, categories=5, rng=rng)]
+    await session.price()
+    processor.lines_priced = 0
+
+    session.update_item(handles[50], CartItem(product=session.cart_items[50].product, quantity=9, size="M"))
+    session.remove_item(handles[10])
+    session.add_item(generate_cart(1, brands=10, categories=5, rng=rng)[0])
+    discounted_price = await session.price()
+
+    assert processor.lines_priced == 2
+    assert len(discounted_price.line_items) == 100
+    assert discounted_price.line_items[49].quantity == 9
+
+
+@pytest.mark.asyncio
+async def test_catalogue_change_reprices_every_line(service_factory):
+    rng = random.Random(2)
+    repository = InMemoryDiscountRepository(generate_discounts(50, brands=5, categories=5))
+    service = service_factory(repository, discount_index=repository.get_discount_index, plan_cache=DiscountPlanCache())
+    customer = generate_customer(rng)
+    session = service.start_cart_session(customer)
+    for item in generate_cart(20, brands=5, categories=5, rng=rng):
+        session.add_item(item)
+    await session.price()
+
+    repository.add_discount(PercentageDiscount(
+        name="Everything 5%", discount_percentage=Decimal(5), discount_rules=[BrandDiscountRule()],
+        discount_type=DiscountType.BRAND_DISCOUNT, expires_at=pendulum.now("UTC") + pendulum.duration(days=1)))
+    discounted_price = await session.price()
+
+    assert "Everything 5%" in discounted_price.applied_discounts
+    assert discounted_price == await service.calculate_cart_discounts(session.cart_items, customer)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("processor_type, strategy", [
+    (MinorUnitDiscountProcessor, None),
+    (DiscountProcessor, OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)),
+])
+async def test_non_decomposable_pricing_falls_back_to_full_repricing(processor_type, strategy, service_factory):
+    rng = random.Random(3)
+    repository = InMemoryDiscountRepository(generate_discounts(100, brands=5, categories=5))
+    service = service_factory(repository, strategy, processor_type=processor_type,
+                              discount_index=repository.get_discount_index, plan_cache=DiscountPlanCache())
+    customer = generate_customer(rng)
+    session = service.start_cart_session(customer)
+    for item in generate_cart(10, brands=5, categories=5, rng=rng):
+        session.add_item(item)
+
+    assert await session.price() == await service.calculate_cart_discounts(session.cart_items, customer)
+
+
+def test_unknown_handles_raise_key_error(service_factory):
+    session = service_factory(InMemoryDiscountRepository([])).start_cart_session(generate_customer(random.Random(0)))
+
+    with pytest.raises(KeyError):
+        session.remove_item(0)
+    with pytest.raises(KeyError):
+        session.update_item(0, generate_cart(1, rng=random.Random(0))[0])
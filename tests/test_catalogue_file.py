@@ -0,0 +1,155 @@
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.percentage_discount import PercentageDiscount
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.discount_rule_interface import IDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from models.customer import CustomerTier
+from models.payment import PaymentMethod
+from repositories.catalogue_file import load_catalogue_file, write_catalogue_file
+from repositories.discount_repository import InMemoryDiscountRepository
+from repositories.mapped_discount_repository import MappedDiscountRepository
+from serializers.discount_serializer import discount_from_dict, discount_to_dict
+
+NOW = pendulum.now("UTC")
+
+
+class SmallSizeOnlyRule(IDiscountRule):
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        return cart_item.size == "S"
+
+
+def _catalogue() -> list:
+    return [
+        PercentageDiscount(name="PUMA 40%", discount_percentage=Decimal("40"), discount_type=DiscountType.BRAND_DISCOUNT,
+                           discount_rules=[BrandDiscountRule(include_brands=["PUMA"], exclude_brands=["NIKE"])],
+                           expires_at=NOW.add(days=30)),
+        FixedAmountDiscount(name="Shoes 250", discount_amount=Decimal("250.50"),
+                            discount_type=DiscountType.CATEGORY_DISCOUNT,
+                            discount_rules=[CategoryDiscountRule(include_categories=["Shoes"]),
+                                            CustomerTierDiscountRule(include_tiers=[CustomerTier.GOLD],
+                                                                     exclude_tiers=[CustomerTier.BRONZE])],
+                            starts_at=NOW.add(days=2), expires_at=NOW.add(days=4)),
+        PercentageDiscount(name="ICICI UPI", discount_percentage=Decimal("12.5"),
+                           discount_type=DiscountType.BANK_DISCOUNT,
+                           discount_rules=[PaymentDiscountRule(applicable_banks=["ICICI Bank"],
+                                                               applicable_payment_methods=[PaymentMethod.UPI])],
+                           expires_at=pendulum.now("Asia/Kolkata").add(days=1)),
+        PercentageDiscount(name="Welcome", discount_code="WELCOME", discount_percentage=Decimal(10),
+                           discount_type=DiscountType.VOUCHER_DISCOUNT, discount_rules=[],
+                           expires_at=NOW.add(days=30)),
+        PercentageDiscount(name="Shadowed welcome", discount_code="WELCOME", discount_percentage=Decimal(50),
+                           discount_type=DiscountType.VOUCHER_DISCOUNT, discount_rules=[],
+                           expires_at=NOW.add(days=30)),
+    ]
+
+
+@pytest.fixture
+def repositories(tmp_path):
+    memory = InMemoryDiscountRepository(_catalogue())
+    template = PercentageDiscount(name="Festive 15%", discount_percentage=Decimal(15), discount_rules=[],
+                                  discount_type=DiscountType.VOUCHER_DISCOUNT, expires_at=NOW.add(days=30))
+    memory.bulk_load_voucher_codes(template, [f"FEST-{number:04d}" for number in range(1000)] + ["WELCOME"])
+    path = str(tmp_path / "catalogue.bin")
+    write_catalogue_file(path, memory.catalogue)
+    with MappedDiscountRepository(path) as mapped:
+        yield memory, mapped
+
+
+def test_discounts_round_trip_through_the_serializer():
+    for discount in _catalogue():
+        assert discount_to_dict(discount_from_dict(discount_to_dict(discount))) == discount_to_dict(discount)
+
+    with pytest.raises(TypeError):
+        discount_to_dict(PercentageDiscount(name="Small", discount_percentage=Decimal(5),
+                                            discount_type=DiscountType.BRAND_DISCOUNT,
+                                            discount_rules=[SmallSizeOnlyRule()], expires_at=NOW.add(days=1)))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("days", [0, 3, 5, -1])
+@pytest.mark.parametrize("exclude", [set(), {DiscountType.VOUCHER_DISCOUNT}])
+async def test_mapped_listing_matches_in_memory_listing(repositories, days, exclude):
+    memory, mapped = repositories
+    now = NOW.add(days=days)
+
+    expected = await memory.list_all_active_discounts(exclude, now=now)
+    listed = await mapped.list_all_active_discounts(exclude, now=now)
+
+    assert [discount_to_dict(discount) for discount in listed] == [discount_to_dict(discount) for discount in expected]
+    assert await mapped.get_catalogue_version() == await memory.get_catalogue_version()
+
+
+@pytest.mark.asyncio
+async def test_mapped_code_lookups_match_in_memory_lookups(repositories):
+    memory, mapped = repositories
+
+    for code in ["WELCOME", "PUMA 40%", "FEST-0042", "FEST-0999", "FEST-1000", "welcome"]:
+        expected, found = await memory.get_discount_by_code(code), await mapped.get_discount_by_code(code)
+        assert (found and discount_to_dict(found)) == (expected and discount_to_dict(expected))
+
+    first, second = await mapped.get_discount_by_code("FEST-0001"), await mapped.get_discount_by_code("FEST-0002")
+    assert (first.discount_code, second.discount_code) == ("FEST-0001", "FEST-0002")
+    # Lookups decode only the records they reach, once.
+    assert await mapped.get_discount_by_code("PUMA 40%") is await mapped.get_discount_by_code("PUMA 40%")
+    assert len(mapped._decoded) == 3
+
+
+def test_catalogue_file_loads_into_an_in_memory_snapshot(repositories, tmp_path):
+    memory, _ = repositories
+    write_catalogue_file(str(tmp_path / "copy.bin"), memory.catalogue)
+
+    catalogue = load_catalogue_file(str(tmp_path / "copy.bin"))
+
+    assert [discount_to_dict(discount) for discount in catalogue.discounts] == \
+           [discount_to_dict(discount) for discount in memory.all_discounts]
+    assert sorted(catalogue.voucher_templates_by_code) == [f"FEST-{number:04d}" for number in range(1000)]
+    assert catalogue.version_at(NOW) == memory.catalogue.version_at(NOW)
+
+
+@pytest.mark.asyncio
+async def test_rewriting_the_file_leaves_open_mappings_intact(repositories, tmp_path):
+    _, mapped = repositories
+    path = str(tmp_path / "catalogue.bin")
+    expected = await mapped.list_all_active_discounts(set(), now=NOW)
+
+    write_catalogue_file(path, InMemoryDiscountRepository(_catalogue()[:1]).catalogue)
+
+    listed = await mapped.list_all_active_discounts(set(), now=NOW)
+    assert [discount_to_dict(discount) for discount in listed] == [discount_to_dict(discount) for discount in expected]
+    assert (await mapped.get_discount_by_code("FEST-0042")).discount_code == "FEST-0042"
+    with MappedDiscountRepository(path) as reopened:
+        assert [discount.name for discount in await reopened.list_all_active_discounts(set(), now=NOW)] == \
+               ["PUMA 40%"]
+    assert [file.name for file in tmp_path.iterdir()] == ["catalogue.bin"]
+
+
+@pytest.mark.asyncio
+async def test_mapped_catalogue_version_changes_when_a_voucher_template_expires(tmp_path):
+    memory = InMemoryDiscountRepository(_catalogue()[:1])
+    template = PercentageDiscount(name="Festive 15%", discount_percentage=Decimal(15), discount_rules=[],
+                                  discount_type=DiscountType.VOUCHER_DISCOUNT, expires_at=NOW.add(days=10))
+    memory.bulk_load_voucher_codes(template, ["FEST-0001"])
+    path = str(tmp_path / "catalogue.bin")
+    write_catalogue_file(path, memory.catalogue)
+
+    with MappedDiscountRepository(path) as mapped:
+        versions = [await mapped.get_catalogue_version(NOW.add(days=days)) for days in (9, 11)]
+        assert versions == [await memory.get_catalogue_version(NOW.add(days=days)) for days in (9, 11)]
+    assert versions[0] != versions[1]
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "catalogue.json"
+    path.write_text('{"discounts": []}')
+
+    with pytest.raises(ValueError):
+        MappedDiscountRepository(str(path))
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+import clock
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+
+
+class FixedClock(clock.IClock):
+
+    def __init__(self, now: datetime) -> None:
+        self._now = now
+
+    def now(self) -> datetime:
+        return self._now
+
+
+@pytest.fixture
+def fixed_clock():
+    fixed = FixedClock(datetime.now(timezone.utc) + timedelta(days=2))
+    previous = clock.set_clock(fixed)
+    yield fixed
+    clock.set_clock(previous)
+
+
+def test_default_clock_is_timezone_aware_utc():
+    assert isinstance(clock.get_clock(), clock.StdlibClock)
+    assert clock.now().utcoffset() == timedelta(0)
+
+
+def test_discounts_read_the_installed_clock(fixed_clock):
+    discount = PercentageDiscount(name="Soon", discount_rules=[], discount_type=DiscountType.BRAND_DISCOUNT,
+                                  expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+                                  discount_percentage=Decimal(10))
+
+    assert discount.is_expired()
+    assert not discount.is_expired(now=datetime.now(timezone.utc))
+
+
+def test_pendulum_clock_compares_with_stdlib_timestamps():
+    pytest.importorskip("pendulum")
+    now = clock.PendulumClock().now()
+
+    assert datetime.now(timezone.utc) - timedelta(minutes=1) < now <= datetime.now(timezone.utc)
+
+
+def test_importing_the_service_does_not_import_heavy_modules():
+    script = ("import sys, services.discount_service, discounts.processor.columnar_discount_processor, "
+              "discounts.processor.parallel_discount_processor; "
+              "print(sorted({'pendulum', 'numpy', 'asyncio', 'concurrent.futures'} & set(sys.modules)))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", script], cwd=root, check=True, capture_output=True,
+                            text=True).stdout
+
+    assert output.strip() == "[]"
+
+
+def test_discount_timestamps_are_kept_in_stdlib_utc():
+    pendulum = pytest.importorskip("pendulum")
+    expires_at = pendulum.datetime(2030, 1, 1, 5, 30, tz="Asia/Kolkata")
+    discount = PercentageDiscount(name="Kolkata", discount_rules=[], discount_type=DiscountType.BRAND_DISCOUNT,
+                                  expires_at=expires_at, starts_at=pendulum.now("UTC"),
+                                  discount_percentage=Decimal(10))
+
+    assert type(discount.expires_at) is datetime and discount.expires_at.tzinfo is timezone.utc
+    assert discount.expires_at == expires_at == datetime(2030, 1, 1, tzinfo=timezone.utc)
+    assert discount.starts_at.tzinfo is timezone.utc
@@ -0,0 +1,127 @@
+import asyncio
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from repositories.coalescing_discount_repository import CoalescingDiscountRepository
+from repositories.discount_repository import InMemoryDiscountRepository
+
+
+class SlowRepository(InMemoryDiscountRepository):
+
+    def __init__(self, discounts, latency_seconds: float = 0.01) -> None:
+        super().__init__(discounts)
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self.running = self.peak_running = 0
+        self.failures_left = 0
+
+    async def list_all_active_discounts(self, exclude_discount_type, now=None):
+        await self._round_trip()
+        return await super().list_all_active_discounts(exclude_discount_type, now=now)
+
+    async def get_discount_by_code(self, discount_code):
+        await self._round_trip()
+        return await super().get_discount_by_code(discount_code)
+
+    async def _round_trip(self) -> None:
+        self.calls += 1
+        self.running += 1
+        self.peak_running = max(self.peak_running, self.running)
+        try:
+            await asyncio.sleep(self.latency_seconds)
+            if self.failures_left:
+                self.failures_left -= 1
+                raise ConnectionError("backend unavailable")
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_backend_call(discount_factory):
+    backend = SlowRepository([discount_factory("Brand")])
+    repository = CoalescingDiscountRepository(backend)
+
+    listings = await asyncio.gather(*(repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT})
+                                      for _ in range(100)))
+
+    assert backend.calls == 1
+    assert (repository.stats.hits, repository.stats.misses) == (99, 1)
+    assert all([discount.name for discount in listing] == ["Brand"] for listing in listings)
+
+
+@pytest.mark.asyncio
+async def test_different_and_sequential_calls_are_not_coalesced(discount_factory):
+    backend = SlowRepository([discount_factory("Brand")])
+    repository = CoalescingDiscountRepository(backend)
+
+    await asyncio.gather(repository.get_discount_by_code("Brand"), repository.get_discount_by_code("Other"),
+                         repository.list_all_active_discounts(set()),
+                         repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT}))
+    await repository.get_discount_by_code("Brand")
+
+    assert backend.calls == 5
+
+
+@pytest.mark.asyncio
+async def test_calls_for_explicit_instants_only_share_a_listing_of_the_same_catalogue_version(discount_factory):
+    now = pendulum.now("UTC")
+    starts_soon = PercentageDiscount(name="Starts soon", discount_percentage=Decimal(10), discount_rules=[],
+                                     discount_type=DiscountType.BRAND_DISCOUNT,
+                                     starts_at=now + pendulum.duration(hours=1),
+                                     expires_at=now + pendulum.duration(days=30))
+    backend = SlowRepository([discount_factory("Brand"), starts_soon])
+    repository = CoalescingDiscountRepository(backend)
+    instants = [now, now + pendulum.duration(minutes=1), now + pendulum.duration(hours=2)]
+
+    listings = await asyncio.gather(*(repository.list_all_active_discounts(set(), now=instant)
+                                      for instant in instants))
+
+    assert [[discount.name for discount in listing] for listing in listings] == \
+           [["Brand"], ["Brand"], ["Brand", "Starts soon"]]
+    assert backend.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_backend_calls_are_bounded(discount_factory):
+    backend = SlowRepository([discount_factory("Brand")])
+    repository = CoalescingDiscountRepository(backend, max_concurrent_calls=3)
+
+    results = await asyncio.gather(*(repository.get_discount_by_code(f"CODE-{index}") for index in range(20)))
+
+    assert results == [None] * 20
+    assert backend.calls == 20
+    assert backend.peak_running == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_are_not_remembered(discount_factory):
+    backend = SlowRepository([discount_factory("Brand")])
+    backend.failures_left = 1
+    repository = CoalescingDiscountRepository(backend)
+
+    results = await asyncio.gather(*(repository.get_discount_by_code("Brand") for _ in range(5)),
+                                   return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert (await repository.get_discount_by_code("Brand")).name == "Brand"
+    assert backend.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_does_not_cancel_the_shared_call(discount_factory):
+    backend = SlowRepository([discount_factory("Brand")], latency_seconds=0.05)
+    repository = CoalescingDiscountRepository(backend)
+
+    first = asyncio.create_task(repository.get_discount_by_code("Brand"))
+    second = asyncio.create_task(repository.get_discount_by_code("Brand"))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert (await second).name == "Brand"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert backend.calls == 1
@@ -0,0 +1,182 @@
+import copy
+import random
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP
+
+import pendulum
+import pytest
+
+from benchmarks.synthetic_data import (
+    DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts, generate_payment_info,
+)
+from discounts.constants import DiscountType
+from discounts.index.discount_index import DiscountIndex
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor import columnar_discount_processor
+from discounts.processor.columnar_discount_processor import ColumnarDiscountProcessor
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from discounts.rules.discount_rule_interface import IDiscountRule
+from discounts.rules.rule_compiler import RuleCompiler
+from models.cart import CartItem
+from models.product import Product, BrandTier
+
+np = pytest.importorskip("numpy")
+
+
+class SmallSizeOnlyRule(IDiscountRule):
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        return cart_item.size == "S"
+
+
+class HalvingDiscount(PercentageDiscount):
+    """A subclass overriding the amount calculation, which must not be vectorized."""
+
+    def calculate_discount_amount_scaled(self, current_price_scaled: int, scale: int) -> int:
+        return current_price_scaled // 2
+
+
+@pytest.fixture
+def strategy():
+    return DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+
+
+def _resolved_discounts(strategy) -> list:
+    catalogue = generate_discounts(300, brands=5, categories=3)
+    resolved_discounts = strategy.resolve_discounts(list(catalogue))
+    resolved_discounts.append(PercentageDiscount(
+        name="Small sizes 12.5%", discount_percentage=Decimal("12.5"), discount_rules=[SmallSizeOnlyRule()],
+        discount_type=DiscountType.BANK_DISCOUNT, expires_at=pendulum.now("UTC") + pendulum.duration(days=1),
+    ))
+    return resolved_discounts
+
+
+@pytest.mark.parametrize("mutate_products", [False, True])
+@pytest.mark.parametrize("rounding", [ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_HALF_DOWN, ROUND_DOWN, ROUND_UP])
+@pytest.mark.parametrize("compile_rules", [False, True])
+def test_matches_scalar_path(strategy, mutate_products, rounding, compile_rules):
+    resolved_discounts = _resolved_discounts(strategy)
+    discount_index = DiscountIndex(resolved_discounts)
+    scalar = MinorUnitDiscountProcessor(strategy, discount_index, mutate_products=mutate_products,
+                                        rounding=rounding)
+    columnar = ColumnarDiscountProcessor(strategy, discount_index, mutate_products=mutate_products,
+                                         rule_compiler=RuleCompiler() if compile_rules else None,
+                                         rounding=rounding, columnar_threshold=0)
+    rng = random.Random(5)
+
+    for _ in range(5):
+        customer, payment_info = generate_customer(rng), generate_payment_info(rng)
+        cart_items = generate_cart(300, brands=5, categories=3, rng=rng)
+        scalar_cart_items = copy.deepcopy(cart_items)
+
+        expected = scalar.apply_resolved_discounts(resolved_discounts, customer, scalar_cart_items, payment_info)
+        actual = columnar.apply_resolved_discounts(resolved_discounts, customer, cart_items, payment_info)
+
+        assert actual == expected
+        assert ([item.product.current_price for item in cart_items]
+                == [item.product.current_price for item in scalar_cart_items])
+
+
+def test_threshold_selects_the_engine(strategy, monkeypatch):
+    resolved_discounts = _resolved_discounts(strategy)
+    processor = ColumnarDiscountProcessor(strategy, mutate_products=False, columnar_threshold=100)
+    scalar = MinorUnitDiscountProcessor(strategy, mutate_products=False)
+    vectorized_calls = []
+    discount_amounts = ColumnarDiscountProcessor._discount_amounts
+
+    def recording_discount_amounts(discount, prices, scale):
+        vectorized_calls.append(len(prices))
+        return discount_amounts(discount, prices, scale)
+
+    monkeypatch.setattr(ColumnarDiscountProcessor, "_discount_amounts", staticmethod(recording_discount_amounts))
+    rng = random.Random(11)
+    customer, payment_info = generate_customer(rng), generate_payment_info(rng)
+
+    small_cart = generate_cart(99, brands=5, categories=3, rng=rng)
+    assert (processor.apply_resolved_discounts(resolved_discounts, customer, small_cart, payment_info)
+            == scalar.apply_resolved_discounts(resolved_discounts, customer, small_cart, payment_info))
+    assert not vectorized_calls
+
+    large_cart = generate_cart(100, brands=5, categories=3, rng=rng)
+    assert (processor.apply_resolved_discounts(resolved_discounts, customer, large_cart, payment_info)
+            == scalar.apply_resolved_discounts(resolved_discounts, customer, large_cart, payment_info))
+    assert vectorized_calls
+
+
+@pytest.mark.parametrize("cart_items, discounts", [
+    pytest.param(
+        None,
+        [HalvingDiscount(name="Half", discount_percentage=Decimal(50), discount_rules=[],
+                         discount_type=DiscountType.BRAND_DISCOUNT,
+                         expires_at=pendulum.now("UTC") + pendulum.duration(days=1))],
+        id="custom discount class",
+    ),
+    pytest.param(
+        None,
+        [PercentageDiscount(name="Twice", discount_percentage=Decimal(percentage), discount_rules=[],
+                            discount_type=discount_type,
+                            expires_at=pendulum.now("UTC") + pendulum.duration(days=1))
+         for percentage, discount_type in [(10, DiscountType.BRAND_DISCOUNT), (5, DiscountType.BANK_DISCOUNT)]],
+        id="repeated discount name",
+    ),
+    pytest.param(
+        [CartItem(product=Product(id="P1", brand="PUMA", brand_tier=BrandTier.PREMIUM, category="T-Shirt",
+                                  base_price=Decimal("10" + "0" * 20), current_price=Decimal("10" + "0" * 20)),
+                  quantity=1, size="M")],
+        [PercentageDiscount(name="10%", discount_percentage=Decimal(10), discount_rules=[],
+                            discount_type=DiscountType.BRAND_DISCOUNT,
+                            expires_at=pendulum.now("UTC") + pendulum.duration(days=1))],
+        id="int64 overflow",
+    ),
+])
+def test_falls_back_to_scalar_path(strategy, monkeypatch, cart_items, discounts):
+    def fail(*args, **kwargs):
+        raise AssertionError("priced column-wise")
+
+    monkeypatch.setattr(ColumnarDiscountProcessor, "_discount_amounts", staticmethod(fail))
+    rng = random.Random(13)
+    customer = generate_customer(rng)
+    cart_items = cart_items or generate_cart(10, brands=5, categories=3, rng=rng)
+    columnar = ColumnarDiscountProcessor(strategy, mutate_products=False, columnar_threshold=0)
+    scalar = MinorUnitDiscountProcessor(strategy, mutate_products=False)
+
+    assert (columnar.apply_resolved_discounts(discounts, customer, cart_items)
+            == scalar.apply_resolved_discounts(discounts, customer, cart_items))
+
+
+def test_without_numpy_every_cart_is_priced_by_the_scalar_path(strategy, monkeypatch):
+    monkeypatch.setattr(columnar_discount_processor, "np", None)
+    resolved_discounts = _resolved_discounts(strategy)
+    rng = random.Random(17)
+    customer, payment_info = generate_customer(rng), generate_payment_info(rng)
+    cart_items = generate_cart(50, brands=5, categories=3, rng=rng)
+    columnar = ColumnarDiscountProcessor(strategy, mutate_products=False, columnar_threshold=0)
+    scalar = MinorUnitDiscountProcessor(strategy, mutate_products=False)
+
+    assert (columnar.apply_resolved_discounts(resolved_discounts, customer, cart_items, payment_info)
+            == scalar.apply_resolved_discounts(resolved_discounts, customer, cart_items, payment_info))
+
+
+def test_wholesale_cart_micro_benchmark(strategy):
+    resolved_discounts = strategy.resolve_discounts(list(generate_discounts(300, brands=5, categories=3)))
+    scalar = MinorUnitDiscountProcessor(strategy, mutate_products=False)
+    columnar = ColumnarDiscountProcessor(strategy, mutate_products=False)
+    rng = random.Random(19)
+    jobs = [(resolved_discounts, generate_customer(rng), generate_cart(5_000, brands=5, categories=3, rng=rng),
+             generate_payment_info(rng)) for _ in range(3)]
+
+    def best_of(processor) -> float:
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            for job in jobs:
+                processor.apply_resolved_discounts(*job)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    scalar_seconds, columnar_seconds = best_of(scalar), best_of(columnar)
+    print(f"scalar: {scalar_seconds:.4f}s, columnar: {columnar_seconds:.4f}s, "
+          f"speedup: {scalar_seconds / columnar_seconds:.2f}x")
+    # Loose bound so a noisy machine does not fail the suite; the printed speedup is the measurement.
+    assert columnar_seconds < scalar_seconds * 1.5
@@ -0,0 +1,140 @@
+import itertools
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.index.discount_index import DiscountIndex
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.discount_rule_interface import IDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from models.cart import CartItem
+from models.customer import CustomerProfile, CustomerTier
+from models.payment import PaymentInfo, PaymentMethod, CardType
+from models.product import Product, BrandTier
+from repositories.discount_repository import InMemoryDiscountRepository
+
+DISCOUNT_TYPE_ORDERING = [
+    DiscountType.BRAND_DISCOUNT,
+    DiscountType.CATEGORY_DISCOUNT,
+    DiscountType.VOUCHER_DISCOUNT,
+    DiscountType.BANK_DISCOUNT,
+]
+
+
+class SmallSizeOnlyRule(IDiscountRule):
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        return cart_item.size == "S"
+
+
+def _expires_at():
+    return pendulum.now("UTC") + pendulum.duration(days=30)
+
+
+def _catalogue() -> list:
+    return [
+        PercentageDiscount(
+            name="Puma 40%", discount_percentage=Decimal(40),
+            discount_rules=[BrandDiscountRule(include_brands=["PUMA"]), CategoryDiscountRule(include_categories=["T-Shirt"])],
+            discount_type=DiscountType.BRAND_DISCOUNT, expires_at=_expires_at(),
+        ),
+        PercentageDiscount(
+            name="Not Nike 5%", discount_percentage=Decimal(5),
+            discount_rules=[BrandDiscountRule(exclude_brands=["NIKE"])],
+            discount_type=DiscountType.CATEGORY_DISCOUNT, expires_at=_expires_at(),
+        ),
+        FixedAmountDiscount(
+            name="Gold shoes 100 off", discount_amount=Decimal(100),
+            discount_rules=[CategoryDiscountRule(include_categories=["Shoes"]),
+                            CustomerTierDiscountRule(include_tiers=[CustomerTier.GOLD])],
+            discount_type=DiscountType.VOUCHER_DISCOUNT, expires_at=_expires_at(),
+        ),
+        PercentageDiscount(
+            name="ICICI UPI 10%", discount_percentage=Decimal(10),
+            discount_rules=[PaymentDiscountRule(applicable_banks=["ICICI Bank"],
+                                                applicable_payment_methods=[PaymentMethod.UPI]),
+                            SmallSizeOnlyRule()],
+            discount_type=DiscountType.BANK_DISCOUNT, expires_at=_expires_at(),
+        ),
+    ]
+
+
+def _cart() -> list[CartItem]:
+    products = [
+        ("P1", "PUMA", "T-Shirt", "1000"), ("P2", "NIKE", "Shoes", "4000"),
+        ("P3", "ADIDAS", "Shoes", "3000"), ("P4", "PUMA", "Shoes", "2500"),
+    ]
+    return [
+        CartItem(product=Product(id=product_id, brand=brand, brand_tier=BrandTier.PREMIUM, category=category,
+                                 base_price=Decimal(price), current_price=Decimal(price)),
+                 quantity=quantity, size=size)
+        for (product_id, brand, category, price), quantity, size in zip(products, [1, 2, 1, 3], ["S", "M", "S", "L"])
+    ]
+
+
+@pytest.mark.parametrize("tier, payment_info", list(itertools.product(
+    list(CustomerTier),
+    [None,
+     PaymentInfo(method=PaymentMethod.UPI, bank_name="ICICI Bank", card_type=None),
+     PaymentInfo(method=PaymentMethod.CARD_PAYMENT, bank_name="ICICI Bank", card_type=CardType.CREDIT_CARD)],
+)))
+def test_indexed_processor_matches_unindexed(tier, payment_info):
+    discounts = _catalogue()
+    customer = CustomerProfile(id="C1", name="Jane", tier=tier, email="j@example.com", phone="1")
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+
+    expected = DiscountProcessor(strategy).apply_discounts(
+        discounts=list(discounts), customer_profile=customer, cart_items=_cart(), payment_info=payment_info)
+    indexed = DiscountProcessor(strategy, discount_index=DiscountIndex(discounts)).apply_discounts(
+        discounts=list(discounts), customer_profile=customer, cart_items=_cart(), payment_info=payment_info)
+
+    assert indexed == expected
+
+
+def test_index_candidates_follow_include_filters():
+    puma, not_nike, gold_shoes, icici_upi = discounts = _catalogue()
+    index = DiscountIndex(discounts)
+    customer = CustomerProfile(id="C1", name="Jane", tier=CustomerTier.GOLD, email="j@example.com", phone="1")
+    upi = PaymentInfo(method=PaymentMethod.UPI, bank_name="ICICI Bank", card_type=None)
+    puma_tshirt, nike_shoes = _cart()[:2]
+
+    assert index.candidate_ids(customer, puma_tshirt, upi) == {id(puma), id(not_nike), id(icici_upi)}
+    # Exclusions are verified by `is_applicable`, so the NIKE exclusion is still a candidate.
+    assert index.candidate_ids(customer, nike_shoes, None) == {id(not_nike), id(gold_shoes)}
+
+
+def test_repository_keeps_index_in_sync():
+    puma, not_nike, *_ = _catalogue()
+    repository = InMemoryDiscountRepository([puma])
+    customer = CustomerProfile(id="C1", name="Jane", tier=CustomerTier.GOLD, email="j@example.com", phone="1")
+    puma_tshirt = _cart()[0]
+
+    repository.add_discount(not_nike)
+    assert repository.discount_index.candidate_ids(customer, puma_tshirt) == {id(puma), id(not_nike)}
+
+    repository.remove_discount(puma)
+    assert repository.discount_index.candidate_ids(customer, puma_tshirt) == {id(not_nike)}
+
+    repository.replace_discounts([puma])
+    assert repository.discount_index.candidate_ids(customer, puma_tshirt) == {id(puma)}
+
+
+def test_processor_follows_published_snapshots():
+    puma, not_nike, *_ = _catalogue()
+    repository = InMemoryDiscountRepository([puma])
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                                  discount_index=repository.get_discount_index)
+    assert processor._discount_index is repository.discount_index
+
+    repository.add_discount(not_nike)
+
+    assert processor._discount_index is repository.discount_index
+    assert not_nike in processor._discount_index
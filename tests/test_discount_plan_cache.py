@@ -0,0 +1,129 @@
+import copy
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_discounts, generate_requests
+from discounts.constants import DiscountType
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processing_strategies.optimal_discount_processing_strategy import OptimalDiscountProcessingStrategy
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from models.customer import CustomerTier
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_plan_cache import DiscountPlan, DiscountPlanCache
+
+
+def test_least_recently_used_plan_is_evicted():
+    plan_cache = DiscountPlanCache(max_entries=2)
+    for key in ("a", "b"):
+        assert plan_cache.get(1, (key,)) is None
+        plan_cache.put(1, (key,), DiscountPlan([]))
+    assert plan_cache.get(1, ("a",)) is not None
+    plan_cache.put(1, ("c",), DiscountPlan([]))
+
+    assert plan_cache.get(1, ("b",)) is None
+    assert plan_cache.get(1, ("a",)) is not None
+    assert plan_cache.get(1, ("c",)) is not None
+    assert (plan_cache.stats.hits, plan_cache.stats.misses, plan_cache.stats.evictions) == (3, 3, 1)
+
+
+def test_new_catalogue_version_drops_every_plan():
+    plan_cache = DiscountPlanCache()
+    plan_cache.get(1, ("a",))
+    plan_cache.put(1, ("a",), DiscountPlan([]))
+
+    assert plan_cache.get(2, ("a",)) is None
+    assert len(plan_cache) == 0
+    assert plan_cache.stats.evictions == 1
+    # A plan built against the previous version is not stored.
+    plan_cache.put(1, ("a",), DiscountPlan([]))
+    assert len(plan_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_plans_price_like_uncached_resolution(service_factory):
+    discounts = generate_discounts(500, brands=10, categories=5, voucher_share=0.1)
+    voucher_codes = [discount.discount_code for discount in discounts
+                     if discount.discount_type == DiscountType.VOUCHER_DISCOUNT][:5] + ["NO-SUCH-CODE"]
+    requests = generate_requests(300, brands=10, categories=5, max_cart_size=20, voucher_codes=voucher_codes,
+                                 voucher_share=0.3, seed=4)
+    repository = InMemoryDiscountRepository(discounts)
+    plan_cache = DiscountPlanCache()
+    cached, uncached = service_factory(repository, plan_cache=plan_cache), service_factory(repository)
+
+    for request in requests:
+        expected = await uncached.calculate_cart_discounts(request.cart_items, request.customer,
+                                                           request.payment_info, request.voucher_code)
+        actual = await cached.calculate_cart_discounts(request.cart_items, request.customer, request.payment_info,
+                                                       request.voucher_code)
+        assert actual == expected
+
+    assert plan_cache.stats.hits > plan_cache.stats.misses
+    assert [result async for result in cached.calculate_many(requests, batch_size=64)] == [
+        result async for result in uncached.calculate_many(copy.deepcopy(requests), batch_size=64)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hits_skip_listing_and_resolution(cart_factory, customer_factory, discount_factory, service_factory):
+    repository = InMemoryDiscountRepository([discount_factory("Brand 10%")])
+    service = service_factory(repository, plan_cache=DiscountPlanCache())
+    await service.calculate_cart_discounts(cart_factory(), customer_factory())
+
+    with patch.object(repository, "list_all_active_discounts") as list_all_active_discounts, \
+            patch.object(DefaultDiscountProcessingStrategy, "resolve_discounts") as resolve_discounts:
+        result = await service.calculate_cart_discounts(cart_factory(), customer_factory())
+
+    list_all_active_discounts.assert_not_called()
+    resolve_discounts.assert_not_called()
+    assert result.final_price == Decimal(900)
+
+
+@pytest.mark.asyncio
+async def test_plans_leave_out_discounts_the_segment_can_never_use(cart_factory, customer_factory, discount_factory,
+                                                                   service_factory):
+    repository = InMemoryDiscountRepository([
+        discount_factory("Gold 10%", rules=[CustomerTierDiscountRule(include_tiers=[CustomerTier.GOLD])]),
+    ])
+    plan_cache = DiscountPlanCache()
+    service = service_factory(repository, plan_cache=plan_cache)
+
+    gold, silver = customer_factory(CustomerTier.GOLD), customer_factory(CustomerTier.SILVER)
+    assert (await service.calculate_cart_discounts(cart_factory(), gold)).final_price == 900
+    assert (await service.calculate_cart_discounts(cart_factory(), silver)).final_price == 1000
+    version = repository.catalogue_version
+    gold_plan = plan_cache.get(version, (CustomerTier.GOLD, None, None, None))
+    silver_plan = plan_cache.get(version, (CustomerTier.SILVER, None, None, None))
+    assert [discount.name for discount in gold_plan.resolved_discounts] == ["Gold 10%"]
+    assert silver_plan.resolved_discounts == []
+
+
+@pytest.mark.asyncio
+async def test_voucher_added_after_an_invalid_lookup_is_picked_up(cart_factory, customer_factory, discount_factory,
+                                                                  service_factory):
+    repository = InMemoryDiscountRepository([discount_factory("Brand 10%")])
+    service = service_factory(repository, plan_cache=DiscountPlanCache())
+
+    result = await service.calculate_cart_discounts(cart_factory(), customer_factory(), voucher_code="LATE")
+    assert "Invalid voucher code : LATE" in result.message
+
+    repository.bulk_load_voucher_codes(discount_factory("Late voucher", DiscountType.VOUCHER_DISCOUNT), ["LATE"])
+    result = await service.calculate_cart_discounts(cart_factory(), customer_factory(), voucher_code="LATE")
+    assert "Invalid voucher code" not in result.message
+    assert result.final_price == Decimal(810)
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bypassed_when_plans_cannot_be_shared(cart_factory, customer_factory, discount_factory,
+                                                             service_factory):
+    plan_cache = DiscountPlanCache()
+    repository = InMemoryDiscountRepository([discount_factory("Brand 10%")])
+    await service_factory(repository, OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING),
+                          plan_cache=plan_cache).calculate_cart_discounts(cart_factory(), customer_factory())
+
+    with patch.object(repository, "get_catalogue_version", return_value=None):
+        await service_factory(repository, plan_cache=plan_cache).calculate_cart_discounts(cart_factory(),
+                                                                                          customer_factory())
+
+    assert plan_cache.stats.hits == plan_cache.stats.misses == 0
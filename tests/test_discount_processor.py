@@ -0,0 +1,100 @@
+import copy
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from models.cart import CartItem
+from models.customer import CustomerProfile, CustomerTier
+from models.discount import DiscountedLineItem
+from models.product import Product, BrandTier
+
+DISCOUNT_TYPE_ORDERING = [
+    DiscountType.BRAND_DISCOUNT,
+    DiscountType.CATEGORY_DISCOUNT,
+    DiscountType.VOUCHER_DISCOUNT,
+    DiscountType.BANK_DISCOUNT,
+]
+
+
+@pytest.fixture
+def discounts():
+    expires_at = pendulum.now("UTC") + pendulum.duration(days=30)
+    return [
+        PercentageDiscount(name="Puma 40%", discount_percentage=Decimal(40),
+                           discount_rules=[BrandDiscountRule(include_brands=["PUMA"])],
+                           discount_type=DiscountType.BRAND_DISCOUNT, expires_at=expires_at),
+        FixedAmountDiscount(name="100 off", discount_amount=Decimal(100), discount_rules=[],
+                            discount_type=DiscountType.CATEGORY_DISCOUNT, expires_at=expires_at),
+    ]
+
+
+@pytest.fixture
+def customer():
+    return CustomerProfile(id="C1", name="Jane", tier=CustomerTier.GOLD, email="j@example.com", phone="1")
+
+
+@pytest.fixture
+def shared_catalogue():
+    return {
+        "puma": Product(id="P1", brand="PUMA", brand_tier=BrandTier.PREMIUM, category="T-Shirt",
+                        base_price=Decimal("1000.00"), current_price=Decimal("1000.00")),
+        "nike": Product(id="N1", brand="NIKE", brand_tier=BrandTier.PREMIUM, category="Shoes",
+                        base_price=Decimal("50.00"), current_price=Decimal("50.00")),
+    }
+
+
+def test_isolated_pricing_leaves_shared_products_untouched(discounts, customer, shared_catalogue):
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False)
+    puma, nike = shared_catalogue["puma"], shared_catalogue["nike"]
+    cart_items = [CartItem(product=puma, quantity=2, size="M"), CartItem(product=nike, quantity=1, size="L"),
+                  CartItem(product=puma, quantity=1, size="S")]
+
+    first = processor.apply_discounts(list(discounts), customer, cart_items)
+    second = processor.apply_discounts(list(discounts), customer, cart_items)
+
+    assert first == second
+    assert (puma.current_price, nike.current_price) == (Decimal("1000.00"), Decimal("50.00"))
+    assert first.final_price == Decimal("500.00") * 3 + Decimal("0.00")
+    assert first.line_items[0] == DiscountedLineItem(
+        product_id="P1", quantity=2, unit_price=Decimal("1000.00"), final_unit_price=Decimal("500.00"),
+        applied_discounts={"Puma 40%": Decimal("400.00"), "100 off": Decimal(100)},
+    )
+    assert first.line_items[1].applied_discounts == {"100 off": Decimal("50.00")}
+
+
+def test_mutating_pricing_keeps_writing_current_price(discounts, customer, shared_catalogue):
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING))
+    isolated = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False)
+    puma = shared_catalogue["puma"]
+    cart_items = [CartItem(product=puma, quantity=1, size="M"), CartItem(product=puma, quantity=1, size="S")]
+
+    expected = isolated.apply_discounts(list(discounts), customer, copy.deepcopy(cart_items))
+    discounted_price = processor.apply_discounts(list(discounts), customer, cart_items)
+
+    # Both lines share one Product, so the second line is discounted on top of the first.
+    assert puma.current_price == discounted_price.line_items[1].final_unit_price
+    assert discounted_price.final_price < expected.final_price
+
+
+def test_discounts_are_evaluated_at_the_given_timestamp(discounts, customer, shared_catalogue):
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False)
+    cart_items = [CartItem(product=shared_catalogue["puma"], quantity=1, size="M")]
+    discounts[0].starts_at = pendulum.now("UTC") + pendulum.duration(days=1)
+
+    today = processor.apply_discounts(list(discounts), customer, cart_items)
+    tomorrow = processor.apply_discounts(list(discounts), customer, cart_items,
+                                         now=pendulum.now("UTC") + pendulum.duration(days=2))
+    next_year = processor.apply_discounts(list(discounts), customer, cart_items,
+                                          now=pendulum.now("UTC") + pendulum.duration(days=365))
+
+    assert list(today.applied_discounts) == ["100 off"]
+    assert list(tomorrow.applied_discounts) == ["Puma 40%", "100 off"]
+    assert next_year.applied_discounts == {}
+    assert next_year.final_price == Decimal("1000.00")
@@ -0,0 +1,172 @@
+import asyncio
+from decimal import Decimal
+from unittest.mock import patch
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from repositories.discount_repository import InMemoryDiscountRepository
+
+
+def _voucher(name: str, discount_code: str | None = None) -> PercentageDiscount:
+    return PercentageDiscount(
+        name=name,
+        discount_code=discount_code,
+        discount_percentage=Decimal(15),
+        discount_rules=[],
+        discount_type=DiscountType.VOUCHER_DISCOUNT,
+        expires_at=pendulum.now("UTC") + pendulum.duration(days=30),
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_discount_by_code_follows_catalogue_changes():
+    first, duplicate = _voucher("First", "SAVE15"), _voucher("Duplicate", "SAVE15")
+    repository = InMemoryDiscountRepository([first, duplicate])
+    assert await repository.get_discount_by_code("SAVE15") is first
+
+    repository.remove_discount(first)
+    assert await repository.get_discount_by_code("SAVE15") is duplicate
+
+    welcome = _voucher("Welcome")
+    repository.add_discount(welcome)
+    assert await repository.get_discount_by_code("Welcome") is welcome
+
+    repository.replace_discounts([])
+    assert await repository.get_discount_by_code("SAVE15") is None
+    assert await repository.get_discount_by_code("Welcome") is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_loaded_voucher_codes_share_template():
+    template = _voucher("Festive 15%")
+    repository = InMemoryDiscountRepository()
+    version = await repository.get_catalogue_version()
+
+    loaded = repository.bulk_load_voucher_codes(template, (f"FEST-{number:06d}" for number in range(1000)))
+
+    voucher = await repository.get_discount_by_code("FEST-000042")
+    assert loaded == 1000
+    assert voucher.discount_code == "FEST-000042"
+    assert voucher.name == template.name and voucher.discount_percentage == template.discount_percentage
+    assert template.discount_code == "Festive 15%"
+    assert await repository.get_catalogue_version() > version
+    assert not await repository.list_all_active_discounts(exclude_discount_type=set())
+
+    repository.remove_voucher_codes(["FEST-000042"])
+    assert await repository.get_discount_by_code("FEST-000042") is None
+
+
+def _campaign(name: str, starts_at, expires_at) -> PercentageDiscount:
+    return PercentageDiscount(name=name, discount_percentage=Decimal(10), discount_rules=[],
+                              discount_type=DiscountType.BRAND_DISCOUNT, starts_at=starts_at, expires_at=expires_at)
+
+
+@pytest.mark.asyncio
+async def test_schedule_activates_and_evicts_discounts():
+    now = pendulum.now("UTC")
+    running = _campaign("Running", None, now + pendulum.duration(days=1))
+    upcoming = _campaign("Upcoming", now + pendulum.duration(days=2), now + pendulum.duration(days=3))
+    repository = InMemoryDiscountRepository([upcoming, running])
+
+    async def active_at(days: int) -> list[str]:
+        listed = await repository.list_all_active_discounts(set(), now=now + pendulum.duration(days=days))
+        return [discount.name for discount in listed]
+
+    assert await active_at(0) == ["Running"]
+    assert await active_at(2) == ["Upcoming"]
+    assert await active_at(5) == []
+    assert await active_at(0) == ["Running"]
+    catalogue = repository.catalogue
+    assert catalogue.version_at(now) < catalogue.version_at(now + pendulum.duration(days=2)) < catalogue.next_version
+
+
+@pytest.mark.asyncio
+async def test_expired_discounts_are_dropped_from_the_next_snapshot():
+    now = pendulum.now("UTC")
+    expiring = _campaign("Expiring", None, now + pendulum.duration(days=1))
+    running = _campaign("Running", None, now + pendulum.duration(days=30))
+    repository = InMemoryDiscountRepository([expiring, running])
+
+    with patch("clock.now", return_value=now + pendulum.duration(days=2)):
+        repository.add_discount(_voucher("Welcome"))
+
+    assert [discount.name for discount in repository.all_discounts] == ["Running", "Welcome"]
+    assert expiring not in repository.discount_index
+    assert await repository.get_discount_by_code("Expiring") is None
+    listed = await repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT}, now=now)
+    assert [discount.name for discount in listed] == ["Running"]
+
+
+def test_next_snapshot_keeps_discounts_active_at_the_given_now():
+    now = pendulum.now("UTC")
+    expired = _campaign("Expired", None, now - pendulum.duration(days=1))
+    catalogue = InMemoryDiscountRepository([expired]).catalogue
+
+    week_ago = now - pendulum.duration(days=7)
+    kept = catalogue.with_changes(discounts=catalogue.discounts + (_voucher("Welcome"),), now=week_ago)
+
+    assert [discount.name for discount in kept.discounts] == ["Expired", "Welcome"]
+    assert [discount.name for discount in kept.active_discounts(set(), week_ago)] == ["Expired", "Welcome"]
+    assert [discount.name for discount in catalogue.with_changes(discounts=kept.discounts).discounts] == ["Welcome"]
+
+
+@pytest.mark.asyncio
+async def test_schedule_follows_catalogue_changes():
+    now = pendulum.now("UTC")
+    running = _campaign("Running", None, now + pendulum.duration(days=1))
+    repository = InMemoryDiscountRepository([running])
+
+    repository.remove_discount(running)
+    repository.add_discount(_campaign("Added", now - pendulum.duration(days=1), now + pendulum.duration(days=1)))
+
+    assert [d.name for d in await repository.list_all_active_discounts(set(), now=now)] == ["Added"]
+    assert not await repository.list_all_active_discounts(set(), now=now + pendulum.duration(days=2))
+
+
+@pytest.mark.asyncio
+async def test_updates_publish_a_new_snapshot():
+    now = pendulum.now("UTC")
+    running = _campaign("Running", None, now + pendulum.duration(days=1))
+    repository = InMemoryDiscountRepository([running])
+    before = repository.catalogue
+    listed = await repository.list_all_active_discounts(set(), now=now)
+
+    repository.add_discount(_campaign("Added", None, now + pendulum.duration(days=1)))
+
+    # Readers holding the previous snapshot keep seeing it, indexes included.
+    assert before.discounts == (running,) and len(before.discount_index) == 1
+    assert [discount.name for discount in listed] == ["Running"]
+    assert repository.catalogue.version > before.version_at(now + pendulum.duration(days=365))
+    assert len(repository.discount_index) == 2
+    assert [discount.name for discount in await repository.list_all_active_discounts(set(), now=now)] == \
+           ["Running", "Added"]
+
+
+@pytest.mark.asyncio
+async def test_background_update_is_reapplied_after_a_concurrent_update():
+    now = pendulum.now("UTC")
+    repository = InMemoryDiscountRepository([_campaign("Running", None, now + pendulum.duration(days=1))])
+    building = asyncio.Event()
+    bulk = _campaign("Bulk", None, now + pendulum.duration(days=1))
+    bases = []
+
+    def add_bulk(catalogue):
+        bases.append(catalogue)
+        if len(bases) == 1:
+            # Still building the first attempt when the concurrent update is published.
+            asyncio.run_coroutine_threadsafe(building.wait(), loop).result()
+        return catalogue.with_changes(discounts=catalogue.discounts + (bulk,))
+
+    loop = asyncio.get_running_loop()
+    update = asyncio.create_task(repository.update_in_background(add_bulk))
+    await asyncio.sleep(0.01)
+    repository.add_discount(_campaign("Concurrent", None, now + pendulum.duration(days=1)))
+    building.set()
+    published = await update
+
+    assert len(bases) == 2
+    assert published is repository.catalogue
+    assert [discount.name for discount in repository.all_discounts] == ["Running", "Concurrent", "Bulk"]
@@ -10,83 +10,18 @@ from discounts.percentage_discount import PercentageDiscount
 from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
 from discounts.processor.discount_processor import DiscountProcessor
 from discounts.rules.brand_discount_rule import BrandDiscountRule
-from exceptions import DiscountNotFoundException
+from exceptions import DiscountNotFoundException, DiscountNotStartedException
 from fake_data import DUMMY_DISCOUNTS
 from models.cart import CartItem
-from models.customer import CustomerTier, CustomerProfile
 from models.discount import DiscountedPrice
-from models.payment import PaymentMethod, CardType, PaymentInfo
-from models.product import BrandTier, Product
+from models.product import Product
 from repositories.discount_repository import InMemoryDiscountRepository
 from services.discount_service import DiscountService
 
 
-@pytest.fixture
-def product_factory():
-    """Factory for creating product variants."""
-
-    def _create_product(
-            brand="Puma",
-            brand_tier=BrandTier.PREMIUM,
-            category="T-Shirt",
-            base_price=1000.0,
-            **kwargs
-    ):
-        return Product(
-            id=kwargs.get("id", "prod_123"),
-            brand=brand,
-            brand_tier=brand_tier,
-            category=category,
-            base_price=Decimal(base_price),
-            current_price=Decimal(kwargs.get("current_price", base_price)),
-        )
-
-    return _create_product
-
-
-@pytest.fixture
-def customer_factory():
-    """Factory for creating customer variants."""
-
-    def _create_customer(
-            tier=CustomerTier.GOLD,
-            name="John Doe",
-            **kwargs
-    ):
-        return CustomerProfile(
-            id=kwargs.get("id", "cust_123"),
-            name=name,
-            tier=tier,
-            email=kwargs.get("email", "jd@gmail.com"),
-            phone=kwargs.get("phone", "1234567890"),
-        )
-
-    return _create_customer
-
-
-@pytest.fixture
-def payment_info_factory():
-    """Factory for creating payment info variants."""
-
-    def _create_payment_info(
-            method=PaymentMethod.CARD_PAYMENT,
-            bank_name: str = "ICICI Bank",
-            card_type: CardType = CardType.CREDIT_CARD,
-            **kwargs
-    ):
-        return PaymentInfo(
-            method=method,
-            bank_name=bank_name,
-            card_type=kwargs.get("card_type", card_type),
-        )
-
-    return _create_payment_info
-
-
 @pytest.fixture
 def discount_service():
-    discount_repo = InMemoryDiscountRepository()
-    discount_repo.all_discounts = DUMMY_DISCOUNTS
+    discount_repo = InMemoryDiscountRepository(DUMMY_DISCOUNTS)
 
     discount_processor = DiscountProcessor(discount_application_strategy=DefaultDiscountProcessingStrategy(
         [
@@ -181,3 +116,105 @@ async def test_validate_discount_code_invalid(
             customer=customer_factory(),
         )
 
+
+@pytest.mark.asyncio
+async def test_validate_discount_code_not_started(discount_service, product_factory, customer_factory):
+    discount_service._discount_repository.add_discount(PercentageDiscount(
+        name="Summer sale",
+        discount_percentage=Decimal(10),
+        discount_rules=[],
+        discount_type=DiscountType.VOUCHER_DISCOUNT,
+        starts_at=pendulum.now("UTC") + pendulum.duration(days=7),
+        expires_at=pendulum.now("UTC") + pendulum.duration(days=30),
+    ))
+
+    with pytest.raises(DiscountNotStartedException):
+        await discount_service.validate_discount_code(
+            code="Summer sale",
+            cart_items=[CartItem(product=product_factory(), quantity=1, size="M")],
+            customer=customer_factory(),
+        )
+
+
+@pytest.mark.asyncio
+async def test_calculate_many_matches_single_cart_pricing(
+        discount_service, product_factory, customer_factory, payment_info_factory
+):
+    discount_service._discount_repository.replace_discounts([
+        PercentageDiscount(
+            name="Puma 40%",
+            discount_percentage=Decimal(40),
+            discount_rules=[BrandDiscountRule(include_brands=["PUMA"])],
+            discount_type=DiscountType.BRAND_DISCOUNT,
+            expires_at=pendulum.now("UTC") + pendulum.duration(days=30),
+        ),
+        PercentageDiscount(
+            name="Welcome 10%",
+            discount_code="welcome_10",
+            discount_percentage=Decimal(10),
+            discount_rules=[],
+            discount_type=DiscountType.VOUCHER_DISCOUNT,
+            expires_at=pendulum.now("UTC") + pendulum.duration(days=30),
+        ),
+    ])
+
+    def _requests():
+        return [
+            (
+                [CartItem(product=product_factory(brand=brand, base_price=price), quantity=quantity, size="M")],
+                customer_factory(),
+                payment_info_factory(),
+                voucher_code,
+            )
+            for brand, price, quantity, voucher_code in [
+                ("PUMA", 1000.0, 1, None),
+                ("NIKE", 2500.0, 2, "welcome_10"),
+                ("PUMA", 1500.0, 3, "invalid_code"),
+                ("PUMA", 800.0, 1, "welcome_10"),
+            ]
+        ]
+
+    expected = [
+        await discount_service.calculate_cart_discounts(
+            cart_items=cart_items, customer=customer, payment_info=payment_info, voucher_code=voucher_code)
+        for cart_items, customer, payment_info, voucher_code in _requests()
+    ]
+    results = [result async for result in discount_service.calculate_many(_requests(), batch_size=3)]
+
+    assert results == expected
+
+
+@pytest.mark.asyncio
+async def test_voucher_is_not_added_to_the_shared_listing(
+        discount_service, product_factory, customer_factory, payment_info_factory
+):
+    repository = discount_service._discount_repository
+    repository.replace_discounts([
+        PercentageDiscount(
+            name="Puma 40%",
+            discount_percentage=Decimal(40),
+            discount_rules=[BrandDiscountRule(include_brands=["PUMA"])],
+            discount_type=DiscountType.BRAND_DISCOUNT,
+            expires_at=pendulum.now("UTC") + pendulum.duration(days=30),
+        ),
+        PercentageDiscount(
+            name="Welcome 10%",
+            discount_code="welcome_10",
+            discount_percentage=Decimal(10),
+            discount_rules=[],
+            discount_type=DiscountType.VOUCHER_DISCOUNT,
+            expires_at=pendulum.now("UTC") + pendulum.duration(days=30),
+        ),
+    ])
+    listing = await repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT})
+
+    discounted_price = await discount_service.calculate_cart_discounts(
+        cart_items=[CartItem(product=product_factory(brand="PUMA"), quantity=1, size="M")],
+        customer=customer_factory(),
+        payment_info=payment_info_factory(),
+        voucher_code="welcome_10",
+    )
+
+    assert set(discounted_price.applied_discounts) == {"Puma 40%", "Welcome 10%"}
+    assert [discount.name for discount in listing] == ["Puma 40%"]
+    assert await repository.list_all_active_discounts({DiscountType.VOUCHER_DISCOUNT}) is listing
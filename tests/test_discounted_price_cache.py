@@ -0,0 +1,128 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from models.customer import CustomerTier
+from models.discount import DiscountedPrice
+from models.payment import PaymentMethod
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discounted_price_cache import DiscountedPriceCache, cart_fingerprint
+
+PUMA_ONLY = [BrandDiscountRule(include_brands=["Puma"])]
+
+
+def _result(line_items: int) -> DiscountedPrice:
+    return DiscountedPrice(original_price=Decimal(1), final_price=Decimal(1), applied_discounts={}, message="",
+                           line_items=[None] * line_items)
+
+
+def test_fingerprint_covers_what_the_price_depends_on(cart_factory, customer_factory, payment_info_factory):
+    upi = payment_info_factory(PaymentMethod.UPI, None, None)
+    fingerprint = cart_fingerprint(cart_factory(), customer_factory(), None, None, 1)
+
+    assert cart_fingerprint(cart_factory(), customer_factory(), None, None, 1) == fingerprint
+    assert cart_fingerprint(cart_factory(), customer_factory(), None, "", 1) == fingerprint
+    for changed in (
+            cart_fingerprint(cart_factory(quantity=2), customer_factory(), None, None, 1),
+            cart_fingerprint(cart_factory(), customer_factory(CustomerTier.SILVER), None, None, 1),
+            cart_fingerprint(cart_factory(), customer_factory(), upi, None, 1),
+            cart_fingerprint(cart_factory(), customer_factory(), None, "WELCOME", 1),
+            cart_fingerprint(cart_factory(), customer_factory(), None, None, 2),
+    ):
+        assert changed != fingerprint
+
+
+@pytest.mark.asyncio
+async def test_repeated_carts_are_served_from_the_cache(cart_factory, customer_factory, discount_factory,
+                                                         service_factory):
+    price_cache = DiscountedPriceCache()
+    service = service_factory(InMemoryDiscountRepository([discount_factory("PUMA 10%", rules=PUMA_ONLY)]),
+                              price_cache=price_cache)
+
+    first = await service.calculate_cart_discounts(cart_factory(), customer_factory())
+    first.message = "changed by the caller"
+    second = await service.calculate_cart_discounts(cart_factory(), customer_factory())
+
+    assert second.final_price == Decimal(900)
+    assert second.message != first.message
+    assert (price_cache.stats.hits, price_cache.stats.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_results_of_a_changed_catalogue_are_never_served(cart_factory, customer_factory, discount_factory,
+                                                                service_factory):
+    repository = InMemoryDiscountRepository([discount_factory("PUMA 10%", rules=PUMA_ONLY, expires_in_days=1)])
+    price_cache = DiscountedPriceCache()
+    service = service_factory(repository, price_cache=price_cache)
+    customer = customer_factory()
+    assert (await service.calculate_cart_discounts(cart_factory(), customer)).final_price == Decimal(900)
+
+    repository.add_discount(discount_factory("PUMA bank 10%", DiscountType.BANK_DISCOUNT, rules=PUMA_ONLY))
+    assert (await service.calculate_cart_discounts(cart_factory(), customer)).final_price == Decimal(810)
+
+    in_two_days = pendulum.now("UTC") + pendulum.duration(days=2)
+    with patch("clock.now", return_value=in_two_days):
+        assert (await service.calculate_cart_discounts(cart_factory(), customer)).final_price == Decimal(900)
+    assert price_cache.stats.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_results_with_an_expired_voucher_are_never_served(cart_factory, customer_factory, discount_factory,
+                                                                 service_factory):
+    repository = InMemoryDiscountRepository()
+    repository.bulk_load_voucher_codes(discount_factory("V", DiscountType.VOUCHER_DISCOUNT, expires_in_days=1),
+                                       ["ABC"])
+    service = service_factory(repository, price_cache=DiscountedPriceCache())
+    customer = customer_factory()
+    assert (await service.calculate_cart_discounts(cart_factory(), customer, None, "ABC")).final_price == Decimal(900)
+
+    in_two_days = pendulum.now("UTC") + pendulum.duration(days=2)
+    with patch("clock.now", return_value=in_two_days):
+        assert (await service.calculate_cart_discounts(cart_factory(), customer, None, "ABC")).final_price == 1000
+
+
+@pytest.mark.asyncio
+async def test_processors_mutating_products_bypass_the_cache(cart_factory, customer_factory, discount_factory,
+                                                              service_factory):
+    price_cache = DiscountedPriceCache()
+    service = service_factory(InMemoryDiscountRepository([discount_factory("PUMA 10%", rules=PUMA_ONLY)]),
+                              price_cache=price_cache, mutate_products=True)
+
+    await service.calculate_cart_discounts(cart_factory(), customer_factory())
+
+    assert len(price_cache) == 0
+
+
+def test_results_expire_after_the_ttl(monotonic_clock):
+    price_cache = DiscountedPriceCache(ttl_seconds=5, monotonic_clock=monotonic_clock)
+    assert price_cache.get(1, b"cart") is None
+    price_cache.put(1, b"cart", _result(1))
+    monotonic_clock.now = 4
+    assert price_cache.get(1, b"cart") is not None
+
+    monotonic_clock.now = 5
+
+    assert price_cache.get(1, b"cart") is None
+    assert (price_cache.stats.hits, price_cache.stats.misses, price_cache.stats.evictions) == (1, 2, 1)
+
+
+def test_least_recently_used_results_are_evicted_to_bound_entries_and_line_items():
+    price_cache = DiscountedPriceCache(max_entries=3, max_line_items=10)
+    price_cache.get(1, b"")
+    for fingerprint in (b"a", b"b", b"c"):
+        price_cache.put(1, fingerprint, _result(3))
+    price_cache.get(1, b"a")
+
+    price_cache.put(1, b"d", _result(3))
+    assert [price_cache.get(1, fingerprint) is not None for fingerprint in (b"a", b"b", b"c", b"d")] == \
+           [True, False, True, True]
+
+    price_cache.put(1, b"e", _result(4))
+    assert len(price_cache) == 3
+    assert price_cache.get(1, b"a") is None
+    price_cache.put(1, b"huge", _result(11))
+    assert price_cache.get(1, b"huge") is None
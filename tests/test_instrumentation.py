@@ -0,0 +1,123 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.columnar_discount_processor import ColumnarDiscountProcessor
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.rule_compiler import RuleCompiler
+from instrumentation.in_process_instrumentation import InProcessInstrumentation, LatencyHistogram
+from instrumentation.instrumentation_interface import NO_OP_INSTRUMENTATION
+from repositories.discount_repository import InMemoryDiscountRepository
+from repositories.instrumented_discount_repository import InstrumentedDiscountRepository
+from services.discount_plan_cache import DiscountPlanCache
+from services.discount_service import DiscountService
+
+DISCOUNT_TYPE_ORDERING = [
+    DiscountType.BRAND_DISCOUNT,
+    DiscountType.CATEGORY_DISCOUNT,
+    DiscountType.VOUCHER_DISCOUNT,
+    DiscountType.BANK_DISCOUNT,
+]
+
+
+@pytest.fixture
+def discounts(discount_factory):
+    return [
+        discount_factory("Puma 40%", rules=[BrandDiscountRule(include_brands=["PUMA"])], discount_percentage=40),
+        discount_factory("Adidas 10%", DiscountType.CATEGORY_DISCOUNT,
+                         rules=[BrandDiscountRule(include_brands=["ADIDAS"])]),
+        discount_factory("Expired", DiscountType.BANK_DISCOUNT, expires_in_days=-1),
+    ]
+
+
+@pytest.fixture
+def cart_items(cart_item_factory):
+    return [cart_item_factory(id="P1", brand="PUMA", size="M"),
+            cart_item_factory(quantity=2, id="P2", brand="PUMA", size="L"),
+            cart_item_factory(id="N1", brand="NIKE", size="S")]
+
+
+def test_latency_histogram_bounds_percentiles():
+    histogram = LatencyHistogram()
+    for microseconds in [3] * 90 + [1000] * 10:
+        histogram.record(microseconds / 1_000_000)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["min_seconds"] == pytest.approx(3e-6)
+    assert summary["max_seconds"] == pytest.approx(1e-3)
+    assert 3e-6 <= summary["p50_seconds"] <= 6e-6
+    assert 3e-6 <= summary["p90_seconds"] <= 6e-6
+    assert summary["p99_seconds"] == pytest.approx(1e-3)
+
+
+@pytest.mark.parametrize("processor_type", [DiscountProcessor, MinorUnitDiscountProcessor, ColumnarDiscountProcessor])
+@pytest.mark.parametrize("rule_compiler", [None, RuleCompiler()])
+def test_processor_counts_are_the_same_for_every_engine(processor_type, rule_compiler, discounts, cart_items,
+                                                        customer_factory):
+    instrumentation = InProcessInstrumentation()
+    processor = processor_type(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False,
+                               rule_compiler=rule_compiler, instrumentation=instrumentation)
+
+    processor.apply_discounts(discounts, customer_factory(), cart_items)
+
+    counters = instrumentation.snapshot()["counters"]
+    assert counters["carts.priced"] == 1
+    assert counters["discounts.considered"] == 2
+    assert counters["items.matched"] == 2
+    assert counters["rules.evaluated"] > 0
+    assert set(instrumentation.snapshot()["latencies"]) == {"processor.resolve_discounts",
+                                                            "processor.apply_resolved_discounts"}
+
+
+def test_no_op_instrumentation_records_nothing(discounts, cart_items, customer_factory):
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False)
+
+    result = processor.apply_discounts(discounts, customer_factory(), cart_items)
+
+    assert processor._instrumentation is NO_OP_INSTRUMENTATION
+    assert not NO_OP_INSTRUMENTATION.enabled
+    assert result.applied_discounts == {"Puma 40%": Decimal("800")}
+
+
+@pytest.mark.asyncio
+async def test_service_reports_every_stage(discounts, cart_items, customer_factory):
+    instrumentation = InProcessInstrumentation()
+    repository = InstrumentedDiscountRepository(InMemoryDiscountRepository(discounts), instrumentation)
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False,
+                                  instrumentation=instrumentation)
+    service = DiscountService(repository, processor, plan_cache=DiscountPlanCache(),
+                              instrumentation=instrumentation)
+
+    for _ in range(3):
+        await service.calculate_cart_discounts(cart_items, customer_factory())
+    results = [result async for result in service.calculate_many([(cart_items, customer_factory())] * 2)]
+
+    snapshot = instrumentation.snapshot()
+    assert len(results) == 2
+    assert snapshot["counters"]["plan_cache.misses"] == 1
+    assert snapshot["counters"]["plan_cache.hits"] == 4
+    assert snapshot["counters"]["carts.priced"] == 5
+    assert snapshot["latencies"]["service.calculate_cart_discounts"]["count"] == 3
+    assert snapshot["latencies"]["service.calculate_batch"]["count"] == 1
+    assert snapshot["latencies"]["repository.get_catalogue_version"]["count"] == 5
+    assert snapshot["latencies"]["repository.list_all_active_discounts"]["count"] == 1
+
+
+def test_dump_and_reset():
+    instrumentation = InProcessInstrumentation()
+    instrumentation.increment("carts.priced", 3)
+    with instrumentation.time("stage"):
+        pass
+
+    output = io.StringIO()
+    instrumentation.dump(output)
+    instrumentation.reset()
+
+    assert "carts.priced" in output.getvalue() and "stage" in output.getvalue()
+    assert instrumentation.snapshot() == {"counters": {}, "latencies": {}}
@@ -0,0 +1,112 @@
+import copy
+import random
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+import pendulum
+import pytest
+
+from benchmarks.synthetic_data import (
+    DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts, generate_payment_info,
+)
+from discounts.constants import DiscountType
+from discounts.index.discount_index import DiscountIndex
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from models.cart import CartItem
+from models.customer import CustomerProfile, CustomerTier
+from models.discount import MinorUnitLineItem
+from models.product import Product, BrandTier
+
+MINOR_UNIT = Decimal("0.01")
+
+
+def quantize(amount: Decimal, rounding: str = ROUND_HALF_UP) -> Decimal:
+    return amount.quantize(MINOR_UNIT, rounding=rounding)
+
+
+@pytest.fixture
+def strategy():
+    return DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+
+
+@pytest.fixture
+def customer():
+    return CustomerProfile(id="C1", name="Jane", tier=CustomerTier.GOLD, email="j@example.com", phone="1")
+
+
+@pytest.mark.parametrize("mutate_products", [False, True])
+def test_matches_decimal_path_to_the_minor_unit(strategy, mutate_products):
+    catalogue = generate_discounts(300, brands=5, categories=3)
+    discount_index = DiscountIndex(catalogue)
+    decimal_processor = DiscountProcessor(strategy, discount_index, mutate_products=mutate_products)
+    minor_unit_processor = MinorUnitDiscountProcessor(strategy, discount_index, mutate_products=mutate_products)
+    resolved_discounts = decimal_processor.resolve_discounts(list(catalogue))
+    rng = random.Random(3)
+
+    for _ in range(10):
+        customer, payment_info = generate_customer(rng), generate_payment_info(rng)
+        cart_items = generate_cart(200, brands=5, categories=3, rng=rng)
+        expected = decimal_processor.apply_resolved_discounts(resolved_discounts, customer,
+                                                              copy.deepcopy(cart_items), payment_info)
+        actual = minor_unit_processor.apply_resolved_discounts(resolved_discounts, customer, cart_items,
+                                                               payment_info)
+
+        assert actual.message == expected.message
+        assert actual.original_price == quantize(expected.original_price)
+        assert actual.final_price == quantize(expected.final_price)
+        assert actual.applied_discounts == {
+            name: quantize(amount) for name, amount in expected.applied_discounts.items()
+        }
+        for actual_line, expected_line in zip(actual.line_items, expected.line_items, strict=True):
+            assert isinstance(actual_line, MinorUnitLineItem)
+            assert actual_line.product_id == expected_line.product_id
+            assert actual_line.final_unit_price == quantize(expected_line.final_unit_price)
+            assert actual_line.applied_discounts == {
+                name: quantize(amount) for name, amount in expected_line.applied_discounts.items()
+            }
+
+
+def test_rounding_mode_is_configurable(strategy, customer):
+    discount = PercentageDiscount(name="7.5%", discount_percentage=Decimal("7.5"), discount_rules=[],
+                                  discount_type=DiscountType.BRAND_DISCOUNT,
+                                  expires_at=pendulum.now("UTC") + pendulum.duration(days=1))
+    product = Product(id="P1", brand="PUMA", brand_tier=BrandTier.PREMIUM, category="T-Shirt",
+                      base_price=Decimal("9.99"), current_price=Decimal("9.99"))
+
+    def price(rounding: str):
+        processor = MinorUnitDiscountProcessor(strategy, mutate_products=False, rounding=rounding)
+        return processor.apply_discounts([discount], customer, [CartItem(product=product, quantity=1, size="M")])
+
+    # 7.5% of 9.99 is 0.74925
+    assert price(ROUND_HALF_UP).line_items[0].applied_discounts_minor == {"7.5%": 75}
+    assert price(ROUND_DOWN).line_items[0].applied_discounts_minor == {"7.5%": 74}
+    assert price(ROUND_DOWN).final_price == Decimal("9.24")
+    assert price(ROUND_DOWN).line_items[0].to_discounted_line_item().final_unit_price == Decimal("9.24")
+
+
+def test_large_cart_micro_benchmark(strategy):
+    catalogue = generate_discounts(300, brands=5, categories=3)
+    decimal_processor = DiscountProcessor(strategy, mutate_products=False)
+    minor_unit_processor = MinorUnitDiscountProcessor(strategy, mutate_products=False)
+    resolved_discounts = decimal_processor.resolve_discounts(list(catalogue))
+    rng = random.Random(7)
+    jobs = [(resolved_discounts, generate_customer(rng), generate_cart(2_000, brands=5, categories=3, rng=rng),
+             generate_payment_info(rng)) for _ in range(5)]
+
+    # Best of several rounds, alternating the engines so that a noisy stretch slows both of them alike.
+    timings = {decimal_processor: [], minor_unit_processor: []}
+    for _ in range(7):
+        for processor, processor_timings in timings.items():
+            started = time.perf_counter()
+            for job in jobs:
+                processor.apply_resolved_discounts(*job)
+            processor_timings.append(time.perf_counter() - started)
+
+    decimal_seconds, minor_unit_seconds = min(timings[decimal_processor]), min(timings[minor_unit_processor])
+    print(f"decimal: {decimal_seconds:.4f}s, minor units: {minor_unit_seconds:.4f}s, "
+          f"speedup: {decimal_seconds / minor_unit_seconds:.2f}x")
+    # Loose bound so a noisy machine does not fail the suite; benchmarks/pricing_benchmark.py measures the speedup.
+    assert minor_unit_seconds < decimal_seconds * 1.5
@@ -0,0 +1,135 @@
+import itertools
+import random
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from benchmarks.synthetic_data import DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts
+from discounts.constants import DiscountObjective, DiscountType
+from discounts.fixed_amount_discount import FixedAmountDiscount
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processing_strategies.discount_processing_strategy_interface import CartContext
+from discounts.processing_strategies.optimal_discount_processing_strategy import OptimalDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from models.cart import CartItem
+from models.customer import CustomerProfile, CustomerTier
+from models.payment import PaymentInfo, PaymentMethod, CardType
+from models.product import Product, BrandTier
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_service import DiscountService
+
+
+def _final_price(discounts, cart_context: CartContext) -> Decimal:
+    processor = DiscountProcessor(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False)
+    return processor.apply_resolved_discounts(discounts, cart_context.customer_profile, cart_context.cart_items,
+                                              cart_context.payment_info).final_price
+
+
+def _exhaustive_final_prices(discounts, cart_context: CartContext) -> list[Decimal]:
+    by_type = [[d for d in discounts if d.discount_type == discount_type] for discount_type in DISCOUNT_TYPE_ORDERING]
+    return [_final_price(list(combination), cart_context)
+            for combination in itertools.product(*[candidates for candidates in by_type if candidates])]
+
+
+@pytest.fixture
+def cart_context():
+    rng = random.Random(5)
+    return CartContext(
+        customer_profile=CustomerProfile(id="C1", name="Jane", tier=CustomerTier.GOLD, email="j@example.com",
+                                         phone="1"),
+        cart_items=generate_cart(12, brands=4, categories=3, rng=rng),
+        payment_info=PaymentInfo(method=PaymentMethod.CARD_PAYMENT, bank_name="HDFC Bank",
+                                 card_type=CardType.CREDIT_CARD),
+        now=pendulum.now("UTC"),
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("objective, pick", [(DiscountObjective.BEST_FOR_CUSTOMER, min),
+                                             (DiscountObjective.BEST_FOR_MARGIN, max)])
+def test_matches_exhaustive_search(cart_context, seed, objective, pick):
+    discounts = generate_discounts(14, brands=4, categories=3, voucher_share=0.2, seed=seed)
+    strategy = OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING, objective, time_budget_seconds=10)
+
+    resolved = strategy.resolve_discounts(list(discounts), cart_context)
+
+    assert len({discount.discount_type for discount in resolved}) == len(resolved)
+    assert _final_price(resolved, cart_context) == pick(_exhaustive_final_prices(discounts, cart_context))
+    assert strategy.timeouts == 0
+
+
+def test_beats_greedy_when_a_later_expiring_discount_is_better():
+    expires_at = pendulum.now("UTC") + pendulum.duration(days=30)
+    soon, later = (
+        PercentageDiscount(name="Puma 10%", discount_percentage=Decimal(10),
+                           discount_rules=[BrandDiscountRule(include_brands=["PUMA"])],
+                           discount_type=DiscountType.BRAND_DISCOUNT, expires_at=expires_at),
+        FixedAmountDiscount(name="Puma 300 off", discount_amount=Decimal(300),
+                            discount_rules=[BrandDiscountRule(include_brands=["PUMA"])],
+                            discount_type=DiscountType.BRAND_DISCOUNT, expires_at=expires_at.add(days=1)),
+    )
+    product = Product(id="P1", brand="PUMA", brand_tier=BrandTier.PREMIUM, category="T-Shirt",
+                      base_price=Decimal(1000), current_price=Decimal(1000))
+    context = CartContext(customer_profile=CustomerProfile(id="C1", name="Jane", tier=CustomerTier.GOLD,
+                                                           email="j@example.com", phone="1"),
+                          cart_items=[CartItem(product=product, quantity=1, size="M")])
+
+    customer_strategy = OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    margin_strategy = OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING, DiscountObjective.BEST_FOR_MARGIN)
+
+    assert customer_strategy.resolve_discounts([soon, later], context) == [later]
+    assert margin_strategy.resolve_discounts([soon, later], context) == [soon]
+    # Without a cart there is nothing to optimize for.
+    assert customer_strategy.resolve_discounts([soon, later]) == [soon]
+
+
+def test_falls_back_to_greedy_when_out_of_time(cart_context):
+    discounts = generate_discounts(200, brands=4, categories=3, voucher_share=0.2)
+    ticks = itertools.count()
+    strategy = OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING, time_budget_seconds=5,
+                                                 monotonic_clock=lambda: next(ticks))
+
+    resolved = strategy.resolve_discounts(list(discounts), cart_context)
+
+    assert resolved == DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING).resolve_discounts(list(discounts))
+    assert strategy.timeouts == 1
+
+
+def test_dozens_of_candidates_per_type_resolve_within_budget(cart_context):
+    discounts = generate_discounts(160, brands=4, categories=3, voucher_share=0.25, seed=9)
+    strategy = OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING, time_budget_seconds=2)
+    greedy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING).resolve_discounts(list(discounts))
+
+    resolved = strategy.resolve_discounts(list(discounts), cart_context)
+
+    assert strategy.timeouts == 0
+    assert _final_price(resolved, cart_context) <= _final_price(greedy, cart_context)
+
+
+def test_processor_passes_the_cart_to_the_strategy(cart_context):
+    discounts = generate_discounts(40, brands=4, categories=3, voucher_share=0.2, seed=3)
+    strategy = OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING, time_budget_seconds=10)
+    processor = DiscountProcessor(strategy, mutate_products=False)
+
+    discounted_price = processor.apply_discounts(list(discounts), cart_context.customer_profile,
+                                                 cart_context.cart_items, cart_context.payment_info)
+
+    assert processor.resolves_per_cart
+    assert discounted_price.final_price == min(_exhaustive_final_prices(discounts, cart_context))
+
+
+@pytest.mark.asyncio
+async def test_calculate_many_resolves_each_cart():
+    rng = random.Random(8)
+    discounts = generate_discounts(40, brands=4, categories=3, seed=4)
+    service = DiscountService(InMemoryDiscountRepository(discounts), DiscountProcessor(
+        OptimalDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING, time_budget_seconds=10), mutate_products=False))
+    requests = [(generate_cart(6, brands=4, categories=3, rng=rng), generate_customer(rng)) for _ in range(5)]
+
+    batched = [discounted_price async for discounted_price in service.calculate_many(requests)]
+
+    for (cart_items, customer), discounted_price in zip(requests, batched, strict=True):
+        assert discounted_price == await service.calculate_cart_discounts(cart_items=cart_items, customer=customer)
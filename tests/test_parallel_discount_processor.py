@@ -0,0 +1,64 @@
+import asyncio
+import random
+
+import pytest
+
+from benchmarks.synthetic_data import (
+    DISCOUNT_TYPE_ORDERING, generate_cart, generate_customer, generate_discounts, generate_payment_info,
+)
+from discounts.index.discount_index import DiscountIndex
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor, PricingJob
+from discounts.processor.parallel_discount_processor import ParallelDiscountProcessor
+
+
+def _jobs(processor: DiscountProcessor, discounts: list, voucher) -> list[PricingJob]:
+    rng = random.Random(7)
+    catalogue_plan = processor.resolve_discounts(list(discounts))
+    voucher_plan = processor.resolve_discounts(list(discounts) + [voucher])
+    return [
+        PricingJob(resolved_discounts=voucher_plan if number % 3 == 0 else catalogue_plan,
+                   customer_profile=generate_customer(rng), cart_items=generate_cart(20, brands=5, rng=rng),
+                   payment_info=generate_payment_info(rng))
+        for number in range(40)
+    ]
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_parallel_processor_matches_serial_mode(use_index):
+    discounts = generate_discounts(200, brands=5)
+    # Vouchers are usually fetched per request, so this one is not part of the shipped catalogue.
+    voucher = generate_discounts(1, voucher_share=1.0, seed=3)[0]
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    serial = DiscountProcessor(strategy, discount_index=DiscountIndex(discounts) if use_index else None)
+    expected = serial.apply_discounts_many(_jobs(serial, discounts, voucher))
+
+    with ParallelDiscountProcessor(strategy, discount_index=DiscountIndex(discounts) if use_index else None,
+                                   max_workers=2, chunk_size=7) as parallel:
+        parallel.load_catalogue(discounts)
+        results = parallel.apply_discounts_many(_jobs(parallel, discounts, voucher))
+
+    assert results == expected
+
+
+@pytest.mark.asyncio
+async def test_batches_priced_on_the_workers_do_not_block_the_event_loop():
+    discounts = generate_discounts(200, brands=5)
+    voucher = generate_discounts(1, voucher_share=1.0, seed=3)[0]
+    strategy = DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING)
+    serial = DiscountProcessor(strategy)
+    expected = serial.apply_discounts_many(_jobs(serial, discounts, voucher))
+    events = []
+
+    async def price(processor: ParallelDiscountProcessor) -> list:
+        events.append("started")
+        discounted_prices = await processor.apply_discounts_many_async(_jobs(processor, discounts, voucher))
+        events.append("finished")
+        return discounted_prices
+
+    with ParallelDiscountProcessor(strategy, max_workers=2, chunk_size=7) as parallel:
+        parallel.load_catalogue(discounts)
+        first, second = await asyncio.gather(price(parallel), price(parallel))
+
+    assert first == second == expected
+    assert events == ["started", "started", "finished", "finished"]
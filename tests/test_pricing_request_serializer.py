@@ -0,0 +1,78 @@
+import io
+import random
+from decimal import Decimal
+
+import pytest
+
+from benchmarks.pricing_benchmark import ENGINES, benchmark_engine, percentile
+from benchmarks.synthetic_data import generate_discounts, generate_requests
+from models.discount import DiscountedLineItem, DiscountedPrice
+from repositories.discount_repository import InMemoryDiscountRepository
+from serializers.pricing_request_serializer import (
+    discounted_price_to_dict, pricing_request_from_dict, read_pricing_requests, write_pricing_requests,
+)
+
+
+def test_pricing_requests_round_trip_through_json_lines():
+    requests = generate_requests(20, max_cart_size=5, voucher_codes=["SUPER69"], voucher_share=0.5, seed=1)
+    file = io.StringIO()
+
+    assert write_pricing_requests(requests, file) == 20
+    file.seek(0)
+
+    assert list(read_pricing_requests(file)) == requests
+
+
+def test_optional_fields_default():
+    request = pricing_request_from_dict({
+        "customer": {"id": "C1", "name": "Jane", "tier": "gold", "email": "j@example.com", "phone": "1"},
+        "cart_items": [{"product": {"id": "P1", "brand": "PUMA", "brand_tier": "premium", "category": "T-Shirt",
+                                    "base_price": "999.99"}, "quantity": 2, "size": "M"}],
+    })
+
+    assert request.payment_info is None and request.voucher_code is None
+    assert request.cart_items[0].product.current_price == Decimal("999.99")
+
+
+@pytest.mark.parametrize("quantity", ["x", "2", 0, -1, 1.5, True])
+def test_quantities_must_be_positive_integers(quantity):
+    with pytest.raises(ValueError, match="Quantity"):
+        pricing_request_from_dict({
+            "customer": {"id": "C1", "name": "Jane", "tier": "gold", "email": "j@example.com", "phone": "1"},
+            "cart_items": [{"product": {"id": "P1", "brand": "PUMA", "brand_tier": "premium", "category": "T-Shirt",
+                                        "base_price": "999.99"}, "quantity": quantity, "size": "M"}],
+        })
+
+
+def test_discounted_price_amounts_are_exact_strings():
+    discounted_price = DiscountedPrice(
+        original_price=Decimal("100.00"), final_price=Decimal("66.67"), applied_discounts={"Third": Decimal("33.33")},
+        message="", line_items=[DiscountedLineItem("P1", 1, Decimal("100.00"), Decimal("66.67"),
+                                                   {"Third": Decimal("33.33")})],
+    )
+
+    data = discounted_price_to_dict(discounted_price)
+
+    assert data["final_price"] == "66.67"
+    assert data["line_items"][0]["applied_discounts"] == {"Third": "33.33"}
+
+
+def test_percentile_uses_nearest_rank():
+    values = sorted(random.Random(0).sample(range(1000), 100))
+
+    assert percentile(values, 0.5) == values[49]
+    assert percentile(values, 0.99) == values[98]
+    assert percentile([7.0], 0.99) == 7.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", list(ENGINES))
+async def test_benchmark_engine_reports_every_request(engine):
+    repository = InMemoryDiscountRepository(generate_discounts(50, voucher_share=0.2))
+    requests = generate_requests(10, max_cart_size=20, seed=2)
+
+    result = await benchmark_engine(engine, repository, requests, warmup=2, allocation_sample=3)
+
+    assert result.carts == 10 and result.carts_per_second > 0
+    assert 0 < result.p50_ms <= result.p99_ms
+    assert result.allocated_bytes_per_cart > 0
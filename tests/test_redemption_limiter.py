@@ -0,0 +1,179 @@
+import asyncio
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from exceptions import DiscountExpiredException, RedemptionLimitExceededException
+from repositories.discount_repository import InMemoryDiscountRepository
+from services.discount_service import DiscountService
+from services.redemption_limiter import RedemptionLimiter
+
+
+def _voucher(code="super_69", *, max_redemptions=None, max_redemptions_per_customer=None,
+             expires_in_days=30) -> PercentageDiscount:
+    return PercentageDiscount(name=code, discount_percentage=Decimal(69), discount_rules=[],
+                              discount_type=DiscountType.VOUCHER_DISCOUNT,
+                              expires_at=pendulum.now("UTC") + pendulum.duration(days=expires_in_days),
+                              max_redemptions=max_redemptions,
+                              max_redemptions_per_customer=max_redemptions_per_customer)
+
+
+async def _try_redeem(limiter: RedemptionLimiter, voucher: PercentageDiscount, customer_id: str) -> bool:
+    try:
+        reservation = await limiter.reserve(voucher, customer_id)
+    except RedemptionLimitExceededException:
+        return False
+    # Yields, so every reservation is held while the others run.
+    await asyncio.sleep(0)
+    await limiter.commit(reservation)
+    return True
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shards", [1, 16])
+async def test_concurrent_redemptions_never_exceed_the_limit(shards):
+    repository = InMemoryDiscountRepository()
+    limiter = RedemptionLimiter(repository, shards=shards, flush_threshold=25)
+    voucher = _voucher(max_redemptions=100)
+
+    redeemed = await asyncio.gather(*(_try_redeem(limiter, voucher, f"customer-{n}") for n in range(1000)))
+    await limiter.flush()
+
+    assert sum(redeemed) == 100
+    assert await repository.get_redemption_count("super_69") == 100
+
+
+@pytest.mark.asyncio
+async def test_limiters_sharing_a_repository_never_exceed_the_limit_together():
+    repository = InMemoryDiscountRepository()
+    # One limiter per worker process.
+    limiters = [RedemptionLimiter(repository, shards=4, claim_size=8) for _ in range(3)]
+    voucher = _voucher(max_redemptions=50)
+
+    redeemed = await asyncio.gather(*(_try_redeem(limiters[n % 3], voucher, f"customer-{n}") for n in range(300)))
+    assert sum(redeemed) <= 50
+    for limiter in limiters:
+        await limiter.flush()
+
+    # Flushing returned the unreserved claims, so any limiter can hand out what is left.
+    late = 0
+    while await _try_redeem(limiters[0], voucher, "late"):
+        late += 1
+    await limiters[0].flush()
+    assert sum(redeemed) + late == 50
+    assert await repository.get_redemption_count("super_69") == 50
+
+
+@pytest.mark.asyncio
+async def test_per_customer_limit():
+    limiter = RedemptionLimiter(InMemoryDiscountRepository())
+    voucher = _voucher(max_redemptions_per_customer=2)
+
+    assert [await _try_redeem(limiter, voucher, "alice") for _ in range(3)] == [True, True, False]
+    assert await _try_redeem(limiter, voucher, "bob")
+
+
+@pytest.mark.asyncio
+async def test_released_reservations_can_be_reserved_again():
+    limiter = RedemptionLimiter(InMemoryDiscountRepository(), shards=4)
+    voucher = _voucher(max_redemptions=1, max_redemptions_per_customer=1)
+    reservation = await limiter.reserve(voucher, "alice")
+    with pytest.raises(RedemptionLimitExceededException):
+        await limiter.reserve(voucher, "bob")
+
+    limiter.release(reservation)
+
+    with pytest.raises(ValueError):
+        limiter.release(reservation)
+    assert await _try_redeem(limiter, voucher, "alice")
+    assert not await _try_redeem(limiter, voucher, "bob")
+
+
+@pytest.mark.asyncio
+async def test_limits_start_from_the_recorded_redemptions():
+    repository = InMemoryDiscountRepository()
+    await repository.add_redemptions({("super_69", "alice"): 2, ("super_69", "bob"): 1})
+    limiter = RedemptionLimiter(repository)
+
+    assert not await _try_redeem(limiter, _voucher(max_redemptions_per_customer=2), "alice")
+    assert await _try_redeem(limiter, _voucher(max_redemptions=4), "carol")
+    assert not await _try_redeem(limiter, _voucher(max_redemptions=4), "dave")
+
+
+@pytest.mark.asyncio
+async def test_failed_claims_leave_no_customer_reservation():
+    repository = InMemoryDiscountRepository()
+    repository.claim_redemptions = AsyncMock(side_effect=ConnectionError)
+    limiter = RedemptionLimiter(repository)
+    voucher = _voucher(max_redemptions=10, max_redemptions_per_customer=1)
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await limiter.reserve(voucher, "alice")
+    repository.claim_redemptions = AsyncMock(return_value=10)
+
+    assert await _try_redeem(limiter, voucher, "alice")
+
+
+@pytest.mark.asyncio
+async def test_commits_are_flushed_in_batches_and_kept_when_a_flush_fails():
+    repository = InMemoryDiscountRepository()
+    repository.add_redemptions = AsyncMock(side_effect=[ConnectionError, None])
+    limiter = RedemptionLimiter(repository, flush_threshold=3)
+    voucher = _voucher(max_redemptions=10)
+
+    assert await _try_redeem(limiter, voucher, "alice")
+    assert await _try_redeem(limiter, voucher, "alice")
+    assert limiter.pending_count == 2
+    bob = await limiter.reserve(voucher, "bob")
+    await limiter.commit(bob)
+    repository.add_redemptions.assert_awaited_once()
+    assert limiter.pending_count == 3
+    with pytest.raises(ValueError):
+        limiter.release(bob)
+
+    await limiter.flush()
+
+    repository.add_redemptions.assert_awaited_with({("super_69", "alice"): 2, ("super_69", "bob"): 1})
+    assert limiter.pending_count == 0
+
+
+@pytest.mark.asyncio
+async def test_service_checks_the_code_before_reserving(customer_factory):
+    repository = InMemoryDiscountRepository([_voucher(max_redemptions=1), _voucher("expired", expires_in_days=-1)])
+    service = DiscountService(repository, DiscountProcessor(DefaultDiscountProcessingStrategy(list(DiscountType))))
+
+    with pytest.raises(DiscountExpiredException):
+        await service.reserve_redemption("expired", customer_factory(id="alice"))
+    reservation = await service.reserve_redemption("super_69", customer_factory(id="alice"))
+    await service.commit_redemption(reservation)
+    with pytest.raises(RedemptionLimitExceededException):
+        await service.reserve_redemption("super_69", customer_factory(id="bob"))
+    await service.flush_redemptions()
+
+    assert await repository.get_redemption_count("super_69", "alice") == 1
+
+
+@pytest.mark.asyncio
+async def test_service_rejects_and_prices_without_exhausted_vouchers(cart_factory, customer_factory):
+    voucher = _voucher(max_redemptions=1)
+    repository = InMemoryDiscountRepository([voucher])
+    other_worker = RedemptionLimiter(repository)
+    await other_worker.commit(await other_worker.reserve(voucher, "alice"))
+    service = DiscountService(repository, DiscountProcessor(DefaultDiscountProcessingStrategy(list(DiscountType))))
+    bob = customer_factory(id="bob")
+
+    assert (await service.calculate_cart_discounts(cart_factory(), bob, voucher_code="super_69")
+            ).final_price == Decimal(310)
+    with pytest.raises(RedemptionLimitExceededException):
+        await service.validate_discount_code("super_69", cart_factory(), bob)
+    discounted_price = await service.calculate_cart_discounts(cart_factory(), bob, voucher_code="super_69")
+
+    assert discounted_price.final_price == Decimal(1000)
+    assert "super_69 has no redemptions left" in discounted_price.message
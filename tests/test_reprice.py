@@ -0,0 +1,121 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from benchmarks.synthetic_data import generate_requests
+from fake_data import DUMMY_DISCOUNTS
+from reprice import build_processor, reprice
+from repositories.discount_repository import InMemoryDiscountRepository
+from serializers.pricing_request_serializer import discounted_price_to_dict, pricing_request_to_dict
+from services.discount_service import DiscountService
+
+
+def _service() -> DiscountService:
+    repository = InMemoryDiscountRepository(DUMMY_DISCOUNTS)
+    return DiscountService(repository, build_processor(repository))
+
+
+def _lines(requests) -> list[str]:
+    return [json.dumps(pricing_request_to_dict(request)) + "\n" for request in requests]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_size, concurrency", [(1, 1), (7, 3), (1000, 2)])
+async def test_results_are_written_in_input_order(batch_size, concurrency):
+    requests = generate_requests(50, brands=5, categories=3, max_cart_size=5, seed=2)
+    service = _service()
+    expected = [json.dumps(discounted_price_to_dict(
+        await service.calculate_cart_discounts(request.cart_items, request.customer, request.payment_info,
+                                               request.voucher_code)
+    )) for request in requests]
+    output = io.StringIO()
+
+    summary = await reprice(_service(), _lines(requests), output, batch_size=batch_size, concurrency=concurrency)
+
+    assert output.getvalue().splitlines() == expected
+    assert (summary.carts, summary.errors) == (50, 0)
+
+
+@pytest.mark.asyncio
+async def test_invalid_lines_keep_their_place():
+    [valid_line] = _lines(generate_requests(1, max_cart_size=2, seed=3))
+    output = io.StringIO()
+
+    summary = await reprice(_service(), [valid_line, "{not json\n", "\n", '{"customer": {}}\n', valid_line],
+                            output, batch_size=2)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert ["error" in result for result in results] == [False, True, True, False]
+    assert results[2]["error"].startswith("KeyError")
+    assert (summary.carts, summary.errors) == (4, 2)
+
+
+@pytest.mark.asyncio
+async def test_lines_with_invalid_prices_or_quantities_keep_their_place():
+    [valid_line] = _lines(generate_requests(1, max_cart_size=2, seed=3))
+    bad_price, bad_quantity = json.loads(valid_line), json.loads(valid_line)
+    bad_price["cart_items"][0]["product"]["base_price"] = "abc"
+    bad_quantity["cart_items"][0]["quantity"] = "x"
+    output = io.StringIO()
+
+    summary = await reprice(_service(), [valid_line, json.dumps(bad_price), json.dumps(bad_quantity), valid_line],
+                            output, batch_size=4)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert ["error" in result for result in results] == [False, True, True, False]
+    assert results[1]["error"].startswith("InvalidOperation")
+    assert results[2]["error"].startswith("ValueError")
+    assert (summary.carts, summary.errors) == (4, 2)
+
+
+@pytest.mark.asyncio
+async def test_a_cart_that_cannot_be_priced_only_fails_its_own_line():
+    [valid_line] = _lines(generate_requests(1, max_cart_size=2, seed=3))
+    unpriceable = json.loads(valid_line)
+    # Parses, but any arithmetic on a signaling NaN raises.
+    unpriceable["cart_items"][0]["product"]["base_price"] = "sNaN"
+    del unpriceable["cart_items"][0]["product"]["current_price"]
+    output = io.StringIO()
+
+    summary = await reprice(_service(), [valid_line, json.dumps(unpriceable), valid_line], output, batch_size=3)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert ["error" in result for result in results] == [False, True, False]
+    assert results[0] == results[2]
+    assert (summary.carts, summary.errors) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_at_most_concurrency_batches_are_in_flight():
+    service = _service()
+    calculate_many = service.calculate_many
+    in_flight = peak = 0
+
+    async def tracking_calculate_many(requests, batch_size=1000):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        async for discounted_price in calculate_many(requests, batch_size):
+            yield discounted_price
+        in_flight -= 1
+
+    service.calculate_many = tracking_calculate_many
+    lines = _lines(generate_requests(40, max_cart_size=2, seed=4))
+    output = io.StringIO()
+    consumed = 0
+
+    def counting_lines():
+        nonlocal consumed
+        for line in lines:
+            consumed += 1
+            # Backpressure: lines read but not written yet never exceed the batches allowed in flight.
+            assert consumed - len(output.getvalue().splitlines()) <= 3 * 4
+            yield line
+
+    await reprice(service, counting_lines(), output, batch_size=4, concurrency=3)
+
+    assert peak == 3
+    assert len(output.getvalue().splitlines()) == 40
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.processing_strategies.default_discount_porcessing_strategy import DefaultDiscountProcessingStrategy
+from discounts.processor.discount_processor import DiscountProcessor
+from discounts.processor.minor_unit_discount_processor import MinorUnitDiscountProcessor
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.category_discount_rule import CategoryDiscountRule
+from discounts.rules.customer_tier_discount_rule import CustomerTierDiscountRule
+from discounts.rules.discount_rule_interface import IDiscountRule
+from discounts.rules.payment_discount_rule import PaymentDiscountRule
+from discounts.rules.rule_compiler import RuleCompiler
+from models.customer import CustomerTier
+from models.payment import PaymentInfo, PaymentMethod
+
+DISCOUNT_TYPE_ORDERING = [
+    DiscountType.BRAND_DISCOUNT,
+    DiscountType.CATEGORY_DISCOUNT,
+    DiscountType.VOUCHER_DISCOUNT,
+    DiscountType.BANK_DISCOUNT,
+]
+BRANDS = ["PUMA", "NIKE", "ADIDAS", "REEBOK", "ASICS"]
+CATEGORIES = ["T-Shirt", "Shoes", "Jeans", "Jacket"]
+BANKS = ["ICICI Bank", "HDFC Bank", "SBI", None]
+
+
+class SmallSizeOnlyRule(IDiscountRule):
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        return cart_item.size == "S"
+
+
+class NotPumaBrandRule(BrandDiscountRule):
+    """A subclass overriding `is_applicable`, which must not be compiled as a plain brand rule."""
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        return cart_item.product.brand != "PUMA"
+
+
+def _random_subset(rng: random.Random, values: list) -> list:
+    return rng.sample(values, rng.randint(0, 2))
+
+
+def _random_rules(rng: random.Random) -> list[IDiscountRule]:
+    rules = []
+    for _ in range(rng.randint(0, 3)):
+        kind = rng.randrange(5)
+        if kind == 0:
+            rules.append(BrandDiscountRule(include_brands=_random_subset(rng, BRANDS + ["ZARA"]),
+                                           exclude_brands=_random_subset(rng, BRANDS)))
+        elif kind == 1:
+            rules.append(CategoryDiscountRule(include_categories=_random_subset(rng, CATEGORIES),
+                                              exclude_categories=_random_subset(rng, CATEGORIES)))
+        elif kind == 2:
+            rules.append(CustomerTierDiscountRule(include_tiers=_random_subset(rng, list(CustomerTier)),
+                                                  exclude_tiers=_random_subset(rng, list(CustomerTier))))
+        elif kind == 3:
+            rules.append(PaymentDiscountRule(applicable_banks=_random_subset(rng, BANKS[:-1]),
+                                             applicable_payment_methods=_random_subset(rng, list(PaymentMethod))))
+        else:
+            rules.append(SmallSizeOnlyRule())
+    return rules
+
+
+def test_compiled_rules_match_interpreted_rules(cart_item_factory, customer_factory, discount_factory):
+    rng = random.Random(12)
+    compiler = RuleCompiler()
+    discounts = [discount_factory(rules=_random_rules(rng)) for _ in range(300)]
+    for discount in discounts:
+        compiler.compile(discount)
+    # Carts also use values no rule mentions, which must behave as any other excluded or unlisted value.
+    for _ in range(300):
+        customer = customer_factory(rng.choice(list(CustomerTier)))
+        payment_info = rng.choice([
+            None,
+            PaymentInfo(method=rng.choice(list(PaymentMethod)), bank_name=rng.choice(BANKS + ["Axis Bank"]),
+                        card_type=None),
+        ])
+        item = cart_item_factory(brand=rng.choice(BRANDS + ["LEVIS"]), category=rng.choice(CATEGORIES + ["Socks"]),
+                                 size=rng.choice(["S", "M"]))
+        for discount in discounts:
+            assert compiler.matches_rules(discount, customer, item, payment_info) == discount.matches_rules(
+                customer_profile=customer, cart_item=item, payment_info=payment_info)
+
+
+def test_rules_on_the_same_attribute_are_intersected(cart_item_factory, customer_factory, discount_factory):
+    compiler = RuleCompiler()
+    discount = discount_factory(rules=[BrandDiscountRule(include_brands=["PUMA", "NIKE"]),
+                                       BrandDiscountRule(include_brands=["NIKE", "ADIDAS"])])
+    customer = customer_factory(CustomerTier.GOLD)
+
+    assert compiler.matches_rules(discount, customer, cart_item_factory(brand="NIKE", category="Shoes"))
+    assert not compiler.matches_rules(discount, customer, cart_item_factory(brand="PUMA", category="Shoes"))
+    assert not compiler.matches_rules(discount, customer, cart_item_factory(brand="ADIDAS", category="Shoes"))
+
+
+def test_payment_rule_rejects_carts_without_payment(cart_item_factory, customer_factory, discount_factory):
+    compiler = RuleCompiler()
+    discount = discount_factory(rules=[PaymentDiscountRule(applicable_banks=[], applicable_payment_methods=[])])
+    customer, item = customer_factory(CustomerTier.GOLD), cart_item_factory(brand="PUMA", category="Shoes")
+
+    assert not compiler.matches_rules(discount, customer, item)
+    assert compiler.matches_rules(discount, customer, item,
+                                  PaymentInfo(method=PaymentMethod.UPI, bank_name=None, card_type=None))
+
+
+def test_custom_rules_fall_back_to_is_applicable(cart_item_factory, customer_factory, discount_factory):
+    compiler = RuleCompiler()
+    discount = discount_factory(rules=[CategoryDiscountRule(include_categories=["Shoes"]), SmallSizeOnlyRule(),
+                                       NotPumaBrandRule()])
+    compiled = compiler.compile(discount)
+    customer = customer_factory(CustomerTier.GOLD)
+
+    assert [type(rule) for rule in compiled.residual_rules] == [SmallSizeOnlyRule, NotPumaBrandRule]
+    assert compiler.matches_rules(discount, customer, cart_item_factory(brand="NIKE", category="Shoes", size="S"))
+    assert not compiler.matches_rules(discount, customer, cart_item_factory(brand="NIKE", category="Shoes", size="M"))
+    assert not compiler.matches_rules(discount, customer, cart_item_factory(brand="PUMA", category="Shoes", size="S"))
+    assert not compiler.matches_rules(discount, customer, cart_item_factory(brand="NIKE", category="Jeans", size="S"))
+
+
+def test_compiled_rules_are_memoized_until_rules_are_replaced(cart_item_factory, customer_factory, discount_factory):
+    compiler = RuleCompiler()
+    discount = discount_factory(rules=[BrandDiscountRule(include_brands=["PUMA"])])
+    compiled = compiler.compile(discount)
+    assert compiler.compile(discount) is compiled
+
+    discount.discount_rules = [BrandDiscountRule(include_brands=["NIKE"])]
+    assert compiler.compile(discount) is not compiled
+    assert compiler.matches_rules(discount, customer_factory(CustomerTier.GOLD),
+                                  cart_item_factory(brand="NIKE", category="Shoes"))
+
+
+@pytest.mark.parametrize("processor_class", [DiscountProcessor, MinorUnitDiscountProcessor])
+def test_processor_with_compiler_matches_processor_without(processor_class, cart_item_factory, customer_factory,
+                                                           discount_factory):
+    rng = random.Random(7)
+    for _ in range(50):
+        discounts = [discount_factory(f"{discount_type.value} {index}", discount_type, rules=_random_rules(rng))
+                     for index in range(3) for discount_type in DISCOUNT_TYPE_ORDERING]
+        customer = customer_factory(rng.choice(list(CustomerTier)))
+        payment_info = rng.choice([None, PaymentInfo(method=rng.choice(list(PaymentMethod)),
+                                                     bank_name=rng.choice(BANKS), card_type=None)])
+        cart = [cart_item_factory(brand=rng.choice(BRANDS), category=rng.choice(CATEGORIES),
+                                  base_price=str(rng.randint(100, 5000)), size=rng.choice(["S", "M"]))
+                for _ in range(rng.randint(1, 10))]
+        results = [
+            processor_class(DefaultDiscountProcessingStrategy(DISCOUNT_TYPE_ORDERING), mutate_products=False,
+                            rule_compiler=rule_compiler).apply_discounts(discounts, customer, cart, payment_info)
+            for rule_compiler in (None, RuleCompiler())
+        ]
+        assert results[0] == results[1]
@@ -0,0 +1,166 @@
+import sqlite3
+
+import pendulum
+import pytest
+
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from discounts.rules.brand_discount_rule import BrandDiscountRule
+from discounts.rules.discount_rule_interface import IDiscountRule
+from repositories.discount_repository import InMemoryDiscountRepository
+from repositories.sqlite_discount_repository import SqliteDiscountRepository
+from serializers.discount_serializer import discount_to_dict
+
+NOW = pendulum.now("UTC")
+
+
+class SmallSizeOnlyRule(IDiscountRule):
+
+    def is_applicable(self, *, customer_profile, cart_item, payment_info=None) -> bool:
+        return cart_item.size == "S"
+
+
+def _catalogue(discount_factory) -> list[PercentageDiscount]:
+    return [
+        discount_factory("PUMA", rules=[BrandDiscountRule(include_brands=["PUMA"])]),
+        discount_factory("Upcoming", DiscountType.CATEGORY_DISCOUNT, starts_in_days=2, expires_in_days=4),
+        discount_factory("Ending", DiscountType.BANK_DISCOUNT, expires_in_days=1),
+        discount_factory("Welcome", DiscountType.VOUCHER_DISCOUNT, discount_code="WELCOME"),
+        discount_factory("Shadowed welcome", DiscountType.VOUCHER_DISCOUNT, discount_code="WELCOME"),
+    ]
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SqliteDiscountRepository(str(tmp_path / "discounts.db"), pool_size=2)
+    yield repository
+    repository.close()
+
+
+def _names(discounts) -> list[str]:
+    return [discount.name for discount in discounts]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("days", [0, 3, 5, -1])
+@pytest.mark.parametrize("exclude", [set(), {DiscountType.VOUCHER_DISCOUNT}])
+async def test_listing_matches_in_memory_listing(repository, days, exclude, discount_factory):
+    catalogue = _catalogue(discount_factory)
+    await repository.add_discounts(catalogue)
+    memory = InMemoryDiscountRepository(catalogue)
+    now = NOW.add(days=days)
+
+    listed = await repository.list_all_active_discounts(exclude, now=now)
+
+    assert [discount_to_dict(discount) for discount in listed] == \
+           [discount_to_dict(discount) for discount in await memory.list_all_active_discounts(exclude, now=now)]
+
+
+@pytest.mark.asyncio
+async def test_listings_are_reused_until_the_version_changes(repository, discount_factory):
+    await repository.add_discounts(_catalogue(discount_factory))
+    first = await repository.list_all_active_discounts(set(), now=NOW)
+    version = await repository.get_catalogue_version()
+
+    again = await repository.list_all_active_discounts(set(), now=NOW)
+    assert _names(again) == ["PUMA", "Ending", "Welcome", "Shadowed welcome"]
+    assert again is first
+
+    await repository.add_discounts([discount_factory("Added")])
+    assert await repository.get_catalogue_version() != version
+    assert _names(await repository.list_all_active_discounts(set(), now=NOW))[-1] == "Added"
+
+
+@pytest.mark.asyncio
+async def test_code_lookups(repository, discount_factory):
+    await repository.add_discounts(_catalogue(discount_factory))
+    template = discount_factory("Festive 15%", DiscountType.VOUCHER_DISCOUNT)
+    assert await repository.bulk_load_voucher_codes(template, [f"FEST-{number}" for number in range(1500)]) == 1500
+    assert await repository.bulk_load_voucher_codes(template, ["FEST-1", "FEST-1500", "WELCOME"]) == 2
+
+    assert (await repository.get_discount_by_code("WELCOME")).name == "Welcome"
+    voucher = await repository.get_discount_by_code("FEST-42")
+    assert (voucher.name, voucher.discount_code) == ("Festive 15%", "FEST-42")
+    assert await repository.get_discount_by_code("welcome") is None
+
+    await repository.remove_voucher_codes(["FEST-42"])
+    assert await repository.remove_discount_codes(["WELCOME"]) == 2
+    assert await repository.get_discount_by_code("FEST-42") is None
+    assert (await repository.get_discount_by_code("WELCOME")).name == "Festive 15%"
+
+
+@pytest.mark.asyncio
+async def test_voucher_templates_are_shared_and_removed_with_their_last_code(repository, tmp_path, discount_factory):
+    festive = discount_factory("Festive 15%", DiscountType.VOUCHER_DISCOUNT)
+    for chunk in range(3):
+        await repository.bulk_load_voucher_codes(festive, [f"FEST-{chunk}-{number}" for number in range(10)])
+    await repository.bulk_load_voucher_codes(discount_factory("Welcome", DiscountType.VOUCHER_DISCOUNT), ["WELCOME-1"])
+
+    def template_names() -> list[str]:
+        with sqlite3.connect(tmp_path / "discounts.db") as connection:
+            return sorted(name for name, in connection.execute(
+                "SELECT json_extract(definition, '$.name') FROM voucher_templates"))
+
+    assert template_names() == ["Festive 15%", "Welcome"]
+    await repository.bulk_load_voucher_codes(festive, ["WELCOME-1"])
+    assert template_names() == ["Festive 15%"]
+    await repository.remove_voucher_codes([f"FEST-{chunk}-{number}" for chunk in range(3) for number in range(10)])
+    assert template_names() == ["Festive 15%"]
+    await repository.remove_voucher_codes(["WELCOME-1"])
+    assert template_names() == []
+
+
+@pytest.mark.asyncio
+async def test_catalogue_version_changes_when_a_voucher_template_starts_or_expires(repository, discount_factory):
+    await repository.add_discounts(_catalogue(discount_factory)[:1])
+    festive = discount_factory("Festive 15%", DiscountType.VOUCHER_DISCOUNT, starts_in_days=1, expires_in_days=3)
+    await repository.bulk_load_voucher_codes(festive, ["FEST-1"])
+
+    versions = [await repository.get_catalogue_version(NOW.add(days=days)) for days in (0, 2, 4)]
+
+    assert len(set(versions)) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_writes_are_rolled_back(repository, tmp_path, discount_factory):
+    await repository.add_discounts(_catalogue(discount_factory))
+    with pytest.raises(TypeError):
+        await repository.replace_discounts([discount_factory("Replacement"),
+                                            discount_factory("Custom", rules=[SmallSizeOnlyRule()])])
+
+    await repository.replace_discounts([discount_factory("Replacement")])
+    reopened = SqliteDiscountRepository(str(tmp_path / "discounts.db"))
+    try:
+        assert _names(await reopened.list_all_active_discounts(set())) == ["Replacement"]
+    finally:
+        reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_redemptions_are_counted_without_changing_the_catalogue_version(repository, discount_factory):
+    await repository.add_discounts(_catalogue(discount_factory))
+    version = await repository.get_catalogue_version()
+
+    await repository.add_redemptions({("WELCOME", "alice"): 2, ("WELCOME", "bob"): 1})
+    await repository.add_redemptions({("WELCOME", "alice"): 1})
+
+    assert await repository.get_redemption_count("WELCOME") == 4
+    assert await repository.get_redemption_count("WELCOME", "alice") == 3
+    assert await repository.get_redemption_count("WELCOME", "carol") == 0
+    assert await repository.get_redemption_count("PUMA") == 0
+    assert await repository.get_catalogue_version() == version
+
+
+@pytest.mark.asyncio
+async def test_redemption_claims_are_shared_between_connections(repository, tmp_path):
+    await repository.add_redemptions({("WELCOME", "alice"): 3})
+    other_process = SqliteDiscountRepository(str(tmp_path / "discounts.db"))
+    try:
+        assert await repository.claim_redemptions("WELCOME", 10, 4) == 4
+        assert await other_process.claim_redemptions("WELCOME", 10, 4) == 3
+        assert await repository.claim_redemptions("WELCOME", 10, 4) == 0
+
+        await other_process.return_redemptions("WELCOME", 2)
+        assert await repository.claim_redemptions("WELCOME", 10, 4) == 2
+    finally:
+        other_process.close()
@@ -0,0 +1,66 @@
+import random
+from decimal import Decimal
+
+import pendulum
+
+from discounts.constants import DiscountType
+from discounts.percentage_discount import PercentageDiscount
+from repositories.voucher_codes import VoucherCodes
+
+
+def _template(name: str) -> PercentageDiscount:
+    return PercentageDiscount(name=name, discount_percentage=Decimal(10), discount_rules=[],
+                              discount_type=DiscountType.VOUCHER_DISCOUNT,
+                              expires_at=pendulum.now("UTC") + pendulum.duration(days=30))
+
+
+def test_chunked_loads_and_removals_behave_like_a_dict():
+    rng = random.Random(5)
+    templates = [_template("A"), _template("B")]
+    voucher_codes, expected = VoucherCodes(), {}
+    for _ in range(200):
+        codes = [f"CODE-{rng.randrange(2_000)}" for _ in range(rng.randrange(1, 300))]
+        if rng.random() < 0.7:
+            template = rng.choice(templates)
+            voucher_codes = voucher_codes.with_codes(codes, template)
+            expected.update(dict.fromkeys(codes, template))
+        else:
+            voucher_codes = voucher_codes.without_codes(codes)
+            for code in codes:
+                expected.pop(code, None)
+
+        assert len(voucher_codes) == len(expected)
+    assert dict(voucher_codes) == expected
+    assert voucher_codes.get("CODE-unknown") is None and "CODE-unknown" not in voucher_codes
+
+
+def test_loading_codes_leaves_earlier_mappings_unchanged():
+    first = VoucherCodes().with_codes(["A1", "A2"], _template("A"))
+
+    second = first.with_codes(["B1"], _template("B")).without_codes(["A1"])
+
+    assert sorted(first) == ["A1", "A2"]
+    assert sorted(second) == ["A2", "B1"]
+    assert second["A2"] is first["A2"]
+
+
+def test_segments_stay_logarithmic_in_the_number_of_loads():
+    voucher_codes = VoucherCodes()
+    for chunk in range(1_000):
+        voucher_codes = voucher_codes.with_codes([f"{chunk}-{number}" for number in range(10)], _template("A"))
+
+    assert len(voucher_codes) == 10_000
+    # Each segment is less than half the size of the next older one.
+    assert len(voucher_codes._segments) <= 14
+
+
+def test_templates_are_tracked_without_visiting_the_codes():
+    a, b = _template("A"), _template("B")
+    voucher_codes = VoucherCodes({"A1": a}).with_codes([f"B{number}" for number in range(10)], b)
+    assert voucher_codes.templates == (a, b)
+    assert voucher_codes.with_codes(["A2"], a).templates == (a, b)
+
+    # A template stays until the segments are merged into one, here by removing more than half of the codes.
+    assert voucher_codes.without_codes(["A1"]).templates == (a, b)
+    assert voucher_codes.without_codes([f"B{number}" for number in range(10)]).templates == (a,)
+    assert VoucherCodes().templates == ()